@@ -3,27 +3,44 @@ MUN Connect Flask Backend
 -------------------------
 Main application factory and configuration.
 """
+import sys
+import time
+
+_import_started = time.perf_counter()
+_modules_before = set(sys.modules)
+
 from flask import Flask
 from flask_cors import CORS
-from flask_jwt_extended import JWTManager
-from flask_migrate import Migrate
 from flask_sqlalchemy import SQLAlchemy
+from app.core.clients import SupabaseClientRegistry
+from app.core.startup import StartupReport
+from app.core.tokens import TokenManager
+
+# Time and modules taken by importing this package, for the startup report
+_import_seconds = time.perf_counter() - _import_started
+_import_modules = set(sys.modules) - _modules_before
 
 # Initialize extensions
 db = SQLAlchemy()
-migrate = Migrate()
-jwt = JWTManager()
+jwt = TokenManager()
+supabase_clients = SupabaseClientRegistry()
 
 def create_app(config_name="default"):
     """
     Application factory function to create and configure the Flask app.
     
+    Each step is timed into a ``StartupReport``, logged once the app is
+    built. With ``LAZY_INIT`` the factory skips Flask-Migrate and the
+    Supabase client and checks connectivity in the background.
+    
     Args:
         config_name (str): Configuration environment to use
         
     Returns:
         Flask: Configured Flask application
     """
+    startup = StartupReport()
+    startup.record("import app", _import_seconds, _import_modules)
     app = Flask(__name__)
     
     # Load configuration based on environment
@@ -35,32 +52,121 @@ def create_app(config_name="default"):
         app.config.from_object("app.core.config.DevelopmentConfig")
     
     # Initialize extensions with app
-    db.init_app(app)
-    migrate.init_app(app, db)
-    jwt.init_app(app)
+    with startup.step("extensions"):
+        db.init_app(app)
+        jwt.init_app(app)
+        supabase_clients.init_app(app)
+    
+    # Database migrations ("flask db"); Alembic is slow to import
+    if not app.config.get("LAZY_INIT"):
+        with startup.step("migrations"):
+            from flask_migrate import Migrate
+            Migrate(app, db)
     
     # Enable CORS
     CORS(app, resources={r"/api/*": {"origins": "*"}})
     
+    # Local verification of Supabase access tokens (AUTH_MODE hybrid/supabase)
+    with startup.step("supabase tokens"):
+        from app.core.tokens import init_supabase_tokens
+        init_supabase_tokens(app)
+    
+    # Request spans, latency histograms and fallback counters (/metrics, /traces)
+    with startup.step("tracing"):
+        from app.core.tracing import init_tracing
+        init_tracing(app)
+    
+    # JSON responses encoded with orjson when installed
+    with startup.step("json provider"):
+        from app.core.serializers import init_json_provider
+        init_json_provider(app)
+    
     # Register blueprints
-    from app.auth import auth_bp
-    from app.users import users_bp
+    with startup.step("blueprints"):
+        from app.auth import auth_bp
+        from app.users import users_bp
+        from app.search import search_bp
+        from app.documents import documents_bp
+        from app.speeches import speeches_bp
+        from app.research import research_bp
+        from app.committees import committees_bp
+        
+        app.register_blueprint(auth_bp, url_prefix="/api/auth")
+        app.register_blueprint(users_bp, url_prefix="/api/users")
+        app.register_blueprint(search_bp, url_prefix="/api/search")
+        app.register_blueprint(documents_bp, url_prefix="/api/documents")
+        app.register_blueprint(speeches_bp, url_prefix="/api/speeches")
+        app.register_blueprint(research_bp, url_prefix="/api/research")
+        app.register_blueprint(committees_bp, url_prefix="/api/committees")
+    
+    # Data backend for structured queries (PostgREST or direct Postgres)
+    with startup.step("repository"):
+        from app.core.repository import init_repository
+        init_repository(app)
+    
+    # Raw SQL execution (MCP server with Supabase fallback)
+    with startup.step("sql client"):
+        from app.core.sql import init_sql_client
+        init_sql_client(app)
+    
+    # Profile search backend
+    with startup.step("search"):
+        from app.search.backends import init_search
+        init_search(app)
+    
+    # Rate limiting
+    with startup.step("rate limiter"):
+        from app.core.ratelimit import init_rate_limiter
+        init_rate_limiter(app)
+    
+    # Read-through profile cache
+    with startup.step("profile cache"):
+        from app.core.profiles import init_profile_cache
+        init_profile_cache(app)
+    
+    # Async views share one event loop per worker
+    with startup.step("async"):
+        from app.core.aio import init_async
+        init_async(app)
+    
+    # Suggested delegates index
+    with startup.step("recommendations"):
+        from app.users.recommendations import init_recommendations
+        init_recommendations(app)
+    
+    # Admin role cache
+    with startup.step("role cache"):
+        from app.core.roles import init_role_cache
+        init_role_cache(app)
+    
+    # Document revision store
+    with startup.step("revision store"):
+        from app.documents.revisions import init_revision_store
+        init_revision_store(app)
+    
+    # Research job queue
+    with startup.step("research queue"):
+        from app.research.jobs import init_research_queue
+        init_research_queue(app)
+    
+    # Profile change feed keeping the derived profile indexes fresh
+    with startup.step("change feed"):
+        from app.core.changefeed import init_change_feed
+        init_change_feed(app)
     
-    app.register_blueprint(auth_bp, url_prefix="/api/auth")
-    app.register_blueprint(users_bp, url_prefix="/api/users")
+    # Conditional GET, Cache-Control and compression for every response
+    with startup.step("response pipeline"):
+        from app.core.pipeline import init_response_pipeline
+        init_response_pipeline(app)
     
     # Register error handlers
     from app.core.errors import register_error_handlers
     register_error_handlers(app)
     
-    # Initialize Supabase client (test connection)
-    with app.app_context():
-        try:
-            from app.core.utils import create_supabase_client
-            supabase = create_supabase_client()
-            app.logger.info("Supabase connection established successfully")
-        except Exception as e:
-            app.logger.error(f"Failed to connect to Supabase: {str(e)}")
+    # Readiness checks (/healthz); builds the Supabase client unless LAZY_INIT
+    with startup.step("health checks"):
+        from app.core.startup import init_health
+        init_health(app, startup)
     
     # Shell context processor
     @app.shell_context_processor
@@ -70,4 +176,6 @@ def create_app(config_name="default"):
             "app": app,
         }
     
-    return app 
\ No newline at end of file
+    startup.finish()
+    app.logger.info(startup.format())
+    return app
\ No newline at end of file
@@ -1,25 +1,49 @@
 """
 Authentication routes for user authentication and authorization.
 """
+import asyncio
 from flask import request, jsonify, current_app
 from flask_jwt_extended import (
     create_access_token,
     create_refresh_token,
+    get_jwt,
     get_jwt_identity,
     jwt_required,
+    verify_jwt_in_request,
 )
 from app.auth import auth_bp
 from app.core.utils import supabase_request, generate_uuid
 from app.core.errors import (
     BadRequestError,
     UnauthorizedError,
+    NotFoundError,
     ValidationFailedError,
     ConflictError,
 )
+from app.core.query import Query, Param
+from app.core.aio import async_supabase_request, run_sync
+from app.core.profiles import aload_profile, get_profile_cache
+from app.core.roles import get_role_cache, resolve_admin
 from app.core.schemas import ProfileSchema
+from app.core.tokens import supabase_sessions
+from app.core.tracing import count_fallback
 from marshmallow import ValidationError
 
 
+PROFILES = Query("profiles")
+PROFILE_ID_BY_USERNAME = PROFILES.select("id").eq("username", Param("username")).limit(1)
+NEW_PROFILE = PROFILES.select("id", "username")
+
+
+def _session_tokens(auth_response):
+    """Tokens of a Supabase Auth session, shaped like the ones this app mints."""
+    return {
+        "access_token": auth_response.get("access_token"),
+        "refresh_token": auth_response.get("refresh_token"),
+        "expires_in": auth_response.get("expires_in"),
+    }
+
+
 @auth_bp.route("/register", methods=["POST"])
 def register():
     """
@@ -58,7 +82,8 @@ def register():
     try:
         existing_user = supabase_request(
             method="GET",
-            endpoint=f"/rest/v1/profiles?username=eq.{username}",
+            endpoint=PROFILE_ID_BY_USERNAME,
+            params={"username": username},
         )
         
         if existing_user and len(existing_user) > 0:
@@ -82,7 +107,9 @@ def register():
         if "error" in auth_response:
             raise BadRequestError(auth_response.get("error_description", "Registration failed"))
         
-        user_id = auth_response.get("user", {}).get("id")
+        # Signup returns a session when email confirmation is off, else the user
+        user = auth_response.get("user") or auth_response
+        user_id = user.get("id")
         
         if not user_id:
             raise BadRequestError("Failed to create user")
@@ -91,19 +118,27 @@ def register():
         profile_data = {
             "id": user_id,
             "username": username,
-            "created_at": auth_response.get("user", {}).get("created_at"),
-            "updated_at": auth_response.get("user", {}).get("created_at"),
+            "created_at": user.get("created_at"),
+            "updated_at": user.get("created_at"),
         }
         
         profile_response = supabase_request(
             method="POST",
-            endpoint="/rest/v1/profiles",
+            endpoint=NEW_PROFILE,
             data=profile_data,
         )
         
-        # Generate tokens
-        access_token = create_access_token(identity=user_id)
-        refresh_token = create_refresh_token(identity=user_id)
+        if supabase_sessions():
+            # No session until the email is confirmed, if confirmation is on
+            tokens = _session_tokens(auth_response) if "access_token" in auth_response else None
+        else:
+            # Generate tokens; the email claim lets /me skip the Auth API and
+            # is_admin lets admin_required skip the role lookup
+            claims = {"email": email, "is_admin": False}
+            tokens = {
+                "access_token": create_access_token(identity=user_id, additional_claims=claims),
+                "refresh_token": create_refresh_token(identity=user_id, additional_claims=claims),
+            }
         
         return jsonify({
             "message": "User registered successfully",
@@ -112,10 +147,7 @@ def register():
                 "email": email,
                 "username": username,
             },
-            "tokens": {
-                "access_token": access_token,
-                "refresh_token": refresh_token,
-            }
+            "tokens": tokens,
         }), 201
         
     except Exception as e:
@@ -126,7 +158,7 @@ def register():
 
 
 @auth_bp.route("/login", methods=["POST"])
-def login():
+async def login():
     """
     Login a user.
     
@@ -153,14 +185,14 @@ def login():
     
     try:
         # Login with Supabase Auth
-        auth_response = supabase_request(
+        auth_response = await async_supabase_request(
             method="POST",
             endpoint="/auth/v1/token",
             data={
                 "email": email,
                 "password": password,
-                "grant_type": "password",
             },
+            params={"grant_type": "password"},
         )
         
         if "error" in auth_response:
@@ -171,13 +203,10 @@ def login():
         if not user_id:
             raise UnauthorizedError("Invalid credentials")
         
-        # Get user profile
-        profile_response = supabase_request(
-            method="GET",
-            endpoint=f"/rest/v1/profiles?id=eq.{user_id}",
-        )
+        # Get user profile (cached)
+        profile = await aload_profile(user_id)
         
-        if not profile_response or len(profile_response) == 0:
+        if not profile:
             # Create profile if it doesn't exist
             profile_data = {
                 "id": user_id,
@@ -186,19 +215,29 @@ def login():
                 "updated_at": auth_response.get("user", {}).get("created_at"),
             }
             
-            supabase_request(
+            await async_supabase_request(
                 method="POST",
-                endpoint="/rest/v1/profiles",
+                endpoint=NEW_PROFILE,
                 data=profile_data,
             )
             
+            await run_sync(get_profile_cache().invalidate, user_id)
             profile = profile_data
-        else:
-            profile = profile_response[0]
         
-        # Generate tokens
-        access_token = create_access_token(identity=user_id)
-        refresh_token = create_refresh_token(identity=user_id)
+        is_admin = bool(profile.get("is_admin"))
+        await run_sync(get_role_cache().set, user_id, is_admin)
+        
+        if supabase_sessions():
+            # Hand out the Supabase session; its tokens are verified locally
+            tokens = _session_tokens(auth_response)
+        else:
+            # Generate tokens; the email claim lets /me skip the Auth API and
+            # is_admin lets admin_required skip the role lookup
+            claims = {"email": email, "is_admin": is_admin}
+            tokens = {
+                "access_token": create_access_token(identity=user_id, additional_claims=claims),
+                "refresh_token": create_refresh_token(identity=user_id, additional_claims=claims),
+            }
         
         return jsonify({
             "message": "Login successful",
@@ -209,10 +248,7 @@ def login():
                 "full_name": profile.get("full_name"),
                 "avatar_url": profile.get("avatar_url"),
             },
-            "tokens": {
-                "access_token": access_token,
-                "refresh_token": refresh_token,
-            }
+            "tokens": tokens,
         }), 200
         
     except Exception as e:
@@ -223,25 +259,63 @@ def login():
 
 
 @auth_bp.route("/refresh", methods=["POST"])
-@jwt_required(refresh=True)
 def refresh():
     """
     Refresh access token.
     
+    Takes the refresh token as a bearer token, or with ``AUTH_MODE=supabase``
+    as ``refresh_token`` in the body (Supabase refresh tokens are opaque).
+    
     Returns:
         JSON: New access token
     """
+    if supabase_sessions():
+        return _refresh_supabase_session()
+    
+    verify_jwt_in_request(refresh=True)
     current_user = get_jwt_identity()
-    access_token = create_access_token(identity=current_user)
+    claims = {"email": get_jwt()["email"]} if "email" in get_jwt() else {}
+    
+    # Re-resolve the role so promotions and demotions reach new tokens
+    try:
+        claims["is_admin"] = resolve_admin(current_user)
+    except Exception as e:
+        current_app.logger.error(f"Error resolving admin role: {str(e)}")
+    
+    access_token = create_access_token(identity=current_user, additional_claims=claims)
     
     return jsonify({
         "access_token": access_token
     }), 200
 
 
+def _refresh_supabase_session():
+    data = request.get_json(silent=True) or {}
+    refresh_token = data.get("refresh_token")
+    
+    if not refresh_token:
+        raise ValidationFailedError("Missing required field: refresh_token")
+    
+    try:
+        auth_response = supabase_request(
+            method="POST",
+            endpoint="/auth/v1/token",
+            data={"refresh_token": refresh_token},
+            params={"grant_type": "refresh_token"},
+        )
+    except Exception as e:
+        current_app.logger.error(f"Session refresh error: {str(e)}")
+        raise UnauthorizedError("Invalid refresh token")
+    
+    if "error" in auth_response or not auth_response.get("access_token"):
+        raise UnauthorizedError(auth_response.get("error_description", "Invalid refresh token"))
+    
+    return jsonify(_session_tokens(auth_response)), 200
+
+
 @auth_bp.route("/me", methods=["GET"])
 @jwt_required()
-def get_user():
+async def get_user():
     """
     Get current user data.
     
@@ -250,25 +324,25 @@ def get_user():
     """
     current_user = get_jwt_identity()
     
+    # Email comes from the token; older tokens fall back to Supabase Auth
+    email = get_jwt().get("email")
+    
     try:
-        # Get user profile
-        profile_response = supabase_request(
-            method="GET",
-            endpoint=f"/rest/v1/profiles?id=eq.{current_user}",
-        )
+        # The profile and Auth lookups are independent, so run them together
+        lookups = [aload_profile(current_user)]
+        if email is None:
+            count_fallback("auth.me.auth_user_lookup")
+            lookups.append(async_supabase_request(
+                method="GET",
+                endpoint=f"/auth/v1/admin/users/{current_user}",
+            ))
+        profile, *user_response = await asyncio.gather(*lookups)
         
-        if not profile_response or len(profile_response) == 0:
+        if not profile:
             raise NotFoundError("User profile not found")
         
-        profile = profile_response[0]
-        
-        # Get user email from Supabase Auth
-        user_response = supabase_request(
-            method="GET",
-            endpoint=f"/auth/v1/user/{current_user}",
-        )
-        
-        email = user_response.get("email", "")
+        if user_response:
+            email = user_response[0].get("email", "")
         
         return jsonify({
             "id": current_user,
@@ -286,4 +360,4 @@ def get_user():
         if isinstance(e, NotFoundError):
             raise
         current_app.logger.error(f"Error getting user data: {str(e)}")
-        raise BadRequestError("Failed to get user data") 
\ No newline at end of file
+        raise BadRequestError("Failed to get user data")
@@ -0,0 +1,8 @@
+"""
+Committees blueprint for the conference and committee catalogue.
+"""
+from flask import Blueprint
+
+committees_bp = Blueprint("committees", __name__)
+
+from app.committees import routes
@@ -0,0 +1,254 @@
+"""
+Committee routes for the conference and committee catalogue.
+
+Document and speech counts and the last activity time are counter columns
+on ``committees`` maintained by database triggers, so a catalogue page is a
+single indexed read however many committees it lists.
+"""
+from datetime import datetime, timezone
+from functools import lru_cache
+
+from flask import request, jsonify, current_app
+from flask_jwt_extended import jwt_required
+from app.committees import committees_bp
+from app.core.utils import supabase_request, supabase_page, rate_limit, admin_required
+from app.core.errors import BadRequestError, NotFoundError, ValidationFailedError
+from app.core.query import Query, Param, CountMode
+from app.core.schemas import CommitteeSchema, ConferenceSchema, PaginatedCommitteesSchema
+
+
+COMMITTEE_COLUMNS = (
+    "id", "name", "topic", "description", "conference_name", "conference_date",
+    "document_count", "speech_count", "last_activity_at", "created_at", "updated_at",
+)
+WRITABLE_FIELDS = ("name", "topic", "description", "conference_name", "conference_date")
+
+COMMITTEES = Query("committees")
+COMMITTEE = COMMITTEES.select(*COMMITTEE_COLUMNS).eq("id", Param("id"))
+COMMITTEE_BY_ID = COMMITTEE.limit(1)
+INSERT_COMMITTEE = COMMITTEES.select(*COMMITTEE_COLUMNS)
+CONFERENCES = Query("conferences").select(
+    "name", "starts_on", "ends_on", "committee_count", "document_count", "speech_count", "last_activity_at",
+).order("starts_on", desc=True, nulls_first=False).order("name")
+
+
+@lru_cache(maxsize=None)
+def _list_query(conference):
+    """Build (once) the catalogue query, in the order of its index."""
+    query = COMMITTEES.select(*COMMITTEE_COLUMNS)
+    if conference:
+        query = query.eq("conference_name", Param("conference_name"))
+    else:
+        query = query.order("conference_date", desc=True, nulls_first=False).order("conference_name")
+    return query.order("name").order("id").limit(Param("limit")).offset(Param("offset")).with_count(CountMode.EXACT)
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat()
+
+
+@committees_bp.route("", methods=["GET"])
+@jwt_required()
+@rate_limit(limit_per_minute=60)
+def list_committees():
+    """
+    List committees with their document and speech counts.
+    
+    Committees are ordered by conference date (newest first), conference
+    and committee name. The page and the total count come from one
+    request.
+    
+    Query parameters:
+        conference_name (str, optional): Only committees of this conference
+        page (int, optional): Page number
+        per_page (int, optional): Number of results per page (up to 500)
+        
+    Returns:
+        JSON: Paginated list of committees
+    """
+    conference_name = request.args.get("conference_name") or None
+    try:
+        page = max(int(request.args.get("page", 1)), 1)
+        per_page = min(max(int(request.args.get("per_page", 100)), 1), 500)  # Limit to 500 max results
+    except ValueError:
+        raise ValidationFailedError("page and per_page must be integers")
+    
+    query_params = {"limit": per_page, "offset": (page - 1) * per_page}
+    if conference_name:
+        query_params["conference_name"] = conference_name
+    
+    try:
+        rows, total = supabase_page(_list_query(bool(conference_name)), params=query_params)
+    except Exception as e:
+        current_app.logger.error(f"Error listing committees: {str(e)}")
+        raise BadRequestError("Failed to list committees")
+    
+    total = total or 0
+    return jsonify(PaginatedCommitteesSchema().dump({
+        "data": rows,
+        "meta": {
+            "page": page,
+            "per_page": per_page,
+            "total": total,
+            "pages": (total + per_page - 1) // per_page,
+        },
+    })), 200
+
+
+@committees_bp.route("/conferences", methods=["GET"])
+@jwt_required()
+@rate_limit(limit_per_minute=60)
+def list_conferences():
+    """
+    List conferences with committee, document and speech totals.
+    
+    Returns:
+        JSON: Conferences, newest first
+    """
+    try:
+        rows = supabase_request(method="GET", endpoint=CONFERENCES)
+    except Exception as e:
+        current_app.logger.error(f"Error listing conferences: {str(e)}")
+        raise BadRequestError("Failed to list conferences")
+    
+    return jsonify({"data": ConferenceSchema(many=True).dump(rows or [])}), 200
+
+
+@committees_bp.route("", methods=["POST"])
+@admin_required
+@rate_limit(limit_per_minute=20)
+def create_committee():
+    """
+    Create a committee (admin only).
+    
+    Request body:
+        name (str): Committee name
+        topic (str): Committee topic
+        conference_name (str): Conference the committee belongs to
+        conference_date (str, optional): Conference date (YYYY-MM-DD)
+        description (str, optional): Description
+        
+    Returns:
+        JSON: Created committee
+    """
+    data = request.get_json()
+    
+    if not data:
+        raise BadRequestError("No input data provided")
+    
+    errors = CommitteeSchema().validate(data)
+    if errors:
+        raise ValidationFailedError(f"Validation error: {errors}")
+    
+    committee = {k: v for k, v in data.items() if k in WRITABLE_FIELDS}
+    
+    try:
+        response = supabase_request(method="POST", endpoint=INSERT_COMMITTEE, data=committee)
+    except Exception as e:
+        current_app.logger.error(f"Error creating committee: {str(e)}")
+        raise BadRequestError("Failed to create committee")
+    
+    if not response:
+        raise BadRequestError("Failed to create committee")
+    
+    return jsonify(CommitteeSchema().dump(response[0])), 201
+
+
+@committees_bp.route("/<committee_id>", methods=["GET"])
+@jwt_required()
+@rate_limit(limit_per_minute=60)
+def get_committee(committee_id):
+    """
+    Get a committee and its aggregates.
+    
+    Args:
+        committee_id (str): Committee id
+        
+    Returns:
+        JSON: Committee data
+    """
+    try:
+        response = supabase_request(method="GET", endpoint=COMMITTEE_BY_ID, params={"id": committee_id})
+    except Exception as e:
+        current_app.logger.error(f"Error getting committee: {str(e)}")
+        raise BadRequestError("Failed to get committee")
+    
+    if not response:
+        raise NotFoundError("Committee not found")
+    
+    return jsonify(CommitteeSchema().dump(response[0])), 200
+
+
+@committees_bp.route("/<committee_id>", methods=["PUT"])
+@admin_required
+@rate_limit(limit_per_minute=30)
+def update_committee(committee_id):
+    """
+    Update a committee (admin only).
+    
+    Args:
+        committee_id (str): Committee id
+        
+    Request body:
+        Any of the fields accepted by ``POST /api/committees``
+        
+    Returns:
+        JSON: Updated committee
+    """
+    data = request.get_json()
+    
+    if not data:
+        raise BadRequestError("No input data provided")
+    
+    errors = CommitteeSchema(partial=True).validate(data)
+    if errors:
+        raise ValidationFailedError(f"Validation error: {errors}")
+    
+    changes = {k: v for k, v in data.items() if k in WRITABLE_FIELDS}
+    if not changes:
+        raise BadRequestError("No updatable fields provided")
+    changes["updated_at"] = _now()
+    
+    try:
+        response = supabase_request(
+            method="PATCH",
+            endpoint=COMMITTEE,
+            data=changes,
+            params={"id": committee_id},
+        )
+    except Exception as e:
+        current_app.logger.error(f"Error updating committee: {str(e)}")
+        raise BadRequestError("Failed to update committee")
+    
+    if not response:
+        raise NotFoundError("Committee not found")
+    
+    return jsonify(CommitteeSchema().dump(response[0])), 200
+
+
+@committees_bp.route("/<committee_id>", methods=["DELETE"])
+@admin_required
+@rate_limit(limit_per_minute=30)
+def delete_committee(committee_id):
+    """
+    Delete a committee (admin only).
+    
+    Its documents, speeches and research queries are kept and lose their
+    committee.
+    
+    Args:
+        committee_id (str): Committee id
+        
+    Returns:
+        JSON: Confirmation
+    """
+    try:
+        response = supabase_request(method="DELETE", endpoint=COMMITTEE, params={"id": committee_id})
+    except Exception as e:
+        current_app.logger.error(f"Error deleting committee: {str(e)}")
+        raise BadRequestError("Failed to delete committee")
+    
+    if not response:
+        raise NotFoundError("Committee not found")
+    
+    return jsonify({"message": "Committee deleted"}), 200
@@ -0,0 +1,227 @@
+"""
+Async Supabase I/O.
+
+Flask runs each ``async def`` view through ``app.async_to_sync``, which by
+default spins up a new event loop per request. ``EventLoopThread`` replaces
+that with one long-lived loop per worker process, so async views share a
+pooled ``httpx.AsyncClient`` and independent upstream calls can be awaited
+concurrently with ``asyncio.gather``.
+
+Code running on the loop must not block: use ``async_supabase_request`` for
+Supabase calls and ``run_sync`` for anything else that may touch the network.
+"""
+import asyncio
+import concurrent.futures
+import contextvars
+import os
+import threading
+from functools import wraps
+
+from flask import current_app
+
+from app.core.query import Query
+from app.core.repository import get_repository
+from app.core.tracing import span
+from app.core.utils import _auth_response, _raise_supabase_error, _span_target
+
+
+class EventLoopThread:
+    """
+    A background event loop shared by every async view in the process.
+
+    The loop is started on first use and restarted after a fork, since the
+    thread running it does not survive into the child.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loop = None
+        self._pid = None
+
+    @property
+    def loop(self):
+        """Return the running loop, starting it if needed."""
+        if self._loop is None or self._pid != os.getpid():
+            with self._lock:
+                if self._loop is None or self._pid != os.getpid():
+                    self._start()
+        return self._loop
+
+    def _start(self):
+        loop = asyncio.new_event_loop()
+        ready = threading.Event()
+
+        def run():
+            asyncio.set_event_loop(loop)
+            loop.call_soon(ready.set)
+            loop.run_forever()
+
+        threading.Thread(target=run, name="supabase-io", daemon=True).start()
+        ready.wait()
+        self._loop = loop
+        self._pid = os.getpid()
+
+    def run(self, coro):
+        """
+        Run a coroutine on the loop and block until it finishes.
+
+        The caller's context variables (Flask's request and app contexts)
+        are carried over to the task.
+
+        Args:
+            coro (coroutine): Coroutine to run
+
+        Returns:
+            Any: The coroutine's result
+        """
+        loop = self.loop
+        result = concurrent.futures.Future()
+
+        def start():
+            task = loop.create_task(coro)
+            task.add_done_callback(lambda t: _transfer(t, result))
+
+        loop.call_soon_threadsafe(start, context=contextvars.copy_context())
+        return result.result()
+
+    def async_to_sync(self, func):
+        """Drop-in replacement for ``Flask.async_to_sync``."""
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            return self.run(func(*args, **kwargs))
+        return wrapper
+
+
+def _transfer(task, future):
+    if task.cancelled():
+        future.cancel()
+    elif task.exception() is not None:
+        future.set_exception(task.exception())
+    else:
+        future.set_result(task.result())
+
+
+def init_async(app):
+    """
+    Run the app's async views on a shared per-process event loop.
+
+    Args:
+        app (Flask): Application to register with
+    """
+    runner = EventLoopThread()
+    app.extensions["aio"] = runner
+    app.async_to_sync = runner.async_to_sync
+
+
+async def run_sync(func, *args, **kwargs):
+    """Run a blocking callable in a worker thread without stalling the loop."""
+    return await asyncio.to_thread(func, *args, **kwargs)
+
+
+async def async_supabase_request(method, endpoint, data=None, params=None, headers=None):
+    """
+    Async counterpart of ``supabase_request``.
+
+    Args:
+        method (str): HTTP method (GET, POST, PUT, PATCH, DELETE)
+        endpoint (Query or str): Structured ``Query`` for PostgREST tables, or
+            an ``/auth/v1/...`` path for Supabase Auth
+        data (dict, optional): Request data
+        params (dict, optional): Values for the query's ``Param`` placeholders,
+            or query string parameters for Auth requests
+        headers (dict, optional): Request headers
+
+    Returns:
+        dict: Response data
+
+    Raises:
+        APIError: If the request fails
+    """
+    with span("supabase.request", method=method, target=_span_target(endpoint)):
+        try:
+            session = current_app.extensions["supabase"].get_async_session(current_app.config)
+            if isinstance(endpoint, str):
+                if endpoint.startswith("/auth/v1/"):
+                    response = await session.request(
+                        method.upper(), endpoint, json=data, params=params, headers=headers
+                    )
+                    return _auth_response(response)
+                endpoint = Query.parse(endpoint)
+
+            repository = get_repository()
+            if repository.name != "rest":
+                rows, _ = await run_sync(repository.execute, method, endpoint, data, params, headers)
+            else:
+                rows, _ = await _execute_query(session, method, endpoint, data, params, headers)
+            return rows
+
+        except Exception as e:
+            _raise_supabase_error(e)
+
+
+async def async_supabase_page(query, params=None, count=None, headers=None):
+    """
+    Async counterpart of ``supabase_page``.
+
+    Returns:
+        tuple: ``(rows, total)``; ``total`` is None when no count was requested
+
+    Raises:
+        APIError: If the request fails
+    """
+    with span("supabase.page", target=query.table):
+        try:
+            repository = get_repository()
+            if repository.name != "rest":
+                return await run_sync(repository.execute, "GET", query, params=params, headers=headers, count=count)
+            session = current_app.extensions["supabase"].get_async_session(current_app.config)
+            return await _execute_query(session, "GET", query, params=params, headers=headers, count=count)
+        except Exception as e:
+            _raise_supabase_error(e)
+
+
+async def _execute_query(session, method, query, data=None, params=None, headers=None, count=None):
+    """
+    Send a structured query straight to PostgREST.
+
+    Mirrors what the supabase-py builders send: ``select`` for reads and for
+    mutations with explicit columns, and ``Prefer`` for counts and returned rows.
+
+    Returns:
+        tuple: ``(rows, total)``
+    """
+    method = method.upper()
+    if method not in ("GET", "POST", "PUT", "PATCH", "DELETE"):
+        raise ValueError(f"Unsupported method: {method}")
+    count = count or query.count
+
+    bound = query.bind(params)
+    if method == "GET" or query.columns:
+        bound.insert(0, ("select", query.select_clause))
+
+    prefer = [] if method == "GET" else ["return=representation"]
+    if count:
+        prefer.append(f"count={count}")
+    request_headers = {"Prefer": ",".join(prefer)} if prefer else {}
+    request_headers.update(headers or {})
+
+    response = await session.request(
+        "PATCH" if method == "PUT" else method,
+        f"/rest/v1/{query.table}",
+        params=bound,
+        json=data if method != "GET" else None,
+        headers=request_headers,
+    )
+    if response.status_code >= 400:
+        raise RuntimeError(f"{response.status_code} {response.text}")
+
+    rows = response.json() if response.content else []
+    return rows, _content_range_total(response.headers.get("Content-Range"))
+
+
+def _content_range_total(value):
+    """Parse the total out of a ``Content-Range: 0-9/42`` header."""
+    if not value or "/" not in value:
+        return None
+    total = value.rsplit("/", 1)[1]
+    return int(total) if total.isdigit() else None
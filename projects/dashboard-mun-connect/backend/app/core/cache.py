@@ -0,0 +1,240 @@
+"""
+Two-tier caching primitives.
+
+``LocalCache`` is a per-process LRU with per-entry TTLs. ``RedisCache`` is a
+shared tier reached through ``CACHE_REDIS_URL``. ``TieredCache`` reads the
+local tier first, falls back to the shared tier and back-fills on the way out.
+"""
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app
+
+
+class CacheStats:
+    """Hit/miss counters for a cache tier."""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.sets = 0
+        self.deletes = 0
+        self.errors = 0
+
+    def to_dict(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "sets": self.sets,
+            "deletes": self.deletes,
+            "errors": self.errors,
+            "hit_ratio": (self.hits / lookups) if lookups else 0.0,
+        }
+
+
+class LocalCache:
+    """Thread-safe in-process LRU cache with per-entry expiry."""
+
+    def __init__(self, max_size=10000, default_timeout=60):
+        self.max_size = max_size
+        self.default_timeout = default_timeout
+        self.stats = CacheStats()
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return the cached value for ``key``, or None if absent or expired."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.stats.misses += 1
+                return None
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                self.stats.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.stats.hits += 1
+            return value
+
+    def get_many(self, keys):
+        """Return a dict of the cached values among ``keys`` (misses are left out)."""
+        found = {}
+        for key in keys:
+            value = self.get(key)
+            if value is not None:
+                found[key] = value
+        return found
+
+    def set(self, key, value, timeout=None):
+        """Store ``value`` under ``key`` for ``timeout`` seconds."""
+        timeout = self.default_timeout if timeout is None else timeout
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + timeout)
+            self._data.move_to_end(key)
+            self.stats.sets += 1
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def delete(self, *keys):
+        """Remove ``keys`` from the cache."""
+        with self._lock:
+            for key in keys:
+                if self._data.pop(key, None) is not None:
+                    self.stats.deletes += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class RedisCache:
+    """
+    Shared cache tier backed by Redis.
+
+    Values are stored as JSON. Redis failures are logged and treated as
+    misses so a cache outage degrades to direct reads instead of errors.
+    """
+
+    def __init__(self, url, default_timeout=300, prefix="mun:"):
+        import redis
+
+        self.default_timeout = default_timeout
+        self.prefix = prefix
+        self.stats = CacheStats()
+        self.client = redis.Redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5)
+
+    def get(self, key):
+        try:
+            raw = self.client.get(self.prefix + key)
+        except Exception as e:
+            self._error("get", e)
+            return None
+        if raw is None:
+            self.stats.misses += 1
+            return None
+        self.stats.hits += 1
+        return json.loads(raw)
+
+    def get_many(self, keys):
+        """Fetch ``keys`` with one ``MGET``; misses are left out."""
+        keys = list(keys)
+        if not keys:
+            return {}
+        try:
+            raws = self.client.mget([self.prefix + key for key in keys])
+        except Exception as e:
+            self._error("get", e)
+            return {}
+        found = {key: json.loads(raw) for key, raw in zip(keys, raws) if raw is not None}
+        self.stats.hits += len(found)
+        self.stats.misses += len(keys) - len(found)
+        return found
+
+    def set(self, key, value, timeout=None):
+        timeout = self.default_timeout if timeout is None else timeout
+        try:
+            self.client.set(self.prefix + key, json.dumps(value), ex=max(int(timeout), 1))
+            self.stats.sets += 1
+        except Exception as e:
+            self._error("set", e)
+
+    def delete(self, *keys):
+        if not keys:
+            return
+        try:
+            self.client.delete(*[self.prefix + key for key in keys])
+            self.stats.deletes += len(keys)
+        except Exception as e:
+            self._error("delete", e)
+
+    def _error(self, operation, error):
+        self.stats.errors += 1
+        try:
+            current_app.logger.warning(f"Redis cache {operation} failed: {str(error)}")
+        except RuntimeError:
+            pass
+
+
+class TieredCache:
+    """Local LRU in front of an optional shared tier."""
+
+    def __init__(self, local, shared=None):
+        self.local = local
+        self.shared = shared
+
+    def get(self, key):
+        value = self.local.get(key)
+        if value is not None or self.shared is None:
+            return value
+        value = self.shared.get(key)
+        if value is not None:
+            self.local.set(key, value)
+        return value
+
+    def get_many(self, keys):
+        """Look ``keys`` up locally, then the rest in one shared-tier round trip."""
+        found = self.local.get_many(keys)
+        if self.shared is None or len(found) == len(keys):
+            return found
+        shared = self.shared.get_many([key for key in keys if key not in found])
+        for key, value in shared.items():
+            self.local.set(key, value)
+        found.update(shared)
+        return found
+
+    def set(self, key, value, timeout=None):
+        """
+        Store a value in both tiers.
+
+        The local tier keeps its own (shorter) default timeout so entries
+        invalidated by another worker age out quickly.
+        """
+        self.local.set(key, value, timeout=min(timeout, self.local.default_timeout) if timeout else None)
+        if self.shared is not None:
+            self.shared.set(key, value, timeout=timeout)
+
+    def delete(self, *keys):
+        self.local.delete(*keys)
+        if self.shared is not None:
+            self.shared.delete(*keys)
+
+    def stats(self):
+        return {
+            "local": dict(self.local.stats.to_dict(), size=len(self.local)),
+            "shared": self.shared.stats.to_dict() if self.shared is not None else None,
+        }
+
+
+def build_tiered_cache(config, max_size, local_timeout, shared_timeout=None, prefix="mun:"):
+    """
+    Build a ``TieredCache`` from the app's caching settings.
+
+    A Redis tier is added when ``CACHE_TYPE`` is ``RedisCache``.
+
+    Args:
+        config (dict): Application config
+        max_size (int): Local LRU capacity
+        local_timeout (int): Local entry lifetime in seconds
+        shared_timeout (int, optional): Shared entry lifetime; defaults to
+            ``CACHE_DEFAULT_TIMEOUT``
+        prefix (str): Key prefix in the shared tier
+
+    Returns:
+        TieredCache: Configured cache
+    """
+    shared = None
+    if config.get("CACHE_TYPE") == "RedisCache" and config.get("CACHE_REDIS_URL"):
+        shared = RedisCache(
+            config["CACHE_REDIS_URL"],
+            default_timeout=shared_timeout or config.get("CACHE_DEFAULT_TIMEOUT", 300),
+            prefix=prefix,
+        )
+    return TieredCache(LocalCache(max_size=max_size, default_timeout=local_timeout), shared)
@@ -0,0 +1,467 @@
+"""
+Change feed over the ``profiles`` table.
+
+Indexes derived from profiles (the SQLite search table, suggested delegates,
+the profile cache) are kept fresh by applying the rows that changed rather
+than rebuilding from a full scan. ``ProfileChangeFeed`` finds those rows by
+polling on an ``(updated_at, id)`` watermark: the ``on_profile_updated``
+trigger keeps ``updated_at`` current, and ``supabase/migrations/profile_changes.sql``
+adds the index the poll reads and a ``profile_deletions`` table that
+records deleted ids, which the feed polls the same way.
+
+``updated_at`` is the writing transaction's start time, so a slow
+transaction can commit a row older than rows already seen. Each poll
+therefore re-reads the last ``overlap`` seconds and skips rows it has
+already delivered. When queries run directly on Postgres (``DATA_BACKEND=postgres``)
+the feed also ``LISTEN``s on ``profiles_changed``, which the migration's
+trigger notifies, and polls as soon as a notification arrives instead of
+waiting for the next interval; the poll stays the source of truth, so a
+missed notification only delays a change.
+
+Every batch is handed to each registered builder as a ``ChangeBatch``.
+Builders must be idempotent: a batch is delivered again if any builder
+fails, and the checkpoint (the watermarks) is saved only after all of them
+succeed. A feed without a checkpoint starts cold: its first batch is every
+profile, so builders that start empty are fully loaded, and deletions are
+followed from the newest tombstone on.
+
+Checkpoints are kept in memory, in a JSON file or in the
+``change_feed_checkpoints`` table (``CHANGE_FEED_CHECKPOINTS``), so a
+restarted worker resumes where it stopped. That is only correct when the
+builders' state outlived the worker too, so the stored checkpoint is used
+only if every builder was registered as ``persistent``. The built-in
+builders (the profile cache, the SQLite search table and the suggested
+delegates index) live in process memory, so each worker starts cold.
+
+The feed runs on a background thread in each worker, started by the first
+request so it survives forking servers.
+"""
+import json
+import os
+import select
+import threading
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+from flask import current_app
+
+from app.core.profiles import CACHED_PROFILE_COLUMNS, get_profile_cache
+from app.core.query import Query, Param, and_
+from app.core.tracing import count_fallback, span
+from app.core.utils import supabase_request
+
+ChangeBatch = namedtuple("ChangeBatch", "upserts deletes")
+
+NOTIFY_CHANNEL = "profiles_changed"
+
+CHECKPOINTS = Query("change_feed_checkpoints")
+CHECKPOINT_BY_NAME = CHECKPOINTS.select("name", "watermarks").eq("name", Param("name")).limit(1)
+SAVE_CHECKPOINT = CHECKPOINTS.select("name").eq("name", Param("name"))
+NEW_CHECKPOINT = CHECKPOINTS.select("name")
+
+
+class MemoryCheckpointStore:
+    """Checkpoints that last as long as the process."""
+
+    def __init__(self):
+        self._checkpoints = {}
+
+    def load(self, name):
+        return self._checkpoints.get(name)
+
+    def save(self, name, watermarks):
+        self._checkpoints[name] = watermarks
+
+
+class FileCheckpointStore:
+    """Checkpoints in a JSON file, replaced atomically on every save."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def load(self, name):
+        try:
+            with open(self.path) as f:
+                return json.load(f).get(name)
+        except FileNotFoundError:
+            return None
+
+    def save(self, name, watermarks):
+        with self._lock:
+            try:
+                with open(self.path) as f:
+                    checkpoints = json.load(f)
+            except FileNotFoundError:
+                checkpoints = {}
+            checkpoints[name] = watermarks
+            temporary = f"{self.path}.tmp"
+            with open(temporary, "w") as f:
+                json.dump(checkpoints, f)
+            os.replace(temporary, self.path)
+
+
+class TableCheckpointStore:
+    """Checkpoints in the ``change_feed_checkpoints`` table."""
+
+    def load(self, name):
+        rows = supabase_request(method="GET", endpoint=CHECKPOINT_BY_NAME, params={"name": name})
+        return rows[0]["watermarks"] if rows else None
+
+    def save(self, name, watermarks):
+        updated = supabase_request(
+            method="PATCH",
+            endpoint=SAVE_CHECKPOINT,
+            data={"watermarks": watermarks, "saved_at": "now()"},
+            params={"name": name},
+        )
+        if not updated:
+            supabase_request(
+                method="POST",
+                endpoint=NEW_CHECKPOINT,
+                data={"name": name, "watermarks": watermarks},
+            )
+
+
+CHECKPOINT_STORES = {
+    "memory": lambda config: MemoryCheckpointStore(),
+    "file": lambda config: FileCheckpointStore(config.get("CHANGE_FEED_CHECKPOINT_PATH", "change_feed.json")),
+    "table": lambda config: TableCheckpointStore(),
+}
+
+
+class _Stream:
+    """
+    Rows of one table after an ``(updated_at, id)``-style watermark.
+
+    Args:
+        table (str): Table name
+        columns (tuple): Columns to read
+        timestamp (str): Column the watermark orders on
+    """
+
+    def __init__(self, table, columns, timestamp):
+        self.timestamp = timestamp
+        ordered = Query(table).select(*columns).order(timestamp).order("id").limit(Param("limit"))
+        self.since = ordered.gte(timestamp, Param("since"))
+        self.after = ordered.or_(
+            (timestamp, "gt", Param("after_ts")),
+            and_((timestamp, "eq", Param("after_ts")), ("id", "gt", Param("after_id"))),
+        )
+        self.latest = Query(table).select(timestamp, "id").order(timestamp, desc=True).order("id", desc=True).limit(1)
+        self.watermark = None
+        # id -> timestamp of rows delivered within the overlap window
+        self._delivered = {}
+
+    def start(self, watermark, replay=False):
+        """
+        Resume after ``watermark``; when None, after the newest row, or from
+        the first row with ``replay``.
+        """
+        if watermark is None and not replay:
+            rows = supabase_request(method="GET", endpoint=self.latest)
+            watermark = [rows[0][self.timestamp], rows[0]["id"]] if rows else None
+        self.watermark = watermark
+
+    def poll(self, batch_size, overlap):
+        """
+        Return rows changed since the watermark (minus ``overlap`` seconds).
+
+        Rows already delivered with the same timestamp are skipped. The
+        watermark is not moved; ``advance`` does that once the rows are applied.
+        """
+        if self.watermark is None:
+            params = {"since": "-infinity"}
+        else:
+            since = _parse_timestamp(self.watermark[0]) - timedelta(seconds=overlap)
+            params = {"since": since.isoformat()}
+
+        changed, last, page = [], None, self.since
+        while True:
+            rows = supabase_request(method="GET", endpoint=page, params=dict(params, limit=batch_size)) or []
+            for row in rows:
+                if self._delivered.get(row["id"]) != row[self.timestamp]:
+                    changed.append(row)
+            if len(rows) < batch_size:
+                break
+            last = rows[-1]
+            page, params = self.after, {"after_ts": last[self.timestamp], "after_id": last["id"]}
+        return changed
+
+    def advance(self, rows, overlap):
+        """Record ``rows`` as delivered and move the watermark past them."""
+        for row in rows:
+            self._delivered[row["id"]] = row[self.timestamp]
+            key = [row[self.timestamp], row["id"]]
+            if self.watermark is None or _sort_key(key) > _sort_key(self.watermark):
+                self.watermark = key
+
+        if self.watermark is not None:
+            horizon = _parse_timestamp(self.watermark[0]) - timedelta(seconds=overlap)
+            self._delivered = {
+                row_id: stamp for row_id, stamp in self._delivered.items()
+                if _parse_timestamp(stamp) >= horizon
+            }
+
+
+def _parse_timestamp(value):
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+def _sort_key(watermark):
+    return _parse_timestamp(watermark[0]), watermark[1]
+
+
+class ProfileChangeFeed:
+    """
+    Polls profile changes and fans them out to index builders.
+
+    Args:
+        app (Flask): Application, for the feed thread's app context
+        store: Checkpoint store (``load``/``save``)
+        name (str): Checkpoint name
+        interval (float): Seconds between polls
+        batch_size (int): Rows read per request
+        overlap (float): Seconds re-read on every poll to catch late commits
+        listen_url (str, optional): Postgres URL to ``LISTEN`` on for
+            immediate wake-ups
+    """
+
+    def __init__(self, app, store, name="profiles", interval=5, batch_size=500, overlap=5, listen_url=None):
+        self.app = app
+        self.store = store
+        self.name = name
+        self.interval = interval
+        self.batch_size = batch_size
+        self.overlap = overlap
+        self.listen_url = listen_url
+        self.builders = {}
+        self.persistent = set()
+        self.profiles = _Stream("profiles", CACHED_PROFILE_COLUMNS, "updated_at")
+        self.deletions = _Stream("profile_deletions", ("id", "deleted_at"), "deleted_at")
+        self.track_deletions = True
+        self.polls = 0
+        self.delivered = 0
+        self.failures = 0
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._started = False
+        self._start_lock = threading.Lock()
+
+    def register(self, name, builder, persistent=False):
+        """
+        Deliver change batches to ``builder``.
+
+        Args:
+            name (str): Builder name, for logs
+            builder (callable): Called with each ``ChangeBatch`` inside an
+                app context; must tolerate the same change twice
+            persistent (bool): Whether the builder's state survives a
+                restart, so a saved checkpoint applies to it
+        """
+        self.builders[name] = builder
+        if persistent:
+            self.persistent.add(name)
+        else:
+            self.persistent.discard(name)
+
+    @property
+    def checkpointed(self):
+        """Whether watermarks are loaded and saved through the checkpoint store."""
+        return bool(self.builders) and self.persistent >= set(self.builders)
+
+    def start(self):
+        """Start the feed thread (and the listener, if configured) once."""
+        with self._start_lock:
+            if self._started:
+                return
+            self._started = True
+        threading.Thread(target=self._run, name="profile-change-feed", daemon=True).start()
+        if self.listen_url:
+            threading.Thread(target=self._listen, name="profile-change-listener", daemon=True).start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def _run(self):
+        with self.app.app_context():
+            while not self._stop.is_set():
+                try:
+                    self._resume()
+                    break
+                except Exception as e:
+                    current_app.logger.error(f"Profile change feed failed to start: {str(e)}")
+                    self._stop.wait(self.interval)
+
+            while not self._stop.is_set():
+                try:
+                    self.poll()
+                except Exception as e:
+                    self.failures += 1
+                    current_app.logger.error(f"Profile change feed poll failed: {str(e)}")
+                self._wake.wait(self.interval)
+                self._wake.clear()
+
+    def _resume(self):
+        checkpoint = (self.store.load(self.name) if self.checkpointed else None) or {}
+        try:
+            # Tombstones first: a profile deleted after that is seen by the next poll
+            self.deletions.start(checkpoint.get("deletions"))
+        except Exception as e:
+            # profile_changes.sql not applied; deletions reach indexes on rebuilds only
+            current_app.logger.warning(f"Profile deletions are not tracked: {str(e)}")
+            count_fallback("changefeed.deletions_untracked")
+            self.track_deletions = False
+        self.profiles.start(checkpoint.get("profiles"), replay=True)
+
+    def poll(self):
+        """
+        Read one round of changes and deliver it to every builder.
+
+        Returns:
+            ChangeBatch: The changes delivered (empty if nothing changed)
+        """
+        with span("changefeed.poll"):
+            self.polls += 1
+            upserts = self.profiles.poll(self.batch_size, self.overlap)
+            deletions = self.deletions.poll(self.batch_size, self.overlap) if self.track_deletions else []
+            if not upserts and not deletions:
+                return ChangeBatch([], [])
+
+            # A row and its tombstone in one round: the later one wins
+            deleted_at = {row["id"]: _parse_timestamp(row["deleted_at"]) for row in deletions}
+            latest = [
+                row for row in upserts
+                if row["id"] not in deleted_at or _parse_timestamp(row["updated_at"]) > deleted_at[row["id"]]
+            ]
+            updated_at = {row["id"]: _parse_timestamp(row["updated_at"]) for row in latest}
+            deletes = [
+                row_id for row_id, stamp in deleted_at.items()
+                if row_id not in updated_at or stamp >= updated_at[row_id]
+            ]
+            batch = ChangeBatch(latest, deletes)
+
+            for name, builder in self.builders.items():
+                try:
+                    builder(batch)
+                except Exception:
+                    # Redeliver the whole round next time; builders are idempotent
+                    current_app.logger.error(f"Profile change feed builder {name} failed")
+                    raise
+
+            self.profiles.advance(upserts, self.overlap)
+            self.deletions.advance(deletions, self.overlap)
+            if self.checkpointed:
+                self.store.save(self.name, {"profiles": self.profiles.watermark, "deletions": self.deletions.watermark})
+            self.delivered += len(latest) + len(deletes)
+            return batch
+
+    def _listen(self):
+        import psycopg
+
+        while not self._stop.is_set():
+            try:
+                with psycopg.connect(self.listen_url, autocommit=True) as conn:
+                    conn.add_notify_handler(lambda notify: self._wake.set())
+                    conn.execute(f"LISTEN {NOTIFY_CHANNEL}")
+                    while not self._stop.is_set():
+                        readable, _, _ = select.select([conn.fileno()], [], [], self.interval)
+                        if readable:
+                            # Reading a result dispatches pending notifications
+                            conn.execute("SELECT 1")
+            except Exception as e:
+                self.app.logger.warning(f"Profile change listener disconnected: {str(e)}")
+                self._stop.wait(self.interval)
+
+    def stats(self):
+        """Return feed counters and watermarks."""
+        return {
+            "polls": self.polls,
+            "delivered": self.delivered,
+            "failures": self.failures,
+            "listening": bool(self.listen_url),
+            "checkpointed": self.checkpointed,
+            "watermarks": {"profiles": self.profiles.watermark, "deletions": self.deletions.watermark},
+            "builders": list(self.builders),
+        }
+
+
+def _apply_to_profile_cache(batch):
+    cache = get_profile_cache()
+    for profile in batch.upserts:
+        # The old username's index entry is guarded against in get_by_username
+        cache.invalidate(profile["id"])
+        cache.put(profile)
+    for profile_id in batch.deletes:
+        cache.invalidate(profile_id)
+
+
+def _apply_to_search(batch):
+    search = current_app.extensions["search"]
+    if batch.upserts:
+        search.index(batch.upserts)
+    if batch.deletes:
+        search.remove(batch.deletes)
+
+
+def _apply_to_recommendations(batch):
+    recommender = current_app.extensions["recommendations"]
+    for profile in batch.upserts:
+        recommender.update(profile)
+    for profile_id in batch.deletes:
+        recommender.remove(profile_id)
+
+
+def init_change_feed(app):
+    """
+    Create the profile change feed when ``CHANGE_FEED_ENABLED`` is set.
+
+    The profile cache, the SQLite search table (if that backend is used) and
+    the suggested delegates index are registered as builders; they are all
+    in-memory, so each worker starts with a full load. The feed starts with
+    the first request.
+
+    Args:
+        app (Flask): Application to register with
+
+    Raises:
+        ValueError: If ``CHANGE_FEED_CHECKPOINTS`` is not a known store
+    """
+    if not app.config.get("CHANGE_FEED_ENABLED"):
+        return
+
+    store_name = app.config.get("CHANGE_FEED_CHECKPOINTS", "memory")
+    if store_name not in CHECKPOINT_STORES:
+        raise ValueError(f"CHANGE_FEED_CHECKPOINTS must be one of: {', '.join(CHECKPOINT_STORES)}")
+
+    listen = app.config.get("CHANGE_FEED_LISTEN", "auto")
+    listen_url = None
+    if listen == "true" or (listen == "auto" and app.config.get("DATA_BACKEND") == "postgres"):
+        # psycopg takes plain libpq URLs, without SQLAlchemy's driver suffix
+        listen_url = (app.config.get("SQLALCHEMY_DATABASE_URI") or "").replace("postgresql+psycopg://", "postgresql://")
+
+    feed = ProfileChangeFeed(
+        app,
+        CHECKPOINT_STORES[store_name](app.config),
+        name=app.config.get("CHANGE_FEED_NAME", "profiles"),
+        interval=app.config.get("CHANGE_FEED_INTERVAL", 5),
+        batch_size=app.config.get("CHANGE_FEED_BATCH_SIZE", 500),
+        overlap=app.config.get("CHANGE_FEED_OVERLAP", 5),
+        listen_url=listen_url or None,
+    )
+    feed.register("profile_cache", _apply_to_profile_cache)
+    if hasattr(app.extensions.get("search"), "index"):
+        feed.register("search", _apply_to_search)
+    if "recommendations" in app.extensions:
+        feed.register("recommendations", _apply_to_recommendations)
+    app.extensions["change_feed"] = feed
+
+    @app.before_request
+    def _start_change_feed():
+        feed.start()
+
+
+def get_change_feed():
+    """Return the change feed registered on the current app, or None."""
+    return current_app.extensions.get("change_feed")
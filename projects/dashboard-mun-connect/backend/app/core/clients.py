@@ -0,0 +1,278 @@
+"""
+Pooled Supabase client registry.
+
+Keeps one Supabase client (and its keep-alive HTTP connection pool) per
+worker process instead of building a new client for every request.
+"""
+import asyncio
+import os
+import threading
+import weakref
+from typing import TYPE_CHECKING
+
+import httpx
+
+from app.core.tracing import register_metrics
+
+if TYPE_CHECKING:
+    from supabase import Client
+
+
+class SupabaseClientRegistry:
+    """
+    Process-wide registry of pooled Supabase clients.
+
+    Clients are keyed by the configured Supabase URL and API key, so a change
+    to the credentials in ``Config`` transparently reconnects. The registry is
+    fork-safe: clients inherited from a parent process (e.g. a gunicorn master
+    started with ``--preload``) are discarded in the child and rebuilt on first
+    use, so sockets are never shared between workers.
+    """
+
+    def __init__(self, app=None):
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self._clients = {}
+        self._reset_counters()
+
+        if hasattr(os, "register_at_fork"):
+            ref = weakref.ref(self)
+            os.register_at_fork(
+                after_in_child=lambda: ref() is not None and ref()._reset_after_fork()
+            )
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """
+        Register the registry on a Flask app.
+
+        Args:
+            app (Flask): Application to register with
+        """
+        app.config.setdefault("SUPABASE_POOL_MAX_CONNECTIONS", 20)
+        app.config.setdefault("SUPABASE_POOL_MAX_KEEPALIVE", 10)
+        app.config.setdefault("SUPABASE_POOL_KEEPALIVE_EXPIRY", 30.0)
+        app.config.setdefault("SUPABASE_TIMEOUT", 10.0)
+        app.extensions["supabase"] = self
+        register_metrics(app, self.prometheus)
+
+    def get_client(self, config) -> "Client":
+        """
+        Return the pooled client for the given configuration.
+
+        Args:
+            config (dict): Application config holding the Supabase settings
+
+        Returns:
+            Client: Pooled Supabase client
+
+        Raises:
+            ValueError: If Supabase credentials are not configured
+        """
+        return self._lookup("client", config, self._build_client)
+
+    def get_session(self, config) -> httpx.Client:
+        """
+        Return the pooled HTTP session for raw Supabase API calls (e.g. Auth).
+
+        The session's base URL is the project URL and it carries the API key
+        headers, so callers pass paths such as ``/auth/v1/token``.
+
+        Args:
+            config (dict): Application config holding the Supabase settings
+
+        Returns:
+            httpx.Client: Pooled keep-alive session
+
+        Raises:
+            ValueError: If Supabase credentials are not configured
+        """
+        return self._lookup("session", config, self._build_session)
+
+    def get_async_session(self, config) -> httpx.AsyncClient:
+        """
+        Return the pooled async HTTP session for PostgREST and Auth calls.
+
+        Async sessions are bound to the event loop that first uses them, so
+        they must only be requested from the app's shared I/O loop (see
+        ``app.core.aio``); each loop gets its own session.
+
+        Args:
+            config (dict): Application config holding the Supabase settings
+
+        Returns:
+            httpx.AsyncClient: Pooled HTTP/2 keep-alive session
+
+        Raises:
+            ValueError: If Supabase credentials are not configured
+        """
+        kind = ("async_session", asyncio.get_running_loop())
+        return self._lookup(kind, config, self._build_async_session)
+
+    def _lookup(self, kind, config, build):
+        supabase_url = config.get("SUPABASE_URL")
+        supabase_key = config.get("SUPABASE_API_KEY")
+
+        if not supabase_url or not supabase_key:
+            raise ValueError("Supabase credentials not configured")
+
+        if self._pid != os.getpid():
+            self._reset_after_fork()
+
+        key = (kind, supabase_url, supabase_key)
+        client = self._clients.get(key)
+        if client is not None:
+            with self._lock:
+                self.hits += 1
+            return client
+
+        with self._lock:
+            client = self._clients.get(key)
+            if client is not None:
+                self.hits += 1
+                return client
+
+            self.misses += 1
+            stale = [
+                k for k in self._clients
+                if k[0] == kind and (k[1] == supabase_url or k[2] == supabase_key)
+            ]
+            for stale_key in stale:
+                self.reconnects += 1
+                self._close(self._clients.pop(stale_key))
+
+            client = build(supabase_url, supabase_key, config)
+            self._clients[key] = client
+            return client
+
+    def stats(self):
+        """
+        Return pool usage counters for this worker.
+
+        Returns:
+            dict: Hit/miss/reconnect counters and the number of live clients
+        """
+        lookups = self.hits + self.misses
+        return {
+            "pid": self._pid,
+            "clients": len(self._clients),
+            "hits": self.hits,
+            "misses": self.misses,
+            "reconnects": self.reconnects,
+            "hit_ratio": (self.hits / lookups) if lookups else 0.0,
+        }
+
+    def prometheus(self):
+        """
+        Render the pool counters in the Prometheus text exposition format.
+
+        Returns:
+            list: Exposition lines
+        """
+        with self._lock:
+            hits, misses, reconnects, clients = self.hits, self.misses, self.reconnects, len(self._clients)
+        return [
+            "# HELP mun_supabase_pool_lookups_total Pooled Supabase client lookups by outcome.",
+            "# TYPE mun_supabase_pool_lookups_total counter",
+            f'mun_supabase_pool_lookups_total{{result="hit"}} {hits}',
+            f'mun_supabase_pool_lookups_total{{result="miss"}} {misses}',
+            "# HELP mun_supabase_pool_reconnects_total Pooled clients replaced after a credential change.",
+            "# TYPE mun_supabase_pool_reconnects_total counter",
+            f"mun_supabase_pool_reconnects_total {reconnects}",
+            "# HELP mun_supabase_pool_clients Live pooled clients and sessions in this worker.",
+            "# TYPE mun_supabase_pool_clients gauge",
+            f"mun_supabase_pool_clients {clients}",
+        ]
+
+    def close(self):
+        """Close all pooled clients owned by this process."""
+        with self._lock:
+            for client in self._clients.values():
+                self._close(client)
+            self._clients.clear()
+
+    def _build_client(self, supabase_url, supabase_key, config):
+        """Build a client whose PostgREST session uses a capped keep-alive pool."""
+        # The supabase SDK is slow to import; only workers that use it pay
+        from postgrest.utils import SyncClient
+        from supabase import create_client, ClientOptions
+
+        options = ClientOptions(
+            auto_refresh_token=False,
+            persist_session=False,
+            postgrest_client_timeout=config.get("SUPABASE_TIMEOUT", 10.0),
+        )
+        client = create_client(supabase_url, supabase_key, options=options)
+
+        postgrest = client.postgrest
+        session = postgrest.session
+        postgrest.session = SyncClient(
+            base_url=session.base_url,
+            headers=session.headers,
+            timeout=session.timeout,
+            follow_redirects=True,
+            http2=True,
+            limits=self._limits(config),
+        )
+        session.close()
+        return client
+
+    def _build_session(self, supabase_url, supabase_key, config):
+        """Build a keep-alive HTTP session for the Supabase project."""
+        return httpx.Client(
+            base_url=supabase_url,
+            headers={
+                "apikey": supabase_key,
+                "Authorization": f"Bearer {supabase_key}",
+            },
+            timeout=config.get("SUPABASE_TIMEOUT", 10.0),
+            limits=self._limits(config),
+        )
+
+    def _build_async_session(self, supabase_url, supabase_key, config):
+        """Build an async HTTP/2 session; concurrent requests share connections."""
+        return httpx.AsyncClient(
+            base_url=supabase_url,
+            headers={
+                "apikey": supabase_key,
+                "Authorization": f"Bearer {supabase_key}",
+            },
+            timeout=config.get("SUPABASE_TIMEOUT", 10.0),
+            limits=self._limits(config),
+            http2=True,
+        )
+
+    @staticmethod
+    def _limits(config):
+        return httpx.Limits(
+            max_connections=config.get("SUPABASE_POOL_MAX_CONNECTIONS", 20),
+            max_keepalive_connections=config.get("SUPABASE_POOL_MAX_KEEPALIVE", 10),
+            keepalive_expiry=config.get("SUPABASE_POOL_KEEPALIVE_EXPIRY", 30.0),
+        )
+
+    @staticmethod
+    def _close(client):
+        try:
+            if isinstance(client, httpx.Client):
+                client.close()
+            elif isinstance(client, httpx.AsyncClient):
+                # Only ever looked up on the I/O loop, so close it there
+                asyncio.get_running_loop().create_task(client.aclose())
+            else:
+                client.postgrest.session.close()
+        except Exception:
+            pass
+
+    def _reset_counters(self):
+        self.hits = 0
+        self.misses = 0
+        self.reconnects = 0
+
+    def _reset_after_fork(self):
+        # Inherited sockets belong to the parent; drop them without closing.
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self._clients = {}
+        self._reset_counters()
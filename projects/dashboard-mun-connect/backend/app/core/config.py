@@ -1,9 +1,18 @@
 """
 Configuration settings for the Flask application.
 """
+import json
 import os
 from datetime import timedelta
 
+
+def _postgres_url(url):
+    """Use the psycopg 3 driver (server-side prepared statements) for Postgres URLs."""
+    if url and url.startswith(("postgres://", "postgresql://")):
+        return "postgresql+psycopg://" + url.split("://", 1)[1]
+    return url
+
+
 class Config:
     """Base configuration class with common settings."""
     SECRET_KEY = os.environ.get("SECRET_KEY") or "dev-secret-key-change-in-production"
@@ -12,10 +21,43 @@ class Config:
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=1)
     JWT_REFRESH_TOKEN_EXPIRES = timedelta(days=30)
     
+    # Accepted access tokens: "app" (minted at login), "hybrid" (also Supabase
+    # Auth tokens) or "supabase" (only Supabase tokens; login hands out the
+    # Supabase session). Supabase tokens are verified locally with
+    # SUPABASE_JWT_SECRET (HS256) or the project's JWKS, cached for
+    # SUPABASE_JWKS_TTL seconds and refetched when a new key id appears.
+    AUTH_MODE = os.environ.get("AUTH_MODE", "app")
+    SUPABASE_JWT_SECRET = os.environ.get("SUPABASE_JWT_SECRET")
+    SUPABASE_JWT_AUDIENCE = os.environ.get("SUPABASE_JWT_AUDIENCE", "authenticated")
+    SUPABASE_JWT_LEEWAY = int(os.environ.get("SUPABASE_JWT_LEEWAY", 0))
+    SUPABASE_JWKS_TTL = int(os.environ.get("SUPABASE_JWKS_TTL", 600))
+    SUPABASE_JWKS_MIN_REFRESH = int(os.environ.get("SUPABASE_JWKS_MIN_REFRESH", 30))
+    SUPABASE_TOKEN_CACHE_SIZE = int(os.environ.get("SUPABASE_TOKEN_CACHE_SIZE", 10000))
+    
     # Supabase connection - using exact variable names from .env.local
     SUPABASE_URL = os.environ.get("NEXT_PUBLIC_SUPABASE_URL")
     SUPABASE_API_KEY = os.environ.get("SUPABASE_API_KEY") or os.environ.get("SUPABASE_SERVICE_ROLE_KEY") or os.environ.get("NEXT_PUBLIC_SUPABASE_ANON_KEY")
     
+    # Supabase client pool (per worker process)
+    SUPABASE_POOL_MAX_CONNECTIONS = int(os.environ.get("SUPABASE_POOL_MAX_CONNECTIONS", 20))
+    SUPABASE_POOL_MAX_KEEPALIVE = int(os.environ.get("SUPABASE_POOL_MAX_KEEPALIVE", 10))
+    SUPABASE_POOL_KEEPALIVE_EXPIRY = float(os.environ.get("SUPABASE_POOL_KEEPALIVE_EXPIRY", 30))
+    SUPABASE_TIMEOUT = float(os.environ.get("SUPABASE_TIMEOUT", 10))
+    
+    # Startup: with LAZY_INIT the factory skips Flask-Migrate (no "flask db")
+    # and the Supabase client, and checks Supabase in the background instead.
+    # /healthz reports readiness, re-checking at most every HEALTH_CHECK_TTL
+    # seconds; each check waits up to HEALTH_CHECK_TIMEOUT seconds.
+    LAZY_INIT = os.environ.get("LAZY_INIT", "false").lower() == "true"
+    HEALTH_CHECK_TTL = float(os.environ.get("HEALTH_CHECK_TTL", 10))
+    HEALTH_CHECK_TIMEOUT = float(os.environ.get("HEALTH_CHECK_TIMEOUT", 2))
+    
+    # Profile search: "exact", or "planned"/"estimated" for very large tables
+    PROFILE_SEARCH_COUNT_MODE = os.environ.get("PROFILE_SEARCH_COUNT_MODE", "exact")
+    
+    # Ranked search backend: "postgrest" (search_profiles_ranked RPC) or "sqlite"
+    SEARCH_BACKEND = os.environ.get("SEARCH_BACKEND", "postgrest")
+    
     # Database connection
     POSTGRES_USER = os.environ.get("POSTGRES_USER", "postgres")
     POSTGRES_PASSWORD = os.environ.get("POSTGRES_PASSWORD", "postgres")
@@ -23,6 +65,29 @@ class Config:
     POSTGRES_PORT = os.environ.get("POSTGRES_PORT", "5432")
     POSTGRES_DB = os.environ.get("POSTGRES_DATABASE", "postgres")
     
+    # Data backend for structured queries: "rest" (PostgREST) or "postgres"
+    # (direct through the SQLAlchemy engine). A prepare threshold of "" turns
+    # prepared statements off, e.g. behind a transaction-mode pgbouncer.
+    DATA_BACKEND = os.environ.get("DATA_BACKEND", "rest")
+    POSTGRES_PREPARE_THRESHOLD = os.environ.get("POSTGRES_PREPARE_THRESHOLD", "5")
+    POSTGRES_ENGINE_OPTIONS = {
+        "pool_size": int(os.environ.get("POSTGRES_POOL_SIZE", 10)),
+        "max_overflow": int(os.environ.get("POSTGRES_MAX_OVERFLOW", 10)),
+        "pool_timeout": int(os.environ.get("POSTGRES_POOL_TIMEOUT", 5)),
+        "pool_recycle": int(os.environ.get("POSTGRES_POOL_RECYCLE", 1800)),
+        "pool_pre_ping": True,
+        "connect_args": {
+            "prepare_threshold": int(POSTGRES_PREPARE_THRESHOLD) if POSTGRES_PREPARE_THRESHOLD else None,
+        },
+    }
+    
+    # Raw SQL execution: MCP server first (if set), then the Supabase run_sql RPC
+    MCP_SERVER_URL = os.environ.get("MCP_SERVER_URL")
+    SQL_TIMEOUT = float(os.environ.get("SQL_TIMEOUT", 10))
+    SQL_BREAKER_FAILURES = int(os.environ.get("SQL_BREAKER_FAILURES", 5))
+    SQL_BREAKER_RESET = int(os.environ.get("SQL_BREAKER_RESET", 30))
+    SQL_STREAM_CHUNK_SIZE = int(os.environ.get("SQL_STREAM_CHUNK_SIZE", 500))
+    
     # AI API keys
     OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY")
     ANTHROPIC_API_KEY = os.environ.get("ANTHROPIC_API_KEY")
@@ -31,6 +96,137 @@ class Config:
     CACHE_TYPE = "SimpleCache"
     CACHE_DEFAULT_TIMEOUT = 300
     
+    # Profile cache: per-worker LRU in front of the shared (Redis) tier
+    PROFILE_CACHE_SIZE = int(os.environ.get("PROFILE_CACHE_SIZE", 10000))
+    PROFILE_CACHE_LOCAL_TTL = int(os.environ.get("PROFILE_CACHE_LOCAL_TTL", 10))
+    PROFILE_CACHE_TTL = int(os.environ.get("PROFILE_CACHE_TTL", 300))
+    
+    # Batch profile lookups: at most PROFILE_BATCH_MAX ids and usernames per
+    # request, cache misses read with one in.(...) query per PROFILE_BATCH_QUERY_SIZE
+    PROFILE_BATCH_MAX = int(os.environ.get("PROFILE_BATCH_MAX", 500))
+    PROFILE_BATCH_QUERY_SIZE = int(os.environ.get("PROFILE_BATCH_QUERY_SIZE", 200))
+    
+    # Suggested delegates: per-worker inverted index over interests, conferences,
+    # country and experience, rebuilt every RECOMMENDATION_REFRESH seconds.
+    # RECOMMENDATION_WEIGHTS overrides family weights, e.g. {"country": 0.2}
+    RECOMMENDATION_WEIGHTS = json.loads(os.environ.get("RECOMMENDATION_WEIGHTS") or "{}")
+    RECOMMENDATION_REFRESH = int(os.environ.get("RECOMMENDATION_REFRESH", 900))
+    RECOMMENDATION_PAGE_SIZE = int(os.environ.get("RECOMMENDATION_PAGE_SIZE", 1000))
+    RECOMMENDATION_MAX_CANDIDATES = int(os.environ.get("RECOMMENDATION_MAX_CANDIDATES", 2000))
+    RECOMMENDATION_COMMON_SHARE = float(os.environ.get("RECOMMENDATION_COMMON_SHARE", 0.05))
+    
+    # Profile change feed: polls profiles on an (updated_at, id) watermark every
+    # CHANGE_FEED_INTERVAL seconds (re-reading CHANGE_FEED_OVERLAP seconds for
+    # late commits) and applies the changes to the profile cache, SQLite search
+    # and suggested delegates. CHANGE_FEED_LISTEN ("auto", "true", "false") also
+    # wakes it on NOTIFY when DATA_BACKEND is postgres. Checkpoints are kept in
+    # "memory", a "file" (CHANGE_FEED_CHECKPOINT_PATH) or the "table", and only
+    # used when every builder is persistent; otherwise a worker starts with a
+    # full load
+    CHANGE_FEED_ENABLED = os.environ.get("CHANGE_FEED_ENABLED", "false").lower() == "true"
+    CHANGE_FEED_INTERVAL = float(os.environ.get("CHANGE_FEED_INTERVAL", 5))
+    CHANGE_FEED_OVERLAP = float(os.environ.get("CHANGE_FEED_OVERLAP", 5))
+    CHANGE_FEED_BATCH_SIZE = int(os.environ.get("CHANGE_FEED_BATCH_SIZE", 500))
+    CHANGE_FEED_LISTEN = os.environ.get("CHANGE_FEED_LISTEN", "auto")
+    CHANGE_FEED_CHECKPOINTS = os.environ.get("CHANGE_FEED_CHECKPOINTS", "memory")
+    CHANGE_FEED_CHECKPOINT_PATH = os.environ.get("CHANGE_FEED_CHECKPOINT_PATH", "change_feed.json")
+    CHANGE_FEED_NAME = os.environ.get("CHANGE_FEED_NAME", "profiles")
+    
+    # Admin role: token claims younger than ADMIN_CLAIM_MAX_AGE are trusted
+    # as-is; older tokens re-check the cached flag (ROLE_CACHE_TTL). Other
+    # workers see revocations within ROLE_REVOCATION_POLL seconds.
+    ADMIN_CLAIM_MAX_AGE = int(os.environ.get("ADMIN_CLAIM_MAX_AGE", 300))
+    ROLE_CACHE_TTL = int(os.environ.get("ROLE_CACHE_TTL", 30))
+    ROLE_REVOCATION_POLL = int(os.environ.get("ROLE_REVOCATION_POLL", 5))
+    
+    # Document revisions: a full snapshot is stored every REVISION_SNAPSHOT_INTERVAL
+    # revisions, or once the deltas since the last one exceed REVISION_SNAPSHOT_RATIO
+    # times the text size. Head texts are cached per worker.
+    REVISION_SNAPSHOT_INTERVAL = int(os.environ.get("REVISION_SNAPSHOT_INTERVAL", 50))
+    REVISION_SNAPSHOT_RATIO = float(os.environ.get("REVISION_SNAPSHOT_RATIO", 1.0))
+    REVISION_MAX_OPS = int(os.environ.get("REVISION_MAX_OPS", 1000))
+    REVISION_CACHE_SIZE = int(os.environ.get("REVISION_CACHE_SIZE", 256))
+    REVISION_CACHE_TTL = int(os.environ.get("REVISION_CACHE_TTL", 300))
+    
+    # Speeches: speaking rate per speech_type (JSON object, merged over the
+    # built-in defaults) used to estimate duration_seconds; imports are
+    # written in multi-row inserts of SPEECH_IMPORT_BATCH_SIZE
+    SPEECH_WORDS_PER_MINUTE = json.loads(os.environ.get("SPEECH_WORDS_PER_MINUTE") or "{}")
+    SPEECH_DEFAULT_WORDS_PER_MINUTE = int(os.environ.get("SPEECH_DEFAULT_WORDS_PER_MINUTE", 140))
+    SPEECH_IMPORT_MAX = int(os.environ.get("SPEECH_IMPORT_MAX", 1000))
+    SPEECH_IMPORT_BATCH_SIZE = int(os.environ.get("SPEECH_IMPORT_BATCH_SIZE", 200))
+    
+    # Response pipeline: bodies of at least COMPRESS_MIN_SIZE bytes are
+    # compressed (brotli if installed, else gzip); GET responses get strong
+    # ETags and DEFAULT_CACHE_CONTROL unless the route sets its own policy
+    COMPRESS_ENABLED = os.environ.get("COMPRESS_ENABLED", "true").lower() != "false"
+    COMPRESS_MIN_SIZE = int(os.environ.get("COMPRESS_MIN_SIZE", 1024))
+    COMPRESS_LEVEL = int(os.environ.get("COMPRESS_LEVEL", 6))
+    COMPRESS_BR_LEVEL = int(os.environ.get("COMPRESS_BR_LEVEL", 4))
+    DEFAULT_CACHE_CONTROL = os.environ.get("DEFAULT_CACHE_CONTROL", "private, no-cache")
+    PUBLIC_PROFILE_CACHE_CONTROL = os.environ.get(
+        "PUBLIC_PROFILE_CACHE_CONTROL", "public, max-age=60, stale-while-revalidate=300"
+    )
+    PROFILE_SEARCH_CACHE_CONTROL = os.environ.get("PROFILE_SEARCH_CACHE_CONTROL", "public, max-age=30")
+    
+    # Tracing: every span feeds per-operation latency histograms on /metrics;
+    # TRACING_SAMPLE_RATE of requests also keep their span tree for /traces and
+    # TRACING_OTLP_ENDPOINT. TRACING_HONOR_TRACEPARENT records every request
+    # whose incoming traceparent is sampled; enable it only behind a proxy that
+    # sets the header. METRICS_TOKEN, when set, is required as a bearer token
+    # on both endpoints (and must be set with METRICS_TOKEN_REQUIRED).
+    TRACING_METRICS = os.environ.get("TRACING_METRICS", "true").lower() != "false"
+    TRACING_SAMPLE_RATE = float(os.environ.get("TRACING_SAMPLE_RATE", 0))
+    TRACING_MAX_TRACES = int(os.environ.get("TRACING_MAX_TRACES", 200))
+    TRACING_OTLP_ENDPOINT = os.environ.get("TRACING_OTLP_ENDPOINT")
+    TRACING_SERVICE_NAME = os.environ.get("TRACING_SERVICE_NAME", "mun-connect-backend")
+    TRACING_HONOR_TRACEPARENT = os.environ.get("TRACING_HONOR_TRACEPARENT", "false").lower() == "true"
+    METRICS_TOKEN = os.environ.get("METRICS_TOKEN")
+    METRICS_TOKEN_REQUIRED = False
+    
+    # JSON provider: "auto" uses orjson when installed, "default" keeps Flask's
+    JSON_PROVIDER = os.environ.get("JSON_PROVIDER", "auto")
+    
+    # Rate limiting: "sliding_window" or "token_bucket"; in-process unless a
+    # Redis URL is given, in which case limits are shared by all workers
+    RATELIMIT_ENABLED = True
+    RATELIMIT_ALGORITHM = os.environ.get("RATELIMIT_ALGORITHM", "sliding_window")
+    RATELIMIT_STORAGE_URL = os.environ.get("RATELIMIT_STORAGE_URL")
+    
+    # Research jobs: models clients may request (provider and concurrency
+    # limit each), run on RESEARCH_WORKERS threads per process. Models whose
+    # provider has no API key are not offered; the offline "stub" provider only
+    # when listed explicitly (or in testing). If RESEARCH_DEFAULT_MODEL is not
+    # offered, the first model that is becomes the default. Progress events
+    # stay in-process unless RESEARCH_BROKER_URL points at Redis.
+    RESEARCH_MODELS = json.loads(os.environ.get("RESEARCH_MODELS") or "{}") or {
+        "gpt-4o-mini": {"provider": "openai", "concurrency": 4},
+        "claude-3-5-haiku-latest": {"provider": "anthropic", "concurrency": 4},
+    }
+    RESEARCH_DEFAULT_MODEL = os.environ.get("RESEARCH_DEFAULT_MODEL", "gpt-4o-mini")
+    RESEARCH_WORKERS = int(os.environ.get("RESEARCH_WORKERS", 16))
+    RESEARCH_TIMEOUT = float(os.environ.get("RESEARCH_TIMEOUT", 60))
+    RESEARCH_BROKER_URL = os.environ.get("RESEARCH_BROKER_URL")
+    RESEARCH_EVENT_RETENTION = int(os.environ.get("RESEARCH_EVENT_RETENTION", 300))
+    RESEARCH_SSE_HEARTBEAT = int(os.environ.get("RESEARCH_SSE_HEARTBEAT", 15))
+    RESEARCH_SSE_POLL_INTERVAL = float(os.environ.get("RESEARCH_SSE_POLL_INTERVAL", 2))
+    RESEARCH_STUB_DELAY = float(os.environ.get("RESEARCH_STUB_DELAY", 0))
+    
+    # Rows left pending/running longer than RESEARCH_JOB_TIMEOUT seconds (their
+    # worker stopped) are marked failed every RESEARCH_REAP_INTERVAL seconds;
+    # 0 disables the reaper
+    RESEARCH_JOB_TIMEOUT = int(os.environ.get("RESEARCH_JOB_TIMEOUT", 900))
+    RESEARCH_REAP_INTERVAL = int(os.environ.get("RESEARCH_REAP_INTERVAL", 300))
+    
+    # Research result cache, per committee: exact matches on normalized text,
+    # near-duplicates above RESEARCH_SIMILARITY_THRESHOLD content-word similarity
+    # (MinHash signatures in RESEARCH_LSH_BANDS bands). A size of 0 disables it.
+    RESEARCH_CACHE_SIZE = int(os.environ.get("RESEARCH_CACHE_SIZE", 5000))
+    RESEARCH_CACHE_TTL = int(os.environ.get("RESEARCH_CACHE_TTL", 86400))
+    RESEARCH_SIMILARITY_THRESHOLD = float(os.environ.get("RESEARCH_SIMILARITY_THRESHOLD", 0.8))
+    RESEARCH_MINHASH_PERMUTATIONS = int(os.environ.get("RESEARCH_MINHASH_PERMUTATIONS", 64))
+    RESEARCH_LSH_BANDS = int(os.environ.get("RESEARCH_LSH_BANDS", 16))
+    
     # Celery
     CELERY_BROKER_URL = os.environ.get("CELERY_BROKER_URL", "redis://localhost:6379/0")
     CELERY_RESULT_BACKEND = os.environ.get("CELERY_RESULT_BACKEND", "redis://localhost:6379/0")
@@ -39,8 +235,9 @@ class Config:
 class DevelopmentConfig(Config):
     """Development configuration."""
     DEBUG = True
-    SQLALCHEMY_DATABASE_URI = os.environ.get("POSTGRES_URL") or \
-        f"postgresql://{Config.POSTGRES_USER}:{Config.POSTGRES_PASSWORD}@{Config.POSTGRES_HOST}:{Config.POSTGRES_PORT}/{Config.POSTGRES_DB}"
+    SQLALCHEMY_DATABASE_URI = _postgres_url(os.environ.get("POSTGRES_URL") or \
+        f"postgresql://{Config.POSTGRES_USER}:{Config.POSTGRES_PASSWORD}@{Config.POSTGRES_HOST}:{Config.POSTGRES_PORT}/{Config.POSTGRES_DB}")
+    SQLALCHEMY_ENGINE_OPTIONS = Config.POSTGRES_ENGINE_OPTIONS
     
 
 class TestingConfig(Config):
@@ -50,12 +247,17 @@ class TestingConfig(Config):
         "sqlite:///:memory:"
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(seconds=5)
     JWT_REFRESH_TOKEN_EXPIRES = timedelta(seconds=10)
+    SEARCH_BACKEND = "sqlite"
+    RESEARCH_MODELS = dict(Config.RESEARCH_MODELS, stub={"provider": "stub", "concurrency": 8})
+    RESEARCH_DEFAULT_MODEL = "stub"
+    RESEARCH_REAP_INTERVAL = 0
 
 
 class ProductionConfig(Config):
     """Production configuration."""
     DEBUG = False
-    SQLALCHEMY_DATABASE_URI = os.environ.get("POSTGRES_URL")
+    SQLALCHEMY_DATABASE_URI = _postgres_url(os.environ.get("POSTGRES_URL"))
+    SQLALCHEMY_ENGINE_OPTIONS = Config.POSTGRES_ENGINE_OPTIONS
     
     # Use more secure settings in production
     JWT_COOKIE_SECURE = True
@@ -64,6 +266,10 @@ class ProductionConfig(Config):
     # Use Redis for caching in production
     CACHE_TYPE = "RedisCache"
     CACHE_REDIS_URL = os.environ.get("REDIS_URL", "redis://localhost:6379/0")
+    RATELIMIT_STORAGE_URL = os.environ.get("RATELIMIT_STORAGE_URL") or CACHE_REDIS_URL
+    
+    # /metrics and /traces are never served unauthenticated
+    METRICS_TOKEN_REQUIRED = True
     
     # Logging
     LOG_LEVEL = "INFO" 
\ No newline at end of file
@@ -81,6 +81,13 @@ class RateLimitError(APIError):
     error_code = "rate_limit_exceeded"
 
 
+class ServiceUnavailableError(APIError):
+    """503 Service Unavailable Error."""
+    status_code = 503
+    message = "Service temporarily unavailable."
+    error_code = "service_unavailable"
+
+
 def register_error_handlers(app):
     """Register error handlers for the Flask app."""
     
@@ -91,6 +91,11 @@ class Committee(db.Model, TimestampMixin):
     conference_name = db.Column(db.String(255), nullable=False)
     conference_date = db.Column(db.Date, nullable=True)
     
+    # Aggregates maintained by database triggers (committee_aggregates.sql)
+    document_count = db.Column(db.Integer, default=0, nullable=False)
+    speech_count = db.Column(db.Integer, default=0, nullable=False)
+    last_activity_at = db.Column(db.DateTime(timezone=True), nullable=True)
+    
     # Relationships
     documents = db.relationship("Document", back_populates="committee", lazy="dynamic")
     speeches = db.relationship("Speech", back_populates="committee", lazy="dynamic")
@@ -0,0 +1,111 @@
+"""
+Keyset pagination and visibility helpers for user-authored content.
+
+Documents and speeches are listed newest first on ``(updated_at, id)``. The
+cursor is the opaque, URL-safe encoding of the last row's sort key; the next
+page seeks past it with ``AFTER_CURSOR`` so deep pages cost the same as the
+first one.
+"""
+import base64
+import binascii
+import json
+
+from app.core.errors import ValidationFailedError
+from app.core.query import Param, and_
+
+# Rows after the cursor in (updated_at desc, id desc) order
+AFTER_CURSOR = (
+    ("updated_at", "lt", Param("cursor_updated_at")),
+    and_(("updated_at", "eq", Param("cursor_updated_at")), ("id", "lt", Param("cursor_id"))),
+)
+
+
+def keyset_order(query):
+    """Apply the (updated_at desc, id desc) ordering and the page limit."""
+    return query.order("updated_at", desc=True).order("id", desc=True).limit(Param("limit"))
+
+
+def encode_cursor(row):
+    """Encode the sort key of the last row on a page."""
+    raw = json.dumps([row["updated_at"], row["id"]], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """
+    Decode a cursor into the parameters of ``AFTER_CURSOR``.
+
+    Args:
+        cursor (str): Cursor from a previous page
+
+    Returns:
+        dict: ``cursor_updated_at`` and ``cursor_id`` values
+
+    Raises:
+        ValidationFailedError: If the cursor is malformed
+    """
+    try:
+        updated_at, row_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (binascii.Error, ValueError, TypeError):
+        raise ValidationFailedError("Invalid cursor")
+    if not isinstance(updated_at, str) or not isinstance(row_id, str):
+        raise ValidationFailedError("Invalid cursor")
+    return {"cursor_updated_at": updated_at, "cursor_id": row_id}
+
+
+def cursor_page(rows, per_page):
+    """
+    Trim a ``per_page + 1`` result to one page.
+
+    Returns:
+        tuple: ``(rows, meta)`` with ``per_page``, ``next_cursor`` and ``has_more``
+    """
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    return rows, {
+        "per_page": per_page,
+        "next_cursor": encode_cursor(rows[-1]) if has_more else None,
+        "has_more": has_more,
+    }
+
+
+def parse_bool(value, name):
+    """Parse an optional boolean query parameter."""
+    if value is None or value == "":
+        return None
+    if value.lower() in ("true", "1"):
+        return True
+    if value.lower() in ("false", "0"):
+        return False
+    raise ValidationFailedError(f"{name} must be true or false")
+
+
+def listing_scope(author_id, is_public, current_user):
+    """
+    Resolve which rows a listing may return.
+
+    Without filters the caller's own rows are listed. ``author_id`` lists
+    another author's public rows; ``is_public=True`` lists public rows from
+    every author. Other authors' private rows are never listed.
+
+    Args:
+        author_id (str or None): Requested author
+        is_public (bool or None): Requested visibility
+        current_user (str): Caller
+
+    Returns:
+        tuple: ``(author_id, is_public)`` filters to apply, or None if
+        nothing can match
+    """
+    if author_id is None and is_public is not True:
+        author_id = current_user
+    if author_id is not None and author_id != current_user:
+        if is_public is False:
+            return None
+        is_public = True
+    return author_id, is_public
+
+
+def visible(row, current_user):
+    """Whether the caller may read a row: their own, or public."""
+    return row["author_id"] == current_user or bool(row.get("is_public"))
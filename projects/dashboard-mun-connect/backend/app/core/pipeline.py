@@ -0,0 +1,192 @@
+"""
+Response pipeline: conditional GET, caching policy and compression.
+
+Registered as an ``after_request`` hook by ``init_response_pipeline``. For
+every buffered response it
+
+1. gives successful GET responses a strong ETag, either one the view set
+   (``set_resource_version`` derives it from a row's ``id`` and
+   ``updated_at``) or a hash of the body;
+2. answers ``If-None-Match`` / ``If-Modified-Since`` with an empty 304;
+3. sets ``Cache-Control`` from the view's ``cache_control`` policy or
+   ``DEFAULT_CACHE_CONTROL``;
+4. compresses bodies of at least ``COMPRESS_MIN_SIZE`` bytes with brotli
+   (when the ``brotli`` package is installed) or gzip, whichever the client
+   prefers.
+
+A compressed body is a different representation, so its ETag gets a
+``-br`` or ``-gzip`` suffix; validators sent back with either suffix still
+match. Streamed responses such as server-sent events pass through untouched.
+"""
+import gzip
+import hashlib
+from datetime import datetime
+from functools import wraps
+
+from flask import current_app, g, request
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = frozenset((
+    "application/json",
+    "text/plain",
+    "text/html",
+    "text/csv",
+))
+
+ENCODING_SUFFIXES = {"br": "-br", "gzip": "-gzip"}
+
+
+def cache_control(policy):
+    """
+    Set the ``Cache-Control`` policy of a route.
+
+    Args:
+        policy (str): Header value, e.g. ``"public, max-age=60"``, or the
+            name of a config key holding it
+
+    Returns:
+        function: Decorator
+    """
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            g.cache_control = current_app.config.get(policy, policy)
+            return current_app.ensure_sync(fn)(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def set_resource_version(resource_id, updated_at):
+    """
+    Derive the validators of the current response from a row's version.
+
+    Use only for resources whose every write bumps ``updated_at``; the body
+    is then not hashed and ``Last-Modified`` is set as well.
+
+    Args:
+        resource_id (str): Row id
+        updated_at (str): Row ``updated_at`` as returned by PostgREST
+    """
+    if not updated_at:
+        return
+    g.resource_etag = hashlib.sha1(f"{resource_id}:{updated_at}".encode("utf-8")).hexdigest()[:32]
+    try:
+        g.resource_modified = datetime.fromisoformat(str(updated_at).replace("Z", "+00:00"))
+    except ValueError:
+        g.resource_modified = None
+
+
+def etag_matches(etag):
+    """
+    Whether the request's ``If-None-Match`` names ``etag`` in any encoding.
+
+    Args:
+        etag (str): Unquoted entity tag, without an encoding suffix
+
+    Returns:
+        bool: True if a 304 may be sent
+    """
+    tags = request.if_none_match
+    if not tags:
+        return False
+    if tags.star_tag:
+        return True
+    return any(_strip_encoding(tag) == etag for tag in tags.as_set(include_weak=True))
+
+
+def _strip_encoding(tag):
+    for suffix in ENCODING_SUFFIXES.values():
+        if tag.endswith(suffix):
+            return tag[:-len(suffix)]
+    return tag
+
+
+def _negotiate(response, config):
+    """Pick a content coding for the response, or None to send it as is."""
+    if not config.get("COMPRESS_ENABLED", True):
+        return None
+    if response.mimetype not in COMPRESSIBLE_MIMETYPES or "Content-Encoding" in response.headers:
+        return None
+    if response.status_code < 200 or response.status_code in (204, 206, 304):
+        return None
+    if response.content_length is not None and response.content_length < config.get("COMPRESS_MIN_SIZE", 1024):
+        return None
+
+    accepted = request.accept_encodings
+    offers = ["br", "gzip"] if brotli is not None else ["gzip"]
+    best = accepted.best_match(offers)
+    if best is None or accepted[best] == 0:
+        return None
+    # Prefer brotli on a tie, whatever order the client listed them in
+    if best == "gzip" and "br" in offers and accepted["br"] == accepted["gzip"]:
+        best = "br"
+    return best
+
+
+def _compress(data, encoding, config):
+    if encoding == "br":
+        return brotli.compress(data, quality=config.get("COMPRESS_BR_LEVEL", 4))
+    return gzip.compress(data, compresslevel=config.get("COMPRESS_LEVEL", 6), mtime=0)
+
+
+def _not_modified(response):
+    """Turn a response into an empty 304, keeping its caching headers."""
+    response.status_code = 304
+    response.set_data(b"")
+    for header in ("Content-Type", "Content-Length", "Content-Encoding"):
+        response.headers.pop(header, None)
+    return response
+
+
+def process_response(response):
+    """``after_request`` hook applying validators, caching policy and compression."""
+    if response.direct_passthrough or response.is_streamed:
+        return response
+
+    config = current_app.config
+    compressible = response.mimetype in COMPRESSIBLE_MIMETYPES and config.get("COMPRESS_ENABLED", True)
+    if compressible:
+        response.vary.add("Accept-Encoding")
+
+    cacheable = request.method in ("GET", "HEAD") and response.status_code == 200
+    if cacheable and "Cache-Control" not in response.headers:
+        policy = g.get("cache_control") or config.get("DEFAULT_CACHE_CONTROL")
+        if policy:
+            response.headers["Cache-Control"] = policy
+
+    encoding = _negotiate(response, config)
+
+    if cacheable:
+        etag, weak = response.get_etag()
+        if etag is None or weak:
+            etag = g.get("resource_etag") or hashlib.blake2b(response.get_data(), digest_size=16).hexdigest()
+        if g.get("resource_modified") is not None and response.last_modified is None:
+            response.last_modified = g.resource_modified
+        response.set_etag(etag + ENCODING_SUFFIXES[encoding] if encoding else etag)
+
+        if request.if_none_match:
+            if etag_matches(etag):
+                return _not_modified(response)
+        elif request.if_modified_since and response.last_modified is not None:
+            if response.last_modified.replace(microsecond=0) <= request.if_modified_since:
+                return _not_modified(response)
+
+    if encoding:
+        response.set_data(_compress(response.get_data(), encoding, config))
+        response.headers["Content-Encoding"] = encoding
+
+    return response
+
+
+def init_response_pipeline(app):
+    """
+    Register the response pipeline on the app.
+
+    Args:
+        app (Flask): Application to register with
+    """
+    app.after_request(process_response)
@@ -0,0 +1,298 @@
+"""
+Read-through profile cache.
+
+Profiles are cached by id; a username index maps usernames to ids so both
+lookups share one entry and a single invalidation covers both.
+"""
+from collections import namedtuple
+
+from flask import current_app
+
+from app.core.aio import async_supabase_request, run_sync
+from app.core.cache import build_tiered_cache
+from app.core.query import Query, Param
+from app.core.utils import supabase_request
+
+# Every profile column any endpoint returns, so one cached row serves them all
+CACHED_PROFILE_COLUMNS = (
+    "id", "username", "full_name", "bio", "avatar_url", "country", "school",
+    "education_level", "interests", "conference_experience", "is_admin", "created_at", "updated_at",
+)
+
+PROFILES = Query("profiles")
+CACHED_PROFILE_BY_ID = PROFILES.select(*CACHED_PROFILE_COLUMNS).eq("id", Param("id")).limit(1)
+CACHED_PROFILE_BY_USERNAME = PROFILES.select(*CACHED_PROFILE_COLUMNS).eq("username", Param("username")).limit(1)
+CACHED_PROFILES_BY_IDS = PROFILES.select(*CACHED_PROFILE_COLUMNS).in_("id", Param("ids"))
+CACHED_PROFILES_BY_USERNAMES = PROFILES.select(*CACHED_PROFILE_COLUMNS).in_("username", Param("usernames"))
+CACHED_PROFILES_BY_IDS_OR_USERNAMES = PROFILES.select(*CACHED_PROFILE_COLUMNS).or_(
+    ("id", "in", Param("ids")),
+    ("username", "in", Param("usernames")),
+)
+
+# Profiles found by id and by username, plus the lookups whose query failed
+ProfileBatch = namedtuple("ProfileBatch", "by_id by_username failed_ids failed_usernames")
+
+
+class ProfileCache:
+    """Two-tier profile cache keyed by id, with a username-to-id index."""
+
+    def __init__(self, cache):
+        self.cache = cache
+
+    @staticmethod
+    def _id_key(profile_id):
+        return f"profile:id:{profile_id}"
+
+    @staticmethod
+    def _username_key(username):
+        return f"profile:username:{username}"
+
+    def get_by_id(self, profile_id, loader):
+        """
+        Return the profile with ``profile_id``, loading it on a miss.
+
+        Args:
+            profile_id (str): Profile id
+            loader (callable): Called with the id on a miss; returns the
+                profile dict or None
+
+        Returns:
+            dict: Profile, or None if it does not exist
+        """
+        profile = self.cache.get(self._id_key(profile_id))
+        if profile is not None:
+            return profile
+
+        profile = loader(profile_id)
+        if profile:
+            self.put(profile)
+        return profile
+
+    async def aget_by_id(self, profile_id, loader):
+        """
+        Async ``get_by_id``; ``loader`` is a coroutine function.
+
+        Shared-tier reads and writes run in a worker thread so a slow cache
+        never stalls the event loop.
+        """
+        key = self._id_key(profile_id)
+        profile = self.cache.local.get(key)
+        if profile is None and self.cache.shared is not None:
+            profile = await run_sync(self.cache.get, key)
+        if profile is not None:
+            return profile
+
+        profile = await loader(profile_id)
+        if profile:
+            if self.cache.shared is not None:
+                await run_sync(self.put, profile)
+            else:
+                self.put(profile)
+        return profile
+
+    def get_by_username(self, username, loader):
+        """
+        Return the profile with ``username``, loading it on a miss.
+
+        Args:
+            username (str): Username
+            loader (callable): Called with the username on a miss
+
+        Returns:
+            dict: Profile, or None if it does not exist
+        """
+        profile_id = self.cache.get(self._username_key(username))
+        if profile_id is not None:
+            profile = self.cache.get(self._id_key(profile_id))
+            # Guard against an index entry that outlived a username change
+            if profile is not None and profile.get("username") == username:
+                return profile
+
+        profile = loader(username)
+        if profile:
+            self.put(profile)
+        return profile
+
+    def get_many(self, ids, usernames, loader):
+        """
+        Return the profiles with ``ids`` and ``usernames``, loading all misses at once.
+
+        Args:
+            ids (list): Profile ids
+            usernames (list): Usernames
+            loader (callable): Called once with the missing ids and usernames;
+                returns the matching rows and the ids and usernames it could
+                not look up
+
+        Returns:
+            ProfileBatch: Profiles that exist, keyed by id and by username
+        """
+        by_id = {
+            profile["id"]: profile
+            for profile in self.cache.get_many([self._id_key(i) for i in ids]).values()
+        }
+
+        by_username = {}
+        wanted = set(usernames)
+        indexed = self.cache.get_many([self._username_key(u) for u in usernames])
+        indexed_ids = {profile_id for profile_id in indexed.values() if profile_id not in by_id}
+        cached = self.cache.get_many([self._id_key(i) for i in indexed_ids])
+        for profile in list(by_id.values()) + list(cached.values()):
+            # As in get_by_username, skip index entries that outlived a rename
+            if profile.get("username") in wanted:
+                by_username[profile["username"]] = profile
+
+        missing_ids = [i for i in ids if i not in by_id]
+        missing_usernames = [u for u in usernames if u not in by_username]
+        failed_ids, failed_usernames = set(), set()
+        if missing_ids or missing_usernames:
+            rows, failed_ids, failed_usernames = loader(missing_ids, missing_usernames)
+            for profile in rows:
+                self.put(profile)
+                by_id[profile["id"]] = profile
+                if profile.get("username"):
+                    by_username[profile["username"]] = profile
+        return ProfileBatch(by_id, by_username, failed_ids, failed_usernames)
+
+    def put(self, profile):
+        """Cache a full profile row under its id and username."""
+        self.cache.set(self._id_key(profile["id"]), profile)
+        if profile.get("username"):
+            self.cache.set(self._username_key(profile["username"]), profile["id"])
+
+    def invalidate(self, profile_id, *usernames):
+        """
+        Drop a profile and any username index entries pointing at it.
+
+        Args:
+            profile_id (str): Profile id
+            *usernames: Usernames (old and new) to unlink
+        """
+        keys = [self._id_key(profile_id)]
+        keys.extend(self._username_key(u) for u in usernames if u)
+        self.cache.delete(*keys)
+
+    def stats(self):
+        return self.cache.stats()
+
+
+def init_profile_cache(app):
+    """
+    Create the profile cache and register it on the app.
+
+    Args:
+        app (Flask): Application to register with
+    """
+    cache = build_tiered_cache(
+        app.config,
+        max_size=app.config.get("PROFILE_CACHE_SIZE", 10000),
+        local_timeout=app.config.get("PROFILE_CACHE_LOCAL_TTL", 10),
+        shared_timeout=app.config.get("PROFILE_CACHE_TTL"),
+    )
+    app.extensions["profile_cache"] = ProfileCache(cache)
+
+
+def get_profile_cache():
+    """Return the profile cache registered on the current app."""
+    return current_app.extensions["profile_cache"]
+
+
+def _load_by_id(profile_id):
+    rows = supabase_request(method="GET", endpoint=CACHED_PROFILE_BY_ID, params={"id": profile_id})
+    return rows[0] if rows else None
+
+
+async def _aload_by_id(profile_id):
+    rows = await async_supabase_request(method="GET", endpoint=CACHED_PROFILE_BY_ID, params={"id": profile_id})
+    return rows[0] if rows else None
+
+
+def _load_by_username(username):
+    rows = supabase_request(method="GET", endpoint=CACHED_PROFILE_BY_USERNAME, params={"username": username})
+    return rows[0] if rows else None
+
+
+def _load_many(ids, usernames):
+    chunk_size = current_app.config.get("PROFILE_BATCH_QUERY_SIZE", 200)
+    rows, failed_ids, failed_usernames = [], set(), set()
+    # One in.(...) query per chunk keeps the URL within proxy limits
+    for start in range(0, max(len(ids), len(usernames)), chunk_size):
+        id_chunk = ids[start:start + chunk_size]
+        username_chunk = usernames[start:start + chunk_size]
+        if id_chunk and username_chunk:
+            endpoint = CACHED_PROFILES_BY_IDS_OR_USERNAMES
+        elif id_chunk:
+            endpoint = CACHED_PROFILES_BY_IDS
+        else:
+            endpoint = CACHED_PROFILES_BY_USERNAMES
+        try:
+            rows.extend(supabase_request(
+                method="GET",
+                endpoint=endpoint,
+                params={"ids": id_chunk, "usernames": username_chunk},
+            ) or [])
+        except Exception as e:
+            # Report this chunk as unavailable and keep the rest of the batch
+            current_app.logger.error(f"Error loading profiles: {str(e)}")
+            failed_ids.update(id_chunk)
+            failed_usernames.update(username_chunk)
+    return rows, failed_ids, failed_usernames
+
+
+def load_profile(profile_id):
+    """
+    Fetch a profile by id through the cache.
+
+    Args:
+        profile_id (str): Profile id
+
+    Returns:
+        dict: Profile, or None if it does not exist
+    """
+    return get_profile_cache().get_by_id(profile_id, _load_by_id)
+
+
+async def aload_profile(profile_id):
+    """
+    Async ``load_profile`` for views running on the shared event loop.
+
+    Args:
+        profile_id (str): Profile id
+
+    Returns:
+        dict: Profile, or None if it does not exist
+    """
+    return await get_profile_cache().aget_by_id(profile_id, _aload_by_id)
+
+
+def load_profile_by_username(username):
+    """
+    Fetch a profile by username through the cache.
+
+    Args:
+        username (str): Username
+
+    Returns:
+        dict: Profile, or None if it does not exist
+    """
+    return get_profile_cache().get_by_username(username, _load_by_username)
+
+
+def load_profiles(ids=(), usernames=()):
+    """
+    Fetch many profiles by id and username through the cache.
+
+    Cache misses are read together with ``in.(...)`` filters, one query per
+    ``PROFILE_BATCH_QUERY_SIZE`` lookups.
+
+    Args:
+        ids (iterable): Profile ids
+        usernames (iterable): Usernames
+
+    Returns:
+        ProfileBatch: Profiles that exist, keyed by id and by username, and
+        the ids and usernames whose query failed
+    """
+    ids = list(dict.fromkeys(ids))
+    usernames = list(dict.fromkeys(usernames))
+    return get_profile_cache().get_many(ids, usernames, _load_many)
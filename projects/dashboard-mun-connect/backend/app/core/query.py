@@ -0,0 +1,339 @@
+"""
+Structured PostgREST query specifications.
+
+Queries are declared once, usually as module-level constants, and compiled to
+PostgREST query parameters at declaration time. Request handlers only bind
+values to the placeholders instead of formatting and re-parsing endpoint
+strings on every call.
+
+Example:
+    PROFILE_BY_ID = Query("profiles").select("id", "username").eq("id", Param("id"))
+    supabase_request("GET", PROFILE_BY_ID, params={"id": user_id})
+"""
+from urllib.parse import parse_qsl, urlsplit
+
+
+class Param:
+    """Placeholder for a value supplied when the query is executed."""
+    __slots__ = ("name",)
+
+    def __init__(self, name):
+        self.name = name
+
+    def __repr__(self):
+        return f"Param({self.name!r})"
+
+
+class CountMode:
+    """Row count strategies supported by PostgREST (``Prefer: count=...``)."""
+    EXACT = "exact"
+    PLANNED = "planned"
+    ESTIMATED = "estimated"
+
+    ALL = (EXACT, PLANNED, ESTIMATED)
+
+
+FILTER_OPERATORS = ("eq", "neq", "gt", "gte", "lt", "lte", "like", "ilike", "is", "in", "cs", "ov")
+
+# Characters that must be quoted inside in.(...) lists and arrays (as postgrest-py's
+# sanitize_param does; importing postgrest itself would load the whole client)
+RESERVED_CHARACTERS = ",:()"
+
+
+def sanitize_param(value):
+    """Quote a list or array element containing PostgREST's reserved characters."""
+    text = str(value)
+    if any(char in text for char in RESERVED_CHARACTERS):
+        return f'"{text}"'
+    return text
+
+
+def _format_value(value, quote=False):
+    """Render a bound value the way PostgREST expects it in a filter."""
+    if value is None:
+        return "null"
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return "(" + ",".join(_format_value(v, quote=True) for v in value) + ")"
+    return sanitize_param(value) if quote else str(value)
+
+
+def _format_array(value):
+    """Render a value as a Postgres array literal for ``cs``/``ov`` filters."""
+    if isinstance(value, str):
+        return value
+    return "{" + ",".join(sanitize_param(v) for v in value) + "}"
+
+
+class _Fragment:
+    """A compiled parameter value: literal text interleaved with placeholders."""
+    __slots__ = ("parts",)
+
+    def __init__(self, *parts):
+        self.parts = parts
+
+    def render(self, params):
+        out = []
+        for part in self.parts:
+            if isinstance(part, str):
+                out.append(part)
+            else:
+                param, formatter = part
+                if param.name not in params:
+                    raise KeyError(f"Missing value for query parameter '{param.name}'")
+                out.append(formatter(params[param.name]))
+        return "".join(out)
+
+
+def _operand(operator, value, quote):
+    """Compile ``<operator>.<value>`` into literal text or a deferred part."""
+    if operator in ("cs", "ov"):
+        formatter = _format_array
+    elif quote:
+        formatter = lambda v: _format_value(v, quote=True)  # noqa: E731
+    else:
+        formatter = _format_value
+    prefix = f"{operator}."
+    if isinstance(value, Param):
+        return (prefix, (value, formatter))
+    return (prefix + formatter(value),)
+
+
+def and_(*conditions):
+    """
+    Group conditions for use inside ``Query.or_``.
+
+    Args:
+        *conditions: ``(column, operator, value)`` tuples
+
+    Returns:
+        tuple: A condition that holds when all of ``conditions`` hold
+    """
+    _check_conditions(conditions)
+    return ("and", "and", tuple(conditions))
+
+
+def _check_conditions(conditions):
+    for column, operator, value in conditions:
+        if operator not in FILTER_OPERATORS + ("and",):
+            raise ValueError(f"Unsupported filter operator: {operator}")
+
+
+def _group_parts(conditions):
+    """Compile a parenthesized, comma-separated list of conditions."""
+    parts = ["("]
+    for index, (column, op, operand) in enumerate(conditions):
+        if index:
+            parts.append(",")
+        if op == "and":
+            parts.append("and")
+            parts.extend(_group_parts(operand))
+        else:
+            parts.append(f"{column}.")
+            parts.extend(_operand(op, operand, True))
+    parts.append(")")
+    return parts
+
+
+def _filter_parts(operator, value):
+    """Compile one stored filter into fragment parts."""
+    if operator is None:
+        return (value,)
+    if operator == "or":
+        return tuple(_group_parts(value))
+    return _operand(operator, value, False)
+
+
+class Query:
+    """
+    Immutable PostgREST query specification.
+
+    Every builder method returns a new ``Query``; the compiled parameter list
+    is computed once per instance, so shared module-level queries cost only a
+    placeholder substitution per request. Filters are kept as
+    ``(column, operator, value)`` triples so they can also be compiled to SQL.
+    """
+    __slots__ = ("table", "columns", "filters", "order_by", "limit_value",
+                 "offset_value", "count", "_compiled")
+
+    def __init__(self, table, columns=(), filters=(), order_by=(), limit_value=None,
+                 offset_value=None, count=None):
+        self.table = table
+        self.columns = tuple(columns)
+        self.filters = tuple(filters)
+        self.order_by = tuple(order_by)
+        self.limit_value = limit_value
+        self.offset_value = offset_value
+        self.count = count
+        self._compiled = self._compile()
+
+    def _replace(self, **changes):
+        state = {
+            "columns": self.columns,
+            "filters": self.filters,
+            "order_by": self.order_by,
+            "limit_value": self.limit_value,
+            "offset_value": self.offset_value,
+            "count": self.count,
+        }
+        state.update(changes)
+        return Query(self.table, **state)
+
+    # Projection -----------------------------------------------------------
+
+    def select(self, *columns):
+        """Restrict the response to the given columns."""
+        return self._replace(columns=columns)
+
+    @property
+    def select_clause(self):
+        """The compiled ``select`` parameter value."""
+        return ",".join(self.columns) if self.columns else "*"
+
+    # Filters --------------------------------------------------------------
+
+    def where(self, column, operator, value):
+        """Add a ``column=operator.value`` filter."""
+        if operator not in FILTER_OPERATORS:
+            raise ValueError(f"Unsupported filter operator: {operator}")
+        return self._replace(filters=self.filters + ((column, operator, value),))
+
+    def eq(self, column, value):
+        return self.where(column, "eq", value)
+
+    def neq(self, column, value):
+        return self.where(column, "neq", value)
+
+    def gt(self, column, value):
+        return self.where(column, "gt", value)
+
+    def gte(self, column, value):
+        return self.where(column, "gte", value)
+
+    def lt(self, column, value):
+        return self.where(column, "lt", value)
+
+    def lte(self, column, value):
+        return self.where(column, "lte", value)
+
+    def ilike(self, column, pattern):
+        return self.where(column, "ilike", pattern)
+
+    def in_(self, column, values):
+        return self.where(column, "in", values)
+
+    def is_(self, column, value):
+        return self.where(column, "is", value)
+
+    def contains(self, column, values):
+        """Array column contains all of ``values``."""
+        return self.where(column, "cs", values)
+
+    def overlaps(self, column, values):
+        """Array column shares at least one element with ``values``."""
+        return self.where(column, "ov", values)
+
+    def or_(self, *conditions):
+        """
+        Add an ``or=(...)`` filter.
+
+        Args:
+            *conditions: ``(column, operator, value)`` tuples, or groups
+                built with ``and_``
+        """
+        _check_conditions(conditions)
+        return self._replace(filters=self.filters + (("or", "or", tuple(conditions)),))
+
+    def raw(self, key, value):
+        """Add a pre-formatted PostgREST parameter."""
+        return self._replace(filters=self.filters + ((key, None, value),))
+
+    # Ordering and paging --------------------------------------------------
+
+    def order(self, column, desc=False, nulls_first=None):
+        """Append an ordering term."""
+        term = f"{column}.{'desc' if desc else 'asc'}"
+        if nulls_first is not None:
+            term += ".nullsfirst" if nulls_first else ".nullslast"
+        return self._replace(order_by=self.order_by + (term,))
+
+    def limit(self, value):
+        return self._replace(limit_value=value)
+
+    def offset(self, value):
+        return self._replace(offset_value=value)
+
+    def range(self, start, end):
+        """Select rows ``start`` to ``end`` inclusive."""
+        return self._replace(offset_value=start, limit_value=end - start + 1)
+
+    def with_count(self, mode=CountMode.EXACT):
+        """Ask PostgREST to report the total row count using ``mode``."""
+        if mode is not None and mode not in CountMode.ALL:
+            raise ValueError(f"Unsupported count mode: {mode}")
+        return self._replace(count=mode)
+
+    # Compilation ----------------------------------------------------------
+
+    def _compile(self):
+        compiled = [(key, _Fragment(*_filter_parts(operator, value))) for key, operator, value in self.filters]
+        if self.order_by:
+            compiled.append(("order", _Fragment(",".join(self.order_by))))
+        for key, value in (("limit", self.limit_value), ("offset", self.offset_value)):
+            if value is None:
+                continue
+            if isinstance(value, Param):
+                compiled.append((key, _Fragment((value, lambda v: str(int(v))))))
+            else:
+                compiled.append((key, _Fragment(str(int(value)))))
+        return tuple(compiled)
+
+    def bind(self, params=None):
+        """
+        Render the query parameters with placeholder values substituted.
+
+        Args:
+            params (dict, optional): Values for the query's ``Param`` placeholders
+
+        Returns:
+            list: ``(key, value)`` pairs ready to send to PostgREST
+        """
+        params = params or {}
+        return [(key, fragment.render(params)) for key, fragment in self._compiled]
+
+    @classmethod
+    def parse(cls, endpoint):
+        """
+        Build a query from a ``/rest/v1/<table>?...`` endpoint string.
+
+        Args:
+            endpoint (str): PostgREST endpoint
+
+        Returns:
+            Query: Equivalent query specification
+
+        Raises:
+            ValueError: If the endpoint is not a PostgREST table endpoint
+        """
+        split = urlsplit(endpoint)
+        parts = split.path.strip("/").split("/")
+        if len(parts) != 3 or parts[0] != "rest" or parts[1] != "v1":
+            raise ValueError(f"Invalid endpoint format: {endpoint}")
+
+        query = cls(parts[2])
+        for key, value in parse_qsl(split.query, keep_blank_values=True):
+            if key == "select":
+                query = query.select(*[c for c in value.split(",") if c])
+            elif key == "order":
+                query = query._replace(order_by=query.order_by + tuple(value.split(",")))
+            elif key == "limit":
+                query = query.limit(int(value))
+            elif key == "offset":
+                query = query.offset(int(value))
+            else:
+                query = query.raw(key, value)
+        return query
+
+    def __repr__(self):
+        return f"<Query {self.table} select={self.select_clause}>"
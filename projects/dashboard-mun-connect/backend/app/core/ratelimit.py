@@ -0,0 +1,302 @@
+"""
+Rate limiting.
+
+Two algorithms are available: a sliding-window counter (the previous fixed
+window's count is weighted by how much of it still overlaps the sliding
+window) and a token bucket. Each algorithm has an in-process implementation,
+run under lock-striped state, and an equivalent Lua script so the Redis
+backend applies it atomically across workers.
+"""
+import math
+import threading
+import time
+import zlib
+from collections import OrderedDict, namedtuple
+
+from flask import current_app, g
+
+RateLimitResult = namedtuple(
+    "RateLimitResult", ["allowed", "limit", "remaining", "reset_after", "retry_after"]
+)
+
+
+class SlidingWindow:
+    """Sliding-window counter over two adjacent fixed windows."""
+    name = "sliding_window"
+
+    LUA = """
+local limit = tonumber(ARGV[1])
+local period = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local cost = tonumber(ARGV[4])
+local window = math.floor(now / period)
+local state = redis.call('HMGET', KEYS[1], 'w', 'cur', 'prev')
+local w = tonumber(state[1]) or window
+local cur = tonumber(state[2]) or 0
+local prev = tonumber(state[3]) or 0
+if w ~= window then
+  if w == window - 1 then prev = cur else prev = 0 end
+  cur = 0
+end
+local elapsed = now - window * period
+local estimated = prev * (1 - elapsed / period) + cur
+local allowed = 0
+local retry_after = 0
+if estimated + cost <= limit then
+  cur = cur + cost
+  estimated = estimated + cost
+  allowed = 1
+else
+  retry_after = period - elapsed
+  if prev > 0 then
+    retry_after = math.min(retry_after, (estimated + cost - limit) * period / prev)
+  end
+end
+redis.call('HSET', KEYS[1], 'w', window, 'cur', cur, 'prev', prev)
+redis.call('EXPIRE', KEYS[1], math.ceil(period * 2))
+return {allowed, tostring(estimated), tostring(period - elapsed), tostring(retry_after)}
+"""
+
+    @staticmethod
+    def apply(state, limit, period, now, cost=1):
+        """
+        Apply one hit to ``state`` in place.
+
+        Returns:
+            tuple: ``(allowed, used, reset_after, retry_after)``
+        """
+        window = math.floor(now / period)
+        w = state.get("w", window)
+        cur = state.get("cur", 0)
+        prev = state.get("prev", 0)
+        if w != window:
+            prev = cur if w == window - 1 else 0
+            cur = 0
+
+        elapsed = now - window * period
+        estimated = prev * (1 - elapsed / period) + cur
+        retry_after = 0.0
+        allowed = estimated + cost <= limit
+        if allowed:
+            cur += cost
+            estimated += cost
+        else:
+            retry_after = period - elapsed
+            if prev > 0:
+                retry_after = min(retry_after, (estimated + cost - limit) * period / prev)
+
+        state["w"] = window
+        state["cur"] = cur
+        state["prev"] = prev
+        state["expires"] = now + period * 2
+        return allowed, estimated, period - elapsed, retry_after
+
+
+class TokenBucket:
+    """Token bucket holding ``limit`` tokens, refilled over ``period`` seconds."""
+    name = "token_bucket"
+
+    LUA = """
+local limit = tonumber(ARGV[1])
+local period = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local cost = tonumber(ARGV[4])
+local rate = limit / period
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or limit
+local ts = tonumber(state[2]) or now
+tokens = math.min(limit, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+local retry_after = 0
+if tokens >= cost then
+  tokens = tokens - cost
+  allowed = 1
+else
+  retry_after = (cost - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(period) + 1)
+return {allowed, tostring(limit - tokens), tostring((limit - tokens) / rate), tostring(retry_after)}
+"""
+
+    @staticmethod
+    def apply(state, limit, period, now, cost=1):
+        """
+        Apply one hit to ``state`` in place.
+
+        Returns:
+            tuple: ``(allowed, used, reset_after, retry_after)``
+        """
+        rate = limit / period
+        tokens = state.get("tokens", limit)
+        ts = state.get("ts", now)
+        tokens = min(limit, tokens + max(0.0, now - ts) * rate)
+
+        retry_after = 0.0
+        allowed = tokens >= cost
+        if allowed:
+            tokens -= cost
+        else:
+            retry_after = (cost - tokens) / rate
+
+        state["tokens"] = tokens
+        state["ts"] = now
+        state["expires"] = now + period + 1
+        return allowed, limit - tokens, (limit - tokens) / rate, retry_after
+
+
+ALGORITHMS = {
+    SlidingWindow.name: SlidingWindow,
+    TokenBucket.name: TokenBucket,
+}
+
+
+def _result(limit, allowed, used, reset_after, retry_after):
+    return RateLimitResult(
+        allowed=bool(allowed),
+        limit=limit,
+        remaining=max(0, int(limit - math.ceil(float(used)))),
+        reset_after=max(0.0, float(reset_after)),
+        retry_after=max(0.0, float(retry_after)),
+    )
+
+
+class MemoryBackend:
+    """
+    Per-process limiter state.
+
+    Keys are spread over ``stripes`` independently locked dicts, so threads
+    checking different keys rarely contend on the same lock. A full stripe
+    first drops expired keys, then the least recently used ones, so many
+    distinct clients (e.g. rotating IPs) cannot grow it without bound; an
+    evicted client starts a fresh window.
+    """
+
+    def __init__(self, stripes=64, max_keys_per_stripe=4096):
+        self._stripes = stripes
+        self._max_keys = max_keys_per_stripe
+        self._locks = [threading.Lock() for _ in range(stripes)]
+        self._stores = [OrderedDict() for _ in range(stripes)]
+
+    def hit(self, algorithm, key, limit, period, cost=1):
+        index = zlib.crc32(key.encode()) % self._stripes
+        now = time.time()
+        with self._locks[index]:
+            store = self._stores[index]
+            state = store.get(key)
+            if state is None:
+                if len(store) >= self._max_keys:
+                    self._evict(store, now, self._max_keys)
+                state = store[key] = {}
+            else:
+                store.move_to_end(key)
+            outcome = algorithm.apply(state, limit, period, now, cost)
+        return _result(limit, *outcome)
+
+    @staticmethod
+    def _evict(store, now, max_keys):
+        # Oldest first: expired keys at the front, then live ones while full
+        while store:
+            key, state = next(iter(store.items()))
+            if state.get("expires", 0) >= now and len(store) < max_keys:
+                break
+            del store[key]
+
+    def reset(self):
+        for lock, store in zip(self._locks, self._stores):
+            with lock:
+                store.clear()
+
+
+class RedisBackend:
+    """Limiter state in Redis, updated atomically by the algorithm's Lua script."""
+
+    def __init__(self, url, prefix="rl:"):
+        import redis
+
+        self.prefix = prefix
+        self.client = redis.Redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5)
+        self._scripts = {name: self.client.register_script(a.LUA) for name, a in ALGORITHMS.items()}
+
+    def hit(self, algorithm, key, limit, period, cost=1):
+        allowed, used, reset_after, retry_after = self._scripts[algorithm.name](
+            keys=[self.prefix + key], args=[limit, period, time.time(), cost]
+        )
+        return _result(limit, allowed, used, reset_after, retry_after)
+
+
+class RateLimiter:
+    """Applies the configured algorithm through the configured backend."""
+
+    def __init__(self, backend, algorithm=SlidingWindow, enabled=True):
+        self.backend = backend
+        self.algorithm = algorithm
+        self.enabled = enabled
+
+    def hit(self, key, limit, period=60, algorithm=None, cost=1):
+        """
+        Record one request against ``key``.
+
+        Args:
+            key (str): Limiter key
+            limit (int): Requests allowed per ``period``
+            period (int): Period in seconds
+            algorithm (str, optional): Algorithm name overriding the default
+            cost (int): Units consumed by this request
+
+        Returns:
+            RateLimitResult: Outcome and header values
+        """
+        if not self.enabled:
+            return RateLimitResult(True, limit, limit, 0.0, 0.0)
+        algo = ALGORITHMS[algorithm] if algorithm else self.algorithm
+        try:
+            return self.backend.hit(algo, key, limit, period, cost)
+        except Exception as e:
+            # Fail open: a limiter outage must not take the API down with it
+            current_app.logger.warning(f"Rate limiter backend error: {str(e)}")
+            return RateLimitResult(True, limit, limit, 0.0, 0.0)
+
+
+def init_rate_limiter(app):
+    """
+    Create the rate limiter and register it on the app.
+
+    Also installs an ``after_request`` hook that adds ``X-RateLimit-*``
+    headers to responses of rate limited routes.
+
+    Args:
+        app (Flask): Application to register with
+    """
+    algorithm = app.config.get("RATELIMIT_ALGORITHM", SlidingWindow.name)
+    if algorithm not in ALGORITHMS:
+        raise ValueError(f"Unknown rate limit algorithm: {algorithm}")
+
+    storage_url = app.config.get("RATELIMIT_STORAGE_URL")
+    if storage_url and storage_url.startswith(("redis://", "rediss://")):
+        backend = RedisBackend(storage_url)
+    else:
+        backend = MemoryBackend()
+
+    app.extensions["rate_limiter"] = RateLimiter(
+        backend,
+        algorithm=ALGORITHMS[algorithm],
+        enabled=app.config.get("RATELIMIT_ENABLED", True),
+    )
+    app.after_request(_add_rate_limit_headers)
+
+
+def get_rate_limiter():
+    """Return the rate limiter registered on the current app."""
+    return current_app.extensions["rate_limiter"]
+
+
+def _add_rate_limit_headers(response):
+    result = g.get("rate_limit")
+    if result is not None:
+        response.headers["X-RateLimit-Limit"] = str(result.limit)
+        response.headers["X-RateLimit-Remaining"] = str(result.remaining)
+        response.headers["X-RateLimit-Reset"] = str(math.ceil(result.reset_after))
+        if not result.allowed:
+            response.headers["Retry-After"] = str(math.ceil(result.retry_after))
+    return response
@@ -0,0 +1,273 @@
+"""
+Data access backends for structured queries.
+
+Every ``Query`` executed through ``supabase_request``/``supabase_page`` goes
+through the repository registered on the app. ``RestRepository`` sends it to
+PostgREST (the default). ``PostgresRepository`` compiles it to SQL and runs it
+on the SQLAlchemy engine, skipping the HTTP hop; with psycopg 3, statements
+run repeatedly on a connection are prepared server-side.
+"""
+import datetime
+import decimal
+import threading
+import uuid
+
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import ARRAY
+from flask import current_app
+
+from app.core.query import Param
+
+
+class RestRepository:
+    """Executes queries through the pooled Supabase PostgREST client."""
+
+    name = "rest"
+
+    def execute(self, method, query, data=None, params=None, headers=None, count=None):
+        """
+        Execute a structured query.
+
+        Args:
+            method (str): HTTP-style method (GET, POST, PUT, PATCH, DELETE)
+            query (Query): Query specification
+            data (dict or list, optional): Row(s) to insert or values to set
+            params (dict, optional): Values for the query's placeholders
+            headers (dict, optional): Extra PostgREST request headers
+            count (str, optional): Count mode overriding the query's own
+
+        Returns:
+            tuple: ``(rows, total)``; ``total`` is None when no count was requested
+        """
+        from app.core.utils import _execute_query
+
+        response = _execute_query(method, query, data, params, headers, count)
+        return response.data, response.count
+
+    def rpc(self, function_name, params=None):
+        """Call a Postgres function exposed through PostgREST."""
+        from app.core.utils import create_supabase_client
+
+        return create_supabase_client().rpc(function_name, params or {}).execute().data
+
+
+class PostgresRepository:
+    """
+    Executes queries directly on Postgres through a SQLAlchemy engine.
+
+    Queries are compiled to SQLAlchemy statements once per (query, method,
+    written columns) and reused. Counts are always exact and PostgREST
+    headers are ignored; ``raw`` filters are not supported.
+    """
+
+    name = "postgres"
+    max_statements = 1024
+
+    def __init__(self, engine):
+        self.engine = engine
+        self._statements = {}
+        self._lock = threading.Lock()
+
+    def execute(self, method, query, data=None, params=None, headers=None, count=None):
+        method = method.upper()
+        if method == "PUT":
+            method = "PATCH"
+        rows = data if isinstance(data, list) else None
+        values = rows[0] if rows else data
+        key = (query, method, tuple(sorted(values)) if values else ())
+
+        statement = self._statements.get(key)
+        if statement is None:
+            statement = self._compile(method, query, values)
+            with self._lock:
+                # Queries are normally module-level constants; guard against
+                # unbounded growth from ad hoc ones
+                if len(self._statements) >= self.max_statements:
+                    self._statements.clear()
+                self._statements[key] = statement
+        select, count_select = statement
+
+        bind = dict(params or {})
+        if method == "GET":
+            with self.engine.connect() as conn:
+                result = [_row(r) for r in conn.execute(select, bind)]
+                total = None
+                if count or query.count:
+                    total = conn.execute(count_select, bind).scalar_one()
+            return result, total
+
+        if method == "PATCH":
+            # SET values get their own names so they never collide with filters
+            bind.update({f"set_{k}": v for k, v in (data or {}).items()})
+        elif rows is None:
+            bind.update(data or {})
+
+        with self.engine.begin() as conn:
+            if rows is not None:
+                result = [_row(r) for r in conn.execute(select, [dict(bind, **row) for row in rows])]
+            else:
+                result = [_row(r) for r in conn.execute(select, bind)]
+        return result, len(result) if count else None
+
+    def rpc(self, function_name, params=None):
+        """Call a set-returning Postgres function with named arguments."""
+        params = params or {}
+        args = ", ".join(f"{name} => :{name}" for name in params)
+        statement = sa.text(f"SELECT * FROM {_identifier(function_name)}({args})")
+        with self.engine.begin() as conn:
+            return [_row(r) for r in conn.execute(statement, params)]
+
+    def _compile(self, method, query, values):
+        """Build the statement (and count statement for reads) for a query."""
+        if method not in ("GET", "POST", "PATCH", "DELETE"):
+            raise ValueError(f"Unsupported method: {method}")
+
+        table = sa.table(query.table, *[sa.column(k) for k in values or ()])
+        columns = [sa.column(c) for c in query.columns] or [sa.literal_column("*")]
+        conditions = [_condition(column, operator, value) for column, operator, value in query.filters]
+
+        if method == "POST":
+            statement = sa.insert(table).values({k: sa.bindparam(k) for k in values}).returning(*columns)
+            return statement, None
+        if method == "PATCH":
+            statement = sa.update(table).where(*conditions).values(
+                {k: sa.bindparam(f"set_{k}") for k in values}
+            ).returning(*columns)
+            return statement, None
+        if method == "DELETE":
+            return sa.delete(table).where(*conditions).returning(*columns), None
+
+        select = sa.select(*columns).select_from(table).where(*conditions)
+        count_select = sa.select(sa.func.count()).select_from(table).where(*conditions)
+        for term in query.order_by:
+            select = select.order_by(_order_term(term))
+        if query.limit_value is not None:
+            select = select.limit(_value(query.limit_value, sa.Integer))
+        if query.offset_value is not None:
+            select = select.offset(_value(query.offset_value, sa.Integer))
+        return select, count_select
+
+
+def _value(value, type_=None):
+    """Turn a query operand into a bind parameter."""
+    if isinstance(value, Param):
+        return sa.bindparam(value.name, type_=type_)
+    return sa.bindparam(None, value, type_=type_, unique=True)
+
+
+def _condition(column, operator, value):
+    """Compile one stored ``Query`` filter to a SQL expression."""
+    if operator is None:
+        raise NotImplementedError(f"Raw filter '{column}' is only supported by the REST backend")
+    if operator == "or":
+        return sa.or_(*[_condition(c, op, v) for c, op, v in value])
+    if operator == "and":
+        return sa.and_(*[_condition(c, op, v) for c, op, v in value])
+
+    col = sa.column(column)
+    if operator == "eq":
+        return col == _value(value)
+    if operator == "neq":
+        return col != _value(value)
+    if operator == "gt":
+        return col > _value(value)
+    if operator == "gte":
+        return col >= _value(value)
+    if operator == "lt":
+        return col < _value(value)
+    if operator == "lte":
+        return col <= _value(value)
+    if operator in ("like", "ilike"):
+        # PostgREST accepts * as a wildcard alias for %
+        pattern = _value(value)
+        pattern = sa.func.replace(pattern, "*", "%")
+        return col.like(pattern) if operator == "like" else col.ilike(pattern)
+    if operator == "is":
+        return col.is_(_is_operand(value))
+    if operator == "in":
+        if isinstance(value, Param):
+            return col.in_(sa.bindparam(value.name, expanding=True))
+        return col.in_(list(value))
+    if operator == "cs":
+        return col.op("@>")(_value(value, ARRAY(sa.Text)))
+    if operator == "ov":
+        return col.op("&&")(_value(value, ARRAY(sa.Text)))
+    raise ValueError(f"Unsupported filter operator: {operator}")
+
+
+def _is_operand(value):
+    """
+    Map an ``is`` operand to its SQL keyword.
+
+    ``IS`` only takes ``NULL``/``TRUE``/``FALSE``/``UNKNOWN``, never a bind
+    parameter, so a ``Param`` is rejected and PostgREST's spellings
+    (``"null"``, ``"true"``, ...) become SQL literals rather than strings.
+    """
+    if isinstance(value, Param):
+        raise ValueError("The 'is' filter takes null, true, false or unknown, not a placeholder")
+    keyword = value if value is None or isinstance(value, bool) else str(value).lower()
+    if keyword in (None, "null", "unknown"):
+        return sa.null()
+    if keyword in (True, "true"):
+        return sa.true()
+    if keyword in (False, "false"):
+        return sa.false()
+    raise ValueError(f"Unsupported 'is' operand: {value!r}")
+
+
+def _order_term(term):
+    """Compile a PostgREST ``column.asc[.nullsfirst]`` term."""
+    parts = term.split(".")
+    expression = sa.column(parts[0])
+    expression = expression.desc() if len(parts) > 1 and parts[1] == "desc" else expression.asc()
+    if len(parts) > 2:
+        expression = expression.nulls_first() if parts[2] == "nullsfirst" else expression.nulls_last()
+    return expression
+
+
+def _identifier(name):
+    if not name.replace("_", "").isalnum():
+        raise ValueError(f"Invalid function name: {name}")
+    return name
+
+
+def _row(record):
+    """Convert a result row to the JSON-shaped dict PostgREST would return."""
+    return {key: _jsonable(value) for key, value in record._mapping.items()}
+
+
+def _jsonable(value):
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    if isinstance(value, decimal.Decimal):
+        return float(value)
+    return value
+
+
+def init_repository(app):
+    """
+    Create the configured data backend and register it on the app.
+
+    ``DATA_BACKEND`` is ``rest`` (PostgREST) or ``postgres`` (the
+    Flask-SQLAlchemy engine, tuned by ``SQLALCHEMY_ENGINE_OPTIONS``).
+
+    Args:
+        app (Flask): Application to register with
+    """
+    backend = app.config.get("DATA_BACKEND", "rest")
+    if backend == "rest":
+        app.extensions["repository"] = RestRepository()
+    elif backend == "postgres":
+        from app import db
+
+        with app.app_context():
+            app.extensions["repository"] = PostgresRepository(db.engine)
+    else:
+        raise ValueError(f"Unknown data backend: {backend}")
+
+
+def get_repository():
+    """Return the data backend registered on the current app."""
+    return current_app.extensions["repository"]
@@ -0,0 +1,180 @@
+"""
+Admin role resolution.
+
+Access tokens carry an ``is_admin`` claim set when they are issued. A fresh
+claim authorizes admin routes without any network I/O; stale or missing
+claims fall back to a short-TTL role cache in front of ``profiles.is_admin``.
+Revocations are recorded in the cache so a demoted admin loses access
+immediately on the revoking worker and within ``ROLE_REVOCATION_POLL``
+seconds on the others.
+"""
+import time
+
+from flask import current_app
+
+from app.core.cache import build_tiered_cache
+from app.core.query import Query, Param
+
+ADMIN_FLAG_QUERY = Query("profiles").select("is_admin").eq("id", Param("id")).limit(1)
+
+
+class RoleCache:
+    """Cached ``is_admin`` flags plus revocation markers."""
+
+    def __init__(self, cache, claim_max_age=300, revocation_poll=5):
+        self.cache = cache
+        self.claim_max_age = claim_max_age
+        self.revocation_poll = revocation_poll
+
+    @staticmethod
+    def _role_key(user_id):
+        return f"role:admin:{user_id}"
+
+    @staticmethod
+    def _revoked_key(user_id):
+        return f"role:revoked:{user_id}"
+
+    def get(self, user_id, loader):
+        """
+        Return whether ``user_id`` is an admin, loading the flag on a miss.
+
+        Args:
+            user_id (str): User id
+            loader (callable): Called with the id on a miss; returns a bool
+
+        Returns:
+            bool: Admin flag
+        """
+        cached = self.cache.get(self._role_key(user_id))
+        if cached is not None:
+            # A flag cached before a revocation on another worker is stale
+            if not cached["is_admin"] or self.revoked_at(user_id) < cached.get("at", 0):
+                return cached["is_admin"]
+
+        is_admin = bool(loader(user_id))
+        self.set(user_id, is_admin)
+        return is_admin
+
+    def set(self, user_id, is_admin):
+        """Record the current admin flag for ``user_id``."""
+        self.cache.set(self._role_key(user_id), {"is_admin": bool(is_admin), "at": time.time()})
+
+    def revoke(self, user_id):
+        """
+        Revoke admin access for ``user_id``.
+
+        Tokens issued before now stop passing the claims fast path, and the
+        cached flag is overwritten.
+        """
+        self.set(user_id, False)
+        key = self._revoked_key(user_id)
+        revoked_at = time.time()
+        # Markers must outlive every token that could still pass the fast path,
+        # so bypass the local tier's shorter default lifetime
+        self.cache.local.set(key, revoked_at, timeout=self.claim_max_age)
+        if self.cache.shared is not None:
+            self.cache.shared.set(key, revoked_at, timeout=self.claim_max_age)
+
+    def revoked_at(self, user_id):
+        """
+        Return when ``user_id`` was last revoked, or 0.
+
+        Negative results are remembered locally for ``revocation_poll``
+        seconds so the shared tier is consulted at most that often.
+        """
+        key = self._revoked_key(user_id)
+        marker = self.cache.local.get(key)
+        if marker is None:
+            marker = self.cache.shared.get(key) if self.cache.shared is not None else None
+            if marker:
+                self.cache.local.set(key, marker, timeout=self.claim_max_age)
+            else:
+                marker = 0
+                self.cache.local.set(key, marker, timeout=self.revocation_poll)
+        return marker
+
+    def claim_allows(self, user_id, claims):
+        """
+        Check whether token claims alone authorize admin access.
+
+        Args:
+            user_id (str): Token identity
+            claims (dict): Decoded JWT claims
+
+        Returns:
+            bool: True if the claim is fresh, set and not revoked
+        """
+        if not claims.get("is_admin"):
+            return False
+        issued_at = claims.get("iat", 0)
+        if time.time() - issued_at > self.claim_max_age:
+            return False
+        return self.revoked_at(user_id) < issued_at
+
+
+def init_role_cache(app):
+    """
+    Create the role cache and register it on the app.
+
+    Args:
+        app (Flask): Application to register with
+    """
+    cache = build_tiered_cache(
+        app.config,
+        max_size=app.config.get("ROLE_CACHE_SIZE", 10000),
+        local_timeout=app.config.get("ROLE_CACHE_TTL", 30),
+        shared_timeout=app.config.get("ROLE_CACHE_TTL", 30),
+    )
+    app.extensions["role_cache"] = RoleCache(
+        cache,
+        claim_max_age=app.config.get("ADMIN_CLAIM_MAX_AGE", 300),
+        revocation_poll=app.config.get("ROLE_REVOCATION_POLL", 5),
+    )
+
+
+def get_role_cache():
+    """Return the role cache registered on the current app."""
+    return current_app.extensions["role_cache"]
+
+
+def _load_admin_flag(user_id):
+    from app.core.utils import supabase_request
+
+    rows = supabase_request(method="GET", endpoint=ADMIN_FLAG_QUERY, params={"id": user_id})
+    return bool(rows and rows[0].get("is_admin"))
+
+
+def resolve_admin(user_id):
+    """
+    Return whether ``user_id`` is an admin, using the role cache.
+
+    Args:
+        user_id (str): User id
+
+    Returns:
+        bool: Admin flag
+    """
+    return get_role_cache().get(user_id, _load_admin_flag)
+
+
+def is_admin_request(user_id, claims):
+    """
+    Authorize an admin request from its JWT.
+
+    A fresh ``is_admin`` claim is trusted without I/O. A false claim is
+    trusted as well; promotions take effect on the next login or refresh.
+    Missing or stale claims are resolved through the role cache.
+
+    Args:
+        user_id (str): Token identity
+        claims (dict): Decoded JWT claims
+
+    Returns:
+        bool: True if the user may access admin routes
+    """
+    role_cache = get_role_cache()
+    if role_cache.claim_allows(user_id, claims):
+        return True
+    if claims.get("is_admin") is False:
+        return False
+    return role_cache.get(user_id, _load_admin_flag)
@@ -4,6 +4,24 @@ Serialization schemas for the models.
 from marshmallow import Schema, fields, validate, validates, ValidationError
 
 
+class Timestamp(fields.DateTime):
+    """DateTime field that passes through ISO strings returned by PostgREST."""
+    
+    def _serialize(self, value, attr, obj, **kwargs):
+        if isinstance(value, str):
+            return value
+        return super()._serialize(value, attr, obj, **kwargs)
+
+
+class CalendarDate(fields.Date):
+    """Date field that passes through ISO strings returned by PostgREST."""
+    
+    def _serialize(self, value, attr, obj, **kwargs):
+        if isinstance(value, str):
+            return value
+        return super()._serialize(value, attr, obj, **kwargs)
+
+
 class ProfileSchema(Schema):
     """Schema for the Profile model."""
     id = fields.String(dump_only=True)
@@ -15,8 +33,8 @@ class ProfileSchema(Schema):
     school = fields.String(validate=validate.Length(max=100))
     education_level = fields.String(validate=validate.OneOf(["middle_school", "high_school", "university", "other"]))
     interests = fields.List(fields.String())
-    created_at = fields.DateTime(dump_only=True)
-    updated_at = fields.DateTime(dump_only=True)
+    created_at = Timestamp(dump_only=True)
+    updated_at = Timestamp(dump_only=True)
     
     @validates("username")
     def validate_username(self, value):
@@ -37,8 +55,9 @@ class DocumentSchema(Schema):
     is_public = fields.Boolean(default=False)
     author_id = fields.String(required=True)
     committee_id = fields.String()
-    created_at = fields.DateTime(dump_only=True)
-    updated_at = fields.DateTime(dump_only=True)
+    revision = fields.Integer(dump_only=True)
+    created_at = Timestamp(dump_only=True)
+    updated_at = Timestamp(dump_only=True)
     
     # Nested fields
     author = fields.Nested(lambda: ProfileSchema(only=("id", "username", "full_name")), dump_only=True)
@@ -57,8 +76,8 @@ class SpeechSchema(Schema):
     is_public = fields.Boolean(default=False)
     author_id = fields.String(required=True)
     committee_id = fields.String()
-    created_at = fields.DateTime(dump_only=True)
-    updated_at = fields.DateTime(dump_only=True)
+    created_at = Timestamp(dump_only=True)
+    updated_at = Timestamp(dump_only=True)
     
     # Nested fields
     author = fields.Nested(lambda: ProfileSchema(only=("id", "username", "full_name")), dump_only=True)
@@ -71,9 +90,23 @@ class CommitteeSchema(Schema):
     topic = fields.String(required=True, validate=validate.Length(min=1, max=255))
     description = fields.String()
     conference_name = fields.String(required=True, validate=validate.Length(min=1, max=255))
-    conference_date = fields.Date()
-    created_at = fields.DateTime(dump_only=True)
-    updated_at = fields.DateTime(dump_only=True)
+    conference_date = CalendarDate(allow_none=True)
+    document_count = fields.Integer(dump_only=True)
+    speech_count = fields.Integer(dump_only=True)
+    last_activity_at = Timestamp(dump_only=True)
+    created_at = Timestamp(dump_only=True)
+    updated_at = Timestamp(dump_only=True)
+
+
+class ConferenceSchema(Schema):
+    """Schema for a conference rolled up from its committees."""
+    name = fields.String(dump_only=True)
+    starts_on = CalendarDate(dump_only=True)
+    ends_on = CalendarDate(dump_only=True)
+    committee_count = fields.Integer(dump_only=True)
+    document_count = fields.Integer(dump_only=True)
+    speech_count = fields.Integer(dump_only=True)
+    last_activity_at = Timestamp(dump_only=True)
 
 
 class ResearchQuerySchema(Schema):
@@ -85,8 +118,8 @@ class ResearchQuerySchema(Schema):
     model_used = fields.String(dump_only=True)
     user_id = fields.String(required=True)
     committee_id = fields.String()
-    created_at = fields.DateTime(dump_only=True)
-    updated_at = fields.DateTime(dump_only=True)
+    created_at = Timestamp(dump_only=True)
+    updated_at = Timestamp(dump_only=True)
 
 
 # Pagination schema
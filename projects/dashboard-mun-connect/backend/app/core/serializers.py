@@ -0,0 +1,221 @@
+"""
+Fast serialization path.
+
+``serializer(SchemaClass, exclude=...)`` compiles a marshmallow schema once
+into a plain Python function that dumps PostgREST rows (dicts) without
+marshmallow's per-field dispatch. Values of the expected type (``str`` for
+string and timestamp fields, ``int`` for integers, lists of ``str`` for
+string lists, None for anything) are copied as they are; anything else is
+handed to the field's own ``_serialize``, so the output always equals
+``SchemaClass(exclude=...).dump(row)``. Schemas with dump hooks, and objects
+that are not dicts, go through marshmallow unchanged.
+
+``FastJSONProvider`` renders ``jsonify`` responses with orjson when it is
+installed, producing the same bytes as Flask's default provider with keys
+sorted. Payloads orjson would encode differently fall back to the standard
+library encoder: non-ASCII text (which Flask escapes as ``\\uXXXX``; its C
+escaper is faster than re-escaping orjson's output), floats in exponent
+notation, non-string keys and very large integers. NaN and infinity, which
+are not valid JSON, are the one difference: orjson writes null.
+"""
+import re
+from functools import lru_cache
+
+from flask.json.provider import DefaultJSONProvider
+from marshmallow import fields, missing
+
+from app.core.schemas import CalendarDate, Timestamp
+from app.core.tracing import span
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+# Field classes whose values of these types serialize to themselves
+_PASSTHROUGH_TYPES = {
+    fields.String: "str",
+    fields.Integer: "int",
+    fields.Float: "float",
+    fields.Boolean: "bool",
+    Timestamp: "str",
+    CalendarDate: "str",
+}
+
+_CHECKS = {
+    "str": "v is None or v.__class__ is str",
+    "int": "v is None or v.__class__ is int",
+    "float": "v is None or v.__class__ is float",
+    "bool": "v is None or v is True or v is False",
+}
+
+
+class CompiledSerializer:
+    """
+    Dump function generated from a marshmallow schema.
+
+    Args:
+        schema (Schema): Schema instance to compile
+    """
+
+    def __init__(self, schema):
+        self.schema = schema
+        self.name = schema.__class__.__name__
+        self._dump = None if _has_dump_hooks(schema) else _compile(schema)
+
+    def dump(self, obj):
+        """
+        Serialize one object exactly as ``schema.dump`` would.
+
+        Args:
+            obj (dict): Row to serialize
+
+        Returns:
+            dict: Serialized data
+        """
+        with span("schema.dump", schema=self.name):
+            return self._dump_one(obj)
+
+    def _dump_one(self, obj):
+        if self._dump is None or obj.__class__ is not dict:
+            return self.schema.dump(obj)
+        return self._dump(obj)
+
+    def dump_many(self, objs):
+        """
+        Serialize a list of objects exactly as ``schema.dump(objs, many=True)`` would.
+
+        Args:
+            objs (list): Rows to serialize
+
+        Returns:
+            list: Serialized data
+        """
+        with span("schema.dump", schema=self.name, rows=len(objs)):
+            dump = self._dump_one
+            return [dump(obj) for obj in objs]
+
+
+def _has_dump_hooks(schema):
+    return any(schema._hooks.get(key) for key in (
+        ("pre_dump", False), ("pre_dump", True), ("post_dump", False), ("post_dump", True),
+    ))
+
+
+def _compile(schema):
+    """Generate the source of a dump function for ``schema`` and compile it."""
+    namespace = {"_missing": missing, "_get_value": schema.get_attribute}
+    lines = ["def dump(obj):", "    out = {}", "    get = obj.get"]
+    for index, (name, field) in enumerate(schema.dump_fields.items()):
+        key = field.data_key if field.data_key is not None else name
+        attribute = field.attribute or name
+        namespace[f"f{index}"] = field
+        if "." in attribute or field.dump_default is not missing or field.__class__ is fields.Method \
+                or field.__class__ is fields.Function:
+            # Nested attribute paths, defaults and computed fields: full marshmallow semantics
+            lines += [
+                f"    v = f{index}.serialize({attribute!r}, obj, accessor=_get_value)",
+                "    if v is not _missing:",
+                f"        out[{key!r}] = v",
+            ]
+            continue
+
+        lines += [f"    v = get({attribute!r}, _missing)", "    if v is not _missing:"]
+        kind = _PASSTHROUGH_TYPES.get(field.__class__)
+        if kind is None and field.__class__ is fields.List and field.inner.__class__ is fields.String:
+            lines += [
+                "        if v is not None and v.__class__ is list and all(i.__class__ is str for i in v):",
+                "            v = list(v)",
+                "        elif v is not None:",
+                f"            v = f{index}._serialize(v, {attribute!r}, obj)",
+            ]
+        elif kind is not None:
+            lines += [
+                f"        if not ({_CHECKS[kind]}):",
+                f"            v = f{index}._serialize(v, {attribute!r}, obj)",
+            ]
+        else:
+            lines.append(f"        v = f{index}._serialize(v, {attribute!r}, obj)")
+        lines.append(f"        out[{key!r}] = v")
+    lines.append("    return out")
+
+    exec(compile("\n".join(lines), f"<serializer {schema.__class__.__name__}>", "exec"), namespace)
+    return namespace["dump"]
+
+
+@lru_cache(maxsize=None)
+def serializer(schema_class, exclude=()):
+    """
+    Return the compiled serializer for a schema, building it on first use.
+
+    Args:
+        schema_class (type): Marshmallow schema class
+        exclude (tuple): Field names to leave out
+
+    Returns:
+        CompiledSerializer: Serializer
+    """
+    return CompiledSerializer(schema_class(exclude=exclude))
+
+
+# Numbers orjson formats differently from the standard encoder: it writes
+# 1e16 and 0.00001 where json writes 1e+16 and 1e-05. A number can also be
+# the whole document, so the start of the buffer counts as a boundary.
+_FLOAT_RE = re.compile(rb"(?:^|[:,\[])-?(?:\d+(?:\.\d+)?e|0\.0000)")
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider that encodes compact responses with orjson."""
+
+    options = (orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS) if orjson else 0
+
+    def encode(self, obj):
+        """
+        Encode ``obj`` to the bytes the default provider's compact form produces.
+
+        Args:
+            obj: Value to encode
+
+        Returns:
+            bytes: JSON without a trailing newline
+        """
+        options = self.options | (orjson.OPT_SORT_KEYS if self.sort_keys else 0)
+        try:
+            data = orjson.dumps(obj, default=self.default, option=options)
+        except (orjson.JSONEncodeError, TypeError):
+            data = None
+        # ensure_ascii also escapes DEL, which orjson writes as is
+        if data is None or _FLOAT_RE.search(data) or (self.ensure_ascii and (not data.isascii() or b"\x7f" in data)):
+            return super().dumps(obj, separators=(",", ":")).encode("utf-8")
+        return data
+
+    def dumps(self, obj, **kwargs):
+        if kwargs == {"separators": (",", ":")}:
+            return self.encode(obj).decode("utf-8")
+        return super().dumps(obj, **kwargs)
+
+    def response(self, *args, **kwargs):
+        if (self.compact is None and self._app.debug) or self.compact is False:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self.encode(obj) + b"\n", mimetype=self.mimetype)
+
+
+def init_json_provider(app):
+    """
+    Install ``FastJSONProvider`` when orjson is available.
+
+    ``JSON_PROVIDER`` may be ``auto`` (the default), ``orjson`` (fail if it
+    is missing) or ``default`` to keep Flask's provider.
+
+    Args:
+        app (Flask): Application to configure
+    """
+    choice = app.config.get("JSON_PROVIDER", "auto")
+    if choice == "default":
+        return
+    if orjson is None:
+        if choice == "orjson":
+            raise RuntimeError("JSON_PROVIDER is orjson but orjson is not installed")
+        return
+    app.json = FastJSONProvider(app)
@@ -0,0 +1,374 @@
+"""
+Raw SQL execution.
+
+``SQLClient`` runs parameterized SQL on an ordered list of backends: the MCP
+server (``MCP_SERVER_URL``) when configured, then the Supabase ``run_sql``
+RPC. Each backend has its own circuit breaker and latency metrics; a backend
+whose breaker is open is skipped until its cool-down ends. SQL errors
+reported by a backend (4xx) are raised immediately instead of failing over.
+"""
+import json
+import threading
+import time
+from collections import deque
+
+import httpx
+from flask import current_app
+
+from app.core.errors import BadRequestError, ServiceUnavailableError
+from app.core.tracing import count_fallback, register_metrics
+
+OUTAGE_CODES = ("08", "53", "57", "PGRST")
+
+
+class SQLError(Exception):
+    """A backend rejected the statement itself (syntax, constraint, ...)."""
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+
+    After ``failure_threshold`` consecutive failures the breaker opens and
+    rejects calls for ``reset_timeout`` seconds, then lets a single trial
+    call through (half-open); its outcome closes or re-opens the breaker.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return self.CLOSED
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return self.HALF_OPEN
+        return self.OPEN
+
+    def allow(self):
+        """Return True if a call may be attempted now."""
+        with self._lock:
+            state = self.state
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and not self._trial:
+                self._trial = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial = False
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+
+class LatencyStats:
+    """Call counts and latency percentiles over a window of recent calls."""
+
+    def __init__(self, window=1024):
+        self.calls = 0
+        self.errors = 0
+        self.rejected = 0
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds, error=False):
+        with self._lock:
+            self.calls += 1
+            self.errors += int(error)
+            self._samples.append(seconds * 1000)
+
+    def reject(self):
+        with self._lock:
+            self.rejected += 1
+
+    def to_dict(self):
+        with self._lock:
+            samples = sorted(self._samples)
+            result = {"calls": self.calls, "errors": self.errors, "rejected": self.rejected}
+        for name, fraction in (("p50_ms", 0.50), ("p95_ms", 0.95), ("p99_ms", 0.99)):
+            result[name] = samples[min(len(samples) - 1, int(len(samples) * fraction))] if samples else None
+        return result
+
+
+class MCPBackend:
+    """
+    SQL over the MCP server's HTTP API.
+
+    Uses one keep-alive session. Endpoints: ``POST /query``,
+    ``POST /query/batch`` and ``POST /query/stream`` (newline-delimited JSON).
+    """
+
+    name = "mcp"
+
+    def __init__(self, url, timeout=10.0, max_connections=10):
+        self.session = httpx.Client(
+            base_url=url,
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            transport=httpx.HTTPTransport(retries=1),
+        )
+
+    def execute(self, query, params):
+        return self._post("/query", {"query": query, "params": params})
+
+    def execute_batch(self, statements):
+        body = self._post("/query/batch", {"statements": [{"query": q, "params": p} for q, p in statements]})
+        return body["results"]
+
+    def stream(self, query, params, chunk_size):
+        with self.session.stream("POST", "/query/stream", json={"query": query, "params": params}) as response:
+            _check(response, read=True)
+            chunk = []
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                chunk.append(json.loads(line))
+                if len(chunk) >= chunk_size:
+                    yield chunk
+                    chunk = []
+            if chunk:
+                yield chunk
+
+    def _post(self, path, payload):
+        response = self.session.post(path, json=payload)
+        _check(response)
+        return response.json()
+
+    def close(self):
+        self.session.close()
+
+
+class SupabaseRPCBackend:
+    """
+    SQL through the Supabase ``run_sql`` RPC.
+
+    The RPC has no batch or cursor support: batches run one call per
+    statement and streams are chunked from a single result set.
+    """
+
+    name = "supabase"
+
+    def execute(self, query, params):
+        from postgrest.exceptions import APIError as PostgrestAPIError
+
+        from app.core.utils import create_supabase_client
+
+        try:
+            return create_supabase_client().rpc("run_sql", {"query": query, "params": params}).execute().data
+        except PostgrestAPIError as e:
+            # Connection (08), resource (53) and shutdown (57) SQLSTATEs and
+            # PostgREST's own codes are outages; anything else is the statement
+            if e.code and not str(e.code).startswith(OUTAGE_CODES):
+                raise SQLError(str(e)) from e
+            raise
+
+    def execute_batch(self, statements):
+        return [self.execute(q, p) for q, p in statements]
+
+    def stream(self, query, params, chunk_size):
+        rows = self.execute(query, params) or []
+        for start in range(0, len(rows), chunk_size):
+            yield rows[start:start + chunk_size]
+
+    def close(self):
+        pass
+
+
+def _check(response, read=False):
+    """Raise ``SQLError`` for statement errors and ``RuntimeError`` for outages."""
+    if response.status_code < 400:
+        return
+    if read:
+        response.read()
+    if response.status_code < 500:
+        raise SQLError(response.text)
+    raise RuntimeError(f"{response.status_code} {response.text}")
+
+
+class SQLClient:
+    """Runs SQL on the first healthy backend, failing over in order."""
+
+    def __init__(self, backends, failure_threshold=5, reset_timeout=30, stream_chunk_size=500):
+        self.backends = list(backends)
+        self.stream_chunk_size = stream_chunk_size
+        self.breakers = {b.name: CircuitBreaker(failure_threshold, reset_timeout) for b in self.backends}
+        self.latency = {b.name: LatencyStats() for b in self.backends}
+
+    def execute(self, query, params=None):
+        """
+        Execute one parameterized statement.
+
+        Args:
+            query (str): SQL with positional placeholders
+            params (list, optional): Placeholder values
+
+        Returns:
+            list: Result rows
+        """
+        return self._call(lambda backend: backend.execute(query, list(params or [])))
+
+    def execute_batch(self, statements):
+        """
+        Execute several statements in one backend call where supported.
+
+        Args:
+            statements (list): ``(query, params)`` tuples
+
+        Returns:
+            list: One result row list per statement
+        """
+        statements = [(q, list(p or [])) for q, p in statements]
+        return self._call(lambda backend: backend.execute_batch(statements))
+
+    def stream(self, query, params=None, chunk_size=None):
+        """
+        Yield result rows in chunks instead of materializing the result.
+
+        Failover only happens before the first chunk is delivered.
+
+        Args:
+            query (str): SQL with positional placeholders
+            params (list, optional): Placeholder values
+            chunk_size (int, optional): Rows per chunk
+
+        Yields:
+            list: Chunks of result rows
+        """
+        chunk_size = chunk_size or self.stream_chunk_size
+        params = list(params or [])
+
+        def first_chunk(backend):
+            chunks = backend.stream(query, params, chunk_size)
+            return chunks, next(chunks, None)
+
+        chunks, chunk = self._call(first_chunk)
+        while chunk is not None:
+            yield chunk
+            chunk = next(chunks, None)
+
+    def _call(self, operation):
+        last_error = None
+        for backend in self.backends:
+            breaker = self.breakers[backend.name]
+            latency = self.latency[backend.name]
+            if not breaker.allow():
+                latency.reject()
+                continue
+
+            start = time.perf_counter()
+            try:
+                result = operation(backend)
+            except SQLError as e:
+                # The backend is healthy; the statement is at fault
+                latency.record(time.perf_counter() - start, error=True)
+                breaker.record_success()
+                raise BadRequestError(f"SQL error: {str(e)}")
+            except Exception as e:
+                latency.record(time.perf_counter() - start, error=True)
+                breaker.record_failure()
+                current_app.logger.warning(f"SQL backend {backend.name} failed: {str(e)}")
+                count_fallback(f"sql.{backend.name}_failover")
+                last_error = e
+                continue
+
+            latency.record(time.perf_counter() - start)
+            breaker.record_success()
+            return result
+
+        if last_error is not None:
+            current_app.logger.error(f"All SQL backends failed: {str(last_error)}")
+        raise ServiceUnavailableError("SQL execution unavailable")
+
+    def stats(self):
+        """Return breaker state and latency metrics per backend."""
+        return {
+            name: dict(self.latency[name].to_dict(), state=self.breakers[name].state)
+            for name in self.breakers
+        }
+
+    def prometheus(self):
+        """
+        Render ``stats()`` in the Prometheus text exposition format.
+
+        Failovers are counted separately, as ``sql.<backend>_failover`` in
+        ``mun_fallbacks_total``.
+
+        Returns:
+            list: Exposition lines
+        """
+        stats = self.stats()
+        lines = [
+            "# HELP mun_sql_calls_total SQL backend calls by outcome.",
+            "# TYPE mun_sql_calls_total counter",
+        ]
+        for name, entry in stats.items():
+            lines.append(f'mun_sql_calls_total{{backend="{name}",result="ok"}} {entry["calls"] - entry["errors"]}')
+            lines.append(f'mun_sql_calls_total{{backend="{name}",result="error"}} {entry["errors"]}')
+            lines.append(f'mun_sql_calls_total{{backend="{name}",result="rejected"}} {entry["rejected"]}')
+        lines += [
+            "# HELP mun_sql_breaker_state Circuit breaker state per backend (1 for the current state).",
+            "# TYPE mun_sql_breaker_state gauge",
+        ]
+        for name, entry in stats.items():
+            for state in (CircuitBreaker.CLOSED, CircuitBreaker.OPEN, CircuitBreaker.HALF_OPEN):
+                lines.append(f'mun_sql_breaker_state{{backend="{name}",state="{state}"}} {int(entry["state"] == state)}')
+        lines += [
+            "# HELP mun_sql_latency_seconds SQL call latency percentiles over recent calls.",
+            "# TYPE mun_sql_latency_seconds gauge",
+        ]
+        for name, entry in stats.items():
+            for quantile, key in (("0.5", "p50_ms"), ("0.95", "p95_ms"), ("0.99", "p99_ms")):
+                if entry[key] is not None:
+                    lines.append(
+                        f'mun_sql_latency_seconds{{backend="{name}",quantile="{quantile}"}} {entry[key] / 1000:.6f}'
+                    )
+        return lines
+
+    def close(self):
+        for backend in self.backends:
+            backend.close()
+
+
+def init_sql_client(app):
+    """
+    Create the SQL client and register it on the app.
+
+    Args:
+        app (Flask): Application to register with
+    """
+    backends = []
+    if app.config.get("MCP_SERVER_URL"):
+        backends.append(MCPBackend(app.config["MCP_SERVER_URL"], timeout=app.config.get("SQL_TIMEOUT", 10.0)))
+    backends.append(SupabaseRPCBackend())
+
+    client = SQLClient(
+        backends,
+        failure_threshold=app.config.get("SQL_BREAKER_FAILURES", 5),
+        reset_timeout=app.config.get("SQL_BREAKER_RESET", 30),
+        stream_chunk_size=app.config.get("SQL_STREAM_CHUNK_SIZE", 500),
+    )
+    app.extensions["sql"] = client
+    register_metrics(app, client.prometheus)
+
+
+def get_sql_client():
+    """Return the SQL client registered on the current app."""
+    return current_app.extensions["sql"]
@@ -0,0 +1,297 @@
+"""
+Startup timing and readiness.
+
+``create_app`` runs each initialization step inside ``StartupReport.step``,
+which records how long the step took and which modules it imported, so a
+slow cold start can be traced to the package responsible (the report is
+logged once the app is built and served by ``/healthz?verbose=1``).
+
+``HealthCheck`` answers ``/healthz``: it checks that Supabase Auth answers
+(and, with ``DATA_BACKEND=postgres``, that Postgres does) and remembers the
+result for ``HEALTH_CHECK_TTL`` seconds, so frequent probes do not add load.
+With ``LAZY_INIT`` the first check runs on a background thread while the
+app starts serving; until it finishes ``/healthz`` answers ``503 starting``.
+"""
+import sys
+import threading
+import time
+from collections import Counter, namedtuple
+from contextlib import contextmanager
+
+from flask import current_app, jsonify, request
+
+from app.core.tracing import _check_metrics_token
+
+StartupStep = namedtuple("StartupStep", "name seconds modules packages")
+CheckResult = namedtuple("CheckResult", "ok seconds error")
+
+
+class StartupReport:
+    """
+    Timings of the steps that built an app.
+
+    Args:
+        started (float, optional): ``time.perf_counter()`` when startup
+            began; defaults to now
+    """
+
+    def __init__(self, started=None):
+        self.started = started if started is not None else time.perf_counter()
+        self.finished = None
+        self.steps = []
+        self._recorded = 0.0
+
+    @contextmanager
+    def step(self, name):
+        """Time the enclosed block and note the modules it imports."""
+        before = set(sys.modules)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._add(name, time.perf_counter() - started, set(sys.modules) - before)
+
+    def record(self, name, seconds, modules=()):
+        """
+        Add a step that ran before the report existed (it counts towards the total).
+
+        Args:
+            name (str): Step name
+            seconds (float): Time the step took
+            modules (iterable): Names of the modules it imported
+        """
+        self._recorded += seconds
+        self._add(name, seconds, modules)
+
+    def _add(self, name, seconds, modules):
+        packages = Counter(module.split(".", 1)[0] for module in modules)
+        self.steps.append(StartupStep(name, seconds, len(modules), [p for p, _ in packages.most_common(5)]))
+
+    def finish(self):
+        self.finished = time.perf_counter()
+
+    @property
+    def total(self):
+        return (self.finished or time.perf_counter()) - self.started + self._recorded
+
+    def slowest(self, count=5):
+        """Return the ``count`` slowest steps, slowest first."""
+        return sorted(self.steps, key=lambda s: s.seconds, reverse=True)[:count]
+
+    def as_dict(self):
+        return {
+            "total_ms": round(self.total * 1000, 1),
+            "steps": [
+                {
+                    "name": s.name,
+                    "ms": round(s.seconds * 1000, 1),
+                    "modules": s.modules,
+                    "packages": s.packages,
+                }
+                for s in self.steps
+            ],
+        }
+
+    def format(self):
+        """Return the report as log lines, slowest steps first."""
+        lines = [f"Startup took {self.total * 1000:.0f} ms"]
+        for s in self.slowest(len(self.steps)):
+            packages = f" ({', '.join(s.packages)})" if s.packages else ""
+            lines.append(f"  {s.name:<24} {s.seconds * 1000:7.1f} ms  {s.modules:4d} modules{packages}")
+        return "\n".join(lines)
+
+
+def _check_supabase(timeout):
+    session = current_app.extensions["supabase"].get_session(current_app.config)
+    response = session.get("/auth/v1/health", timeout=timeout)
+    if response.status_code >= 500:
+        raise RuntimeError(f"Supabase Auth answered {response.status_code}")
+
+
+def _check_postgres(timeout):
+    from sqlalchemy import text
+
+    engine = current_app.extensions["repository"].engine
+
+    def ping():
+        with engine.connect() as connection:
+            if engine.dialect.name == "postgresql":
+                # Ends a stuck ping server-side too, returning the connection to the pool
+                connection.execute(text(f"SET LOCAL statement_timeout = {max(int(timeout * 1000), 1)}"))
+            connection.execute(text("SELECT 1"))
+
+    # Pool checkout and connecting have no timeout of their own here
+    _wait_for(ping, timeout)
+
+
+def _wait_for(fn, timeout):
+    """
+    Call ``fn`` on a daemon thread, waiting at most ``timeout`` seconds.
+
+    Raises:
+        TimeoutError: If ``fn`` has not returned in time (it keeps running)
+        Exception: Whatever ``fn`` raised
+    """
+    outcome = {}
+
+    def run():
+        try:
+            fn()
+        except Exception as e:
+            outcome["error"] = e
+
+    thread = threading.Thread(target=run, name="health-check", daemon=True)
+    thread.start()
+    thread.join(timeout)
+    if thread.is_alive():
+        raise TimeoutError(f"No answer within {timeout:g} s")
+    if "error" in outcome:
+        raise outcome["error"]
+
+
+class HealthCheck:
+    """
+    Readiness checks with a cached result.
+
+    Args:
+        app (Flask): Application, for background checks' app context
+        ttl (float): Seconds a result is reused
+        timeout (float): Seconds a single check may wait
+    """
+
+    def __init__(self, app, ttl=10, timeout=2):
+        self.app = app
+        self.ttl = ttl
+        self.timeout = timeout
+        self.checks = {}
+        self.results = None
+        self.checked_at = None
+        self._lock = threading.Lock()
+
+    def register(self, name, check):
+        """
+        Add a check.
+
+        Args:
+            name (str): Check name, as reported by ``/healthz``
+            check (callable): Called with the timeout inside an app
+                context; raises if the dependency is unavailable
+        """
+        self.checks[name] = check
+
+    def run(self):
+        """
+        Run every check, unless a result younger than ``ttl`` exists.
+
+        A caller arriving while another thread is checking gets the previous
+        result (None if there is none yet) instead of waiting.
+
+        Returns:
+            dict: Check name to ``CheckResult``, or None
+        """
+        if self.checked_at is not None and time.monotonic() - self.checked_at < self.ttl:
+            return self.results
+        if not self._lock.acquire(blocking=False):
+            return self.results
+        try:
+            results = {}
+            for name, check in self.checks.items():
+                started = time.perf_counter()
+                try:
+                    check(self.timeout)
+                    results[name] = CheckResult(True, time.perf_counter() - started, None)
+                except Exception as e:
+                    results[name] = CheckResult(False, time.perf_counter() - started, str(e))
+            self.results, self.checked_at = results, time.monotonic()
+            return results
+        finally:
+            self._lock.release()
+
+    def start(self):
+        """Run the checks on a background thread and log the outcome."""
+        threading.Thread(target=self._run_in_background, name="startup-health-check", daemon=True).start()
+
+    def _run_in_background(self):
+        with self.app.app_context():
+            for name, result in (self.run() or {}).items():
+                if result.ok:
+                    self.app.logger.info(f"{name} is reachable ({result.seconds * 1000:.0f} ms)")
+                else:
+                    self.app.logger.error(f"{name} is unreachable: {result.error}")
+
+
+def healthz_endpoint():
+    """
+    Readiness of this worker.
+
+    Query parameters:
+        verbose (bool, optional): Include the startup report (requires the
+            metrics token when one is configured)
+
+    Returns:
+        JSON: ``status`` (``ok``, ``unavailable`` or ``starting``) and each
+        check's outcome; ``503`` unless every check passed
+    """
+    health = current_app.extensions["health"]
+    results = health.run()
+    if results is None:
+        status = "starting"
+    else:
+        status = "ok" if all(r.ok for r in results.values()) else "unavailable"
+
+    body = {
+        "status": status,
+        "checks": {
+            name: {"ok": r.ok, "ms": round(r.seconds * 1000, 1), "error": r.error}
+            for name, r in (results or {}).items()
+        },
+    }
+    if request.args.get("verbose", "").lower() in ("1", "true"):
+        _check_metrics_token()
+        body["startup"] = current_app.extensions["startup"].as_dict()
+
+    response = jsonify(body)
+    response.status_code = 200 if status == "ok" else 503
+    response.headers["Cache-Control"] = "no-store"
+    return response
+
+
+def init_health(app, report):
+    """
+    Register the startup report and the health checks, and add ``/healthz``.
+
+    Without ``LAZY_INIT`` the Supabase client is built here, as part of
+    startup; with it, the checks start on a background thread instead.
+
+    Args:
+        app (Flask): Application to register with
+        report (StartupReport): Report of the app's startup
+    """
+    health = HealthCheck(
+        app,
+        ttl=app.config.get("HEALTH_CHECK_TTL", 10),
+        timeout=app.config.get("HEALTH_CHECK_TIMEOUT", 2),
+    )
+    health.register("supabase", _check_supabase)
+    if app.config.get("DATA_BACKEND") == "postgres":
+        health.register("postgres", _check_postgres)
+    app.extensions["startup"] = report
+    app.extensions["health"] = health
+    app.add_url_rule("/healthz", "healthz", healthz_endpoint, methods=["GET"])
+
+    if app.config.get("LAZY_INIT"):
+        health.start()
+        return
+
+    with app.app_context():
+        try:
+            from app.core.utils import create_supabase_client
+            create_supabase_client()
+            app.logger.info("Supabase connection established successfully")
+        except Exception as e:
+            app.logger.error(f"Failed to connect to Supabase: {str(e)}")
+
+
+def get_health():
+    """Return the health checks registered on the current app."""
+    return current_app.extensions["health"]
@@ -0,0 +1,310 @@
+"""
+Local verification of Supabase Auth access tokens.
+
+``AUTH_MODE`` selects which bearer tokens ``jwt_required`` routes accept:
+
+- ``app`` (default): only tokens minted by this backend at login;
+- ``hybrid``: those, plus Supabase access tokens (e.g. a supabase-js session
+  sent straight to the API);
+- ``supabase``: only Supabase access tokens; ``/login`` and ``/refresh`` hand
+  out Supabase sessions instead of minting tokens.
+
+Supabase tokens are told apart by their issuer (``<SUPABASE_URL>/auth/v1``)
+and verified in-process, so no request makes a Supabase Auth call. HS256
+tokens are checked against ``SUPABASE_JWT_SECRET``; asymmetric ones (RS256,
+ES256) against the project's JWKS, which is cached for
+``SUPABASE_JWKS_TTL`` seconds and refetched early when a token names a key
+id it does not contain, so signing key rotations are picked up at once.
+Verified tokens are remembered until they expire (``SUPABASE_TOKEN_CACHE_SIZE``
+per worker), making repeat requests with the same token a dictionary lookup.
+
+Claims are mapped onto the ones the app's own tokens carry: ``sub`` is the
+identity, ``email`` comes through unchanged and ``is_admin`` is read from
+``app_metadata.is_admin`` or ``app_metadata.role == "admin"`` (left unset
+otherwise, so admin routes resolve it through the role cache).
+"""
+import threading
+import time
+from collections import OrderedDict
+
+import jwt
+from flask import current_app
+from flask_jwt_extended import JWTManager
+from jwt.exceptions import ExpiredSignatureError, InvalidTokenError, PyJWKError
+
+from app.core.tracing import span
+
+AUTH_MODES = ("app", "hybrid", "supabase")
+ASYMMETRIC_ALGORITHMS = ("RS256", "RS384", "RS512", "ES256", "ES384", "PS256", "EdDSA")
+
+
+class SupabaseKeySet:
+    """
+    Signing keys of a Supabase project.
+
+    Args:
+        config (dict): App config; ``SUPABASE_URL`` is read on each fetch
+        secret (str, optional): Shared HS256 secret
+        ttl (int): Seconds a fetched JWKS is used before it is refetched
+        min_refresh_interval (int): Minimum seconds between fetches triggered
+            by unknown key ids, so forged ids cannot flood the Auth server
+    """
+
+    def __init__(self, config, secret=None, ttl=600, min_refresh_interval=30):
+        self.config = config
+        self.secret = secret
+        self.ttl = ttl
+        self.min_refresh_interval = min_refresh_interval
+        self.fetches = 0
+        self.fetch_errors = 0
+        self._keys = {}
+        self._expires_at = 0.0
+        self._fetched_at = float("-inf")
+        self._lock = threading.Lock()
+
+    def key_for(self, header):
+        """
+        Return the key verifying a token with ``header``.
+
+        Args:
+            header (dict): Unverified JWT header
+
+        Returns:
+            Key material for ``jwt.decode``
+
+        Raises:
+            InvalidTokenError: If no key matches
+        """
+        algorithm = header.get("alg")
+        if algorithm == "HS256":
+            if not self.secret:
+                raise InvalidTokenError("SUPABASE_JWT_SECRET is not configured")
+            return self.secret
+        if algorithm not in ASYMMETRIC_ALGORITHMS:
+            raise InvalidTokenError(f"Unsupported algorithm: {algorithm}")
+
+        kid = header.get("kid")
+        if time.monotonic() >= self._expires_at:
+            self._refresh(force=False)
+        key = self._keys.get(kid)
+        if key is None:
+            # A new key id usually means the signing key was rotated
+            self._refresh(force=True)
+            key = self._keys.get(kid)
+        if key is None:
+            raise InvalidTokenError("Unknown signing key")
+        return key
+
+    def _refresh(self, force):
+        with self._lock:
+            now = time.monotonic()
+            if not force and now < self._expires_at:
+                return  # another thread refreshed while we waited
+            if force and now - self._fetched_at < self.min_refresh_interval:
+                return
+            self._fetched_at = now
+            try:
+                self._keys = self._fetch()
+                self._expires_at = now + self.ttl
+            except Exception as e:
+                # Keep verifying with the keys we have; retry after the interval
+                self.fetch_errors += 1
+                self._expires_at = now + self.min_refresh_interval
+                current_app.logger.warning(f"Failed to fetch Supabase JWKS: {str(e)}")
+
+    def _fetch(self):
+        self.fetches += 1
+        session = current_app.extensions["supabase"].get_session(self.config)
+        response = session.get("/auth/v1/.well-known/jwks.json")
+        response.raise_for_status()
+
+        keys = {}
+        for jwk in response.json().get("keys", []):
+            if jwk.get("use", "sig") != "sig":
+                continue
+            try:
+                keys[jwk.get("kid")] = jwt.PyJWK(jwk)
+            except PyJWKError as e:
+                # e.g. an EC key without the cryptography package installed
+                current_app.logger.warning(f"Skipping Supabase signing key {jwk.get('kid')}: {str(e)}")
+        return keys
+
+
+class SupabaseTokenVerifier:
+    """
+    Verifies Supabase access tokens and maps their claims.
+
+    Args:
+        config (dict): App config; ``SUPABASE_URL`` gives the expected issuer
+        keys (SupabaseKeySet): Signing keys
+        audience (str): Expected ``aud`` claim
+        leeway (int): Clock skew tolerance in seconds
+        cache_size (int): Verified tokens remembered per worker (0 disables)
+    """
+
+    def __init__(self, config, keys, audience="authenticated", leeway=0, cache_size=10000):
+        self.config = config
+        self.keys = keys
+        self.audience = audience
+        self.leeway = leeway
+        self.cache_size = cache_size
+        self.hits = 0
+        self.misses = 0
+        self._verified = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def issuer(self):
+        return f"{(self.config.get('SUPABASE_URL') or '').rstrip('/')}/auth/v1"
+
+    def issued(self, token):
+        """
+        Whether ``token`` claims to come from the project's Supabase Auth.
+
+        Only the unverified payload is read; ``verify`` checks it.
+
+        Args:
+            token (str): Encoded JWT
+
+        Returns:
+            bool: True for Supabase tokens
+        """
+        if token in self._verified:
+            return True
+        try:
+            claims = jwt.decode(token, options={"verify_signature": False})
+        except InvalidTokenError:
+            return False
+        return claims.get("iss") == self.issuer
+
+    def verify(self, token, allow_expired=False):
+        """
+        Verify a Supabase access token.
+
+        Args:
+            token (str): Encoded JWT
+            allow_expired (bool): Accept an expired token (for expiry callbacks)
+
+        Returns:
+            dict: Claims, with ``type``, ``fresh``, ``jti`` and ``is_admin``
+            filled in like the app's own tokens
+
+        Raises:
+            InvalidTokenError: If the token is invalid or expired
+        """
+        cached = self._verified.get(token) if self.cache_size else None
+        if cached is not None and (allow_expired or cached["exp"] > time.time() - self.leeway):
+            self.hits += 1
+            return cached
+
+        self.misses += 1
+        header = jwt.get_unverified_header(token)
+        try:
+            claims = self._decode(token, header, verify_exp=not allow_expired)
+        except ExpiredSignatureError as e:
+            # flask_jwt_extended's expired-token callback reads these
+            e.jwt_header = header
+            e.jwt_data = self._decode(token, header, verify_exp=False)
+            raise
+
+        if self.cache_size and not allow_expired:
+            with self._lock:
+                self._verified[token] = claims
+                while len(self._verified) > self.cache_size:
+                    self._verified.popitem(last=False)
+        return claims
+
+    def _decode(self, token, header, verify_exp):
+        claims = jwt.decode(
+            token,
+            self.keys.key_for(header),
+            algorithms=[header.get("alg")],
+            audience=self.audience,
+            issuer=self.issuer,
+            leeway=self.leeway,
+            options={"require": ["exp", "iat", "sub"], "verify_exp": verify_exp},
+        )
+        return _app_claims(claims)
+
+    def stats(self):
+        """Return verification counters for this worker."""
+        return {
+            "cached": len(self._verified),
+            "hits": self.hits,
+            "misses": self.misses,
+            "jwks_fetches": self.keys.fetches,
+            "jwks_fetch_errors": self.keys.fetch_errors,
+        }
+
+
+def _app_claims(claims):
+    claims.setdefault("type", "access")
+    claims.setdefault("fresh", False)
+    claims.setdefault("jti", claims.get("session_id"))
+
+    app_metadata = claims.get("app_metadata") or {}
+    if isinstance(app_metadata.get("is_admin"), bool):
+        claims["is_admin"] = app_metadata["is_admin"]
+    elif "role" in app_metadata:
+        claims["is_admin"] = app_metadata["role"] == "admin"
+    return claims
+
+
+class TokenManager(JWTManager):
+    """
+    ``JWTManager`` that also accepts Supabase access tokens (see ``AUTH_MODE``).
+
+    Token decoding is timed as the ``jwt.verify`` span.
+
+    This overrides the private ``_decode_jwt_from_config``: the public
+    ``decode_key_loader`` only picks the key, while audience, issuer and
+    algorithms stay global, and hybrid mode needs different ones per token
+    (plus the verified-token cache and claim mapping). Flask-JWT-Extended is
+    pinned exactly, and ``tests/test_tokens.py`` fails if the hook changes.
+    """
+
+    def _decode_jwt_from_config(self, encoded_token, csrf_value=None, allow_expired=False):
+        with span("jwt.verify"):
+            verifier = current_app.extensions.get("supabase_tokens")
+            if verifier is not None:
+                if verifier.issued(encoded_token):
+                    return verifier.verify(encoded_token, allow_expired)
+                if current_app.config.get("AUTH_MODE") == "supabase":
+                    raise InvalidTokenError("Only Supabase access tokens are accepted")
+            return super()._decode_jwt_from_config(encoded_token, csrf_value, allow_expired)
+
+
+def init_supabase_tokens(app):
+    """
+    Set up Supabase token verification when ``AUTH_MODE`` asks for it.
+
+    Args:
+        app (Flask): Application to register with
+
+    Raises:
+        ValueError: If ``AUTH_MODE`` is not a known mode
+    """
+    mode = app.config.get("AUTH_MODE", "app")
+    if mode not in AUTH_MODES:
+        raise ValueError(f"AUTH_MODE must be one of: {', '.join(AUTH_MODES)}")
+    if mode == "app":
+        return
+
+    keys = SupabaseKeySet(
+        app.config,
+        secret=app.config.get("SUPABASE_JWT_SECRET"),
+        ttl=app.config.get("SUPABASE_JWKS_TTL", 600),
+        min_refresh_interval=app.config.get("SUPABASE_JWKS_MIN_REFRESH", 30),
+    )
+    app.extensions["supabase_tokens"] = SupabaseTokenVerifier(
+        app.config,
+        keys,
+        audience=app.config.get("SUPABASE_JWT_AUDIENCE", "authenticated"),
+        leeway=app.config.get("SUPABASE_JWT_LEEWAY", 0),
+        cache_size=app.config.get("SUPABASE_TOKEN_CACHE_SIZE", 10000),
+    )
+
+
+def supabase_sessions():
+    """Whether ``/login`` and ``/refresh`` hand out Supabase sessions."""
+    return current_app.config.get("AUTH_MODE") == "supabase"
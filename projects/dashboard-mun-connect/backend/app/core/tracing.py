@@ -0,0 +1,638 @@
+"""
+Request tracing and upstream call instrumentation.
+
+``span(name, **attributes)`` times a block of work. Every span feeds a
+per-name latency histogram (``TRACING_METRICS``), which costs two clock reads
+and one counter update. A sampled request (``TRACING_SAMPLE_RATE``, or with
+``TRACING_HONOR_TRACEPARENT`` an incoming W3C ``traceparent`` with the sampled
+flag) additionally records the span tree: each span's parent, timing, attributes and fallback events. With
+sampling off nothing is allocated beyond the histogram update, and with
+metrics off as well ``span`` returns a shared no-op.
+
+``count_fallback(site)`` counts activations of a retry or fallback path,
+e.g. a route re-running its query with a smaller column set.
+
+Data is exported as Prometheus text on ``/metrics`` and as OTLP/JSON (the
+OpenTelemetry wire format) on ``/traces``; finished traces are also pushed
+to ``TRACING_OTLP_ENDPOINT`` (an OTLP/HTTP collector such as
+``http://collector:4318/v1/traces``) from a background thread when it is
+set. Both endpoints require ``Authorization: Bearer <METRICS_TOKEN>`` when a
+token is configured; with ``METRICS_TOKEN_REQUIRED`` (production) the app
+refuses to start without one.
+"""
+import os
+import queue
+import random
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter, deque
+from contextvars import ContextVar
+
+import httpx
+from flask import current_app, g, jsonify, request
+
+from app.core.errors import UnauthorizedError
+
+# Upper bounds (seconds) of the latency histogram buckets
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_current_span = ContextVar("current_span", default=None)
+
+# Tracer of the app created in this process (one per worker). ``span`` reads
+# it directly because resolving ``current_app`` would cost more than the span.
+_tracer = None
+
+
+class _NoopSpan:
+    """Span returned when tracing is off entirely."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def set_attribute(self, key, value):
+        pass
+
+
+_NOOP = _NoopSpan()
+
+
+class _TimedSpan:
+    """Span of an unsampled request: only feeds the latency histogram."""
+
+    __slots__ = ("record", "name", "start")
+
+    def __init__(self, record, name):
+        self.record = record
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.record(self.name, time.perf_counter() - self.start, exc_type is not None)
+        return False
+
+    def set_attribute(self, key, value):
+        pass
+
+    def add_event(self, name, **attributes):
+        pass
+
+
+class Span:
+    """
+    A timed operation, recorded in the histograms and, when sampled, in its trace.
+
+    Use through ``span()`` or ``Tracer.span()`` as a context manager.
+    """
+
+    __slots__ = ("tracer", "name", "attributes", "parent", "trace", "span_id", "start", "start_ns", "end_ns",
+                 "error", "events", "_token")
+
+    def __init__(self, tracer, name, attributes, parent=None, trace=None):
+        self.tracer = tracer
+        self.name = name
+        self.attributes = attributes
+        self.parent = parent
+        self.trace = trace if trace is not None else (parent.trace if parent is not None else None)
+        self.span_id = None
+        self.start = None
+        self.error = None
+        self.events = None
+        self._token = None
+
+    def __enter__(self):
+        if self.trace is not None:
+            self.span_id = os.urandom(8).hex()
+            self.start_ns = time.time_ns()
+            self._token = _current_span.set(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.finish(error=exc)
+        return False
+
+    def set_attribute(self, key, value):
+        """Attach an attribute; only kept on sampled spans."""
+        if self.trace is not None:
+            self.attributes[key] = value
+
+    def add_event(self, name, **attributes):
+        """Record a point-in-time event on a sampled span."""
+        if self.trace is not None:
+            if self.events is None:
+                self.events = []
+            self.events.append((time.time_ns(), name, attributes))
+
+    def finish(self, error=None):
+        """End the span, recording it once."""
+        if self.start is None:
+            return
+        duration = time.perf_counter() - self.start
+        self.start = None
+        if error is not None:
+            self.error = f"{type(error).__name__}: {error}"
+        self.tracer._record(self.name, duration, self.error is not None)
+        if self.trace is not None:
+            self.end_ns = self.start_ns + int(duration * 1e9)
+            if self._token is not None:
+                _current_span.reset(self._token)
+                self._token = None
+            self.trace.spans.append(self)
+            if self.parent is None:
+                self.tracer._finish_trace(self.trace)
+
+
+class Trace:
+    """Spans of one sampled request."""
+
+    __slots__ = ("trace_id", "remote_parent_id", "spans")
+
+    def __init__(self, trace_id=None, remote_parent_id=None):
+        self.trace_id = trace_id or os.urandom(16).hex()
+        self.remote_parent_id = remote_parent_id
+        self.spans = []
+
+    def to_otlp(self):
+        """Return the spans as OTLP/JSON span objects."""
+        spans = []
+        for span in self.spans:
+            parent_id = span.parent.span_id if span.parent is not None else self.remote_parent_id
+            record = {
+                "traceId": self.trace_id,
+                "spanId": span.span_id,
+                "name": span.name,
+                "kind": _span_kind(span),
+                "startTimeUnixNano": str(span.start_ns),
+                "endTimeUnixNano": str(span.end_ns),
+                "attributes": _otlp_attributes(span.attributes),
+                "status": {"code": 2, "message": span.error} if span.error else {"code": 1},
+            }
+            if parent_id:
+                record["parentSpanId"] = parent_id
+            if span.events:
+                record["events"] = [
+                    {"timeUnixNano": str(at), "name": name, "attributes": _otlp_attributes(attributes)}
+                    for at, name, attributes in span.events
+                ]
+            spans.append(record)
+        return spans
+
+
+def _span_kind(span):
+    """OTLP span kind: SERVER for the request, CLIENT for upstream calls, else INTERNAL."""
+    if span.parent is None:
+        return 2
+    return 3 if span.name.startswith(("supabase.", "sql.")) else 1
+
+
+def _otlp_attributes(attributes):
+    result = []
+    for key, value in attributes.items():
+        if isinstance(value, bool):
+            typed = {"boolValue": value}
+        elif isinstance(value, int):
+            typed = {"intValue": str(value)}
+        elif isinstance(value, float):
+            typed = {"doubleValue": value}
+        else:
+            typed = {"stringValue": str(value)}
+        result.append({"key": key, "value": typed})
+    return result
+
+
+class Histogram:
+    """Latency histogram of one span name; bucket counts are cumulated when rendered."""
+
+    __slots__ = ("counts", "sum", "count", "errors")
+
+    def __init__(self, buckets):
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.errors = 0
+
+
+class OTLPExporter:
+    """
+    Pushes finished traces to an OTLP/HTTP collector in batches.
+
+    Traces are queued by the request thread and posted from a daemon thread
+    every ``interval`` seconds (or once ``batch_size`` are waiting). When the
+    queue is full, new traces are dropped and counted.
+    """
+
+    def __init__(self, endpoint, resource, batch_size=64, interval=5.0, max_queue=2048, timeout=5.0):
+        self.endpoint = endpoint
+        self.resource = resource
+        self.batch_size = batch_size
+        self.interval = interval
+        self.timeout = timeout
+        self.exported = 0
+        self.dropped = 0
+        self.failed = 0
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, trace):
+        """Queue a finished trace for export."""
+        try:
+            self._queue.put_nowait(trace)
+        except queue.Full:
+            self.dropped += 1
+            return
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="otlp-exporter", daemon=True)
+                    self._thread.start()
+
+    def _run(self):
+        session = httpx.Client(timeout=self.timeout)
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._post(session, batch)
+
+    def _post(self, session, batch):
+        spans = [span for trace in batch for span in trace.to_otlp()]
+        body = {"resourceSpans": [{
+            "resource": {"attributes": _otlp_attributes(self.resource)},
+            "scopeSpans": [{"scope": {"name": "app.core.tracing"}, "spans": spans}],
+        }]}
+        try:
+            response = session.post(self.endpoint, json=body)
+            response.raise_for_status()
+            self.exported += len(batch)
+        except Exception:
+            # Telemetry must never affect requests; the counter shows the loss
+            self.failed += len(batch)
+
+
+class Tracer:
+    """
+    Span histograms, fallback counters and recently sampled traces.
+
+    Args:
+        sample_rate (float): Fraction of requests whose span tree is recorded
+        metrics (bool): Whether to keep latency histograms
+        max_traces (int): Sampled traces kept for ``/traces``
+        buckets (tuple): Histogram bucket upper bounds in seconds
+        exporter (OTLPExporter, optional): Receives every finished trace
+        resource (dict, optional): OTLP resource attributes
+        honor_remote_sampling (bool): Record every request whose incoming
+            ``traceparent`` is sampled; otherwise only ``sample_rate`` decides
+            and the remote trace id is kept for the requests it picks
+    """
+
+    def __init__(self, sample_rate=0.0, metrics=True, max_traces=200, buckets=DEFAULT_BUCKETS,
+                 exporter=None, resource=None, honor_remote_sampling=False):
+        self.sample_rate = sample_rate
+        self.honor_remote_sampling = honor_remote_sampling
+        self.metrics = metrics
+        self.buckets = buckets
+        self.exporter = exporter
+        self.resource = resource or {}
+        self.traces = deque(maxlen=max_traces)
+        self.fallbacks = Counter()
+        self.sampled = 0
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.metrics or self.sample_rate > 0
+
+    def span(self, name, attributes=None):
+        """
+        Start a span under the current one.
+
+        Args:
+            name (str): Operation name, e.g. ``supabase.request``
+            attributes (dict, optional): Span attributes (kept when sampled)
+
+        Returns:
+            Span: Context manager
+        """
+        parent = _current_span.get()
+        if parent is None:
+            return _TimedSpan(self._record, name) if self.metrics else _NOOP
+        return Span(self, name, attributes or {}, parent)
+
+    def start_request(self, name, traceparent=None, attributes=None):
+        """
+        Start the root span of a request, deciding whether it is sampled.
+
+        Args:
+            name (str): Span name, e.g. ``GET /api/users/profile``
+            traceparent (str, optional): Incoming W3C ``traceparent`` header
+            attributes (dict, optional): Span attributes
+
+        Returns:
+            Span: Started span, or None when the tracer is off
+        """
+        if not self.enabled:
+            return None
+        trace = None
+        parent = _parse_traceparent(traceparent)
+        # Callers control the sampled flag, so it only forces recording when trusted
+        sampled = parent is not None and parent[2] and self.honor_remote_sampling
+        if sampled or (self.sample_rate > 0 and random.random() < self.sample_rate):
+            trace = Trace(parent[0], parent[1]) if parent is not None else Trace()
+        root = Span(self, name, attributes or {}, trace=trace)
+        return root.__enter__()
+
+    def count_fallback(self, site):
+        """
+        Count one activation of a fallback path.
+
+        Args:
+            site (str): Fallback name, e.g. ``users.get_profile.basic_columns``
+        """
+        with self._lock:
+            self.fallbacks[site] += 1
+        current = _current_span.get()
+        if current is not None:
+            current.add_event("fallback", site=site)
+
+    def _record(self, name, duration, error):
+        if not self.metrics:
+            return
+        index = bisect_left(self.buckets, duration)
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = Histogram(self.buckets)
+            histogram.counts[index] += 1
+            histogram.sum += duration
+            histogram.count += 1
+            histogram.errors += error
+
+    def _finish_trace(self, trace):
+        with self._lock:
+            self.sampled += 1
+            self.traces.append(trace)
+        if self.exporter is not None:
+            self.exporter.submit(trace)
+
+    def prometheus(self):
+        """
+        Render the metrics in the Prometheus text exposition format.
+
+        Returns:
+            str: Exposition text
+        """
+        with self._lock:
+            histograms = {
+                name: (list(h.counts), h.sum, h.count, h.errors) for name, h in sorted(self._histograms.items())
+            }
+            fallbacks = sorted(self.fallbacks.items())
+            sampled = self.sampled
+
+        lines = [
+            "# HELP mun_span_duration_seconds Duration of instrumented operations.",
+            "# TYPE mun_span_duration_seconds histogram",
+        ]
+        for name, (counts, total_seconds, count, _) in histograms.items():
+            label = _escape(name)
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f'mun_span_duration_seconds_bucket{{span="{label}",le="{bound}"}} {cumulative}')
+            lines.append(f'mun_span_duration_seconds_bucket{{span="{label}",le="+Inf"}} {count}')
+            lines.append(f'mun_span_duration_seconds_sum{{span="{label}"}} {total_seconds:.6f}')
+            lines.append(f'mun_span_duration_seconds_count{{span="{label}"}} {count}')
+
+        lines += [
+            "# HELP mun_span_errors_total Instrumented operations that raised.",
+            "# TYPE mun_span_errors_total counter",
+        ]
+        for name, (_, _, _, errors) in histograms.items():
+            lines.append(f'mun_span_errors_total{{span="{_escape(name)}"}} {errors}')
+
+        lines += [
+            "# HELP mun_fallbacks_total Activations of retry and fallback paths.",
+            "# TYPE mun_fallbacks_total counter",
+        ]
+        for site, count in fallbacks:
+            lines.append(f'mun_fallbacks_total{{site="{_escape(site)}"}} {count}')
+
+        lines += [
+            "# HELP mun_traces_sampled_total Requests whose span tree was recorded.",
+            "# TYPE mun_traces_sampled_total counter",
+            f"mun_traces_sampled_total {sampled}",
+        ]
+        if self.exporter is not None:
+            lines += [
+                "# HELP mun_traces_export_total Sampled traces by OTLP export outcome.",
+                "# TYPE mun_traces_export_total counter",
+                f'mun_traces_export_total{{outcome="exported"}} {self.exporter.exported}',
+                f'mun_traces_export_total{{outcome="failed"}} {self.exporter.failed}',
+                f'mun_traces_export_total{{outcome="dropped"}} {self.exporter.dropped}',
+            ]
+        return "\n".join(lines) + "\n"
+
+    def otlp(self, limit=None):
+        """
+        Return recently sampled traces as an OTLP/JSON ``ExportTraceServiceRequest``.
+
+        Args:
+            limit (int, optional): Most recent traces to include
+
+        Returns:
+            dict: OTLP/JSON document
+        """
+        with self._lock:
+            traces = list(self.traces)
+        if limit is not None:
+            traces = traces[-limit:] if limit > 0 else []
+        return {"resourceSpans": [{
+            "resource": {"attributes": _otlp_attributes(self.resource)},
+            "scopeSpans": [{
+                "scope": {"name": "app.core.tracing"},
+                "spans": [span for trace in traces for span in trace.to_otlp()],
+            }],
+        }]}
+
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _parse_traceparent(header):
+    """Return ``(trace_id, parent_id, sampled)`` from a W3C traceparent, or None."""
+    if not header:
+        return None
+    parts = header.strip().split("-")
+    if len(parts) < 4 or len(parts[1]) != 32 or len(parts[2]) != 16 or parts[0] == "ff":
+        return None
+    try:
+        flags = int(parts[3][:2], 16)
+        int(parts[1], 16), int(parts[2], 16)
+    except ValueError:
+        return None
+    if parts[1] == "0" * 32 or parts[2] == "0" * 16:
+        return None
+    return parts[1], parts[2], bool(flags & 1)
+
+
+def span(name, **attributes):
+    """
+    Time a block of work on the current app's tracer.
+
+    Args:
+        name (str): Operation name, e.g. ``supabase.request``
+        **attributes: Span attributes (kept when the request is sampled)
+
+    Returns:
+        Span: Context manager; a no-op before ``init_tracing``
+    """
+    if _tracer is None:
+        return _NOOP
+    return _tracer.span(name, attributes)
+
+
+def count_fallback(site):
+    """
+    Count one activation of a fallback path on the current app's tracer.
+
+    Args:
+        site (str): Fallback name, e.g. ``users.search_profiles.basic_columns``
+    """
+    if _tracer is not None:
+        _tracer.count_fallback(site)
+
+
+def _start_request_span():
+    tracer = current_app.extensions["tracer"]
+    rule = request.url_rule.rule if request.url_rule is not None else "unmatched"
+    g.request_span = tracer.start_request(
+        f"{request.method} {rule}",
+        request.headers.get("traceparent"),
+        {"http.method": request.method, "http.route": rule},
+    )
+
+
+def _end_request_span(response):
+    root = g.pop("request_span", None)
+    if root is not None:
+        root.set_attribute("http.status_code", response.status_code)
+        if root.trace is not None:
+            response.headers["traceparent"] = f"00-{root.trace.trace_id}-{root.span_id}-01"
+        if response.status_code >= 500:
+            root.error = f"HTTP {response.status_code}"
+        root.finish()
+    return response
+
+
+def _abort_request_span(error=None):
+    root = g.pop("request_span", None)
+    if root is not None:
+        root.finish(error=error)
+
+
+def _check_metrics_token():
+    token = current_app.config.get("METRICS_TOKEN")
+    if token and request.headers.get("Authorization") != f"Bearer {token}":
+        raise UnauthorizedError("Invalid metrics token")
+
+
+def metrics_endpoint():
+    """
+    Prometheus metrics of this worker.
+
+    Returns:
+        Response: Text exposition format
+    """
+    _check_metrics_token()
+    text = get_tracer().prometheus()
+    for collector in current_app.extensions.get("metrics_collectors", ()):
+        text += "\n".join(collector()) + "\n"
+    return current_app.response_class(text, content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+def register_metrics(app, collector):
+    """
+    Append a component's metrics to ``/metrics``.
+
+    Args:
+        app (Flask): Application serving ``/metrics``
+        collector (callable): Called inside the request; returns exposition
+            lines, including their ``# HELP`` and ``# TYPE`` comments
+    """
+    app.extensions.setdefault("metrics_collectors", []).append(collector)
+
+
+def traces_endpoint():
+    """
+    Recently sampled traces of this worker in OTLP/JSON.
+
+    Query parameters:
+        limit (int, optional): Most recent traces to return
+
+    Returns:
+        JSON: ``ExportTraceServiceRequest`` document
+    """
+    _check_metrics_token()
+    limit = request.args.get("limit", type=int)
+    return jsonify(get_tracer().otlp(limit))
+
+
+def init_tracing(app):
+    """
+    Create the tracer, time every request and add ``/metrics`` and ``/traces``.
+
+    The tracer also becomes the process-wide one used by ``span`` and
+    ``count_fallback``.
+
+    Args:
+        app (Flask): Application to register with
+    """
+    global _tracer
+    if app.config.get("METRICS_TOKEN_REQUIRED") and not app.config.get("METRICS_TOKEN"):
+        raise RuntimeError("METRICS_TOKEN must be set to serve /metrics and /traces")
+    exporter = None
+    resource = {"service.name": app.config.get("TRACING_SERVICE_NAME", "mun-connect-backend")}
+    if app.config.get("TRACING_OTLP_ENDPOINT"):
+        exporter = OTLPExporter(app.config["TRACING_OTLP_ENDPOINT"], resource)
+
+    tracer = Tracer(
+        sample_rate=app.config.get("TRACING_SAMPLE_RATE", 0.0),
+        metrics=app.config.get("TRACING_METRICS", True),
+        max_traces=app.config.get("TRACING_MAX_TRACES", 200),
+        exporter=exporter,
+        resource=resource,
+        honor_remote_sampling=app.config.get("TRACING_HONOR_TRACEPARENT", False),
+    )
+    app.extensions["tracer"] = tracer
+    _tracer = tracer
+
+    if tracer.enabled:
+        app.before_request(_start_request_span)
+        app.after_request(_end_request_span)
+        app.teardown_request(_abort_request_span)
+
+    app.add_url_rule("/metrics", "metrics", metrics_endpoint, methods=["GET"])
+    app.add_url_rule("/traces", "traces", traces_endpoint, methods=["GET"])
+
+
+def get_tracer():
+    """Return the tracer registered on the current app."""
+    return current_app.extensions["tracer"]
@@ -2,14 +2,21 @@
 Utility functions for the application.
 """
 import uuid
-import os
-import json
 from functools import wraps
-from flask import request, current_app
-from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
-import requests
-from supabase import create_client, Client
-from app.core.errors import UnauthorizedError, ForbiddenError, RateLimitError
+from typing import TYPE_CHECKING
+from flask import request, current_app, g
+from flask_jwt_extended import get_jwt, get_jwt_identity, verify_jwt_in_request
+from app.core.errors import APIError, UnauthorizedError, ForbiddenError, RateLimitError
+from app.core.query import Query
+from app.core.ratelimit import get_rate_limiter
+from app.core.repository import get_repository
+from app.core.roles import is_admin_request
+from app.core.sql import get_sql_client
+from app.core.tracing import span
+
+if TYPE_CHECKING:
+    # The supabase SDK is imported when the first client is built
+    from supabase import Client
 
 
 def generate_uuid():
@@ -17,9 +24,12 @@ def generate_uuid():
     return str(uuid.uuid4())
 
 
-def create_supabase_client() -> Client:
+def create_supabase_client() -> "Client":
     """
-    Create and return a Supabase client instance.
+    Return the pooled Supabase client for the current worker.
+    
+    The client is owned by the app's ``SupabaseClientRegistry`` and reused
+    across requests, so its keep-alive connections survive between calls.
     
     Returns:
         Client: Supabase client
@@ -27,59 +37,51 @@ def create_supabase_client() -> Client:
     Raises:
         UnauthorizedError: If Supabase credentials are not configured
     """
-    supabase_url = current_app.config["SUPABASE_URL"]
-    supabase_key = current_app.config["SUPABASE_API_KEY"]
-    
-    if not supabase_url or not supabase_key:
+    try:
+        with span("supabase.client"):
+            return current_app.extensions["supabase"].get_client(current_app.config)
+    except ValueError:
         current_app.logger.error("Supabase credentials not configured")
         raise UnauthorizedError("API credentials not configured")
-    
-    return create_client(supabase_url, supabase_key)
 
 
 def execute_mcp_query(query, params=None):
     """
-    Execute a SQL query using MCP if available, otherwise fallback to Supabase.
+    Execute a SQL query on the MCP server, falling back to Supabase.
+    
+    Backends are tried in order behind per-backend circuit breakers; see
+    ``app.core.sql`` for batching and streaming.
     
     Args:
         query (str): SQL query to execute
         params (list, optional): Query parameters
         
     Returns:
-        dict: Query results
+        list: Query results
         
     Raises:
-        Exception: If query execution fails
+        BadRequestError: If the statement fails
+        ServiceUnavailableError: If no backend is reachable
     """
-    try:
-        # Try MCP execution if available via API
-        mcp_server_url = os.environ.get("MCP_SERVER_URL")
-        if mcp_server_url:
-            response = requests.post(
-                f"{mcp_server_url}/query",
-                json={"query": query, "params": params or []}
-            )
-            if response.status_code == 200:
-                return response.json()
-        
-        # Fallback to Supabase
-        supabase = create_supabase_client()
-        response = supabase.rpc('run_sql', {"query": query, "params": params or []}).execute()
-        return response.data
-    except Exception as e:
-        current_app.logger.error(f"MCP query error: {str(e)}")
-        raise
+    with span("sql.execute"):
+        return get_sql_client().execute(query, params)
 
 
 def supabase_request(method, endpoint, data=None, params=None, headers=None):
     """
-    Make a request to the Supabase API using the supabase-py library.
+    Make a request to the Supabase API.
+    
+    Queries run on the configured data backend (``DATA_BACKEND``): PostgREST
+    through the pooled supabase-py client, or Postgres directly.
     
     Args:
         method (str): HTTP method (GET, POST, PUT, PATCH, DELETE)
-        endpoint (str): API endpoint
+        endpoint (Query or str): Structured ``Query`` for PostgREST tables, or
+            an ``/auth/v1/...`` path for Supabase Auth. Legacy
+            ``/rest/v1/table?...`` strings are parsed into a ``Query``.
         data (dict, optional): Request data
-        params (dict, optional): Query parameters
+        params (dict, optional): Values for the query's ``Param`` placeholders,
+            or query string parameters for Auth requests
         headers (dict, optional): Request headers
         
     Returns:
@@ -88,77 +90,174 @@ def supabase_request(method, endpoint, data=None, params=None, headers=None):
     Raises:
         APIError: If the request fails
     """
-    try:
-        supabase = create_supabase_client()
+    with span("supabase.request", method=method, target=_span_target(endpoint)):
+        try:
+            if isinstance(endpoint, str):
+                if endpoint.startswith("/auth/v1/"):
+                    return _auth_request(method, endpoint, data, params, headers)
+                endpoint = Query.parse(endpoint)
+            
+            rows, _ = get_repository().execute(method, endpoint, data, params, headers)
+            return rows
+                
+        except Exception as e:
+            _raise_supabase_error(e)
+
+
+def supabase_page(query, params=None, count=None, headers=None):
+    """
+    Fetch a page of rows and the total row count in a single request.
+    
+    The count is computed by PostgREST (``Prefer: count=...``) and read back
+    from the ``Content-Range`` header of the same response.
+    
+    Args:
+        query (Query): Query specification
+        params (dict, optional): Values for the query's ``Param`` placeholders
+        count (str, optional): Count mode overriding the query's own
+            (``exact``, ``planned`` or ``estimated``)
+        headers (dict, optional): Request headers
         
-        # Extract table and conditions from endpoint
-        # Expected format: /rest/v1/table_name?condition=value
-        parts = endpoint.strip('/').split('/')
-        if len(parts) < 3 or parts[0] != 'rest' or parts[1] != 'v1':
-            raise ValueError(f"Invalid endpoint format: {endpoint}")
+    Returns:
+        tuple: ``(rows, total)``; ``total`` is None when no count was requested
         
-        table_name = parts[2].split('?')[0]
-        query = supabase.table(table_name)
+    Raises:
+        APIError: If the request fails
+    """
+    with span("supabase.page", target=query.table):
+        try:
+            return get_repository().execute("GET", query, params=params, headers=headers, count=count)
+        except Exception as e:
+            _raise_supabase_error(e)
+
+
+def supabase_rpc(function_name, params=None):
+    """
+    Call a Postgres function exposed by PostgREST (``/rest/v1/rpc/<name>``).
+    
+    Args:
+        function_name (str): Function name
+        params (dict, optional): Named function arguments
         
-        # Apply conditions if present in the endpoint
-        if '?' in endpoint:
-            conditions = endpoint.split('?')[1].split('&')
-            for condition in conditions:
-                if '=' in condition:
-                    key, value = condition.split('=')
-                    # Handle equality conditions (eq., neq., etc.)
-                    if '.=' in key:
-                        operator, field = key.split('.=')
-                        if operator == 'eq':
-                            query = query.eq(field, value)
-                        elif operator == 'neq':
-                            query = query.neq(field, value)
-                        elif operator == 'gt':
-                            query = query.gt(field, value)
-                        elif operator == 'lt':
-                            query = query.lt(field, value)
-                        elif operator == 'gte':
-                            query = query.gte(field, value)
-                        elif operator == 'lte':
-                            query = query.lte(field, value)
+    Returns:
+        list: Rows returned by the function
         
-        # Execute the appropriate method on the query
-        if method.upper() == 'GET':
-            response = query.select('*').execute()
-            return response.data
-        elif method.upper() == 'POST':
-            response = query.insert(data).execute()
-            return response.data
-        elif method.upper() in ['PUT', 'PATCH']:
-            response = query.update(data).execute()
-            return response.data
-        elif method.upper() == 'DELETE':
-            response = query.delete().execute()
-            return response.data
-        else:
-            raise ValueError(f"Unsupported method: {method}")
-            
-    except Exception as e:
-        current_app.logger.error(f"Supabase API error: {str(e)}")
+    Raises:
+        APIError: If the request fails
+    """
+    with span("supabase.rpc", target=function_name):
+        try:
+            return get_repository().rpc(function_name, params)
+        except Exception as e:
+            _raise_supabase_error(e)
+
+
+def _span_target(endpoint):
+    """Name what a request addresses: the table, or the Auth path without ids."""
+    if isinstance(endpoint, Query):
+        return endpoint.table
+    path = endpoint.split("?", 1)[0]
+    if path.startswith("/auth/v1/admin/users/"):
+        return "/auth/v1/admin/users"
+    return path
+
+
+def _execute_query(method, query, data=None, params=None, headers=None, count=None):
+    """
+    Execute a structured query and return the raw PostgREST response.
+    
+    Args:
+        method (str): HTTP method (GET, POST, PUT, PATCH, DELETE)
+        query (Query): Query specification
+        data (dict, optional): Request data
+        params (dict, optional): Values for the query's placeholders
+        headers (dict, optional): Request headers
+        count (str, optional): Count mode overriding the query's own
         
-        if "429" in str(e):
-            raise RateLimitError("Too many requests to Supabase API")
-        elif "401" in str(e):
-            raise UnauthorizedError("Unauthorized access to Supabase API")
-        elif "403" in str(e):
-            raise ForbiddenError("Forbidden access to Supabase API")
-        else:
-            from app.core.errors import APIError
-            raise APIError(
-                message=f"Supabase API error: {str(e)}",
-                status_code=500
-            )
+    Returns:
+        APIResponse: Response with ``data`` and ``count``
+    """
+    supabase = create_supabase_client()
+    table = supabase.table(query.table)
+    method = method.upper()
+    count = count or query.count
+    
+    if method == "GET":
+        builder = table.select(query.select_clause, count=count)
+    elif method == "POST":
+        builder = table.insert(data, count=count)
+    elif method in ["PUT", "PATCH"]:
+        builder = table.update(data, count=count)
+    elif method == "DELETE":
+        builder = table.delete(count=count)
+    else:
+        raise ValueError(f"Unsupported method: {method}")
+    
+    bound = query.bind(params)
+    if method != "GET" and query.columns:
+        bound.append(("select", query.select_clause))
+    for key, value in bound:
+        builder.params = builder.params.add(key, value)
+    
+    if headers:
+        builder.headers.update(headers)
+    
+    return builder.execute()
+
+
+def _auth_request(method, endpoint, data=None, params=None, headers=None):
+    """
+    Call the Supabase Auth (GoTrue) API over the pooled HTTP session.
+    
+    Client errors are returned as ``{"error": ..., "error_description": ...}``
+    so callers can report them; auth, rate limit and server errors raise.
+    """
+    session = current_app.extensions["supabase"].get_session(current_app.config)
+    response = session.request(method.upper(), endpoint, json=data, params=params, headers=headers)
+    return _auth_response(response)
+
+
+def _auth_response(response):
+    """Decode a Supabase Auth response, raising on auth, rate limit and server errors."""
+    if response.status_code in (401, 403, 429) or response.status_code >= 500:
+        raise RuntimeError(f"{response.status_code} {response.text}")
+    
+    body = response.json() if response.content else {}
+    if response.status_code >= 400:
+        return {
+            "error": body.get("error") or body.get("error_code") or str(response.status_code),
+            "error_description": body.get("error_description") or body.get("msg") or body.get("message"),
+        }
+    return body
+
+
+def _raise_supabase_error(e):
+    """Translate a Supabase client failure into an ``APIError``."""
+    if isinstance(e, APIError):
+        raise e
+    
+    current_app.logger.error(f"Supabase API error: {str(e)}")
+    
+    if "429" in str(e):
+        raise RateLimitError("Too many requests to Supabase API")
+    elif "401" in str(e):
+        raise UnauthorizedError("Unauthorized access to Supabase API")
+    elif "403" in str(e):
+        raise ForbiddenError("Forbidden access to Supabase API")
+    else:
+        raise APIError(
+            message=f"Supabase API error: {str(e)}",
+            status_code=500
+        )
 
 
 def admin_required(fn):
     """
     Decorator to require admin role for a route.
     
+    A fresh ``is_admin`` token claim is trusted without a database round
+    trip; otherwise the flag is read through the role cache.
+    
     Args:
         fn: The function to decorate
         
@@ -170,30 +269,30 @@ def admin_required(fn):
         verify_jwt_in_request()
         user_id = get_jwt_identity()
         
-        # Check if user is admin in Supabase
         try:
-            response = supabase_request(
-                method="GET",
-                endpoint=f"/rest/v1/profiles?id=eq.{user_id}&select=is_admin",
-            )
-            
-            if not response or not response[0].get("is_admin"):
-                raise ForbiddenError("Admin access required")
-                
+            allowed = is_admin_request(user_id, get_jwt())
         except Exception as e:
             current_app.logger.error(f"Error checking admin status: {str(e)}")
             raise ForbiddenError("Admin access required")
             
-        return fn(*args, **kwargs)
+        if not allowed:
+            raise ForbiddenError("Admin access required")
+            
+        return current_app.ensure_sync(fn)(*args, **kwargs)
     return wrapper
 
 
-def rate_limit(limit_per_minute=60):
+def rate_limit(limit_per_minute=60, algorithm=None):
     """
     Decorator to apply rate limiting to a route.
     
+    Requests are counted per authenticated user (JWT identity) when a valid
+    token is present, otherwise per client IP, and per endpoint.
+    
     Args:
         limit_per_minute (int): Maximum requests per minute
+        algorithm (str, optional): ``sliding_window`` or ``token_bucket``;
+            defaults to ``RATELIMIT_ALGORITHM``
         
     Returns:
         function: The decorated function
@@ -201,23 +300,26 @@ def rate_limit(limit_per_minute=60):
     def decorator(fn):
         @wraps(fn)
         def wrapper(*args, **kwargs):
-            # Get client IP
-            client_ip = request.remote_addr
+            key = f"{request.endpoint}:{_rate_limit_identity()}"
+            result = get_rate_limiter().hit(key, limit_per_minute, period=60, algorithm=algorithm)
+            g.rate_limit = result
             
-            # Use cache to track request count
-            cache_key = f"rate_limit:{client_ip}:{request.path}"
-            request_count = current_app.extensions["cache"].get(cache_key) or 0
-            
-            if request_count >= limit_per_minute:
+            if not result.allowed:
                 raise RateLimitError(f"Rate limit of {limit_per_minute} requests per minute exceeded")
             
-            # Increment request count
-            current_app.extensions["cache"].set(
-                cache_key, 
-                request_count + 1, 
-                timeout=60  # Reset after 1 minute
-            )
-            
-            return fn(*args, **kwargs)
+            return current_app.ensure_sync(fn)(*args, **kwargs)
         return wrapper
-    return decorator 
\ No newline at end of file
+    return decorator
+
+
+def _rate_limit_identity():
+    """Return ``user:<id>`` for a valid JWT, else ``ip:<address>``."""
+    try:
+        verify_jwt_in_request(optional=True)
+        user_id = get_jwt_identity()
+    except Exception:
+        user_id = None
+    
+    if user_id:
+        return f"user:{user_id}"
+    return f"ip:{request.remote_addr}"
@@ -0,0 +1,8 @@
+"""
+Documents blueprint for position papers and other delegate documents.
+"""
+from flask import Blueprint
+
+documents_bp = Blueprint("documents", __name__)
+
+from app.documents import routes
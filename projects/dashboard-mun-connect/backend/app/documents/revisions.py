@@ -0,0 +1,324 @@
+"""
+Document revisions.
+
+Autosaves send range patches against the revision they were made on instead
+of the whole text. Each save stores only its patch (a delta) in
+``document_revisions``. Every ``REVISION_SNAPSHOT_INTERVAL`` revisions, or
+once the deltas since the last snapshot outgrow the text, the save also
+stores a full snapshot and refreshes ``documents.content``. Any revision is
+rebuilt from the nearest snapshot at or before it plus the deltas after it.
+
+The head text of recently edited documents is kept in a per-worker LRU so
+an autosave costs one ``save_document_revision`` RPC. The RPC only applies
+a save whose base revision is still the head, so a stale cache can cause a
+conflict but never a lost edit.
+"""
+import json
+from collections import namedtuple
+
+from flask import current_app
+
+from app.core.cache import LocalCache
+from app.core.query import Query, Param
+
+DOCUMENT_HEAD = Query("documents").select(
+    "id", "author_id", "revision", "content_revision", "content"
+).eq("id", Param("id")).limit(1)
+
+REVISIONS = Query("document_revisions")
+DELTAS = REVISIONS.select("revision", "ops", "size").eq("document_id", Param("id")).gt(
+    "revision", Param("after")
+).lte("revision", Param("upto")).order("revision")
+SNAPSHOT_AT = REVISIONS.select("revision", "content").eq("document_id", Param("id")).eq(
+    "snapshot", True
+).lte("revision", Param("revision")).order("revision", desc=True).limit(1)
+HISTORY = REVISIONS.select("revision", "snapshot", "size", "created_at").eq("document_id", Param("id")).lt(
+    "revision", Param("before")
+).order("revision", desc=True).limit(Param("limit"))
+
+SAVE_FUNCTION = "save_document_revision"
+
+# Text of a document at ``revision``; ``snapshot_revision`` and ``delta_bytes``
+# describe the delta chain since the last snapshot
+Head = namedtuple("Head", "author_id revision content snapshot_revision delta_bytes")
+
+
+class PatchError(ValueError):
+    """A patch does not apply to its base text."""
+
+
+class RevisionConflict(Exception):
+    """The base revision of a save is no longer the head."""
+
+    def __init__(self, revision):
+        super().__init__(f"Document is at revision {revision}")
+        self.revision = revision
+
+
+def apply_patch(text, ops):
+    """
+    Apply range operations to a text.
+
+    Each op replaces ``text[start:end]`` of the *base* text with ``text``.
+    Ops must be sorted and must not overlap.
+
+    Args:
+        text (str): Base text
+        ops (list): ``{"start": int, "end": int, "text": str}`` dicts
+
+    Returns:
+        str: Patched text
+
+    Raises:
+        PatchError: If an op is malformed, out of range or overlapping
+    """
+    parts = []
+    position = 0
+    for op in ops:
+        try:
+            start, end, insert = op["start"], op["end"], op.get("text", "")
+        except (KeyError, TypeError):
+            raise PatchError("Each op needs start and end")
+        if not isinstance(start, int) or not isinstance(end, int) or not isinstance(insert, str):
+            raise PatchError("start and end must be integers and text a string")
+        if start < position or end < start or end > len(text):
+            raise PatchError(f"Op range {start}-{end} is out of order or out of bounds")
+        parts.append(text[position:start])
+        parts.append(insert)
+        position = end
+    parts.append(text[position:])
+    return "".join(parts)
+
+
+def patch_size(ops):
+    """Stored size of a delta in bytes."""
+    return len(json.dumps(ops, separators=(",", ":")).encode())
+
+
+class RevisionStore:
+    """Saves patches as revisions and rebuilds documents from them."""
+
+    def __init__(self, cache, snapshot_interval=50, snapshot_ratio=1.0, max_ops=1000):
+        self.cache = cache
+        self.snapshot_interval = snapshot_interval
+        self.snapshot_ratio = snapshot_ratio
+        self.max_ops = max_ops
+
+    @staticmethod
+    def _head_key(document_id):
+        return f"revisions:head:{document_id}"
+
+    def head(self, document_id, revision=None):
+        """
+        Return the latest text of a document.
+
+        Args:
+            document_id (str): Document id
+            revision (int, optional): Revision the caller knows to exist; a
+                cached head older than this is reloaded
+
+        Returns:
+            Head: Latest text, or None if the document does not exist
+        """
+        head = self.cache.get(self._head_key(document_id))
+        if head is not None and (revision is None or head.revision >= revision):
+            return head
+
+        head = self._load_head(document_id)
+        if head is not None:
+            self.cache.set(self._head_key(document_id), head)
+        return head
+
+    def _load_head(self, document_id):
+        from app.core.utils import supabase_request
+
+        rows = supabase_request(method="GET", endpoint=DOCUMENT_HEAD, params={"id": document_id})
+        if not rows:
+            return None
+        row = rows[0]
+        content = row.get("content") or ""
+        delta_bytes = 0
+        if row["revision"] > row["content_revision"]:
+            deltas = supabase_request(
+                method="GET",
+                endpoint=DELTAS,
+                params={"id": document_id, "after": row["content_revision"], "upto": row["revision"]},
+            )
+            for delta in deltas:
+                content = apply_patch(content, delta["ops"])
+                delta_bytes += delta["size"]
+        return Head(row["author_id"], row["revision"], content, row["content_revision"], delta_bytes)
+
+    def save(self, document_id, author_id, base_revision, ops):
+        """
+        Apply a patch made against ``base_revision`` and store it.
+
+        Args:
+            document_id (str): Document id
+            author_id (str): Current user; only the author may save
+            base_revision (int): Revision the patch was made against
+            ops (list): Range operations (see ``apply_patch``)
+
+        Returns:
+            dict: ``revision``, ``length``, ``snapshot`` and ``updated_at``,
+            or None if the document does not exist or is not the author's
+
+        Raises:
+            PatchError: If the patch is invalid
+            RevisionConflict: If the document has moved past ``base_revision``
+        """
+        if not isinstance(ops, list) or len(ops) > self.max_ops:
+            raise PatchError(f"ops must be a list of at most {self.max_ops} operations")
+
+        head = self.head(document_id, base_revision)
+        if head is None or head.author_id != author_id:
+            return None
+        if head.revision != base_revision:
+            raise RevisionConflict(head.revision)
+
+        content = apply_patch(head.content, ops)
+        size = patch_size(ops)
+        revision = base_revision + 1
+        snapshot = (
+            revision - head.snapshot_revision >= self.snapshot_interval
+            or head.delta_bytes + size > self.snapshot_ratio * max(len(content), 1)
+        )
+
+        row = self._write(document_id, author_id, base_revision, ops, content if snapshot else None)
+        if row is None:
+            return None
+
+        if snapshot:
+            head = Head(author_id, revision, content, revision, 0)
+        else:
+            head = Head(author_id, revision, content, head.snapshot_revision, head.delta_bytes + size)
+        self.cache.set(self._head_key(document_id), head)
+
+        return {
+            "revision": revision,
+            "length": len(content),
+            "snapshot": snapshot,
+            "updated_at": row["updated_at"],
+        }
+
+    def replace(self, document_id, author_id, content):
+        """
+        Store a full new text as a snapshot revision on top of the head.
+
+        Returns:
+            dict: ``revision`` and ``updated_at``, or None if the document
+            does not exist or is not the author's
+        """
+        row = self._write(document_id, author_id, None, None, content)
+        if row is None:
+            return None
+        self.cache.set(self._head_key(document_id), Head(author_id, row["revision"], content, row["revision"], 0))
+        return row
+
+    def _write(self, document_id, author_id, base_revision, ops, snapshot):
+        from app.core.utils import supabase_rpc
+
+        rows = supabase_rpc(SAVE_FUNCTION, {
+            "p_document_id": document_id,
+            "p_author_id": author_id,
+            "p_base_revision": base_revision,
+            # Sent as text so every data backend passes it through unchanged
+            "p_ops": json.dumps(ops, separators=(",", ":")) if ops is not None else None,
+            "p_size": patch_size(ops) if ops is not None else 0,
+            "p_content": snapshot,
+        })
+        if rows:
+            return rows[0]
+
+        # Nothing written: the head moved, or the document is gone or not ours
+        self.invalidate(document_id)
+        head = self.head(document_id)
+        if head is not None and head.author_id == author_id and base_revision is not None:
+            raise RevisionConflict(head.revision)
+        return None
+
+    def rebuild(self, document_id, revision):
+        """
+        Rebuild the text of any past revision.
+
+        Args:
+            document_id (str): Document id
+            revision (int): Revision to rebuild
+
+        Returns:
+            str: Text at ``revision``, or None if it does not exist
+        """
+        from app.core.utils import supabase_request
+
+        head = self.cache.get(self._head_key(document_id))
+        if head is not None and head.revision == revision:
+            return head.content
+
+        snapshots = supabase_request(
+            method="GET",
+            endpoint=SNAPSHOT_AT,
+            params={"id": document_id, "revision": revision},
+        )
+        if not snapshots:
+            return None
+        snapshot = snapshots[0]
+
+        content = snapshot["content"] or ""
+        if snapshot["revision"] < revision:
+            deltas = supabase_request(
+                method="GET",
+                endpoint=DELTAS,
+                params={"id": document_id, "after": snapshot["revision"], "upto": revision},
+            )
+            if not deltas or deltas[-1]["revision"] != revision:
+                return None
+            for delta in deltas:
+                content = apply_patch(content, delta["ops"])
+        return content
+
+    def history(self, document_id, before, limit):
+        """
+        List revision metadata, newest first.
+
+        Args:
+            document_id (str): Document id
+            before (int): Only revisions older than this
+            limit (int): Maximum number of revisions
+
+        Returns:
+            list: ``revision``, ``snapshot``, ``size`` and ``created_at`` rows
+        """
+        from app.core.utils import supabase_request
+
+        return supabase_request(
+            method="GET",
+            endpoint=HISTORY,
+            params={"id": document_id, "before": before, "limit": limit},
+        )
+
+    def invalidate(self, document_id):
+        """Drop the cached head of a document."""
+        self.cache.delete(self._head_key(document_id))
+
+
+def init_revision_store(app):
+    """
+    Create the document revision store and register it on the app.
+
+    Args:
+        app (Flask): Application to register with
+    """
+    app.extensions["revisions"] = RevisionStore(
+        LocalCache(
+            max_size=app.config.get("REVISION_CACHE_SIZE", 256),
+            default_timeout=app.config.get("REVISION_CACHE_TTL", 300),
+        ),
+        snapshot_interval=app.config.get("REVISION_SNAPSHOT_INTERVAL", 50),
+        snapshot_ratio=app.config.get("REVISION_SNAPSHOT_RATIO", 1.0),
+        max_ops=app.config.get("REVISION_MAX_OPS", 1000),
+    )
+
+
+def get_revision_store():
+    """Return the revision store registered on the current app."""
+    return current_app.extensions["revisions"]
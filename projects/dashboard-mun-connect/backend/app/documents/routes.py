@@ -0,0 +1,495 @@
+"""
+Document routes for position papers, research notes and resolutions.
+
+Listings only ever select metadata columns; the (potentially very large)
+``content`` column is served by its own endpoint with ETag revalidation.
+"""
+import hashlib
+from datetime import datetime, timezone
+from functools import lru_cache
+
+from flask import request, jsonify, current_app
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from app.documents import documents_bp
+from app.core.utils import supabase_request, rate_limit
+from app.core.errors import BadRequestError, ConflictError, NotFoundError, ValidationFailedError
+from app.core.query import Query, Param
+from app.core.pagination import (
+    AFTER_CURSOR,
+    cursor_page,
+    decode_cursor,
+    keyset_order,
+    listing_scope,
+    parse_bool,
+    visible,
+)
+from app.core.pipeline import etag_matches, set_resource_version
+from app.core.schemas import DocumentSchema
+from app.core.serializers import serializer
+from app.documents.revisions import PatchError, RevisionConflict, get_revision_store
+
+
+# Everything DocumentSchema serializes except content
+DOCUMENT_LIST_COLUMNS = (
+    "id", "title", "document_type", "tags", "is_public", "author_id", "committee_id", "revision",
+    "created_at", "updated_at",
+)
+WRITABLE_FIELDS = ("title", "content", "document_type", "tags", "is_public", "committee_id")
+
+DOCUMENTS = Query("documents")
+DOCUMENT_BY_ID = DOCUMENTS.select(*DOCUMENT_LIST_COLUMNS).eq("id", Param("id")).limit(1)
+# Mutations are scoped to the author, so ownership needs no extra read
+OWN_DOCUMENT = DOCUMENTS.select(*DOCUMENT_LIST_COLUMNS).eq("id", Param("id")).eq("author_id", Param("author_id"))
+INSERT_DOCUMENT = DOCUMENTS.select(*DOCUMENT_LIST_COLUMNS)
+
+DOCUMENT_LIST_SERIALIZER = serializer(DocumentSchema, exclude=("content",))
+
+
+@lru_cache(maxsize=None)
+def _list_query(author, public, tag, committee, document_type, cursor):
+    """Build (once) the listing query for a combination of filters."""
+    query = DOCUMENTS.select(*DOCUMENT_LIST_COLUMNS)
+    if author:
+        query = query.eq("author_id", Param("author_id"))
+    if public:
+        query = query.eq("is_public", Param("is_public"))
+    if tag:
+        query = query.contains("tags", Param("tags"))
+    if committee:
+        query = query.eq("committee_id", Param("committee_id"))
+    if document_type:
+        query = query.eq("document_type", Param("document_type"))
+    if cursor:
+        query = query.or_(*AFTER_CURSOR)
+    return keyset_order(query)
+
+
+def _content_etag(document):
+    """Strong ETag for a document's content; changes with every revision."""
+    digest = hashlib.sha1(f"{document['id']}:{document['revision']}".encode()).hexdigest()
+    return digest[:32]
+
+
+def _load_visible(document_id, current_user):
+    """Return a document's metadata, or raise NotFoundError if the caller cannot see it."""
+    response = supabase_request(method="GET", endpoint=DOCUMENT_BY_ID, params={"id": document_id})
+    if not response or not visible(response[0], current_user):
+        raise NotFoundError("Document not found")
+    return response[0]
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat()
+
+
+@documents_bp.route("", methods=["GET"])
+@jwt_required()
+@rate_limit(limit_per_minute=60)
+def list_documents():
+    """
+    List documents, newest first, without their content.
+    
+    Without filters the caller's own documents are listed. ``author_id``
+    lists another author's public documents; ``is_public=true`` lists
+    public documents from every author.
+    
+    Query parameters:
+        author_id (str, optional): Only documents by this author
+        is_public (bool, optional): Only public (true) or private (false)
+            documents; private documents are only listed for their author
+        tag (str, optional): Only documents with this tag
+        committee_id (str, optional): Only documents for this committee
+        document_type (str, optional): Only documents of this type
+        cursor (str, optional): ``next_cursor`` from the previous page
+        per_page (int, optional): Number of results per page
+        
+    Returns:
+        JSON: Page of document metadata and the next cursor
+    """
+    current_user = get_jwt_identity()
+    author_id = request.args.get("author_id") or None
+    is_public = parse_bool(request.args.get("is_public"), "is_public")
+    tag = request.args.get("tag") or None
+    committee_id = request.args.get("committee_id") or None
+    document_type = request.args.get("document_type") or None
+    cursor = request.args.get("cursor") or None
+    per_page = min(int(request.args.get("per_page", 20)), 100)  # Limit to 100 max results
+    
+    scope = listing_scope(author_id, is_public, current_user)
+    if scope is None:
+        return jsonify({"data": [], "meta": {"per_page": per_page, "next_cursor": None, "has_more": False}}), 200
+    author_id, is_public = scope
+    
+    # Fetch one extra row to learn whether another page follows
+    query_params = {"limit": per_page + 1}
+    if author_id is not None:
+        query_params["author_id"] = author_id
+    if is_public is not None:
+        query_params["is_public"] = is_public
+    if tag:
+        query_params["tags"] = [tag]
+    if committee_id:
+        query_params["committee_id"] = committee_id
+    if document_type:
+        query_params["document_type"] = document_type
+    if cursor:
+        query_params.update(decode_cursor(cursor))
+    
+    query = _list_query(
+        author_id is not None, is_public is not None, bool(tag), bool(committee_id), bool(document_type), bool(cursor)
+    )
+    
+    try:
+        rows = supabase_request(method="GET", endpoint=query, params=query_params)
+    except Exception as e:
+        current_app.logger.error(f"Error listing documents: {str(e)}")
+        raise BadRequestError("Failed to list documents")
+    
+    rows, meta = cursor_page(rows, per_page)
+    
+    return jsonify({
+        "data": DOCUMENT_LIST_SERIALIZER.dump_many(rows),
+        "meta": meta,
+    }), 200
+
+
+@documents_bp.route("", methods=["POST"])
+@jwt_required()
+@rate_limit(limit_per_minute=20)
+def create_document():
+    """
+    Create a document owned by the current user.
+    
+    Request body:
+        title (str): Document title
+        content (str): Document body
+        document_type (str): One of the supported document types
+        tags (list, optional): Tags
+        is_public (bool, optional): Whether other users can read it
+        committee_id (str, optional): Committee the document belongs to
+        
+    Returns:
+        JSON: Created document metadata
+    """
+    current_user = get_jwt_identity()
+    data = request.get_json()
+    
+    if not data:
+        raise BadRequestError("No input data provided")
+    
+    errors = DocumentSchema(partial=("author_id",)).validate(data)
+    if errors:
+        raise ValidationFailedError(f"Validation error: {errors}")
+    
+    document = {k: v for k, v in data.items() if k in WRITABLE_FIELDS}
+    document["author_id"] = current_user
+    
+    try:
+        response = supabase_request(method="POST", endpoint=INSERT_DOCUMENT, data=document)
+    except Exception as e:
+        current_app.logger.error(f"Error creating document: {str(e)}")
+        raise BadRequestError("Failed to create document")
+    
+    if not response:
+        raise BadRequestError("Failed to create document")
+    
+    return jsonify(DocumentSchema(exclude=["content"]).dump(response[0])), 201
+
+
+@documents_bp.route("/<document_id>", methods=["GET"])
+@jwt_required()
+@rate_limit(limit_per_minute=60)
+def get_document(document_id):
+    """
+    Get a document's metadata.
+    
+    Args:
+        document_id (str): Document id
+        
+    Returns:
+        JSON: Document metadata (without content)
+    """
+    current_user = get_jwt_identity()
+    
+    try:
+        response = supabase_request(method="GET", endpoint=DOCUMENT_BY_ID, params={"id": document_id})
+    except Exception as e:
+        current_app.logger.error(f"Error getting document: {str(e)}")
+        raise BadRequestError("Failed to get document")
+    
+    if not response or not visible(response[0], current_user):
+        raise NotFoundError("Document not found")
+    
+    set_resource_version(document_id, response[0].get("updated_at"))
+    return jsonify(DocumentSchema(exclude=["content"]).dump(response[0])), 200
+
+
+@documents_bp.route("/<document_id>/content", methods=["GET"])
+@jwt_required()
+@rate_limit(limit_per_minute=60)
+def get_document_content(document_id):
+    """
+    Get the latest content of a document.
+    
+    The response carries an ETag for the document's revision. Clients that
+    send it back in ``If-None-Match`` get an empty 304 while the document is
+    unchanged, without the content being read.
+    
+    Args:
+        document_id (str): Document id
+        
+    Returns:
+        JSON: Document id, revision and content
+    """
+    current_user = get_jwt_identity()
+    
+    try:
+        # Check the version without pulling the content
+        document = _load_visible(document_id, current_user)
+        etag = _content_etag(document)
+        if etag_matches(etag):
+            not_modified = current_app.response_class(status=304)
+            not_modified.set_etag(etag)
+            not_modified.headers["Cache-Control"] = "private, no-cache"
+            return not_modified
+        
+        head = get_revision_store().head(document_id, document["revision"])
+    except Exception as e:
+        if isinstance(e, NotFoundError):
+            raise
+        current_app.logger.error(f"Error getting document content: {str(e)}")
+        raise BadRequestError("Failed to get document content")
+    
+    if head is None:
+        raise NotFoundError("Document not found")
+    
+    result = jsonify({
+        "id": document_id,
+        "revision": head.revision,
+        "content": head.content,
+    })
+    result.set_etag(_content_etag({"id": document_id, "revision": head.revision}))
+    result.headers["Cache-Control"] = "private, no-cache"
+    return result, 200
+
+
+@documents_bp.route("/<document_id>", methods=["PUT"])
+@jwt_required()
+@rate_limit(limit_per_minute=30)
+def update_document(document_id):
+    """
+    Update one of the current user's documents.
+    
+    Args:
+        document_id (str): Document id
+        
+    Request body:
+        Any of the fields accepted by ``POST /api/documents``
+        
+    Returns:
+        JSON: Updated document metadata
+    """
+    current_user = get_jwt_identity()
+    data = request.get_json()
+    
+    if not data:
+        raise BadRequestError("No input data provided")
+    
+    errors = DocumentSchema(partial=True).validate(data)
+    if errors:
+        raise ValidationFailedError(f"Validation error: {errors}")
+    
+    changes = {k: v for k, v in data.items() if k in WRITABLE_FIELDS}
+    if not changes:
+        raise BadRequestError("No updatable fields provided")
+    content = changes.pop("content", None)
+    
+    try:
+        if content is not None:
+            # A full replacement is stored as a snapshot revision
+            if get_revision_store().replace(document_id, current_user, content) is None:
+                raise NotFoundError("Document not found")
+        
+        if changes:
+            # updated_at orders listings
+            changes["updated_at"] = _now()
+            response = supabase_request(
+                method="PATCH",
+                endpoint=OWN_DOCUMENT,
+                data=changes,
+                params={"id": document_id, "author_id": current_user},
+            )
+        else:
+            response = supabase_request(method="GET", endpoint=DOCUMENT_BY_ID, params={"id": document_id})
+    except Exception as e:
+        if isinstance(e, NotFoundError):
+            raise
+        current_app.logger.error(f"Error updating document: {str(e)}")
+        raise BadRequestError("Failed to update document")
+    
+    if not response:
+        raise NotFoundError("Document not found")
+    
+    return jsonify(DocumentSchema(exclude=["content"]).dump(response[0])), 200
+
+
+@documents_bp.route("/<document_id>/revisions", methods=["POST"])
+@jwt_required()
+@rate_limit(limit_per_minute=120)
+def save_revision(document_id):
+    """
+    Save an edit as a patch against a base revision.
+    
+    Autosave sends only what changed. Ops replace ``[start, end)`` ranges of
+    the base revision's text, sorted and non-overlapping; an insertion has
+    ``start == end`` and a deletion an empty ``text``.
+    
+    Args:
+        document_id (str): Document id
+        
+    Request body:
+        base_revision (int): Revision the edit was made against
+        ops (list): ``{"start": int, "end": int, "text": str}`` operations
+        
+    Returns:
+        JSON: New revision number, text length and whether a snapshot was stored
+    """
+    current_user = get_jwt_identity()
+    data = request.get_json()
+    
+    if not data:
+        raise BadRequestError("No input data provided")
+    
+    base_revision = data.get("base_revision")
+    if not isinstance(base_revision, int) or isinstance(base_revision, bool) or base_revision < 0:
+        raise ValidationFailedError("base_revision must be a non-negative integer")
+    
+    try:
+        result = get_revision_store().save(document_id, current_user, base_revision, data.get("ops"))
+    except PatchError as e:
+        raise ValidationFailedError(str(e))
+    except RevisionConflict as e:
+        raise ConflictError(
+            "Document has changed since the base revision",
+            payload={"revision": e.revision},
+        )
+    except Exception as e:
+        current_app.logger.error(f"Error saving document revision: {str(e)}")
+        raise BadRequestError("Failed to save document")
+    
+    if result is None:
+        raise NotFoundError("Document not found")
+    
+    return jsonify(result), 201
+
+
+@documents_bp.route("/<document_id>/revisions", methods=["GET"])
+@jwt_required()
+@rate_limit(limit_per_minute=30)
+def list_revisions(document_id):
+    """
+    List a document's revisions, newest first.
+    
+    Args:
+        document_id (str): Document id
+        
+    Query parameters:
+        before (int, optional): Only revisions older than this one
+        per_page (int, optional): Number of results per page
+        
+    Returns:
+        JSON: Revision numbers, sizes and whether each is a snapshot
+    """
+    current_user = get_jwt_identity()
+    per_page = min(int(request.args.get("per_page", 50)), 200)  # Limit to 200 max results
+    
+    try:
+        document = _load_visible(document_id, current_user)
+        before = int(request.args.get("before", document["revision"] + 1))
+        rows = get_revision_store().history(document_id, before, per_page + 1)
+    except Exception as e:
+        if isinstance(e, NotFoundError):
+            raise
+        current_app.logger.error(f"Error listing document revisions: {str(e)}")
+        raise BadRequestError("Failed to list document revisions")
+    
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    
+    return jsonify({
+        "data": rows,
+        "meta": {
+            "per_page": per_page,
+            "next_before": rows[-1]["revision"] if has_more else None,
+            "has_more": has_more,
+        }
+    }), 200
+
+
+@documents_bp.route("/<document_id>/revisions/<int:revision>", methods=["GET"])
+@jwt_required()
+@rate_limit(limit_per_minute=30)
+def get_revision(document_id, revision):
+    """
+    Get the text of a document as of any revision.
+    
+    Revisions never change, so responses may be cached indefinitely.
+    
+    Args:
+        document_id (str): Document id
+        revision (int): Revision number
+        
+    Returns:
+        JSON: Document id, revision and content
+    """
+    current_user = get_jwt_identity()
+    
+    try:
+        document = _load_visible(document_id, current_user)
+        if revision > document["revision"]:
+            raise NotFoundError("Revision not found")
+        content = get_revision_store().rebuild(document_id, revision)
+    except Exception as e:
+        if isinstance(e, NotFoundError):
+            raise
+        current_app.logger.error(f"Error rebuilding document revision: {str(e)}")
+        raise BadRequestError("Failed to get document revision")
+    
+    if content is None:
+        raise NotFoundError("Revision not found")
+    
+    result = jsonify({"id": document_id, "revision": revision, "content": content})
+    result.set_etag(_content_etag({"id": document_id, "revision": revision}))
+    result.headers["Cache-Control"] = "private, max-age=31536000, immutable"
+    return result, 200
+
+
+@documents_bp.route("/<document_id>", methods=["DELETE"])
+@jwt_required()
+@rate_limit(limit_per_minute=30)
+def delete_document(document_id):
+    """
+    Delete one of the current user's documents.
+    
+    Args:
+        document_id (str): Document id
+        
+    Returns:
+        JSON: Confirmation
+    """
+    current_user = get_jwt_identity()
+    
+    try:
+        response = supabase_request(
+            method="DELETE",
+            endpoint=OWN_DOCUMENT,
+            params={"id": document_id, "author_id": current_user},
+        )
+    except Exception as e:
+        current_app.logger.error(f"Error deleting document: {str(e)}")
+        raise BadRequestError("Failed to delete document")
+    
+    if not response:
+        raise NotFoundError("Document not found")
+    
+    return jsonify({"message": "Document deleted"}), 200
@@ -0,0 +1,8 @@
+"""
+Research blueprint for AI research queries.
+"""
+from flask import Blueprint
+
+research_bp = Blueprint("research", __name__)
+
+from app.research import routes
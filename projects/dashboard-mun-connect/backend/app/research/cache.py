@@ -0,0 +1,329 @@
+"""
+Result cache for research queries.
+
+Delegates in a committee keep asking the same questions, so finished answers
+are cached per committee and model and reused instead of calling the model
+again; an answer is never served for a model other than the one that wrote it.
+
+Lookups have two tiers. The exact tier is keyed on the normalized query
+text (case, punctuation and whitespace folded), the committee and the
+model. The similarity tier catches rephrasings: every entry carries a MinHash
+signature of its content words (stop words and question phrasing dropped),
+indexed with locality-sensitive hashing (LSH) bands so candidates are found
+without scanning the cache. Candidates are confirmed with the exact Jaccard
+similarity of their word sets against ``threshold``. Words rather than
+character shingles keep "Brazil's position on X" close to "the position of
+Brazil on X" while "China's position on X" stays apart.
+
+Entries expire after ``ttl`` seconds and the least recently used entries
+are evicted beyond ``max_size``. When the app has a Redis cache, exact
+entries are also shared with the other workers; the similarity index is
+per worker.
+"""
+import hashlib
+import random
+import re
+import struct
+import threading
+import time
+import unicodedata
+from collections import OrderedDict, namedtuple
+
+_PUNCTUATION_RE = re.compile(r"[^\w\s]+", re.UNICODE)
+_WHITESPACE_RE = re.compile(r"\s+")
+
+# Words that carry no topic: articles, prepositions and question phrasing
+STOP_WORDS = frozenset("""
+a about an and any are as at be been can could describe did do does explain for from give
+has have how i in into is it its me of on or please regarding s should tell than that the
+their there these this those to was were what whats when where which who why will with
+would you your
+""".split())
+
+# Mersenne prime modulus for the MinHash permutations
+_PRIME = (1 << 61) - 1
+
+CachedResult = namedtuple("CachedResult", ["result", "model", "match", "similarity"])
+
+
+def normalize_query(text):
+    """
+    Fold a research query to the form used as its cache key.
+
+    Args:
+        text (str): Research question
+
+    Returns:
+        str: Lower-cased text without punctuation and with single spaces
+    """
+    text = unicodedata.normalize("NFKC", text or "").lower()
+    text = _PUNCTUATION_RE.sub(" ", text)
+    return _WHITESPACE_RE.sub(" ", text).strip()
+
+
+def content_words(text):
+    """
+    Return the topic words of normalized text.
+
+    Stop words are dropped and a plural ``s`` is stripped from longer words.
+
+    Args:
+        text (str): Normalized text
+
+    Returns:
+        set: Words; all words if every one of them is a stop word
+    """
+    words = text.split()
+    result = {
+        word[:-1] if len(word) > 3 and word.endswith("s") and not word.endswith("ss") else word
+        for word in words
+        if word not in STOP_WORDS
+    }
+    return result or set(words)
+
+
+def jaccard(a, b):
+    """Jaccard similarity of two sets."""
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+class MinHasher:
+    """
+    MinHash signatures with a fixed set of random permutations.
+
+    Args:
+        permutations (int): Signature length
+        seed (int): Seed for the permutation coefficients
+    """
+
+    def __init__(self, permutations=64, seed=1):
+        rng = random.Random(seed)
+        self.coefficients = [
+            (rng.randrange(1, _PRIME), rng.randrange(0, _PRIME)) for _ in range(permutations)
+        ]
+
+    def signature(self, items):
+        """
+        Compute the signature of a set of strings.
+
+        Args:
+            items (set): Words
+
+        Returns:
+            tuple: One minimum hash per permutation
+        """
+        hashes = [
+            struct.unpack("<Q", hashlib.blake2b(item.encode("utf-8"), digest_size=8).digest())[0]
+            for item in items
+        ]
+        if not hashes:
+            return tuple(0 for _ in self.coefficients)
+        return tuple(min((a * h + b) % _PRIME for h in hashes) for a, b in self.coefficients)
+
+
+class _Entry:
+    __slots__ = ("scope", "normalized", "words", "bands", "result", "model", "expires_at")
+
+    def __init__(self, scope, normalized, words, bands, result, model, expires_at):
+        self.scope = scope
+        self.normalized = normalized
+        self.words = words
+        self.bands = bands
+        self.result = result
+        self.model = model
+        self.expires_at = expires_at
+
+
+class ResearchCache:
+    """
+    Exact and near-duplicate result cache, scoped by committee and model.
+
+    Args:
+        max_size (int): Entries kept per worker
+        ttl (int): Entry lifetime in seconds
+        threshold (float): Minimum content-word Jaccard similarity for a
+            near-duplicate hit; 1.0 or more disables the similarity tier
+        permutations (int): MinHash signature length
+        bands (int): LSH bands; ``permutations`` must divide evenly
+        shared (RedisCache, optional): Shared tier for exact entries
+    """
+
+    def __init__(self, max_size=5000, ttl=86400, threshold=0.8, permutations=64, bands=16, shared=None):
+        if permutations % bands:
+            raise ValueError("permutations must be a multiple of bands")
+        self.max_size = max_size
+        self.ttl = ttl
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = permutations // bands
+        self.hasher = MinHasher(permutations)
+        self.shared = shared
+        self._entries = OrderedDict()
+        self._buckets = {}
+        self._lock = threading.Lock()
+        self._stats = {"exact": 0, "similar": 0, "misses": 0, "stores": 0, "evictions": 0}
+
+    @staticmethod
+    def scope(committee_id, model=None):
+        return f"{committee_id or '-'}\x00{model or '-'}"
+
+    @staticmethod
+    def key(normalized, committee_id=None, model=None):
+        """
+        Exact-tier key of a normalized query.
+
+        Args:
+            normalized (str): Output of ``normalize_query``
+            committee_id (str, optional): Committee the query is for
+            model (str, optional): Model answering it
+
+        Returns:
+            str: Cache key
+        """
+        scope = ResearchCache.scope(committee_id, model)
+        return hashlib.sha1(f"{scope}\x00{normalized}".encode("utf-8")).hexdigest()
+
+    def lookup(self, query, committee_id=None, model=None):
+        """
+        Find a cached answer for a query or a near-duplicate of it.
+
+        Args:
+            query (str): Research question
+            committee_id (str, optional): Committee the query is for
+            model (str, optional): Model the answer must come from
+
+        Returns:
+            CachedResult: The answer and how it matched, or None
+        """
+        normalized = normalize_query(query)
+        key = self.key(normalized, committee_id, model)
+        scope = self.scope(committee_id, model)
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at <= now:
+                self._evict(key)
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self._stats["exact"] += 1
+                return CachedResult(entry.result, entry.model, "exact", 1.0)
+
+        if self.shared is not None:
+            value = self.shared.get(f"research:{key}")
+            if value is not None:
+                self._store(key, scope, normalized, value["result"], value.get("model"), now)
+                with self._lock:
+                    self._stats["exact"] += 1
+                return CachedResult(value["result"], value.get("model"), "exact", 1.0)
+
+        if self.threshold < 1.0:
+            items = content_words(normalized)
+            bands = self._bands(scope, self.hasher.signature(items))
+            with self._lock:
+                best, best_score = None, 0.0
+                candidates = set()
+                for band in bands:
+                    candidates.update(self._buckets.get(band, ()))
+                for candidate in candidates:
+                    entry = self._entries[candidate]
+                    if entry.expires_at <= now:
+                        continue
+                    score = jaccard(items, entry.words)
+                    if score >= self.threshold and score > best_score:
+                        best, best_score = candidate, score
+                if best is not None:
+                    entry = self._entries[best]
+                    self._entries.move_to_end(best)
+                    self._stats["similar"] += 1
+                    return CachedResult(entry.result, entry.model, "similar", round(best_score, 3))
+
+        with self._lock:
+            self._stats["misses"] += 1
+        return None
+
+    def store(self, query, committee_id, result, model):
+        """
+        Cache the answer to a query.
+
+        Args:
+            query (str): Research question
+            committee_id (str, optional): Committee the query is for
+            result (str): Answer
+            model (str): Model that produced it
+        """
+        normalized = normalize_query(query)
+        if not normalized or not result:
+            return
+        key = self.key(normalized, committee_id, model)
+        self._store(key, self.scope(committee_id, model), normalized, result, model, time.monotonic())
+        with self._lock:
+            self._stats["stores"] += 1
+        if self.shared is not None:
+            self.shared.set(f"research:{key}", {"result": result, "model": model}, timeout=self.ttl)
+
+    def _bands(self, scope, signature):
+        rows = self.rows
+        return [(scope, i, signature[i * rows:(i + 1) * rows]) for i in range(self.bands)]
+
+    def _store(self, key, scope, normalized, result, model, now):
+        items = content_words(normalized)
+        bands = self._bands(scope, self.hasher.signature(items)) if self.threshold < 1.0 else ()
+        entry = _Entry(scope, normalized, items, bands, result, model, now + self.ttl)
+        with self._lock:
+            if key in self._entries:
+                self._evict(key, count=False)
+            self._entries[key] = entry
+            for band in bands:
+                self._buckets.setdefault(band, set()).add(key)
+            while len(self._entries) > self.max_size:
+                self._evict(next(iter(self._entries)))
+
+    def _evict(self, key, count=True):
+        """Drop an entry and its LSH buckets; the caller holds the lock."""
+        entry = self._entries.pop(key)
+        for band in entry.bands:
+            bucket = self._buckets.get(band)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self._buckets[band]
+        if count:
+            self._stats["evictions"] += 1
+
+    def stats(self):
+        """Return hit counters and the current size."""
+        with self._lock:
+            return dict(self._stats, size=len(self._entries), buckets=len(self._buckets))
+
+
+def build_research_cache(config):
+    """
+    Build the research result cache from the app config.
+
+    Args:
+        config (dict): Application config
+
+    Returns:
+        ResearchCache: Configured cache, or None if ``RESEARCH_CACHE_SIZE`` is 0
+    """
+    max_size = config.get("RESEARCH_CACHE_SIZE", 5000)
+    if not max_size:
+        return None
+    ttl = config.get("RESEARCH_CACHE_TTL", 86400)
+    shared = None
+    if config.get("CACHE_TYPE") == "RedisCache" and config.get("CACHE_REDIS_URL"):
+        from app.core.cache import RedisCache
+
+        shared = RedisCache(config["CACHE_REDIS_URL"], default_timeout=ttl)
+    return ResearchCache(
+        max_size=max_size,
+        ttl=ttl,
+        threshold=config.get("RESEARCH_SIMILARITY_THRESHOLD", 0.8),
+        permutations=config.get("RESEARCH_MINHASH_PERMUTATIONS", 64),
+        bands=config.get("RESEARCH_LSH_BANDS", 16),
+        shared=shared,
+    )
@@ -0,0 +1,470 @@
+"""
+Research job queue.
+
+``JobQueue`` runs research queries on a thread pool owned by the worker
+process that accepted them. Jobs wait in a queue per model and are started
+only while that model is under its concurrency limit, so a slow or
+rate-limited provider never ties up the threads other models need.
+
+Progress is published as numbered events on a broker: ``status`` when a job
+starts, ``chunk`` for each piece of the answer and a final ``done`` or
+``error``. ``InProcessBroker`` keeps events in memory, which is enough when
+clients stream from the worker running their job. ``RedisBroker``
+(``RESEARCH_BROKER_URL``) shares them so any worker can serve the stream.
+Subscribers first replay the events they missed, so a reconnecting client
+resumes from its ``Last-Event-ID``.
+
+Identical queries (same normalized text and committee) that arrive while
+one is already running are coalesced: the later jobs join the running one's
+``_Flight``, receive a replay of the answer so far and then every event it
+publishes, and have their rows written with the same result. Completed
+answers are stored in the ``ResearchCache``.
+
+Jobs live only in the memory of the process that accepted them, so a worker
+restart leaves their rows ``pending`` or ``running``. Every worker
+periodically marks rows that have been unfinished for longer than
+``RESEARCH_JOB_TIMEOUT`` as failed (``JobQueue.reap_stale``).
+"""
+import json
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from flask import current_app
+
+from app.core.query import Query, Param
+from app.research.cache import ResearchCache, build_research_cache, normalize_query
+from app.research.providers import build_models
+
+UPDATE_RESEARCH_QUERIES = Query("research_queries").select("id").in_("id", Param("ids"))
+# Served by idx_research_queries_unfinished
+STALE_RESEARCH_QUERIES = Query("research_queries").select("id").in_("status", ("pending", "running")).lt(
+    "created_at", Param("cutoff")
+)
+
+FINAL_EVENTS = ("done", "error")
+
+
+class _Channel:
+    """Event history of one job."""
+
+    __slots__ = ("events", "condition", "closed_at")
+
+    def __init__(self):
+        self.events = []
+        self.condition = threading.Condition()
+        self.closed_at = None
+
+
+class InProcessBroker:
+    """
+    Per-process event broker.
+
+    Event histories are kept for ``retention`` seconds after a job finishes
+    so late subscribers still receive the whole answer.
+    """
+
+    # Only jobs run by this process publish here
+    shared = False
+
+    def __init__(self, retention=300):
+        self.retention = retention
+        self._channels = {}
+        self._lock = threading.Lock()
+
+    def _channel(self, job_id, create=False):
+        with self._lock:
+            channel = self._channels.get(job_id)
+            if channel is None and create:
+                channel = self._channels[job_id] = _Channel()
+            return channel
+
+    def publish(self, job_id, event):
+        """
+        Append an event to a job's stream.
+
+        Args:
+            job_id (str): Job id
+            event (dict): ``seq``, ``event`` and ``data`` keys
+        """
+        channel = self._channel(job_id, create=True)
+        with channel.condition:
+            channel.events.append(event)
+            if event["event"] in FINAL_EVENTS:
+                channel.closed_at = time.monotonic()
+            channel.condition.notify_all()
+        if event["event"] in FINAL_EVENTS:
+            self._prune()
+
+    def subscribe(self, job_id, after=0, timeout=15):
+        """
+        Stream a job's events.
+
+        Args:
+            job_id (str): Job id
+            after (int): Only events with a higher ``seq``
+            timeout (float): Seconds to wait before yielding a heartbeat
+
+        Yields:
+            dict: Events in order, or None after ``timeout`` seconds without
+            one; the stream ends after the final event
+        """
+        channel = self._channel(job_id, create=True)
+        position = after
+        while True:
+            with channel.condition:
+                pending = [e for e in channel.events[position:] if e["seq"] > after]
+                if not pending and channel.closed_at is None:
+                    channel.condition.wait(timeout)
+                    pending = [e for e in channel.events[position:] if e["seq"] > after]
+                position = len(channel.events)
+            if not pending:
+                yield None
+                continue
+            for event in pending:
+                yield event
+                if event["event"] in FINAL_EVENTS:
+                    return
+
+    def has(self, job_id):
+        """Whether the broker holds events for a job."""
+        channel = self._channel(job_id)
+        return channel is not None and bool(channel.events)
+
+    def _prune(self):
+        cutoff = time.monotonic() - self.retention
+        with self._lock:
+            expired = [k for k, c in self._channels.items() if c.closed_at is not None and c.closed_at < cutoff]
+            for job_id in expired:
+                del self._channels[job_id]
+
+
+class RedisBroker:
+    """
+    Event broker shared by all workers through Redis.
+
+    Each job's events are appended to a list (the replay history) and
+    published on a channel (live delivery).
+    """
+
+    shared = True
+
+    def __init__(self, url, retention=300, prefix="mun:research:"):
+        import redis
+
+        self.retention = retention
+        self.prefix = prefix
+        self.client = redis.Redis.from_url(url)
+
+    def _key(self, job_id):
+        return f"{self.prefix}{job_id}"
+
+    def publish(self, job_id, event):
+        key = self._key(job_id)
+        payload = json.dumps(event)
+        pipe = self.client.pipeline()
+        pipe.rpush(key, payload)
+        pipe.expire(key, self.retention)
+        pipe.publish(key, payload)
+        pipe.execute()
+
+    def subscribe(self, job_id, after=0, timeout=15):
+        key = self._key(job_id)
+        pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        # Subscribe before reading the history so nothing falls in between
+        pubsub.subscribe(key)
+        try:
+            last = after
+            for raw in self.client.lrange(key, 0, -1):
+                event = json.loads(raw)
+                if event["seq"] <= last:
+                    continue
+                last = event["seq"]
+                yield event
+                if event["event"] in FINAL_EVENTS:
+                    return
+            while True:
+                message = pubsub.get_message(timeout=timeout)
+                if message is None:
+                    yield None
+                    continue
+                event = json.loads(message["data"])
+                if event["seq"] <= last:
+                    continue
+                last = event["seq"]
+                yield event
+                if event["event"] in FINAL_EVENTS:
+                    return
+        finally:
+            pubsub.close()
+
+    def has(self, job_id):
+        return bool(self.client.exists(self._key(job_id)))
+
+
+class _Flight:
+    """
+    One model execution shared by every job asking the same question.
+
+    Each job has its own event sequence so clients see the usual numbering
+    whether they started the execution or joined it.
+    """
+
+    def __init__(self, broker, key, query, committee_id, job_id):
+        self.broker = broker
+        self.key = key
+        self.query = query
+        self.committee_id = committee_id
+        self.jobs = {job_id: 0}
+        self.events = []
+        self._lock = threading.Lock()
+
+    def publish(self, event, **data):
+        with self._lock:
+            self.events.append((event, data))
+            for job_id in self.jobs:
+                self._send(job_id, event, data)
+
+    def join(self, job_id):
+        """Attach a job and replay what the execution has published so far."""
+        with self._lock:
+            self.jobs[job_id] = 0
+            if self.events:
+                text = "".join(data["text"] for event, data in self.events if event == "chunk")
+                self._send(job_id, *self.events[0])
+                if text:
+                    self._send(job_id, "chunk", {"text": text})
+
+    def job_ids(self):
+        with self._lock:
+            return list(self.jobs)
+
+    def _send(self, job_id, event, data):
+        self.jobs[job_id] += 1
+        self.broker.publish(job_id, {"seq": self.jobs[job_id], "event": event, "data": data})
+
+
+class JobQueue:
+    """Thread pool with a FIFO queue and a concurrency limit per model."""
+
+    def __init__(self, app, broker, models, workers=16, cache=None, job_timeout=900):
+        self.app = app
+        self.broker = broker
+        self.models = models
+        self.cache = cache
+        self.job_timeout = job_timeout
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="research")
+        self._pending = {name: deque() for name in models}
+        self._running = {name: 0 for name in models}
+        self._flights = {}
+        self._coalesced = 0
+        self._reaped = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def enqueue(self, job_id, query, model_name, committee_id=None):
+        """
+        Queue a research query, or attach it to an identical one in flight.
+
+        Args:
+            job_id (str): ``research_queries`` row id
+            query (str): Research question
+            model_name (str): One of the configured models
+            committee_id (str, optional): Committee the query is for
+
+        Returns:
+            bool: True if the job joined a query that is already queued or
+            running and will share its result
+
+        Raises:
+            KeyError: If the model is not configured
+        """
+        if model_name not in self.models:
+            raise KeyError(model_name)
+        key = ResearchCache.key(normalize_query(query), committee_id, model_name)
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None:
+                flight.join(job_id)
+                self._coalesced += 1
+                return True
+            flight = self._flights[key] = _Flight(self.broker, key, query, committee_id, job_id)
+            self._pending[model_name].append(flight)
+        self._dispatch(model_name)
+        return False
+
+    def _dispatch(self, model_name):
+        limit = self.models[model_name][1]
+        with self._lock:
+            while self._pending[model_name] and self._running[model_name] < limit:
+                flight = self._pending[model_name].popleft()
+                self._running[model_name] += 1
+                self.executor.submit(self._run, flight, model_name)
+
+    def _run(self, flight, model_name):
+        model = self.models[model_name][0]
+
+        try:
+            with self.app.app_context():
+                flight.publish("status", status="running", model=model_name)
+                self._write(flight.job_ids(), {"status": "running", "model_used": model_name})
+                try:
+                    chunks = []
+                    for chunk in model.stream(flight.query):
+                        chunks.append(chunk)
+                        flight.publish("chunk", text=chunk)
+                except Exception as e:
+                    current_app.logger.error(f"Research query {flight.key} failed: {str(e)}")
+                    job_ids = self._land(flight)
+                    self._write(job_ids, {"status": "failed"})
+                    flight.publish("error", status="failed", message="Research query failed")
+                    return
+
+                result = "".join(chunks)
+                if self.cache is not None and model.cacheable:
+                    self.cache.store(flight.query, flight.committee_id, result, model_name)
+                job_ids = self._land(flight)
+                self._write(job_ids, {"status": "completed", "model_used": model_name, "result": result})
+                flight.publish("done", status="completed")
+        except Exception as e:
+            self.app.logger.error(f"Research job {flight.key} crashed: {str(e)}")
+        finally:
+            with self._lock:
+                self._flights.pop(flight.key, None)
+                self._running[model_name] -= 1
+            self._dispatch(model_name)
+
+    def owns(self, job_id):
+        """Whether a job is queued or running in this process."""
+        with self._lock:
+            return any(job_id in flight.jobs for flight in self._flights.values())
+
+    def reap_stale(self):
+        """
+        Mark jobs unfinished for longer than ``job_timeout`` as failed.
+
+        They were accepted by a worker that has since stopped, so nothing
+        will ever finish them. Must run inside an app context.
+
+        Returns:
+            list: Ids of the rows marked failed
+        """
+        from app.core.utils import supabase_request
+
+        now = datetime.now(timezone.utc)
+        cutoff = datetime.fromtimestamp(now.timestamp() - self.job_timeout, timezone.utc)
+        rows = supabase_request(
+            method="PATCH",
+            endpoint=STALE_RESEARCH_QUERIES,
+            data={"status": "failed", "updated_at": now.isoformat()},
+            params={"cutoff": cutoff.isoformat()},
+        ) or []
+        if rows:
+            with self._lock:
+                self._reaped += len(rows)
+            current_app.logger.warning(f"Marked {len(rows)} abandoned research queries as failed")
+        return [row["id"] for row in rows]
+
+    def start_reaper(self, interval):
+        """Run ``reap_stale`` now and then every ``interval`` seconds."""
+        threading.Thread(target=self._reap_forever, args=(interval,), name="research-reaper", daemon=True).start()
+
+    def _reap_forever(self, interval):
+        with self.app.app_context():
+            while not self._stop.is_set():
+                try:
+                    self.reap_stale()
+                except Exception as e:
+                    current_app.logger.warning(f"Failed to reap abandoned research queries: {str(e)}")
+                self._stop.wait(interval)
+
+    def _land(self, flight):
+        """Stop new jobs joining a finished flight and return its jobs."""
+        with self._lock:
+            self._flights.pop(flight.key, None)
+        return flight.job_ids()
+
+    def _write(self, job_ids, changes):
+        """Write job state back to ``research_queries``; failures are logged only."""
+        from app.core.utils import supabase_request
+
+        try:
+            supabase_request(
+                method="PATCH",
+                endpoint=UPDATE_RESEARCH_QUERIES,
+                data=dict(changes, updated_at=datetime.now(timezone.utc).isoformat()),
+                params={"ids": job_ids},
+            )
+        except Exception as e:
+            current_app.logger.warning(f"Failed to update research queries {job_ids}: {str(e)}")
+
+    def stats(self):
+        """Return queued and running jobs per model, coalescing and cache counters."""
+        with self._lock:
+            stats = {
+                "models": {
+                    name: {
+                        "pending": len(self._pending[name]),
+                        "running": self._running[name],
+                        "limit": self.models[name][1],
+                    }
+                    for name in self.models
+                },
+                "in_flight": len(self._flights),
+                "coalesced": self._coalesced,
+                "reaped": self._reaped,
+            }
+        stats["cache"] = self.cache.stats() if self.cache is not None else None
+        return stats
+
+    def shutdown(self, wait=True):
+        self._stop.set()
+        self.executor.shutdown(wait=wait)
+
+
+def init_research_queue(app):
+    """
+    Create the research job queue and register it on the app.
+
+    ``RESEARCH_DEFAULT_MODEL`` is replaced by the first available model when
+    it is not available itself.
+
+    Args:
+        app (Flask): Application to register with
+    """
+    retention = app.config.get("RESEARCH_EVENT_RETENTION", 300)
+    if app.config.get("RESEARCH_BROKER_URL"):
+        broker = RedisBroker(app.config["RESEARCH_BROKER_URL"], retention=retention)
+    else:
+        broker = InProcessBroker(retention=retention)
+
+    models = build_models(app.config)
+    default = app.config.get("RESEARCH_DEFAULT_MODEL")
+    if models and default not in models:
+        # e.g. the default's provider has no API key on this deployment
+        fallback = next(iter(models))
+        app.logger.warning(f"Research model {default} is not available; defaulting to {fallback}")
+        app.config["RESEARCH_DEFAULT_MODEL"] = fallback
+    elif not models:
+        app.logger.warning("No research model is available; set OPENAI_API_KEY or ANTHROPIC_API_KEY")
+
+    queue = JobQueue(
+        app,
+        broker,
+        models,
+        workers=app.config.get("RESEARCH_WORKERS", 16),
+        cache=build_research_cache(app.config),
+        job_timeout=app.config.get("RESEARCH_JOB_TIMEOUT", 900),
+    )
+    app.extensions["research"] = queue
+
+    interval = app.config.get("RESEARCH_REAP_INTERVAL", 300)
+    if interval:
+        queue.start_reaper(interval)
+
+
+def get_research_queue():
+    """Return the research job queue registered on the current app."""
+    return current_app.extensions["research"]
@@ -0,0 +1,186 @@
+"""
+Language model providers for research queries.
+
+Each provider streams the answer to a research query as text chunks.
+``RESEARCH_MODELS`` maps the model names clients may request to a provider
+and a per-model concurrency limit; models whose provider has no API key
+configured are not offered. ``StubModel`` needs no network access and is
+used by the testing configuration.
+"""
+import json
+import threading
+import time
+
+import httpx
+
+SYSTEM_PROMPT = (
+    "You are a research assistant for Model United Nations delegates. Answer with concise, "
+    "factual background, relevant treaties and resolutions, and country positions where known."
+)
+
+
+class ResearchModel:
+    """Interface for a streaming research model."""
+
+    provider = None
+    # Whether answers may be reused for other delegates through the result cache
+    cacheable = True
+
+    def __init__(self, name):
+        self.name = name
+        self._session = None
+        self._session_lock = threading.Lock()
+
+    @property
+    def session(self):
+        """HTTP session, built on first use so unused providers cost nothing at startup."""
+        if self._session is None:
+            with self._session_lock:
+                if self._session is None:
+                    self._session = self.build_session()
+        return self._session
+
+    def build_session(self):
+        """Return the provider's HTTP session."""
+        raise NotImplementedError
+
+    def stream(self, query):
+        """
+        Generate an answer to a research query.
+
+        Args:
+            query (str): Research question
+
+        Yields:
+            str: Chunks of the answer, in order
+        """
+        raise NotImplementedError
+
+
+class StubModel(ResearchModel):
+    """Deterministic offline model that echoes the query back in chunks."""
+
+    provider = "stub"
+    cacheable = False
+
+    def __init__(self, name, delay=0.0):
+        super().__init__(name)
+        self.delay = delay
+
+    def stream(self, query):
+        answer = f"Research notes on: {query}\n\nNo model provider is configured; this is a stub answer."
+        for word in answer.split(" "):
+            if self.delay:
+                time.sleep(self.delay)
+            yield word + " "
+
+
+class OpenAIModel(ResearchModel):
+    """Chat Completions API with server-sent event streaming."""
+
+    provider = "openai"
+    url = "https://api.openai.com/v1/chat/completions"
+
+    def __init__(self, name, api_key, timeout=60.0):
+        super().__init__(name)
+        self.api_key = api_key
+        self.timeout = timeout
+
+    def build_session(self):
+        return httpx.Client(timeout=self.timeout, headers={"Authorization": f"Bearer {self.api_key}"})
+
+    def stream(self, query):
+        payload = {
+            "model": self.name,
+            "stream": True,
+            "messages": [
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": query},
+            ],
+        }
+        with self.session.stream("POST", self.url, json=payload) as response:
+            _check(response)
+            for data in _sse_data(response):
+                if data == "[DONE]":
+                    break
+                choices = json.loads(data).get("choices") or []
+                text = choices[0].get("delta", {}).get("content") if choices else None
+                if text:
+                    yield text
+
+
+class AnthropicModel(ResearchModel):
+    """Messages API with server-sent event streaming."""
+
+    provider = "anthropic"
+    url = "https://api.anthropic.com/v1/messages"
+
+    def __init__(self, name, api_key, timeout=60.0, max_tokens=2048):
+        super().__init__(name)
+        self.api_key = api_key
+        self.timeout = timeout
+        self.max_tokens = max_tokens
+
+    def build_session(self):
+        return httpx.Client(
+            timeout=self.timeout,
+            headers={"x-api-key": self.api_key, "anthropic-version": "2023-06-01"},
+        )
+
+    def stream(self, query):
+        payload = {
+            "model": self.name,
+            "stream": True,
+            "max_tokens": self.max_tokens,
+            "system": SYSTEM_PROMPT,
+            "messages": [{"role": "user", "content": query}],
+        }
+        with self.session.stream("POST", self.url, json=payload) as response:
+            _check(response)
+            for data in _sse_data(response):
+                event = json.loads(data)
+                if event.get("type") == "content_block_delta":
+                    text = event.get("delta", {}).get("text")
+                    if text:
+                        yield text
+                elif event.get("type") == "message_stop":
+                    break
+
+
+def _check(response):
+    if response.status_code >= 400:
+        response.read()
+        raise RuntimeError(f"{response.status_code} {response.text}")
+
+
+def _sse_data(response):
+    """Yield the ``data:`` payloads of a server-sent event stream."""
+    for line in response.iter_lines():
+        if line.startswith("data:"):
+            yield line[5:].strip()
+
+
+def build_models(config):
+    """
+    Instantiate every configured model whose provider is available.
+
+    Args:
+        config (dict): Application config
+
+    Returns:
+        dict: Model name to ``(ResearchModel, concurrency)``
+    """
+    keys = {"openai": config.get("OPENAI_API_KEY"), "anthropic": config.get("ANTHROPIC_API_KEY")}
+    models = {}
+    for name, spec in (config.get("RESEARCH_MODELS") or {}).items():
+        provider = spec.get("provider")
+        if provider == "stub":
+            model = StubModel(name, delay=config.get("RESEARCH_STUB_DELAY", 0.0))
+        elif provider == "openai" and keys["openai"]:
+            model = OpenAIModel(name, keys["openai"], timeout=config.get("RESEARCH_TIMEOUT", 60.0))
+        elif provider == "anthropic" and keys["anthropic"]:
+            model = AnthropicModel(name, keys["anthropic"], timeout=config.get("RESEARCH_TIMEOUT", 60.0))
+        else:
+            continue
+        models[name] = (model, max(1, int(spec.get("concurrency", 4))))
+    return models
@@ -0,0 +1,307 @@
+"""
+Research routes for queuing AI research queries and streaming their results.
+"""
+import json
+import time
+
+from flask import request, jsonify, current_app, Response, stream_with_context
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from app.research import research_bp
+from app.research.jobs import get_research_queue
+from app.core.utils import supabase_request, rate_limit, admin_required
+from app.core.errors import BadRequestError, NotFoundError, ValidationFailedError
+from app.core.query import Query, Param
+from app.core.pagination import AFTER_CURSOR, cursor_page, decode_cursor, keyset_order
+from app.core.schemas import ResearchQuerySchema
+from app.core.serializers import serializer
+
+
+RESEARCH_LIST_COLUMNS = ("id", "query", "status", "model_used", "user_id", "committee_id", "created_at", "updated_at")
+RESEARCH_COLUMNS = RESEARCH_LIST_COLUMNS + ("result",)
+
+RESEARCH_QUERIES = Query("research_queries")
+INSERT_RESEARCH_QUERY = RESEARCH_QUERIES.select(*RESEARCH_LIST_COLUMNS)
+OWN_RESEARCH_QUERY = RESEARCH_QUERIES.select(*RESEARCH_COLUMNS).eq("id", Param("id")).eq(
+    "user_id", Param("user_id")
+).limit(1)
+OWN_RESEARCH_QUERIES = keyset_order(RESEARCH_QUERIES.select(*RESEARCH_LIST_COLUMNS).eq("user_id", Param("user_id")))
+OWN_RESEARCH_QUERIES_AFTER = keyset_order(
+    RESEARCH_QUERIES.select(*RESEARCH_LIST_COLUMNS).eq("user_id", Param("user_id")).or_(*AFTER_CURSOR)
+)
+
+RESEARCH_LIST_SERIALIZER = serializer(ResearchQuerySchema, exclude=("result",))
+
+MAX_QUERY_LENGTH = 4000
+
+FINISHED_STATUSES = ("completed", "failed")
+
+
+def _sse(event, data, event_id=None):
+    """Format one server-sent event."""
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data)}")
+    return "\n".join(lines) + "\n\n"
+
+
+def _final_events(research_query):
+    """Events replaying a finished query from its row."""
+    if research_query["status"] == "completed":
+        yield _sse("chunk", {"text": research_query.get("result") or ""})
+        yield _sse("done", {"status": "completed"})
+    else:
+        yield _sse("error", {"status": "failed", "message": "Research query failed"})
+
+
+def _poll_events(query_id, current_user, interval, heartbeat):
+    """Follow a query through its row until it finishes, with heartbeats."""
+    last_beat = time.monotonic()
+    while True:
+        time.sleep(interval)
+        research_query = _load_own(query_id, current_user)
+        if research_query["status"] in FINISHED_STATUSES:
+            yield from _final_events(research_query)
+            return
+        if time.monotonic() - last_beat >= heartbeat:
+            last_beat = time.monotonic()
+            yield ": heartbeat\n\n"
+
+
+def _load_own(query_id, current_user):
+    response = supabase_request(
+        method="GET",
+        endpoint=OWN_RESEARCH_QUERY,
+        params={"id": query_id, "user_id": current_user},
+    )
+    if not response:
+        raise NotFoundError("Research query not found")
+    return response[0]
+
+
+@research_bp.route("/queries", methods=["POST"])
+@jwt_required()
+@rate_limit(limit_per_minute=10)
+def create_research_query():
+    """
+    Queue a research query.
+    
+    Returns immediately; the answer is produced in the background. Poll
+    ``GET /api/research/queries/<id>`` or stream ``/events`` to follow it.
+    
+    If the same question, or a near-duplicate of it, was already answered
+    for the committee, the query is created completed with the cached
+    answer and ``cache`` is ``"exact"`` or ``"similar"``. An identical
+    question to the same model that is still running is shared instead of
+    run again (``cache`` is ``"coalesced"``). Answers are only reused for the
+    model that produced them, and stub answers are never cached.
+    
+    Request body:
+        query (str): Research question
+        model (str, optional): Model to use; defaults to ``RESEARCH_DEFAULT_MODEL``
+        committee_id (str, optional): Committee the research is for
+        refresh (bool, optional): Skip cached answers
+        
+    Returns:
+        JSON: The research query, how it was served and its event stream URL
+    """
+    current_user = get_jwt_identity()
+    data = request.get_json()
+    
+    if not data:
+        raise BadRequestError("No input data provided")
+    
+    query = (data.get("query") or "").strip()
+    if not query:
+        raise ValidationFailedError("query is required")
+    if len(query) > MAX_QUERY_LENGTH:
+        raise ValidationFailedError(f"query must be at most {MAX_QUERY_LENGTH} characters")
+    
+    research_queue = get_research_queue()
+    model = data.get("model") or current_app.config.get("RESEARCH_DEFAULT_MODEL")
+    if model not in research_queue.models:
+        raise ValidationFailedError(f"model must be one of: {', '.join(research_queue.models)}")
+    
+    committee_id = data.get("committee_id") or None
+    cached = None
+    if research_queue.cache is not None and not data.get("refresh"):
+        cached = research_queue.cache.lookup(query, committee_id, model)
+    
+    row = {"query": query, "status": "pending", "model_used": model, "user_id": current_user}
+    if cached is not None:
+        row.update(status="completed", model_used=cached.model or model, result=cached.result)
+    if committee_id:
+        row["committee_id"] = committee_id
+    
+    try:
+        response = supabase_request(method="POST", endpoint=INSERT_RESEARCH_QUERY, data=row)
+    except Exception as e:
+        current_app.logger.error(f"Error creating research query: {str(e)}")
+        raise BadRequestError("Failed to create research query")
+    
+    if not response:
+        raise BadRequestError("Failed to create research query")
+    
+    research_query = response[0]
+    if cached is not None:
+        research_query["result"] = cached.result
+        cache = cached.match
+    elif research_queue.enqueue(research_query["id"], query, model, committee_id=committee_id):
+        cache = "coalesced"
+    else:
+        cache = None
+    
+    result = ResearchQuerySchema().dump(research_query)
+    result["cache"] = cache
+    result["events_url"] = f"{request.path}/{research_query['id']}/events"
+    return jsonify(result), 201 if cached is not None else 202
+
+
+@research_bp.route("/queries", methods=["GET"])
+@jwt_required()
+@rate_limit(limit_per_minute=30)
+def list_research_queries():
+    """
+    List the current user's research queries, newest first, without results.
+    
+    Query parameters:
+        cursor (str, optional): ``next_cursor`` from the previous page
+        per_page (int, optional): Number of results per page
+        
+    Returns:
+        JSON: Page of research queries and the next cursor
+    """
+    current_user = get_jwt_identity()
+    cursor = request.args.get("cursor") or None
+    per_page = min(int(request.args.get("per_page", 20)), 100)  # Limit to 100 max results
+    
+    # Fetch one extra row to learn whether another page follows
+    query_params = {"user_id": current_user, "limit": per_page + 1}
+    if cursor:
+        query_params.update(decode_cursor(cursor))
+    
+    try:
+        rows = supabase_request(
+            method="GET",
+            endpoint=OWN_RESEARCH_QUERIES_AFTER if cursor else OWN_RESEARCH_QUERIES,
+            params=query_params,
+        )
+    except Exception as e:
+        current_app.logger.error(f"Error listing research queries: {str(e)}")
+        raise BadRequestError("Failed to list research queries")
+    
+    rows, meta = cursor_page(rows, per_page)
+    
+    return jsonify({
+        "data": RESEARCH_LIST_SERIALIZER.dump_many(rows),
+        "meta": meta,
+    }), 200
+
+
+@research_bp.route("/queries/<query_id>", methods=["GET"])
+@jwt_required()
+@rate_limit(limit_per_minute=60)
+def get_research_query(query_id):
+    """
+    Get a research query and, once completed, its result.
+    
+    Args:
+        query_id (str): Research query id
+        
+    Returns:
+        JSON: Research query
+    """
+    current_user = get_jwt_identity()
+    
+    try:
+        research_query = _load_own(query_id, current_user)
+    except Exception as e:
+        if isinstance(e, NotFoundError):
+            raise
+        current_app.logger.error(f"Error getting research query: {str(e)}")
+        raise BadRequestError("Failed to get research query")
+    
+    return jsonify(ResearchQuerySchema().dump(research_query)), 200
+
+
+@research_bp.route("/queries/<query_id>/events", methods=["GET"])
+@jwt_required()
+@rate_limit(limit_per_minute=30)
+def stream_research_query(query_id):
+    """
+    Stream a research query's progress as server-sent events.
+    
+    Events are ``status``, ``chunk`` (``{"text": ...}``, pieces of the
+    answer in order) and a final ``done`` or ``error``. Every event has an
+    id; reconnecting with ``Last-Event-ID`` resumes after it. A comment is
+    sent every ``RESEARCH_SSE_HEARTBEAT`` seconds while waiting.
+    
+    Without a shared broker only the worker running a query has its events;
+    other workers poll the row every ``RESEARCH_SSE_POLL_INTERVAL`` seconds
+    and send the whole answer once it is finished.
+    
+    Args:
+        query_id (str): Research query id
+        
+    Returns:
+        Response: ``text/event-stream``
+    """
+    current_user = get_jwt_identity()
+    
+    try:
+        research_query = _load_own(query_id, current_user)
+    except Exception as e:
+        if isinstance(e, NotFoundError):
+            raise
+        current_app.logger.error(f"Error getting research query: {str(e)}")
+        raise BadRequestError("Failed to get research query")
+    
+    research_queue = get_research_queue()
+    broker = research_queue.broker
+    heartbeat = current_app.config.get("RESEARCH_SSE_HEARTBEAT", 15)
+    poll_interval = current_app.config.get("RESEARCH_SSE_POLL_INTERVAL", 2)
+    try:
+        after = int(request.headers.get("Last-Event-ID", 0))
+    except ValueError:
+        after = 0
+    
+    def events():
+        if research_query["status"] in FINISHED_STATUSES and not broker.has(query_id):
+            # Finished before the stream was opened and no longer buffered
+            yield from _final_events(research_query)
+            return
+        
+        if not (broker.shared or broker.has(query_id) or research_queue.owns(query_id)):
+            # Another worker runs it and its events never reach this one
+            yield from _poll_events(query_id, current_user, poll_interval, heartbeat)
+            return
+        
+        for event in broker.subscribe(query_id, after=after, timeout=heartbeat):
+            if event is not None:
+                yield _sse(event["event"], event["data"], event["seq"])
+            elif _load_own(query_id, current_user)["status"] == "failed":
+                # Reaped after its worker stopped; no final event will come
+                yield from _final_events({"status": "failed"})
+                return
+            else:
+                yield ": heartbeat\n\n"
+    
+    return Response(
+        stream_with_context(events()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@research_bp.route("/queue/stats", methods=["GET"])
+@admin_required
+def research_queue_stats():
+    """
+    Get queued and running jobs per model, coalescing and result cache
+    counters on this worker.
+    
+    Returns:
+        JSON: Queue and cache statistics
+    """
+    return jsonify(get_research_queue().stats()), 200
@@ -0,0 +1,8 @@
+"""
+Search blueprint for ranked profile search.
+"""
+from flask import Blueprint
+
+search_bp = Blueprint("search", __name__)
+
+from app.search import routes
@@ -0,0 +1,231 @@
+"""
+Profile search backends.
+
+``PostgrestSearchBackend`` calls the ``search_profiles_ranked`` function from
+``supabase/migrations/profile_search.sql``. ``SQLiteSearchBackend`` evaluates
+the same filters and scoring against an in-memory SQLite database so ranking
+can be exercised without a Supabase project.
+"""
+import json
+import sqlite3
+import threading
+
+from flask import current_app
+
+from app.search.trigram import similarity
+
+# pg_trgm.similarity_threshold default, used by the % operator
+SIMILARITY_THRESHOLD = 0.3
+
+SEARCH_COLUMNS = (
+    "id", "username", "full_name", "bio", "avatar_url", "country", "school",
+    "education_level", "interests", "created_at", "updated_at",
+)
+
+
+class ProfileSearchBackend:
+    """Interface for ranked profile search."""
+
+    def search(self, search_query=None, country=None, education_level=None,
+               interests=None, limit=10, offset=0):
+        """
+        Run a ranked, filtered profile search.
+
+        Args:
+            search_query (str, optional): Free-text query
+            country (str, optional): Exact country filter
+            education_level (str, optional): Exact education level filter
+            interests (list, optional): Match profiles sharing any interest
+            limit (int): Page size
+            offset (int): Rows to skip
+
+        Returns:
+            tuple: ``(rows, total)``; each row carries a ``rank`` key
+        """
+        raise NotImplementedError
+
+
+class PostgrestSearchBackend(ProfileSearchBackend):
+    """Search through the ``search_profiles_ranked`` RPC."""
+
+    function_name = "search_profiles_ranked"
+
+    def search(self, search_query=None, country=None, education_level=None,
+               interests=None, limit=10, offset=0):
+        from app.core.utils import supabase_rpc
+
+        rows = supabase_rpc(self.function_name, {
+            "search_query": search_query or None,
+            "country_filter": country,
+            "education_level_filter": education_level,
+            "interests_filter": list(interests) if interests else None,
+            "result_limit": limit,
+            "result_offset": offset,
+        }) or []
+
+        # A page past the end is a single row holding only total_count
+        total = rows[0]["total_count"] if rows else 0
+        for row in rows:
+            row.pop("total_count", None)
+        return [row for row in rows if row.get("id") is not None], total
+
+
+class SQLiteSearchBackend(ProfileSearchBackend):
+    """
+    In-memory stand-in for the Postgres search function.
+
+    ``similarity`` is a faithful port of pg_trgm, ``LIKE`` mirrors the
+    ``search_text`` substring match (with ``%`` and ``_`` in the query
+    escaped) and interests are stored as JSON arrays.
+    """
+
+    SQL = f"""
+        WITH matches AS (
+            SELECT p.*,
+                CASE WHEN :q IS NULL THEN 0.0 ELSE (
+                    2.0 * similarity(p.username, :q)
+                    + 1.5 * similarity(coalesce(p.full_name, ''), :q)
+                    + 0.5 * similarity(coalesce(p.school, ''), :q)
+                    + 0.5 * similarity(coalesce(p.country, ''), :q)
+                    + 0.5 * similarity(interests_text(p.interests), :q)
+                    + CASE WHEN lower(p.username) LIKE :pattern || '%' ESCAPE '\\' THEN 1.0 ELSE 0.0 END
+                ) END AS rank
+            FROM profiles p
+            WHERE (
+                    :q IS NULL
+                    OR p.search_text LIKE '%' || :pattern || '%' ESCAPE '\\'
+                    OR similarity(p.username, :q) >= {SIMILARITY_THRESHOLD}
+                    OR similarity(p.full_name, :q) >= {SIMILARITY_THRESHOLD}
+                )
+                AND (:country IS NULL OR p.country = :country)
+                AND (:education_level IS NULL OR p.education_level = :education_level)
+                AND (:interests IS NULL OR interests_overlap(p.interests, :interests))
+        ),
+        counted AS (
+            SELECT count(*) AS total_count FROM matches
+        ),
+        page AS (
+            SELECT * FROM matches
+            ORDER BY rank DESC, username
+            LIMIT :limit OFFSET :offset
+        )
+        SELECT {", ".join(f"page.{c}" for c in SEARCH_COLUMNS)}, page.rank, counted.total_count
+        FROM counted
+        LEFT JOIN page ON 1
+        ORDER BY page.rank DESC, page.username
+    """
+
+    def __init__(self, path=":memory:"):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.create_function("similarity", 2, similarity, deterministic=True)
+        self._conn.create_function("interests_text", 1, _interests_text, deterministic=True)
+        self._conn.create_function("interests_overlap", 2, _interests_overlap, deterministic=True)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS profiles ("
+            "id TEXT PRIMARY KEY, username TEXT UNIQUE NOT NULL, full_name TEXT, bio TEXT, "
+            "avatar_url TEXT, country TEXT, school TEXT, education_level TEXT, interests TEXT, "
+            "created_at TEXT, updated_at TEXT, search_text TEXT)"
+        )
+
+    def index(self, profiles):
+        """
+        Insert or replace profiles in the search table.
+
+        Args:
+            profiles (list): Profile dicts as returned by PostgREST
+        """
+        rows = []
+        for profile in profiles:
+            row = {column: profile.get(column) for column in SEARCH_COLUMNS}
+            row["interests"] = json.dumps(row["interests"]) if row["interests"] is not None else None
+            row["search_text"] = _search_text(profile)
+            rows.append(row)
+
+        placeholders = ", ".join(f":{c}" for c in SEARCH_COLUMNS + ("search_text",))
+        with self._lock, self._conn:
+            self._conn.executemany(
+                f"INSERT OR REPLACE INTO profiles ({', '.join(SEARCH_COLUMNS)}, search_text) "
+                f"VALUES ({placeholders})",
+                rows,
+            )
+
+    def remove(self, profile_ids):
+        """Delete profiles from the search table."""
+        with self._lock, self._conn:
+            self._conn.executemany("DELETE FROM profiles WHERE id = ?", [(i,) for i in profile_ids])
+
+    def search(self, search_query=None, country=None, education_level=None,
+               interests=None, limit=10, offset=0):
+        term = (search_query or "").strip().lower() or None
+        params = {
+            "q": term,
+            "pattern": _like_pattern(term) if term else None,
+            "country": country,
+            "education_level": education_level,
+            "interests": json.dumps(list(interests)) if interests else None,
+            "limit": limit,
+            "offset": offset,
+        }
+        with self._lock:
+            result = self._conn.execute(self.SQL, params).fetchall()
+
+        rows = []
+        total = 0
+        for record in result:
+            row = dict(record)
+            total = row.pop("total_count")
+            if row["id"] is None:
+                # Page past the end: only the count row
+                continue
+            if row["interests"] is not None:
+                row["interests"] = json.loads(row["interests"])
+            rows.append(row)
+        return rows, total
+
+
+def _search_text(profile):
+    """Mirror of the ``handle_profile_search_text`` trigger."""
+    parts = [profile.get(c) for c in ("username", "full_name", "school", "country")]
+    parts.append(" ".join(profile.get("interests") or []) or None)
+    return " ".join(p for p in parts if p).lower()
+
+
+def _like_pattern(term):
+    """Escape ``LIKE`` wildcards so they match literally."""
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _interests_text(value):
+    return " ".join(json.loads(value)) if value else ""
+
+
+def _interests_overlap(value, wanted):
+    if not value:
+        return False
+    return bool(set(json.loads(value)) & set(json.loads(wanted)))
+
+
+SEARCH_BACKENDS = {
+    "postgrest": PostgrestSearchBackend,
+    "sqlite": SQLiteSearchBackend,
+}
+
+
+def init_search(app):
+    """
+    Create the configured search backend and register it on the app.
+
+    Args:
+        app (Flask): Application to register with
+    """
+    name = app.config.get("SEARCH_BACKEND", "postgrest")
+    if name not in SEARCH_BACKENDS:
+        raise ValueError(f"Unknown search backend: {name}")
+    app.extensions["search"] = SEARCH_BACKENDS[name]()
+
+
+def get_search_backend():
+    """Return the search backend registered on the current app."""
+    return current_app.extensions["search"]
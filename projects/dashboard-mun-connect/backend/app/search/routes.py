@@ -0,0 +1,82 @@
+"""
+Search routes for ranked profile search.
+"""
+from flask import request, jsonify, current_app
+from app.search import search_bp
+from app.search.backends import get_search_backend
+from app.core.aio import run_sync
+from app.core.utils import rate_limit
+from app.core.errors import BadRequestError, ValidationFailedError
+from app.core.schemas import ProfileSchema
+from app.core.serializers import serializer
+
+
+PROFILE_SERIALIZER = serializer(ProfileSchema)
+
+EDUCATION_LEVELS = ["middle_school", "high_school", "university", "other"]
+
+
+@search_bp.route("/profiles", methods=["GET"])
+@rate_limit(limit_per_minute=30)
+async def search_profiles():
+    """
+    Ranked, filterable profile search.
+    
+    Results are ordered by trigram similarity of the query to the username,
+    full name, school, country and interests, with a boost for username
+    prefix matches.
+    
+    Query parameters:
+        q (str, optional): Search query
+        country (str, optional): Only profiles from this country
+        education_level (str, optional): Only profiles at this education level
+        interests (str, optional): Comma-separated interests; matches profiles
+            sharing at least one
+        page (int, optional): Page number
+        per_page (int, optional): Number of results per page
+        
+    Returns:
+        JSON: Paginated list of ranked profiles
+    """
+    search_query = request.args.get("q", "").strip()
+    country = request.args.get("country") or None
+    education_level = request.args.get("education_level") or None
+    interests = [i.strip() for i in request.args.get("interests", "").split(",") if i.strip()]
+    page = max(int(request.args.get("page", 1)), 1)
+    per_page = min(int(request.args.get("per_page", 10)), 50)  # Limit to 50 max results
+    
+    if education_level and education_level not in EDUCATION_LEVELS:
+        raise ValidationFailedError(f"education_level must be one of: {', '.join(EDUCATION_LEVELS)}")
+    
+    try:
+        rows, total = await run_sync(
+            get_search_backend().search,
+            search_query=search_query,
+            country=country,
+            education_level=education_level,
+            interests=interests,
+            limit=per_page,
+            offset=(page - 1) * per_page,
+        )
+        
+        profiles = []
+        for row in rows:
+            profile = PROFILE_SERIALIZER.dump(row)
+            profile["rank"] = round(float(row.get("rank") or 0), 4)
+            profiles.append(profile)
+        
+        pages = (total + per_page - 1) // per_page if total > 0 else 0
+        
+        return jsonify({
+            "data": profiles,
+            "meta": {
+                "page": page,
+                "per_page": per_page,
+                "total": total,
+                "pages": pages,
+            }
+        }), 200
+        
+    except Exception as e:
+        current_app.logger.error(f"Error searching profiles: {str(e)}")
+        raise BadRequestError("Failed to search profiles")
@@ -0,0 +1,54 @@
+"""
+Pure-Python port of pg_trgm trigram similarity.
+
+Used by the SQLite search backend so rankings computed offline match the
+``similarity()`` scores Postgres produces for the same data.
+"""
+import re
+
+# pg_trgm treats any run of alphanumeric characters as a word
+_WORD_RE = re.compile(r"[^\W_]+", re.UNICODE)
+
+
+def trigrams(text):
+    """
+    Return the set of trigrams pg_trgm extracts from ``text``.
+    
+    Each lower-cased word is padded with two leading spaces and one trailing
+    space before being split into overlapping three-character sequences.
+    
+    Args:
+        text (str): Input text
+        
+    Returns:
+        set: Trigrams
+    """
+    result = set()
+    if not text:
+        return result
+    for word in _WORD_RE.findall(text.lower()):
+        padded = f"  {word} "
+        for i in range(len(padded) - 2):
+            result.add(padded[i:i + 3])
+    return result
+
+
+def similarity(a, b):
+    """
+    Trigram similarity between two strings, as ``similarity(a, b)`` in pg_trgm.
+    
+    Args:
+        a (str): First string
+        b (str): Second string
+        
+    Returns:
+        float: Shared trigrams divided by the union of both trigram sets
+    """
+    if a is None or b is None:
+        return 0.0
+    ta = trigrams(a)
+    tb = trigrams(b)
+    if not ta or not tb:
+        return 0.0
+    shared = len(ta & tb)
+    return shared / (len(ta) + len(tb) - shared)
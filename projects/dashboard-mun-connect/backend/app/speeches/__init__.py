@@ -0,0 +1,8 @@
+"""
+Speeches blueprint for the delegate speech library.
+"""
+from flask import Blueprint
+
+speeches_bp = Blueprint("speeches", __name__)
+
+from app.speeches import routes
@@ -0,0 +1,49 @@
+"""
+Speaking-time estimates for speeches.
+
+Durations follow a words-per-minute model with a rate per ``speech_type``
+(``SPEECH_WORDS_PER_MINUTE``): prepared openings are delivered more slowly
+than caucus interventions. Estimates for a whole import are computed in one
+pass over the batch, with each rate looked up once.
+"""
+
+# Typical delivery rates in committee, in words per minute
+DEFAULT_WORDS_PER_MINUTE = {
+    "opening": 130,
+    "closing": 130,
+    "moderated_caucus": 150,
+    "unmoderated_caucus": 160,
+    "other": 140,
+}
+
+# SpeechSchema caps duration_seconds at one hour
+MAX_DURATION_SECONDS = 3600
+
+
+def estimate_durations(speeches, words_per_minute=None, default_rate=140):
+    """
+    Estimate the speaking time of a batch of speeches.
+
+    Args:
+        speeches (list): Dicts with ``content`` and ``speech_type``
+        words_per_minute (dict, optional): Rate per speech type
+        default_rate (int): Rate for types without their own
+
+    Returns:
+        list: Estimated ``duration_seconds`` per speech, in input order
+    """
+    rates = dict(DEFAULT_WORDS_PER_MINUTE, **(words_per_minute or {}))
+    # Seconds per word, resolved once per type rather than once per speech
+    seconds_per_word = {speech_type: 60.0 / rate for speech_type, rate in rates.items()}
+    default = 60.0 / default_rate
+
+    word_counts = [len((speech.get("content") or "").split()) for speech in speeches]
+    factors = [seconds_per_word.get(speech.get("speech_type"), default) for speech in speeches]
+    return [min(MAX_DURATION_SECONDS, round(words * factor)) for words, factor in zip(word_counts, factors)]
+
+
+def estimate_duration(content, speech_type, words_per_minute=None, default_rate=140):
+    """Estimate the speaking time of a single speech in seconds."""
+    return estimate_durations(
+        [{"content": content, "speech_type": speech_type}], words_per_minute, default_rate
+    )[0]
@@ -0,0 +1,434 @@
+"""
+Speech routes for the delegate speech library.
+
+Speeches get a server-side ``duration_seconds`` estimate unless the author
+supplies one. Listings select metadata columns only and page on
+``(updated_at, id)`` like the documents API.
+"""
+from datetime import datetime, timezone
+from functools import lru_cache
+
+from flask import request, jsonify, current_app
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from app.speeches import speeches_bp
+from app.speeches.duration import estimate_durations
+from app.core.utils import supabase_request, rate_limit
+from app.core.errors import BadRequestError, NotFoundError, ValidationFailedError
+from app.core.query import Query, Param
+from app.core.pagination import (
+    AFTER_CURSOR,
+    cursor_page,
+    decode_cursor,
+    keyset_order,
+    listing_scope,
+    parse_bool,
+    visible,
+)
+from app.core.pipeline import set_resource_version
+from app.core.schemas import SpeechSchema
+from app.core.serializers import serializer
+
+
+SPEECH_TYPES = ["opening", "closing", "moderated_caucus", "unmoderated_caucus", "other"]
+
+# Everything SpeechSchema serializes except content
+SPEECH_LIST_COLUMNS = (
+    "id", "title", "speech_type", "duration_seconds", "tags", "is_public", "author_id", "committee_id",
+    "created_at", "updated_at",
+)
+WRITABLE_FIELDS = ("title", "content", "speech_type", "duration_seconds", "tags", "is_public", "committee_id")
+# Bulk inserts need the same keys on every row; missing ones get these values
+IMPORT_DEFAULTS = {"tags": [], "is_public": False, "committee_id": None}
+
+SPEECHES = Query("speeches")
+SPEECH_BY_ID = SPEECHES.select(*SPEECH_LIST_COLUMNS, "content").eq("id", Param("id")).limit(1)
+SPEECH_TYPE_BY_ID = SPEECHES.select("speech_type").eq("id", Param("id")).eq("author_id", Param("author_id")).limit(1)
+SPEECH_CONTENT_BY_ID = SPEECHES.select("content").eq("id", Param("id")).eq("author_id", Param("author_id")).limit(1)
+# Mutations are scoped to the author, so ownership needs no extra read
+OWN_SPEECH = SPEECHES.select(*SPEECH_LIST_COLUMNS).eq("id", Param("id")).eq("author_id", Param("author_id"))
+INSERT_SPEECHES = SPEECHES.select(*SPEECH_LIST_COLUMNS)
+
+SPEECH_LIST_SERIALIZER = serializer(SpeechSchema, exclude=("content",))
+
+
+@lru_cache(maxsize=None)
+def _list_query(author, public, speech_type, tag, committee, min_duration, max_duration, cursor):
+    """Build (once) the listing query for a combination of filters."""
+    query = SPEECHES.select(*SPEECH_LIST_COLUMNS)
+    if author:
+        query = query.eq("author_id", Param("author_id"))
+    if public:
+        query = query.eq("is_public", Param("is_public"))
+    if speech_type:
+        query = query.eq("speech_type", Param("speech_type"))
+    if tag:
+        query = query.contains("tags", Param("tags"))
+    if committee:
+        query = query.eq("committee_id", Param("committee_id"))
+    if min_duration:
+        query = query.gte("duration_seconds", Param("min_duration"))
+    if max_duration:
+        query = query.lte("duration_seconds", Param("max_duration"))
+    if cursor:
+        query = query.or_(*AFTER_CURSOR)
+    return keyset_order(query)
+
+
+def _parse_duration(name):
+    value = request.args.get(name)
+    if value is None or value == "":
+        return None
+    try:
+        value = int(value)
+    except ValueError:
+        raise ValidationFailedError(f"{name} must be an integer number of seconds")
+    if value < 0:
+        raise ValidationFailedError(f"{name} must not be negative")
+    return value
+
+
+def _estimate(speeches):
+    """Fill in ``duration_seconds`` for speeches that do not carry one."""
+    missing = [speech for speech in speeches if speech.get("duration_seconds") is None]
+    if missing:
+        durations = estimate_durations(
+            missing,
+            current_app.config.get("SPEECH_WORDS_PER_MINUTE"),
+            current_app.config.get("SPEECH_DEFAULT_WORDS_PER_MINUTE", 140),
+        )
+        for speech, duration in zip(missing, durations):
+            speech["duration_seconds"] = duration
+    return speeches
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat()
+
+
+@speeches_bp.route("", methods=["GET"])
+@jwt_required()
+@rate_limit(limit_per_minute=60)
+def list_speeches():
+    """
+    List speeches, newest first, without their content.
+    
+    Without filters the caller's own speeches are listed. ``author_id``
+    lists another author's public speeches; ``is_public=true`` lists public
+    speeches from every author.
+    
+    Query parameters:
+        author_id (str, optional): Only speeches by this author
+        is_public (bool, optional): Only public (true) or private (false)
+            speeches; private speeches are only listed for their author
+        speech_type (str, optional): Only speeches of this type
+        min_duration (int, optional): Minimum duration in seconds
+        max_duration (int, optional): Maximum duration in seconds
+        tag (str, optional): Only speeches with this tag
+        committee_id (str, optional): Only speeches for this committee
+        cursor (str, optional): ``next_cursor`` from the previous page
+        per_page (int, optional): Number of results per page
+        
+    Returns:
+        JSON: Page of speech metadata and the next cursor
+    """
+    current_user = get_jwt_identity()
+    author_id = request.args.get("author_id") or None
+    is_public = parse_bool(request.args.get("is_public"), "is_public")
+    speech_type = request.args.get("speech_type") or None
+    min_duration = _parse_duration("min_duration")
+    max_duration = _parse_duration("max_duration")
+    tag = request.args.get("tag") or None
+    committee_id = request.args.get("committee_id") or None
+    cursor = request.args.get("cursor") or None
+    per_page = min(int(request.args.get("per_page", 20)), 100)  # Limit to 100 max results
+    
+    if speech_type and speech_type not in SPEECH_TYPES:
+        raise ValidationFailedError(f"speech_type must be one of: {', '.join(SPEECH_TYPES)}")
+    if min_duration is not None and max_duration is not None and min_duration > max_duration:
+        raise ValidationFailedError("min_duration must not exceed max_duration")
+    
+    scope = listing_scope(author_id, is_public, current_user)
+    if scope is None:
+        return jsonify({"data": [], "meta": {"per_page": per_page, "next_cursor": None, "has_more": False}}), 200
+    author_id, is_public = scope
+    
+    # Fetch one extra row to learn whether another page follows
+    query_params = {"limit": per_page + 1}
+    if author_id is not None:
+        query_params["author_id"] = author_id
+    if is_public is not None:
+        query_params["is_public"] = is_public
+    if speech_type:
+        query_params["speech_type"] = speech_type
+    if tag:
+        query_params["tags"] = [tag]
+    if committee_id:
+        query_params["committee_id"] = committee_id
+    if min_duration is not None:
+        query_params["min_duration"] = min_duration
+    if max_duration is not None:
+        query_params["max_duration"] = max_duration
+    if cursor:
+        query_params.update(decode_cursor(cursor))
+    
+    query = _list_query(
+        author_id is not None,
+        is_public is not None,
+        bool(speech_type),
+        bool(tag),
+        bool(committee_id),
+        min_duration is not None,
+        max_duration is not None,
+        bool(cursor),
+    )
+    
+    try:
+        rows = supabase_request(method="GET", endpoint=query, params=query_params)
+    except Exception as e:
+        current_app.logger.error(f"Error listing speeches: {str(e)}")
+        raise BadRequestError("Failed to list speeches")
+    
+    rows, meta = cursor_page(rows, per_page)
+    
+    return jsonify({
+        "data": SPEECH_LIST_SERIALIZER.dump_many(rows),
+        "meta": meta,
+    }), 200
+
+
+@speeches_bp.route("", methods=["POST"])
+@jwt_required()
+@rate_limit(limit_per_minute=20)
+def create_speech():
+    """
+    Create a speech owned by the current user.
+    
+    Request body:
+        title (str): Speech title
+        content (str): Speech text
+        speech_type (str): One of the supported speech types
+        duration_seconds (int, optional): Speaking time; estimated from the
+            text when omitted
+        tags (list, optional): Tags
+        is_public (bool, optional): Whether other users can read it
+        committee_id (str, optional): Committee the speech belongs to
+        
+    Returns:
+        JSON: Created speech metadata
+    """
+    current_user = get_jwt_identity()
+    data = request.get_json()
+    
+    if not data:
+        raise BadRequestError("No input data provided")
+    
+    errors = SpeechSchema(partial=("author_id",)).validate(data)
+    if errors:
+        raise ValidationFailedError(f"Validation error: {errors}")
+    
+    speech = {k: v for k, v in data.items() if k in WRITABLE_FIELDS}
+    speech["author_id"] = current_user
+    _estimate([speech])
+    
+    try:
+        response = supabase_request(method="POST", endpoint=INSERT_SPEECHES, data=speech)
+    except Exception as e:
+        current_app.logger.error(f"Error creating speech: {str(e)}")
+        raise BadRequestError("Failed to create speech")
+    
+    if not response:
+        raise BadRequestError("Failed to create speech")
+    
+    return jsonify(SpeechSchema(exclude=["content"]).dump(response[0])), 201
+
+
+@speeches_bp.route("/import", methods=["POST"])
+@jwt_required()
+@rate_limit(limit_per_minute=5)
+def import_speeches():
+    """
+    Import many speeches in one request.
+    
+    The whole payload is validated before anything is written. Durations are
+    estimated for the batch in one pass, and rows are written with
+    multi-row inserts of ``SPEECH_IMPORT_BATCH_SIZE`` speeches each.
+    
+    Request body:
+        speeches (list): Speeches, each accepting the fields of
+            ``POST /api/speeches``
+    
+    Returns:
+        JSON: Number of imported speeches and their metadata
+    """
+    current_user = get_jwt_identity()
+    data = request.get_json()
+    max_import = current_app.config.get("SPEECH_IMPORT_MAX", 1000)
+    batch_size = current_app.config.get("SPEECH_IMPORT_BATCH_SIZE", 200)
+    
+    speeches = data.get("speeches") if isinstance(data, dict) else None
+    if not speeches or not isinstance(speeches, list):
+        raise BadRequestError("No speeches provided")
+    if len(speeches) > max_import:
+        raise ValidationFailedError(f"At most {max_import} speeches can be imported at once")
+    if not all(isinstance(speech, dict) for speech in speeches):
+        raise ValidationFailedError("Each speech must be an object")
+    
+    # Errors are keyed by the index of the offending speech
+    errors = SpeechSchema(many=True, partial=("author_id",)).validate(speeches)
+    if errors:
+        raise ValidationFailedError(f"Validation error: {errors}")
+    
+    rows = []
+    for speech in speeches:
+        row = dict(IMPORT_DEFAULTS)
+        row.update({k: v for k, v in speech.items() if k in WRITABLE_FIELDS})
+        row.setdefault("duration_seconds", None)
+        row["author_id"] = current_user
+        rows.append(row)
+    _estimate(rows)
+    
+    imported = []
+    for start in range(0, len(rows), batch_size):
+        try:
+            imported.extend(supabase_request(
+                method="POST",
+                endpoint=INSERT_SPEECHES,
+                data=rows[start:start + batch_size],
+            ) or [])
+        except Exception as e:
+            current_app.logger.error(f"Error importing speeches: {str(e)}")
+            raise BadRequestError(
+                "Failed to import speeches",
+                payload={"imported": len(imported)},
+            )
+    
+    return jsonify({
+        "imported": len(imported),
+        "data": SPEECH_LIST_SERIALIZER.dump_many(imported),
+    }), 201
+
+
+@speeches_bp.route("/<speech_id>", methods=["GET"])
+@jwt_required()
+@rate_limit(limit_per_minute=60)
+def get_speech(speech_id):
+    """
+    Get a speech.
+    
+    Args:
+        speech_id (str): Speech id
+        
+    Returns:
+        JSON: Speech data including content
+    """
+    current_user = get_jwt_identity()
+    
+    try:
+        response = supabase_request(method="GET", endpoint=SPEECH_BY_ID, params={"id": speech_id})
+    except Exception as e:
+        current_app.logger.error(f"Error getting speech: {str(e)}")
+        raise BadRequestError("Failed to get speech")
+    
+    if not response or not visible(response[0], current_user):
+        raise NotFoundError("Speech not found")
+    
+    set_resource_version(speech_id, response[0].get("updated_at"))
+    return jsonify(SpeechSchema().dump(response[0])), 200
+
+
+@speeches_bp.route("/<speech_id>", methods=["PUT"])
+@jwt_required()
+@rate_limit(limit_per_minute=30)
+def update_speech(speech_id):
+    """
+    Update one of the current user's speeches.
+    
+    Changing the content or type re-estimates the duration unless a
+    ``duration_seconds`` is supplied.
+    
+    Args:
+        speech_id (str): Speech id
+        
+    Request body:
+        Any of the fields accepted by ``POST /api/speeches``
+        
+    Returns:
+        JSON: Updated speech metadata
+    """
+    current_user = get_jwt_identity()
+    data = request.get_json()
+    
+    if not data:
+        raise BadRequestError("No input data provided")
+    
+    errors = SpeechSchema(partial=True).validate(data)
+    if errors:
+        raise ValidationFailedError(f"Validation error: {errors}")
+    
+    changes = {k: v for k, v in data.items() if k in WRITABLE_FIELDS}
+    if not changes:
+        raise BadRequestError("No updatable fields provided")
+    
+    try:
+        if ("content" in changes or "speech_type" in changes) and "duration_seconds" not in changes:
+            # Both inputs of the estimate; read whichever one is unchanged
+            speech = {k: changes[k] for k in ("content", "speech_type") if k in changes}
+            if len(speech) < 2:
+                current = supabase_request(
+                    method="GET",
+                    endpoint=SPEECH_TYPE_BY_ID if "content" in speech else SPEECH_CONTENT_BY_ID,
+                    params={"id": speech_id, "author_id": current_user},
+                )
+                if not current:
+                    raise NotFoundError("Speech not found")
+                speech.update(current[0])
+            changes["duration_seconds"] = _estimate([speech])[0]["duration_seconds"]
+        
+        changes["updated_at"] = _now()
+        response = supabase_request(
+            method="PATCH",
+            endpoint=OWN_SPEECH,
+            data=changes,
+            params={"id": speech_id, "author_id": current_user},
+        )
+    except Exception as e:
+        if isinstance(e, NotFoundError):
+            raise
+        current_app.logger.error(f"Error updating speech: {str(e)}")
+        raise BadRequestError("Failed to update speech")
+    
+    if not response:
+        raise NotFoundError("Speech not found")
+    
+    return jsonify(SpeechSchema(exclude=["content"]).dump(response[0])), 200
+
+
+@speeches_bp.route("/<speech_id>", methods=["DELETE"])
+@jwt_required()
+@rate_limit(limit_per_minute=30)
+def delete_speech(speech_id):
+    """
+    Delete one of the current user's speeches.
+    
+    Args:
+        speech_id (str): Speech id
+        
+    Returns:
+        JSON: Confirmation
+    """
+    current_user = get_jwt_identity()
+    
+    try:
+        response = supabase_request(
+            method="DELETE",
+            endpoint=OWN_SPEECH,
+            params={"id": speech_id, "author_id": current_user},
+        )
+    except Exception as e:
+        current_app.logger.error(f"Error deleting speech: {str(e)}")
+        raise BadRequestError("Failed to delete speech")
+    
+    if not response:
+        raise NotFoundError("Speech not found")
+    
+    return jsonify({"message": "Speech deleted"}), 200
@@ -0,0 +1,392 @@
+"""
+Suggested delegates.
+
+Profiles are turned into sparse binary feature vectors: one feature per
+interest, per conference attended, for the country and for a bucket of
+conference experience. Each feature family has a weight
+(``RECOMMENDATION_WEIGHTS``), and features shared by few profiles count for
+more through an inverse document frequency factor, so two delegates who
+both follow "water rights" score higher than two who both list "security".
+
+An inverted index maps every feature to the profiles that have it, so a
+lookup only touches profiles sharing at least one feature with the user.
+Candidates are gathered from the rarest features first, and at most
+``max_candidates`` profiles are scored. Once that many are being scored,
+or once a feature is so common that its posting list covers more than
+``common_share`` of the table, the remaining features only add to the
+scores of existing candidates. These features walk the smaller of the
+candidate set and the posting list. This keeps a lookup in the milliseconds
+however common "country: Brazil" gets.
+
+The index lives in each worker. It is built from the ``profiles`` table on
+first use and rebuilt in the background every ``RECOMMENDATION_REFRESH``
+seconds; ``update_profile`` applies the user's own changes to it at once.
+"""
+import heapq
+import math
+import threading
+import time
+from collections import namedtuple
+
+from flask import current_app
+
+from app.core.query import Query, Param
+from app.core.utils import supabase_request
+
+RECOMMENDATION_COLUMNS = ("id", "country", "interests", "conference_experience")
+# Profile fields whose change alters a profile's features
+RECOMMENDATION_FIELDS = frozenset(RECOMMENDATION_COLUMNS[1:])
+
+PROFILES = Query("profiles")
+FIRST_PROFILE_FEATURES = PROFILES.select(*RECOMMENDATION_COLUMNS).order("id")
+NEXT_PROFILE_FEATURES = PROFILES.select(*RECOMMENDATION_COLUMNS).gt("id", Param("after")).order("id")
+
+DEFAULT_WEIGHTS = {"interest": 1.0, "conference": 0.8, "country": 0.5, "experience": 0.3}
+
+# Upper bounds of the conference experience buckets
+EXPERIENCE_BUCKETS = (0, 2, 5, 10)
+
+Match = namedtuple("Match", "profile_id score shared")
+
+
+def _normalize(value):
+    return " ".join(str(value).lower().split())
+
+
+def _experience_bucket(count):
+    for bucket, upper in enumerate(EXPERIENCE_BUCKETS):
+        if count <= upper:
+            return bucket
+    return len(EXPERIENCE_BUCKETS)
+
+
+class RecommendationIndex:
+    """
+    Inverted index of profile features with top-k similarity lookups.
+
+    Args:
+        weights (dict): Weight per feature family (``interest``,
+            ``conference``, ``country``, ``experience``)
+        max_candidates (int): Most profiles scored per lookup
+        common_share (float): Features held by more than this share of all
+            profiles only re-score existing candidates
+    """
+
+    def __init__(self, weights=None, max_candidates=2000, common_share=0.05):
+        self.weights = dict(DEFAULT_WEIGHTS, **(weights or {}))
+        self.max_candidates = max_candidates
+        self.common_share = common_share
+        self._postings = {}
+        self._features = {}
+        self._totals = {}
+        self._lock = threading.Lock()
+
+    def features(self, profile, previous=None):
+        """
+        Return the features of a profile row.
+
+        Args:
+            profile (dict): Profile row
+            previous (set, optional): Current features of the profile, kept
+                for families whose columns ``profile`` does not include
+
+        Returns:
+            set: ``(family, value)`` pairs
+        """
+        previous = previous or set()
+        features = set()
+
+        if "interests" in profile:
+            features.update(("interest", _normalize(i)) for i in profile.get("interests") or () if i)
+        else:
+            features.update(f for f in previous if f[0] == "interest")
+
+        if "country" in profile:
+            if profile.get("country"):
+                features.add(("country", _normalize(profile["country"])))
+        else:
+            features.update(f for f in previous if f[0] == "country")
+
+        if "conference_experience" in profile:
+            experience = profile.get("conference_experience")
+            if isinstance(experience, (list, tuple)):
+                features.update(("conference", _normalize(c)) for c in experience if c)
+                experience = len(experience)
+            if isinstance(experience, int):
+                features.add(("experience", _experience_bucket(experience)))
+        else:
+            features.update(f for f in previous if f[0] in ("conference", "experience"))
+        return features
+
+    def build(self, profiles):
+        """
+        Replace the index with ``profiles``.
+
+        Args:
+            profiles (iterable): Profile rows with ``RECOMMENDATION_COLUMNS``
+        """
+        postings, all_features, totals = {}, {}, {}
+        for profile in profiles:
+            features = self.features(profile)
+            all_features[profile["id"]] = features
+            totals[profile["id"]] = self._total(features)
+            for feature in features:
+                postings.setdefault(feature, set()).add(profile["id"])
+
+        with self._lock:
+            self._postings, self._features, self._totals = postings, all_features, totals
+
+    def upsert(self, profile):
+        """
+        Add a profile or update its features.
+
+        Args:
+            profile (dict): Profile row; families whose columns are missing
+                keep their current features
+        """
+        profile_id = profile["id"]
+        with self._lock:
+            old = self._features.get(profile_id, set())
+            new = self.features(profile, previous=old)
+            for feature in old - new:
+                posting = self._postings.get(feature)
+                if posting is not None:
+                    posting.discard(profile_id)
+                    if not posting:
+                        del self._postings[feature]
+            for feature in new - old:
+                self._postings.setdefault(feature, set()).add(profile_id)
+            self._features[profile_id] = new
+            self._totals[profile_id] = self._total(new)
+
+    def remove(self, profile_id):
+        """Drop a profile from the index."""
+        with self._lock:
+            for feature in self._features.pop(profile_id, ()):
+                posting = self._postings.get(feature)
+                if posting is not None:
+                    posting.discard(profile_id)
+                    if not posting:
+                        del self._postings[feature]
+            self._totals.pop(profile_id, None)
+
+    def similar(self, profile_id, k=10):
+        """
+        Return the ``k`` profiles most similar to ``profile_id``.
+
+        The score of a candidate is the sum, over shared features, of the
+        family weight times the feature's IDF, divided by the geometric mean
+        of both profiles' total family weights.
+
+        Args:
+            profile_id (str): Profile to find neighbours for
+            k (int): Number of results
+
+        Returns:
+            list: ``Match`` tuples, best first; empty if the profile is not
+            indexed or has no features
+        """
+        with self._lock:
+            features = self._features.get(profile_id)
+            if not features:
+                return []
+
+            count = len(self._features)
+            common = max(int(count * self.common_share), k)
+            ranked = sorted(
+                ((self.weights[f[0]] * math.log(1 + count / len(self._postings[f])), f) for f in features),
+                reverse=True,
+            )
+
+            scores = {}
+            for weight, feature in ranked:
+                posting = self._postings[feature]
+                # The profile itself is in every posting list, hence the "+ 1"
+                room = self.max_candidates + 1 - len(scores)
+                if room > 0 and (len(posting) <= common or len(scores) <= k):
+                    for other in posting:
+                        if other in scores:
+                            scores[other] += weight
+                        elif room > 0:
+                            scores[other] = weight
+                            room -= 1
+                elif len(posting) < len(scores):
+                    for other in posting:
+                        if other in scores:
+                            scores[other] += weight
+                else:
+                    for other in scores:
+                        if other in posting:
+                            scores[other] += weight
+            scores.pop(profile_id, None)
+
+            total = self._totals[profile_id]
+            best = heapq.nlargest(
+                k,
+                ((score / (math.sqrt(total * self._totals[other]) or 1.0), other) for other, score in scores.items()),
+            )
+            return [
+                Match(other, round(score, 4), _shared(features & self._features[other]))
+                for score, other in best
+            ]
+
+    def _total(self, features):
+        return sum(self.weights[f[0]] for f in features)
+
+    def __contains__(self, profile_id):
+        return profile_id in self._features
+
+    def __len__(self):
+        return len(self._features)
+
+    def stats(self):
+        """Return the size of the index."""
+        return {"profiles": len(self._features), "features": len(self._postings)}
+
+
+def _shared(features):
+    """Group shared features for display."""
+    shared = {"interests": [], "conferences": [], "country": None, "experience": False}
+    for family, value in sorted(features, key=str):
+        if family == "interest":
+            shared["interests"].append(value)
+        elif family == "conference":
+            shared["conferences"].append(value)
+        elif family == "country":
+            shared["country"] = value
+        else:
+            shared["experience"] = True
+    return shared
+
+
+class Recommender:
+    """
+    A worker's ``RecommendationIndex`` kept in step with the profiles table.
+
+    Args:
+        app (Flask): Application, for the background rebuilds' app context
+        index (RecommendationIndex): Index to maintain
+        refresh_interval (int): Seconds between full rebuilds
+        page_size (int): Profiles read per request while rebuilding
+    """
+
+    def __init__(self, app, index, refresh_interval=900, page_size=1000):
+        self.app = app
+        self.index = index
+        self.refresh_interval = refresh_interval
+        self.page_size = page_size
+        self.built_at = None
+        self._build_lock = threading.Lock()
+        self._refreshing = False
+        # Changes made while a rebuild reads the table, replayed onto the new index
+        self._changes = None
+        self._changes_lock = threading.Lock()
+
+    def ensure_loaded(self):
+        """
+        Build the index if it never was; refresh it in the background once stale.
+
+        Raises:
+            APIError: If the first build cannot read the profiles
+        """
+        if self.built_at is None:
+            with self._build_lock:
+                if self.built_at is None:
+                    self.rebuild()
+        elif time.monotonic() - self.built_at > self.refresh_interval and not self._refreshing:
+            self._refreshing = True
+            threading.Thread(target=self._refresh, name="recommendations-refresh", daemon=True).start()
+
+    def rebuild(self):
+        """
+        Rebuild the index from the profiles table, one keyset page at a time.
+
+        Profiles updated or removed while the pages are read may be missing
+        from them or stale, so those changes are replayed onto the new index.
+        """
+        with self._changes_lock:
+            self._changes = []
+        try:
+            rows = self._read_profiles()
+            with self._changes_lock:
+                self.index.build(rows)
+                for profile_id, profile in self._changes:
+                    if profile is None:
+                        self.index.remove(profile_id)
+                    else:
+                        self.index.upsert(profile)
+                self.built_at = time.monotonic()
+        finally:
+            with self._changes_lock:
+                self._changes = None
+
+    def _read_profiles(self):
+        rows, after = [], None
+        while True:
+            if after is None:
+                page = supabase_request(method="GET", endpoint=FIRST_PROFILE_FEATURES.limit(self.page_size))
+            else:
+                page = supabase_request(
+                    method="GET",
+                    endpoint=NEXT_PROFILE_FEATURES.limit(self.page_size),
+                    params={"after": after},
+                )
+            rows.extend(page or [])
+            if not page or len(page) < self.page_size:
+                break
+            after = page[-1]["id"]
+        return rows
+
+    def _refresh(self):
+        try:
+            with self.app.app_context():
+                with self._build_lock:
+                    self.rebuild()
+        except Exception as e:
+            self.app.logger.error(f"Recommendation index refresh failed: {str(e)}")
+        finally:
+            self._refreshing = False
+
+    def update(self, profile):
+        """Apply a changed profile row, once the index has been built."""
+        self._apply(profile["id"], profile)
+
+    def remove(self, profile_id):
+        """Drop a deleted profile, once the index has been built."""
+        self._apply(profile_id, None)
+
+    def _apply(self, profile_id, profile):
+        with self._changes_lock:
+            if self._changes is not None:
+                self._changes.append((profile_id, profile))
+            if self.built_at is None:
+                return
+            if profile is None:
+                self.index.remove(profile_id)
+            else:
+                self.index.upsert(profile)
+
+
+def init_recommendations(app):
+    """
+    Create the recommender and register it on the app.
+
+    Args:
+        app (Flask): Application to register with
+    """
+    index = RecommendationIndex(
+        weights=app.config.get("RECOMMENDATION_WEIGHTS"),
+        max_candidates=app.config.get("RECOMMENDATION_MAX_CANDIDATES", 2000),
+        common_share=app.config.get("RECOMMENDATION_COMMON_SHARE", 0.05),
+    )
+    app.extensions["recommendations"] = Recommender(
+        app,
+        index,
+        refresh_interval=app.config.get("RECOMMENDATION_REFRESH", 900),
+        page_size=app.config.get("RECOMMENDATION_PAGE_SIZE", 1000),
+    )
+
+
+def get_recommender():
+    """Return the recommender registered on the current app."""
+    return current_app.extensions["recommendations"]
@@ -1,23 +1,83 @@
 """
 User routes for profile management.
 """
+import uuid
+
 from flask import request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app.users import users_bp
-from app.core.utils import supabase_request, rate_limit
+from app.core.utils import supabase_request, rate_limit, admin_required
 from app.core.errors import (
     BadRequestError,
     NotFoundError,
     ValidationFailedError,
     ConflictError,
 )
+from app.core.query import Query, Param, CountMode
+from app.core.aio import async_supabase_page, async_supabase_request, run_sync
+from app.core.profiles import (
+    CACHED_PROFILE_COLUMNS,
+    aload_profile,
+    get_profile_cache,
+    load_profile,
+    load_profile_by_username,
+    load_profiles,
+)
+from app.core.roles import get_role_cache
+from app.users.recommendations import RECOMMENDATION_FIELDS, get_recommender
+from app.core.pipeline import cache_control
 from app.core.schemas import ProfileSchema
+from app.core.serializers import serializer
+from app.core.tracing import count_fallback
 from marshmallow import ValidationError
 
 
+# Columns serialized by ProfileSchema; nothing else is fetched
+BASIC_PROFILE_COLUMNS = (
+    "id", "username", "full_name", "bio", "avatar_url", "country", "school", "education_level", "interests",
+)
+PROFILE_COLUMNS = BASIC_PROFILE_COLUMNS + ("created_at", "updated_at")
+
+PROFILES = Query("profiles")
+BASIC_PROFILE_BY_ID = PROFILES.select(*BASIC_PROFILE_COLUMNS).eq("id", Param("id")).limit(1)
+USERNAME_TAKEN = PROFILES.select("id").eq("username", Param("username")).neq("id", Param("id")).limit(1)
+# PATCH returns the updated row, so no follow-up GET is needed
+UPDATE_PROFILE = PROFILES.select(*CACHED_PROFILE_COLUMNS).eq("id", Param("id"))
+REVOKE_ADMIN = PROFILES.select("id").eq("id", Param("id"))
+
+PROFILE_SERIALIZER = serializer(ProfileSchema)
+PUBLIC_PROFILE_SERIALIZER = serializer(ProfileSchema, exclude=("created_at", "updated_at"))
+
+PROFILE_NAME_MATCH = (
+    ("username", "ilike", Param("pattern")),
+    ("full_name", "ilike", Param("pattern")),
+)
+
+
+def _build_search_query(matching, keyset, basic):
+    """Build one variant of the profile directory query."""
+    query = PROFILES.select(*(BASIC_PROFILE_COLUMNS if basic else PROFILE_COLUMNS))
+    if matching:
+        query = query.or_(*PROFILE_NAME_MATCH)
+    if keyset:
+        # Usernames are unique, so they form a stable cursor
+        query = query.gt("username", Param("cursor"))
+    else:
+        query = query.offset(Param("offset"))
+    return query.order("username").limit(Param("limit"))
+
+
+# Every (matching, keyset, basic) variant, compiled once at import time
+PROFILE_SEARCH_QUERIES = {
+    (matching, keyset, basic): _build_search_query(matching, keyset, basic)
+    for matching in (False, True)
+    for keyset in (False, True)
+    for basic in (False, True)
+}
+
 @users_bp.route("/profile", methods=["GET"])
 @jwt_required()
-def get_profile():
+async def get_profile():
     """
     Get current user's profile.
     
@@ -27,27 +87,25 @@ def get_profile():
     current_user = get_jwt_identity()
     
     try:
-        # Get user profile with improved error handling for schema changes
+        # Get user profile (cached) with improved error handling for schema changes
         try:
-            profile_response = supabase_request(
-                method="GET",
-                endpoint=f"/rest/v1/profiles?id=eq.{current_user}",
-            )
+            profile = await aload_profile(current_user)
         except Exception as e:
             # If there's an issue with the request, try a more basic query
             current_app.logger.warning(f"Initial profile request failed: {str(e)}")
-            supabase = create_supabase_client()
-            result = supabase.table('profiles').select('id,username,full_name,bio,avatar_url,country,school,education_level,interests').eq('id', current_user).execute()
-            profile_response = result.data
+            count_fallback("users.get_profile.basic_columns")
+            profile_response = await async_supabase_request(
+                method="GET",
+                endpoint=BASIC_PROFILE_BY_ID,
+                params={"id": current_user},
+            )
+            profile = profile_response[0] if profile_response else None
         
-        if not profile_response or len(profile_response) == 0:
+        if not profile:
             raise NotFoundError("User profile not found")
         
-        profile = profile_response[0]
-        
         # Serialize profile data
-        profile_schema = ProfileSchema()
-        result = profile_schema.dump(profile)
+        result = PROFILE_SERIALIZER.dump(profile)
         
         return jsonify(result), 200
         
@@ -61,7 +119,7 @@ def get_profile():
 @users_bp.route("/profile", methods=["PUT"])
 @jwt_required()
 @rate_limit(limit_per_minute=10)
-def update_profile():
+async def update_profile():
     """
     Update current user's profile.
     
@@ -101,9 +159,10 @@ def update_profile():
         # Check if username is being updated and if it already exists
         if "username" in sanitized_data:
             username = sanitized_data["username"]
-            existing_user = supabase_request(
+            existing_user = await async_supabase_request(
                 method="GET",
-                endpoint=f"/rest/v1/profiles?username=eq.{username}&id=neq.{current_user}",
+                endpoint=USERNAME_TAKEN,
+                params={"username": username, "id": current_user},
             )
             
             if existing_user and len(existing_user) > 0:
@@ -114,37 +173,55 @@ def update_profile():
         
         # Update profile in Supabase with better error handling
         try:
-            update_response = supabase_request(
+            update_response = await async_supabase_request(
                 method="PATCH",
-                endpoint=f"/rest/v1/profiles?id=eq.{current_user}",
-                data=sanitized_data
+                endpoint=UPDATE_PROFILE,
+                data=sanitized_data,
+                params={"id": current_user},
             )
         except Exception as e:
-            # If the PATCH request fails, try a more targeted approach
+            # If the PATCH request fails, retry without the server-side timestamp
             current_app.logger.warning(f"Initial update request failed: {str(e)}")
-            supabase = create_supabase_client()
-            update_response = supabase.table('profiles').update(sanitized_data).eq('id', current_user).execute()
-        
-        # Get updated profile
-        try:
-            profile_response = supabase_request(
-                method="GET",
-                endpoint=f"/rest/v1/profiles?id=eq.{current_user}",
+            count_fallback("users.update_profile.client_timestamp")
+            sanitized_data.pop("updated_at", None)
+            update_response = await async_supabase_request(
+                method="PATCH",
+                endpoint=UPDATE_PROFILE,
+                data=sanitized_data,
+                params={"id": current_user},
             )
-        except Exception as e:
-            # If there's an issue with the request, try a more basic query
-            current_app.logger.warning(f"Post-update profile request failed: {str(e)}")
-            supabase = create_supabase_client()
-            result = supabase.table('profiles').select('id,username,full_name,bio,avatar_url,country,school,education_level,interests').eq('id', current_user).execute()
-            profile_response = result.data
         
-        if not profile_response or len(profile_response) == 0:
+        # Drop the cached row (and username index) before anything else reads it
+        profile_cache = get_profile_cache()
+        await run_sync(profile_cache.invalidate, current_user, sanitized_data.get("username"))
+        
+        if update_response:
+            profile = update_response[0]
+            await run_sync(profile_cache.put, profile)
+        else:
+            # Nothing returned; read the profile back
+            try:
+                profile = await aload_profile(current_user)
+            except Exception as e:
+                # If there's an issue with the request, try a more basic query
+                current_app.logger.warning(f"Post-update profile request failed: {str(e)}")
+                count_fallback("users.update_profile.basic_columns")
+                profile_response = await async_supabase_request(
+                    method="GET",
+                    endpoint=BASIC_PROFILE_BY_ID,
+                    params={"id": current_user},
+                )
+                profile = profile_response[0] if profile_response else None
+        
+        if not profile:
             raise NotFoundError("User profile not found")
         
-        profile = profile_response[0]
+        # Re-index the user's features so their suggestions change at once
+        if RECOMMENDATION_FIELDS & sanitized_data.keys():
+            await run_sync(get_recommender().update, profile)
         
         # Serialize profile data
-        result = profile_schema.dump(profile)
+        result = PROFILE_SERIALIZER.dump(profile)
         
         return jsonify(result), 200
         
@@ -156,6 +233,7 @@ def update_profile():
 
 
 @users_bp.route("/profile/<string:username>", methods=["GET"])
+@cache_control("PUBLIC_PROFILE_CACHE_CONTROL")
 @rate_limit(limit_per_minute=30)
 def get_user_profile(username):
     """
@@ -168,20 +246,14 @@ def get_user_profile(username):
         JSON: User profile data
     """
     try:
-        # Get user profile
-        profile_response = supabase_request(
-            method="GET",
-            endpoint=f"/rest/v1/profiles?username=eq.{username}",
-        )
+        # Get user profile (cached)
+        profile = load_profile_by_username(username)
         
-        if not profile_response or len(profile_response) == 0:
+        if not profile:
             raise NotFoundError("User profile not found")
         
-        profile = profile_response[0]
-        
         # Serialize profile data (exclude sensitive fields)
-        profile_schema = ProfileSchema(exclude=["created_at", "updated_at"])
-        result = profile_schema.dump(profile)
+        result = PUBLIC_PROFILE_SERIALIZER.dump(profile)
         
         return jsonify(result), 200
         
@@ -192,100 +264,266 @@ def get_user_profile(username):
         raise BadRequestError("Failed to get profile")
 
 
+@users_bp.route("/profiles/batch", methods=["POST"])
+@jwt_required()
+@rate_limit(limit_per_minute=30)
+def batch_profiles():
+    """
+    Get many users' public profiles in one request.
+    
+    Profiles are served from the profile cache where possible; the rest are
+    read together with ``in.(...)`` filters rather than one query each. A
+    lookup that fails or matches nothing is reported on its own entry
+    instead of failing the batch.
+    
+    Request body:
+        ids (list, optional): Profile ids
+        usernames (list, optional): Usernames
+        
+    Returns:
+        JSON: ``results`` with one entry per requested id, then per requested
+        username, in request order, each with a ``status`` of ``found``,
+        ``not_found`` or ``unavailable`` and the ``profile`` when found
+    """
+    data = request.get_json(silent=True)
+    max_batch = current_app.config.get("PROFILE_BATCH_MAX", 500)
+    
+    if not isinstance(data, dict):
+        raise BadRequestError("No input data provided")
+    
+    ids = data.get("ids") or []
+    usernames = data.get("usernames") or []
+    if not isinstance(ids, list) or not isinstance(usernames, list):
+        raise ValidationFailedError("ids and usernames must be lists")
+    if not ids and not usernames:
+        raise BadRequestError("No ids or usernames provided")
+    if len(ids) + len(usernames) > max_batch:
+        raise ValidationFailedError(f"At most {max_batch} profiles can be requested at once")
+    if not all(isinstance(key, str) for key in ids + usernames):
+        raise ValidationFailedError("ids and usernames must be strings")
+    
+    # A malformed id would make Postgres reject the whole in.(...) filter
+    valid_ids = [profile_id for profile_id in ids if _is_uuid(profile_id)]
+    batch = load_profiles(valid_ids, usernames)
+    
+    results = []
+    for field, keys, found, failed in (
+        ("id", ids, batch.by_id, batch.failed_ids),
+        ("username", usernames, batch.by_username, batch.failed_usernames),
+    ):
+        for key in keys:
+            profile = found.get(key)
+            if profile is not None:
+                results.append({field: key, "status": "found", "profile": PUBLIC_PROFILE_SERIALIZER.dump(profile)})
+            else:
+                results.append({field: key, "status": "unavailable" if key in failed else "not_found"})
+    
+    return jsonify({"results": results}), 200
+
+
+def _is_uuid(value):
+    try:
+        uuid.UUID(value)
+    except ValueError:
+        return False
+    return True
+
+
+@users_bp.route("/recommendations", methods=["GET"])
+@jwt_required()
+@rate_limit(limit_per_minute=30)
+def recommended_profiles():
+    """
+    Suggest delegates with interests, conferences, country and experience
+    like the current user's.
+    
+    Query parameters:
+        limit (int, optional): Number of suggestions (default 10, at most 50)
+        
+    Returns:
+        JSON: Public profiles, best match first, each with a ``score`` and
+        the ``shared`` interests, conferences, country and experience
+    """
+    current_user = get_jwt_identity()
+    try:
+        limit = min(max(int(request.args.get("limit", 10)), 1), 50)
+    except ValueError:
+        raise ValidationFailedError("limit must be an integer")
+    
+    try:
+        recommender = get_recommender()
+        recommender.ensure_loaded()
+        
+        if current_user not in recommender.index:
+            # Signed up since the last rebuild
+            profile = load_profile(current_user)
+            if not profile:
+                raise NotFoundError("User profile not found")
+            recommender.update(profile)
+        
+        matches = recommender.index.similar(current_user, limit)
+        batch = load_profiles(ids=[match.profile_id for match in matches])
+        
+        profiles = []
+        for match in matches:
+            profile = batch.by_id.get(match.profile_id)
+            if profile is None:
+                continue  # deleted since the index was built
+            result = PUBLIC_PROFILE_SERIALIZER.dump(profile)
+            result["score"] = match.score
+            result["shared"] = match.shared
+            profiles.append(result)
+        
+        return jsonify({"data": profiles}), 200
+        
+    except Exception as e:
+        if isinstance(e, NotFoundError):
+            raise
+        current_app.logger.error(f"Error getting recommendations: {str(e)}")
+        raise BadRequestError("Failed to get recommendations")
+
+
+@users_bp.route("/profile-cache/stats", methods=["GET"])
+@admin_required
+def profile_cache_stats():
+    """
+    Get hit/miss statistics for this worker's profile cache.
+    
+    Returns:
+        JSON: Per-tier cache statistics
+    """
+    return jsonify(get_profile_cache().stats()), 200
+
+
+@users_bp.route("/admins/<user_id>", methods=["DELETE"])
+@admin_required
+def revoke_admin(user_id):
+    """
+    Remove a user's admin role.
+    
+    Existing tokens stop authorizing admin routes immediately on this
+    worker and within ``ROLE_REVOCATION_POLL`` seconds on the others.
+    
+    Args:
+        user_id (str): User to demote
+        
+    Returns:
+        JSON: Confirmation
+    """
+    try:
+        response = supabase_request(
+            method="PATCH",
+            endpoint=REVOKE_ADMIN,
+            data={"is_admin": False},
+            params={"id": user_id},
+        )
+    except Exception as e:
+        current_app.logger.error(f"Error revoking admin role: {str(e)}")
+        raise BadRequestError("Failed to revoke admin role")
+    
+    if not response:
+        raise NotFoundError("User not found")
+    
+    get_role_cache().revoke(user_id)
+    get_profile_cache().invalidate(user_id)
+    
+    return jsonify({"message": "Admin role revoked"}), 200
+
+
 @users_bp.route("/profiles", methods=["GET"])
+@cache_control("PROFILE_SEARCH_CACHE_CONTROL")
 @rate_limit(limit_per_minute=10)
-def search_profiles():
+async def search_profiles():
     """
     Search for user profiles.
     
+    Two pagination modes are supported. Page mode returns the page and the
+    total count from a single upstream request. Cursor mode seeks past the
+    last username of the previous page, so deep pages cost the same as the
+    first one; it skips the total count.
+    
     Query parameters:
         q (str, optional): Search query
         page (int, optional): Page number
         per_page (int, optional): Number of results per page
-        
+        cursor (str, optional): Username to continue after; enables cursor
+            mode (pass an empty value for the first page)
+        count (str, optional): Count mode for page mode: exact, planned or
+            estimated
+    
     Returns:
         JSON: Paginated list of user profiles
     """
     search_query = request.args.get("q", "")
     page = int(request.args.get("page", 1))
     per_page = min(int(request.args.get("per_page", 10)), 50)  # Limit to 50 max results
+    cursor = request.args.get("cursor")
+    count_mode = request.args.get("count", current_app.config["PROFILE_SEARCH_COUNT_MODE"])
+    
+    if count_mode not in CountMode.ALL:
+        raise ValidationFailedError(f"count must be one of: {', '.join(CountMode.ALL)}")
+    
+    keyset = bool(cursor)
     
     try:
-        # Build search query
-        offset = (page - 1) * per_page
+        if cursor is not None:
+            # Fetch one extra row to learn whether another page follows
+            query_params = {"limit": per_page + 1, "cursor": cursor, "offset": 0}
+            count_mode = None
+        else:
+            query_params = {"limit": per_page, "offset": (page - 1) * per_page}
+        
+        if search_query:
+            # Case-insensitive substring match on username or full name
+            query_params["pattern"] = f"*{search_query}*"
         
         # Try using the improved search approach with error handling
         try:
-            # Use ilike for case-insensitive search
-            search_condition = ""
-            if search_query:
-                search_condition = f"&or=(username.ilike.*{search_query}*,full_name.ilike.*{search_query}*)"
-            
-            profiles_response = supabase_request(
-                method="GET",
-                endpoint=f"/rest/v1/profiles?order=username{search_condition}&limit={per_page}&offset={offset}",
-                headers={
-                    "Range-Unit": "items",
-                    "Range": f"{offset}-{offset+per_page-1}",
-                    "Prefer": "count=exact"
-                }
+            profiles_response, total = await async_supabase_page(
+                PROFILE_SEARCH_QUERIES[(bool(search_query), keyset, False)],
+                params=query_params,
+                count=count_mode,
             )
-            
-            # Get total count from response headers
-            total = 0
-            
-            # Since we're using the direct supabase_request, we don't have access to headers
-            # We'll need to make a separate count query
-            count_response = supabase_request(
-                method="GET",
-                endpoint=f"/rest/v1/profiles?select=count{search_condition}"
-            )
-            
-            if count_response and len(count_response) > 0:
-                total = count_response[0].get("count", 0)
-            
         except Exception as e:
-            # If there's an issue with the request, try using create_supabase_client directly
+            # If there's an issue with the request, retry with the basic column set
             current_app.logger.warning(f"Initial profiles search request failed: {str(e)}")
-            supabase = create_supabase_client()
-            
-            # Build query
-            query = supabase.table('profiles').select('id,username,full_name,bio,avatar_url,country,school,education_level,interests')
-            
-            # Apply search if provided
-            if search_query:
-                query = query.or_(f'username.ilike.%{search_query}%,full_name.ilike.%{search_query}%')
-            
-            # Get paginated results
-            result = query.range(offset, offset + per_page - 1).execute()
-            profiles_response = result.data
-            
-            # Get count
-            count_result = supabase.table('profiles').select('count', count='exact')
-            if search_query:
-                count_result = count_result.or_(f'username.ilike.%{search_query}%,full_name.ilike.%{search_query}%')
-            total = count_result.execute().count or 0
+            count_fallback("users.search_profiles.basic_columns")
+            profiles_response, total = await async_supabase_page(
+                PROFILE_SEARCH_QUERIES[(bool(search_query), keyset, True)],
+                params=query_params,
+                count=count_mode,
+            )
         
-        # Calculate pagination metadata
-        pages = (total + per_page - 1) // per_page if total > 0 else 0
+        if cursor is not None:
+            has_more = len(profiles_response) > per_page
+            profiles_response = profiles_response[:per_page]
+            meta = {
+                "per_page": per_page,
+                "next_cursor": profiles_response[-1]["username"] if has_more else None,
+                "has_more": has_more,
+            }
+        else:
+            # Calculate pagination metadata
+            total = total or 0
+            pages = (total + per_page - 1) // per_page if total > 0 else 0
+            meta = {
+                "page": page,
+                "per_page": per_page,
+                "total": total,
+                "pages": pages,
+            }
         
         # Serialize profiles data
-        profile_schema = ProfileSchema(many=True)
-        profiles = profile_schema.dump(profiles_response)
+        profiles = PROFILE_SERIALIZER.dump_many(profiles_response)
         
         # Return paginated response
         response = {
             "data": profiles,
-            "meta": {
-                "page": page,
-                "per_page": per_page,
-                "total": total,
-                "pages": pages
-            }
+            "meta": meta,
         }
         
         return jsonify(response), 200
         
     except Exception as e:
         current_app.logger.error(f"Error searching profiles: {str(e)}")
-        raise BadRequestError("Failed to search profiles") 
\ No newline at end of file
+        raise BadRequestError("Failed to search profiles")
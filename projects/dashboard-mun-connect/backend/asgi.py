@@ -0,0 +1,18 @@
+"""
+ASGI entry point for the application.
+
+Run with ``uvicorn asgi:app``. Requests are handed to a pool of
+``ASGI_THREADS`` threads; async views park on the shared Supabase I/O loop
+while they wait, so one worker can keep hundreds of requests in flight.
+"""
+import os
+from a2wsgi import WSGIMiddleware
+from app import create_app
+
+# Create the Flask application and wrap it for ASGI servers
+flask_app = create_app(os.getenv("FLASK_ENV", "development"))
+app = WSGIMiddleware(flask_app, workers=int(os.getenv("ASGI_THREADS", 200)))
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(app, host="0.0.0.0", port=int(os.getenv("PORT", 5000)))
@@ -0,0 +1,490 @@
+"""
+In-process stand-in for the Supabase PostgREST and Auth APIs.
+
+Serves the subset of PostgREST the backend uses (``select``, ``eq``/``neq``/
+``gt``/``gte``/``lt``/``lte``/``like``/``ilike``/``in``/``is``/``cs``/``ov``
+filters, ``or``, ``order``, ``limit``/``offset``, ``Prefer: count=...`` and
+``return=representation``) over in-memory tables, Postgres functions
+registered in ``functions`` as Python callables, plus the password grant
+and admin user lookup of Supabase Auth. Given a ``jwt_secret``, sessions carry
+HS256 access tokens signed like a real project's (``AUTH_MODE=supabase``) and
+can be refreshed with the ``refresh_token`` grant. Every upstream call is counted by
+route, and each response can be delayed or replaced by an injected error, so
+load tests measure the backend itself under controlled upstream conditions.
+
+Used by ``load_bench.py``; it can also be run on its own to point a
+separately started backend at it::
+
+    python benchmarks/fake_supabase.py --port 54321 --latency-ms 5
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from collections import Counter
+from functools import lru_cache
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, unquote, urlsplit
+
+import jwt
+
+WORDS = ["climate", "security", "trade", "nuclear", "refugees", "water", "rights", "health", "energy", "oceans"]
+COUNTRIES = ["Brazil", "Canada", "Ghana", "India", "Japan", "Kenya", "Mexico", "Norway"]
+PASSWORD = "password"
+
+
+def seed_profiles(count, seed=7):
+    """
+    Generate ``count`` profiles and their Auth users.
+
+    Usernames are ``delegate_0000``, ``delegate_0001``, ...; the matching
+    Auth email is ``<username>@example.org`` with password ``password``.
+
+    Args:
+        count (int): Number of profiles
+        seed (int): Random seed
+
+    Returns:
+        tuple: (profiles, users) lists of dicts
+    """
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    profiles, users = [], []
+    for i in range(count):
+        user_id = str(uuid.UUID(int=rng.getrandbits(128), version=4))
+        created_at = (start + timedelta(minutes=i)).isoformat()
+        username = f"delegate_{i:04d}"
+        profiles.append({
+            "id": user_id,
+            "username": username,
+            "full_name": f"Delegate {rng.choice(COUNTRIES)} {i}",
+            "bio": " ".join(rng.choice(WORDS) for _ in range(30)),
+            "avatar_url": None,
+            "country": rng.choice(COUNTRIES),
+            "school": f"School {i % 40}",
+            "education_level": rng.choice(["high_school", "university"]),
+            "interests": rng.sample(WORDS, 3),
+            "conference_experience": rng.randint(0, 12),
+            "is_admin": i == 0,
+            "created_at": created_at,
+            "updated_at": created_at,
+        })
+        users.append({"id": user_id, "email": f"{username}@example.org", "created_at": created_at})
+    return profiles, users
+
+
+def _split_top_level(text):
+    """Split a PostgREST logic tree on commas outside parentheses and quotes."""
+    parts, depth, quoted, current = [], 0, False, []
+    for char in text:
+        if char == '"':
+            quoted = not quoted
+        elif not quoted and char == "(":
+            depth += 1
+        elif not quoted and char == ")":
+            depth -= 1
+        elif not quoted and char == "," and depth == 0:
+            parts.append("".join(current))
+            current = []
+            continue
+        current.append(char)
+    if current:
+        parts.append("".join(current))
+    return parts
+
+
+@lru_cache(maxsize=256)
+def _like(pattern, case_insensitive):
+    regex = "^" + ".*".join(re.escape(part) for part in pattern.replace("%", "*").split("*")) + "$"
+    return re.compile(regex, re.IGNORECASE if case_insensitive else 0)
+
+
+def _compare(value, op, operand):
+    """Evaluate one PostgREST operator against a row value."""
+    if op == "is":
+        return value is None if operand == "null" else value is (operand == "true")
+    if value is None:
+        return False
+    if op in ("like", "ilike"):
+        return bool(_like(operand, op == "ilike").match(str(value)))
+    if op == "in":
+        items = [item.strip('"') for item in _split_top_level(operand.strip("()"))]
+        return str(value) in items
+    if op in ("cs", "ov"):
+        items = {item.strip('"') for item in _split_top_level(operand.strip("{}"))}
+        values = {str(item) for item in value}
+        return items <= values if op == "cs" else bool(items & values)
+    if isinstance(value, bool):
+        value = str(value).lower()
+    elif isinstance(value, (int, float)):
+        operand = type(value)(operand)
+    else:
+        value = str(value)
+    return {
+        "eq": value == operand,
+        "neq": value != operand,
+        "gt": value > operand,
+        "gte": value >= operand,
+        "lt": value < operand,
+        "lte": value <= operand,
+    }[op]
+
+
+def _condition(column, expression):
+    """Build a row predicate from ``column`` and ``op.value`` (optionally ``not.``)."""
+    negate = expression.startswith("not.")
+    if negate:
+        expression = expression[4:]
+    op, _, operand = expression.partition(".")
+    if op in ("or", "and"):
+        return _logic(op, operand)
+    if len(operand) > 1 and operand[0] == operand[-1] == '"':
+        # Values with reserved characters are quoted inside logic trees
+        operand = operand[1:-1]
+    return lambda row: _compare(row.get(column), op, operand) != negate
+
+
+def _logic(op, tree):
+    conditions = []
+    for part in _split_top_level(tree.strip("()")):
+        if part.startswith(("or(", "and(")):
+            name, _, inner = part.partition("(")
+            conditions.append(_logic(name, "(" + inner))
+        else:
+            column, _, expression = part.partition(".")
+            conditions.append(_condition(column, expression))
+    combine = any if op == "or" else all
+    return lambda row: combine(condition(row) for condition in conditions)
+
+
+def _order(rows, clause):
+    # Stable sorts applied from the last key to the first
+    for term in reversed(clause.split(",")):
+        column, *modifiers = term.split(".")
+        descending = "desc" in modifiers
+        nulls_first = "nullsfirst" in modifiers or ("nullslast" not in modifiers and descending)
+        present = [row for row in rows if row.get(column) is not None]
+        missing = [row for row in rows if row.get(column) is None]
+        present.sort(key=lambda row: row[column], reverse=descending)
+        rows = missing + present if nulls_first else present + missing
+    return rows
+
+
+class FakeSupabase:
+    """
+    Fake Supabase project served on a local port.
+
+    Args:
+        profiles (int): Number of seeded profiles
+        latency_ms (float): Delay added to every response
+        jitter_ms (float): Extra uniformly distributed delay, up to this much
+        error_rate (float): Fraction of calls answered with ``error_status``
+        error_status (int): Status code of injected errors
+        seed (int): Random seed for data and injected errors
+        jwt_secret (str, optional): Sign session access tokens with this
+            HS256 secret instead of handing out opaque placeholders
+    """
+
+    def __init__(self, profiles=1000, latency_ms=0.0, jitter_ms=0.0, error_rate=0.0, error_status=503, seed=7,
+                 jwt_secret=None):
+        self.jwt_secret = jwt_secret
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._calls = Counter()
+        self._errors = 0
+
+        rows, users = seed_profiles(profiles, seed)
+        self.tables = {"profiles": rows}
+        self.users = {user["id"]: user for user in users}
+        self.users_by_email = {user["email"]: user for user in users}
+        self.admins = {row["id"] for row in rows if row["is_admin"]}
+        self.refresh_tokens = {}
+        # RPC name -> callable taking the JSON arguments and returning rows;
+        # it runs under the fake's lock, so it sees a consistent snapshot
+        self.functions = {}
+        self._server = None
+
+    @property
+    def url(self):
+        """Base URL to use as ``SUPABASE_URL``."""
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self, host="127.0.0.1", port=0):
+        """
+        Serve on a background thread.
+
+        Args:
+            host (str): Interface to bind
+            port (int): Port, or 0 for any free one
+
+        Returns:
+            FakeSupabase: self
+        """
+        fake = self
+
+        class Handler(_Handler):
+            supabase = fake
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name="fake-supabase", daemon=True).start()
+        return self
+
+    def stop(self):
+        """Shut the server down."""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def reset_calls(self):
+        """Clear the call counters."""
+        with self._lock:
+            self._calls.clear()
+            self._errors = 0
+
+    def calls(self):
+        """
+        Return the calls received since the last reset.
+
+        Returns:
+            dict: ``{"total": n, "errors": n, "routes": {"GET profiles": n, ...}}``
+        """
+        with self._lock:
+            return {"total": sum(self._calls.values()), "errors": self._errors, "routes": dict(self._calls)}
+
+    def _record(self, route):
+        """Count a call and decide its delay and whether it fails."""
+        with self._lock:
+            self._calls[route] += 1
+            delay = self.latency_ms + (self._rng.random() * self.jitter_ms if self.jitter_ms else 0)
+            failed = self.error_rate > 0 and self._rng.random() < self.error_rate
+            if failed:
+                self._errors += 1
+        return delay / 1000, failed
+
+    def handle(self, method, path, headers, body):
+        """
+        Answer one request.
+
+        Args:
+            method (str): HTTP method
+            path (str): Path with query string
+            headers (Message): Request headers
+            body (bytes): Request body
+
+        Returns:
+            tuple: (status, response headers, JSON-serializable body)
+        """
+        parts = urlsplit(path)
+        query = parse_qsl(parts.query, keep_blank_values=True)
+        if parts.path.startswith("/rest/v1/rpc/"):
+            function = self.functions.get(parts.path[len("/rest/v1/rpc/"):])
+            if function is None:
+                return 404, {}, {"message": "function not registered in the fake"}
+            with self._lock:
+                return 200, {}, function(json.loads(body) if body else {})
+        if parts.path.startswith("/rest/v1/"):
+            return self._rest(method, unquote(parts.path[len("/rest/v1/"):]), query, headers, body)
+        if parts.path.startswith("/auth/v1/"):
+            return self._auth(method, parts.path[len("/auth/v1/"):], dict(query), body)
+        return 404, {}, {"message": "not found"}
+
+    def route(self, method, path):
+        """Name the upstream route of a request, e.g. ``GET profiles``."""
+        path = urlsplit(path).path
+        if path.startswith("/rest/v1/"):
+            return f"{method} {path[len('/rest/v1/'):]}"
+        if path.startswith("/auth/v1/admin/users/"):
+            return f"{method} auth/admin/users"
+        return f"{method} {path.lstrip('/').replace('/v1', '')}"
+
+    def _rest(self, method, table, query, headers, body):
+        rows = self.tables.setdefault(table, [])
+        predicates, order, limit, offset, select = [], None, None, 0, "*"
+        for key, value in query:
+            if key == "select":
+                select = value
+            elif key == "order":
+                order = value
+            elif key == "limit":
+                limit = int(value)
+            elif key == "offset":
+                offset = int(value)
+            elif key in ("or", "and"):
+                predicates.append(_logic(key, value))
+            else:
+                predicates.append(_condition(key, value))
+
+        prefer = headers.get("Prefer", "")
+        payload = json.loads(body) if body else None
+
+        with self._lock:
+            if method == "POST":
+                new_rows = payload if isinstance(payload, list) else [payload]
+                matched = [dict(row) for row in new_rows]
+                for row in matched:
+                    row.setdefault("id", str(uuid.uuid4()))
+                rows.extend(matched)
+            else:
+                matched = [row for row in rows if all(predicate(row) for predicate in predicates)]
+                if method == "PATCH":
+                    now = datetime.now(timezone.utc).isoformat()
+                    for row in matched:
+                        row.update({k: now if v == "now()" else v for k, v in payload.items()})
+                elif method == "DELETE":
+                    self.tables[table] = [row for row in rows if row not in matched]
+                    if table == "profiles":
+                        # Like the profile_deletions trigger
+                        now = datetime.now(timezone.utc).isoformat()
+                        self.tables.setdefault("profile_deletions", []).extend(
+                            {"id": row["id"], "deleted_at": now} for row in matched
+                        )
+            matched = [dict(row) for row in matched]
+
+        total = len(matched)
+        if order:
+            matched = _order(matched, order)
+        if method == "GET":
+            matched = matched[offset:offset + limit if limit is not None else None]
+        if select != "*":
+            columns = [column.split(":")[-1] for column in _split_top_level(select)]
+            matched = [{column: row.get(column) for column in columns} for row in matched]
+
+        response_headers = {}
+        if "count=" in prefer:
+            end = offset + len(matched) - 1
+            response_headers["Content-Range"] = f"{offset}-{end}/{total}" if matched else f"*/{total}"
+        if method != "GET" and "return=representation" not in prefer:
+            return 204, response_headers, None
+        return (201 if method == "POST" else 200), response_headers, matched
+
+    def _auth(self, method, path, query, body):
+        payload = json.loads(body) if body else {}
+        if method == "POST" and path == "token" and query.get("grant_type") == "password":
+            user = self.users_by_email.get(payload.get("email"))
+            if user is None or payload.get("password") != PASSWORD:
+                return 400, {}, {"error": "invalid_grant", "error_description": "Invalid login credentials"}
+            return 200, {}, self._session(user)
+        if method == "POST" and path == "token" and query.get("grant_type") == "refresh_token":
+            with self._lock:
+                user_id = self.refresh_tokens.pop(payload.get("refresh_token"), None)
+            if user_id is None:
+                return 400, {}, {"error": "invalid_grant", "error_description": "Invalid Refresh Token"}
+            return 200, {}, self._session(self.users[user_id])
+        if method == "GET" and path == ".well-known/jwks.json":
+            # HS256 projects publish no public keys
+            return 200, {}, {"keys": []}
+        if method == "GET" and path == "health":
+            return 200, {}, {"name": "GoTrue", "description": "fake"}
+        if method == "POST" and path == "signup":
+            user = {
+                "id": str(uuid.uuid4()),
+                "email": payload.get("email"),
+                "created_at": datetime.now(timezone.utc).isoformat(),
+            }
+            with self._lock:
+                self.users[user["id"]] = user
+                self.users_by_email[user["email"]] = user
+            return 200, {}, user
+        if method == "GET" and path.startswith("admin/users/"):
+            user = self.users.get(path[len("admin/users/"):])
+            if user is None:
+                return 404, {}, {"msg": "User not found"}
+            return 200, {}, user
+        return 404, {}, {"msg": "not found"}
+
+    def _session(self, user, expires_in=3600):
+        refresh_token = uuid.uuid4().hex
+        with self._lock:
+            self.refresh_tokens[refresh_token] = user["id"]
+        if self.jwt_secret:
+            now = int(time.time())
+            role = "admin" if user["id"] in self.admins else "user"
+            access_token = jwt.encode({
+                "iss": f"{self.url}/auth/v1",
+                "aud": "authenticated",
+                "sub": user["id"],
+                "email": user["email"],
+                "role": "authenticated",
+                "app_metadata": {"provider": "email", "role": role},
+                "session_id": str(uuid.uuid4()),
+                "iat": now,
+                "exp": now + expires_in,
+            }, self.jwt_secret, algorithm="HS256")
+        else:
+            access_token = f"fake-{user['id']}"
+        return {
+            "access_token": access_token,
+            "refresh_token": refresh_token,
+            "token_type": "bearer",
+            "expires_in": expires_in,
+            "user": user,
+        }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    supabase = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _serve(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+
+        delay, failed = self.supabase._record(self.supabase.route(self.command, self.path))
+        if delay:
+            time.sleep(delay)
+        if failed:
+            status, headers, payload = self.supabase.error_status, {}, {"message": "injected upstream error"}
+        else:
+            status, headers, payload = self.supabase.handle(self.command, self.path, self.headers, body)
+
+        data = b"" if payload is None else json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    do_GET = do_POST = do_PATCH = do_PUT = do_DELETE = _serve
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=54321)
+    parser.add_argument("--profiles", type=int, default=1000, help="seeded profiles")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="delay added to every response")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="extra random delay, up to this much")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of calls that fail")
+    parser.add_argument("--jwt-secret", help="sign access tokens with this HS256 secret (SUPABASE_JWT_SECRET)")
+    args = parser.parse_args()
+
+    fake = FakeSupabase(
+        args.profiles, args.latency_ms, args.jitter_ms, args.error_rate, jwt_secret=args.jwt_secret,
+    ).start(args.host, args.port)
+    print(f"Fake Supabase on {fake.url}; log in as delegate_0000@example.org / {PASSWORD}")
+    try:
+        while True:
+            time.sleep(10)
+            print(json.dumps(fake.calls()))
+    except KeyboardInterrupt:
+        fake.stop()
+
+
+if __name__ == "__main__":
+    main()
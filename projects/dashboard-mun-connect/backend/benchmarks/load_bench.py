@@ -0,0 +1,321 @@
+"""
+Load test of the auth and profile endpoints against a fake Supabase.
+
+Starts ``fake_supabase.FakeSupabase`` and the backend (in a threaded
+development server, or ``--target`` for one started separately), then drives
+each workload with ``--concurrency`` clients that each log in as their own
+seeded user:
+
+    login          POST /api/auth/login
+    me             GET  /api/auth/me
+    profile_get    GET  /api/users/profile
+    profile_put    PUT  /api/users/profile
+    search         GET  /api/users/profiles?q=...
+
+For each workload it reports p50/p95/p99 latency, requests per second, the
+share of failed requests and upstream (Supabase) calls per request. Results
+are written as a JSON baseline; ``--compare`` checks a run against an earlier
+baseline and exits non-zero on a regression, so runs on two commits can be
+diffed with the same settings.
+
+Rate limiting is switched off unless ``--rate-limit`` is given, since a
+handful of clients would otherwise measure 429s. Client, backend and fake
+share one process in the default mode, so absolute numbers are lower than a
+deployment's; compare runs from the same machine. ``--auth-mode supabase``
+logs clients in with Supabase session tokens (HS256, signed by the fake) so
+the runs measure local verification of those instead of app-minted tokens.
+
+Usage:
+    python benchmarks/load_bench.py [--requests N] [--concurrency N] [--workload NAME ...]
+        [--latency-ms MS] [--jitter-ms MS] [--error-rate F] [--auth-mode app|supabase]
+        [--output PATH] [--compare PATH] [--tolerance F]
+        [--target URL --upstream-port PORT]
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+# Add the parent directory to the path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+
+from fake_supabase import PASSWORD, FakeSupabase
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+FAKE_JWT_SECRET = "fake-supabase-jwt-secret-for-load-tests"
+SEARCH_TERMS = ["", "delegate", "brazil", "_00", "japan", "1"]
+
+
+def _login(client, index):
+    return client.post("/api/auth/login", json={
+        "email": f"delegate_{index:04d}@example.org",
+        "password": PASSWORD,
+    })
+
+
+def _search(client, i):
+    term = SEARCH_TERMS[i % len(SEARCH_TERMS)]
+    return client.get("/api/users/profiles", params={"q": term, "page": i % 3 + 1, "per_page": 10})
+
+
+# name -> request(client, i); the client is already logged in as its own user
+WORKLOADS = {
+    "login": lambda client, i: _login(client, client.user_index),
+    "me": lambda client, i: client.get("/api/auth/me"),
+    "profile_get": lambda client, i: client.get("/api/users/profile"),
+    "profile_put": lambda client, i: client.put("/api/users/profile", json={"bio": f"Update {i}"}),
+    "search": _search,
+}
+
+
+def percentile(samples, fraction):
+    """Return the ``fraction`` percentile of sorted ``samples``."""
+    if not samples:
+        return 0.0
+    return samples[min(len(samples) - 1, int(len(samples) * fraction))]
+
+
+class BackendServer:
+    """The backend in a threaded development server on a free local port."""
+
+    def __init__(self, supabase_url, auth_mode="app"):
+        from werkzeug.serving import make_server
+        from app import create_app
+
+        os.environ["NEXT_PUBLIC_SUPABASE_URL"] = supabase_url
+        os.environ["SUPABASE_API_KEY"] = "fake.service.key"
+        os.environ["AUTH_MODE"] = auth_mode
+        os.environ["SUPABASE_JWT_SECRET"] = FAKE_JWT_SECRET
+        self.app = create_app("testing")
+        # One access log line per request would dominate the run
+        logging.getLogger("werkzeug").setLevel(logging.WARNING)
+        self._server = make_server("127.0.0.1", 0, self.app, threaded=True)
+        self.url = f"http://127.0.0.1:{self._server.server_port}"
+        threading.Thread(target=self._server.serve_forever, name="backend", daemon=True).start()
+
+    def stop(self):
+        self._server.shutdown()
+
+
+def open_clients(base_url, count):
+    """Create ``count`` keep-alive clients, each logged in as a different user."""
+    clients = []
+    for index in range(count):
+        client = httpx.Client(base_url=base_url, timeout=30)
+        response = _login(client, index)
+        response.raise_for_status()
+        client.headers["Authorization"] = f"Bearer {response.json()['tokens']['access_token']}"
+        client.user_index = index
+        clients.append(client)
+    return clients
+
+
+def warm_up(request, clients, count):
+    """Send ``count`` untimed requests from every client."""
+    for client in clients:
+        for i in range(count):
+            request(client, i)
+
+
+def run_workload(request, clients, total):
+    """
+    Send ``total`` requests spread over the clients.
+
+    Returns:
+        tuple: (sorted latencies in ms, failed request count, elapsed seconds)
+    """
+    latencies, failures, lock = [], [0], threading.Lock()
+    counter = iter(range(total))
+
+    def worker(client):
+        local, failed = [], 0
+        while True:
+            with lock:
+                i = next(counter, None)
+            if i is None:
+                break
+            start = time.perf_counter()
+            response = request(client, i)
+            local.append((time.perf_counter() - start) * 1000)
+            failed += response.status_code >= 400
+        with lock:
+            latencies.extend(local)
+            failures[0] += failed
+
+    threads = [threading.Thread(target=worker, args=(client,)) for client in clients]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return sorted(latencies), failures[0], time.perf_counter() - start
+
+
+def summarize(latencies, failures, elapsed, upstream):
+    """Build the result record of one workload."""
+    count = len(latencies)
+    return {
+        "requests": count,
+        "failures": failures,
+        "error_rate": round(failures / count, 4) if count else 0.0,
+        "rps": round(count / elapsed, 1) if elapsed else 0.0,
+        "mean_ms": round(sum(latencies) / count, 3) if count else 0.0,
+        "p50_ms": round(percentile(latencies, 0.50), 3),
+        "p95_ms": round(percentile(latencies, 0.95), 3),
+        "p99_ms": round(percentile(latencies, 0.99), 3),
+        "upstream_per_request": round(upstream["total"] / count, 3) if count else 0.0,
+        "upstream_routes": {route: round(n / count, 3) for route, n in sorted(upstream["routes"].items())},
+    }
+
+
+def compare(results, baseline, tolerance):
+    """
+    Print the change against a baseline and list regressions.
+
+    Latency and throughput regress when they are worse by more than
+    ``tolerance`` (a fraction); upstream calls per request regress on any
+    increase, since they do not depend on the machine.
+
+    Returns:
+        list: Regression descriptions
+    """
+    regressions = []
+    print(f"\nAgainst {baseline.get('commit') or 'baseline'} ({baseline.get('created_at', '?')}):")
+    print(f"{'workload':<12} {'p50':>9} {'p95':>9} {'p99':>9} {'rps':>9} {'upstream':>9}")
+    for name, current in results["workloads"].items():
+        before = baseline.get("workloads", {}).get(name)
+        if before is None:
+            continue
+
+        def change(key):
+            return (current[key] - before[key]) / before[key] if before[key] else 0.0
+
+        print(
+            f"{name:<12} {change('p50_ms'):>+9.1%} {change('p95_ms'):>+9.1%} {change('p99_ms'):>+9.1%} "
+            f"{change('rps'):>+9.1%} {current['upstream_per_request'] - before['upstream_per_request']:>+9.2f}"
+        )
+        if change("p95_ms") > tolerance:
+            regressions.append(f"{name}: p95 {before['p95_ms']}ms -> {current['p95_ms']}ms")
+        if -change("rps") > tolerance:
+            regressions.append(f"{name}: {before['rps']} -> {current['rps']} requests/s")
+        if current["upstream_per_request"] > before["upstream_per_request"] + 0.01:
+            regressions.append(
+                f"{name}: {before['upstream_per_request']} -> {current['upstream_per_request']} upstream calls/request"
+            )
+    return regressions
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=BENCHMARKS_DIR, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workload", action="append", choices=sorted(WORKLOADS), help="workload to run (repeatable; default all)")
+    parser.add_argument("--requests", type=int, default=1000, help="timed requests per workload")
+    parser.add_argument("--concurrency", type=int, default=8, help="concurrent clients")
+    parser.add_argument("--warmup", type=int, default=5, help="untimed requests per client before each workload")
+    parser.add_argument("--profiles", type=int, default=1000, help="profiles seeded in the fake")
+    parser.add_argument("--latency-ms", type=float, default=2.0, help="delay the fake adds to every upstream call")
+    parser.add_argument("--jitter-ms", type=float, default=1.0, help="extra random upstream delay, up to this much")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of upstream calls that fail")
+    parser.add_argument("--rate-limit", action="store_true", help="keep the backend's rate limits on")
+    parser.add_argument("--auth-mode", choices=["app", "supabase"], default="app",
+                        help="authenticate with app-minted or Supabase session tokens")
+    parser.add_argument("--target", help="URL of a backend started separately against --upstream-port")
+    parser.add_argument("--upstream-port", type=int, default=0, help="port of the fake Supabase (default any)")
+    parser.add_argument("--output", help="baseline file to write (default benchmarks/baselines/load-<commit>.json)")
+    parser.add_argument("--compare", help="baseline file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed latency/throughput regression")
+    args = parser.parse_args()
+
+    if args.concurrency > args.profiles:
+        parser.error("--concurrency cannot exceed --profiles (one user per client)")
+
+    fake = FakeSupabase(args.profiles, args.latency_ms, args.jitter_ms, jwt_secret=FAKE_JWT_SECRET)
+    fake.start(port=args.upstream_port)
+    if args.target:
+        base_url, backend = args.target.rstrip("/"), None
+        print(f"Fake Supabase on {fake.url}; the backend at {base_url} must use it as its Supabase URL")
+    else:
+        backend = BackendServer(fake.url, args.auth_mode)
+        backend.app.extensions["rate_limiter"].enabled = args.rate_limit
+        # Tokens must outlive the run
+        backend.app.config["JWT_ACCESS_TOKEN_EXPIRES"] = timedelta(hours=1)
+        base_url = backend.url
+
+    clients = open_clients(base_url, args.concurrency)
+    # Errors are injected only once every client has logged in
+    fake.error_rate = args.error_rate
+
+    results = {
+        "commit": _git_commit(),
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "settings": {
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "profiles": args.profiles,
+            "latency_ms": args.latency_ms,
+            "jitter_ms": args.jitter_ms,
+            "error_rate": args.error_rate,
+            "rate_limit": args.rate_limit,
+            "auth_mode": args.auth_mode,
+            "target": "external" if args.target else "in-process",
+        },
+        "workloads": {},
+    }
+
+    print(f"{'workload':<12} {'rps':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7} {'upstream/req':>13}")
+    try:
+        for name in args.workload or list(WORKLOADS):
+            warm_up(WORKLOADS[name], clients, args.warmup)
+            # Warmup calls are not part of the per-request figure
+            fake.reset_calls()
+            latencies, failures, elapsed = run_workload(WORKLOADS[name], clients, args.requests)
+            timed = summarize(latencies, failures, elapsed, fake.calls())
+            results["workloads"][name] = timed
+            print(
+                f"{name:<12} {timed['rps']:>8.0f} {timed['p50_ms']:>8.2f} {timed['p95_ms']:>8.2f} "
+                f"{timed['p99_ms']:>8.2f} {timed['error_rate']:>7.1%} {timed['upstream_per_request']:>13.2f}"
+            )
+    finally:
+        for client in clients:
+            client.close()
+        if backend is not None:
+            backend.stop()
+        fake.stop()
+
+    output = args.output or os.path.join(BENCHMARKS_DIR, "baselines", f"load-{results['commit'] or 'local'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+        f.write("\n")
+    print(f"\nWrote {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print("\nRegressions:")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Microbenchmark for rate limiter check overhead.
+
+Measures the cost of one limiter check for each algorithm on the in-process
+backend, with threads hitting distinct keys (the common case: many clients)
+and a single shared key (worst-case lock contention).
+
+Usage:
+    python benchmarks/ratelimit_bench.py [--checks N] [--redis URL]
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+# Add the parent directory to the path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.ratelimit import ALGORITHMS, MemoryBackend, RedisBackend
+
+
+def run(backend, algorithm, threads, checks, shared_key):
+    """Return the mean wall-clock nanoseconds per check across all threads."""
+    barrier = threading.Barrier(threads + 1)
+
+    def worker(index):
+        key = "bench:shared" if shared_key else f"bench:{index}"
+        barrier.wait()
+        for _ in range(checks):
+            backend.hit(algorithm, key, 1_000_000, 60)
+
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for t in workers:
+        t.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for t in workers:
+        t.join()
+    elapsed = time.perf_counter() - start
+    return elapsed / (threads * checks) * 1e9
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--checks", type=int, default=20000, help="checks per thread")
+    parser.add_argument("--redis", help="also benchmark the Redis backend at this URL")
+    args = parser.parse_args()
+
+    backends = [("memory", MemoryBackend)]
+    if args.redis:
+        backends.append(("redis", lambda: RedisBackend(args.redis, prefix="rl-bench:")))
+
+    print(f"{'backend':<8} {'algorithm':<15} {'threads':>7} {'keys':>8} {'ns/check':>10} {'checks/s':>12}")
+    for backend_name, factory in backends:
+        checks = args.checks if backend_name == "memory" else max(args.checks // 20, 100)
+        for algorithm in ALGORITHMS.values():
+            for threads in (1, 4, 8):
+                for shared_key in (False, True):
+                    ns = run(factory(), algorithm, threads, checks, shared_key)
+                    print(
+                        f"{backend_name:<8} {algorithm.name:<15} {threads:>7} "
+                        f"{'shared' if shared_key else 'distinct':>8} {ns:>10.0f} {1e9 / ns:>12,.0f}"
+                    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Benchmark for the suggested delegates index.
+
+Builds a ``RecommendationIndex`` over synthetic profiles (interests and
+conferences drawn with a skewed, Zipf-like popularity so some features are
+very common), then times top-k lookups for random profiles and incremental
+updates as ``update_profile`` applies them.
+
+Usage:
+    python benchmarks/recommendation_bench.py [--profiles N] [--lookups N] [--k N]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+# Add the parent directory to the path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.users.recommendations import RecommendationIndex
+
+COUNTRIES = [f"country {i}" for i in range(60)]
+INTERESTS = [f"interest {i}" for i in range(300)]
+CONFERENCES = [f"conference {i}" for i in range(120)]
+
+
+def skewed_sample(rng, population, count):
+    """Sample without replacement, favouring the start of ``population``."""
+    chosen = set()
+    while len(chosen) < count:
+        chosen.add(population[min(int(rng.paretovariate(1.2)) - 1, len(population) - 1)])
+    return list(chosen)
+
+
+def generate(count, seed=7):
+    rng = random.Random(seed)
+    return [
+        {
+            "id": f"profile-{i}",
+            "country": skewed_sample(rng, COUNTRIES, 1)[0],
+            "interests": skewed_sample(rng, INTERESTS, rng.randint(1, 6)),
+            "conference_experience": skewed_sample(rng, CONFERENCES, rng.randint(0, 8)),
+        }
+        for i in range(count)
+    ]
+
+
+def percentile(samples, fraction):
+    return samples[min(len(samples) - 1, int(len(samples) * fraction))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--profiles", type=int, default=50000, help="profiles in the index")
+    parser.add_argument("--lookups", type=int, default=1000, help="top-k lookups timed")
+    parser.add_argument("--k", type=int, default=10, help="suggestions per lookup")
+    parser.add_argument("--max-candidates", type=int, default=2000, help="RECOMMENDATION_MAX_CANDIDATES")
+    parser.add_argument("--common-share", type=float, default=0.05, help="RECOMMENDATION_COMMON_SHARE")
+    args = parser.parse_args()
+
+    profiles = generate(args.profiles)
+    index = RecommendationIndex(max_candidates=args.max_candidates, common_share=args.common_share)
+    start = time.perf_counter()
+    index.build(profiles)
+    build_ms = (time.perf_counter() - start) * 1000
+
+    rng = random.Random(1)
+    latencies = []
+    for _ in range(args.lookups):
+        profile_id = rng.choice(profiles)["id"]
+        start = time.perf_counter()
+        index.similar(profile_id, args.k)
+        latencies.append((time.perf_counter() - start) * 1000)
+    latencies.sort()
+
+    start = time.perf_counter()
+    for profile in generate(args.lookups, seed=8):
+        index.upsert(dict(profile, id=rng.choice(profiles)["id"]))
+    upsert_us = (time.perf_counter() - start) / args.lookups * 1e6
+
+    print(f"profiles {args.profiles}, features {index.stats()['features']}, build {build_ms:.0f} ms")
+    print(f"{'lookup p50 ms':>14} {'p95 ms':>8} {'p99 ms':>8} {'upsert us':>10}")
+    print(
+        f"{percentile(latencies, 0.5):>14.2f} {percentile(latencies, 0.95):>8.2f} "
+        f"{percentile(latencies, 0.99):>8.2f} {upsert_us:>10.1f}"
+    )
+
+
+if __name__ == "__main__":
+    main()
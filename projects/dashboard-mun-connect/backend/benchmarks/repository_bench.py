@@ -0,0 +1,69 @@
+"""
+Benchmark for the REST and direct Postgres data backends.
+
+Runs the cached-profile lookup used by the profile routes through each
+backend and reports per-call latency. Needs the Supabase settings and a
+reachable ``POSTGRES_URL`` in the environment.
+
+Usage:
+    python benchmarks/repository_bench.py --profile-id ID [--iterations N] [--config NAME]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+# Add the parent directory to the path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from app import create_app, db
+from app.core.profiles import CACHED_PROFILE_BY_ID
+from app.core.repository import PostgresRepository, RestRepository
+
+
+def run(repository, profile_id, iterations, warmup=20):
+    """Return sorted per-call latencies in milliseconds."""
+    params = {"id": profile_id}
+    for _ in range(warmup):
+        repository.execute("GET", CACHED_PROFILE_BY_ID, params=params)
+
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        repository.execute("GET", CACHED_PROFILE_BY_ID, params=params)
+        samples.append((time.perf_counter() - start) * 1000)
+    return sorted(samples)
+
+
+def percentile(samples, fraction):
+    return samples[min(len(samples) - 1, int(len(samples) * fraction))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--profile-id", required=True, help="existing profile id to look up")
+    parser.add_argument("--iterations", type=int, default=500, help="timed lookups per backend")
+    parser.add_argument("--config", default=os.getenv("FLASK_ENV", "development"), help="config name")
+    args = parser.parse_args()
+
+    app = create_app(args.config)
+    with app.app_context():
+        backends = [RestRepository(), PostgresRepository(db.engine)]
+
+        print(f"{'backend':<10} {'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+        for repository in backends:
+            samples = run(repository, args.profile_id, args.iterations)
+            print(
+                f"{repository.name:<10} {statistics.mean(samples):>9.2f} "
+                f"{percentile(samples, 0.50):>9.2f} {percentile(samples, 0.95):>9.2f} "
+                f"{percentile(samples, 0.99):>9.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""
+Benchmark for response serialization of 50-item pages.
+
+Compares the marshmallow path (``Schema(many=True).dump`` and Flask's
+default JSON provider) with the compiled serializers and the orjson
+provider, for profile, document and speech pages. Before timing, every page
+is rendered by both paths and the response bodies are checked to be
+byte-identical.
+
+Usage:
+    python benchmarks/serialization_bench.py [--pages N] [--per-page N]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+# Add the parent directory to the path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+from app.core.schemas import DocumentSchema, ProfileSchema, SpeechSchema
+from app.core.serializers import FastJSONProvider, orjson, serializer
+
+WORDS = ["climate", "security", "trade", "nuclear", "disarmament", "refugees", "water", "rights", "health", "energy"]
+# Names with accents make some pages non-ASCII, like real profile data
+NAMES = ["Ana", "Kenji", "Amara", "Lukas", "Priya", "Mateo", "José", "Zoë"]
+
+
+def _text(rng, words):
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+def _timestamp(rng):
+    return f"2024-0{rng.randint(1, 9)}-1{rng.randint(0, 9)}T12:{rng.randint(10, 59)}:00.{rng.randint(0, 999999):06d}+00:00"
+
+
+def profile_row(rng, i):
+    row = {
+        "id": f"{rng.getrandbits(128):032x}",
+        "username": f"delegate_{i}",
+        "full_name": f"{rng.choice(NAMES)} {rng.choice(NAMES)}son",
+        "bio": _text(rng, 40) if i % 3 else None,
+        "avatar_url": None,
+        "country": rng.choice(["Brazil", "Côte d'Ivoire", "Japan"]),
+        "school": _text(rng, 3),
+        "education_level": rng.choice(["high_school", "university"]),
+        "interests": [rng.choice(WORDS) for _ in range(rng.randint(0, 6))],
+        "created_at": _timestamp(rng),
+        "updated_at": _timestamp(rng),
+    }
+    if i % 7 == 0:
+        del row["school"]
+    return row
+
+
+def document_row(rng, i):
+    return {
+        "id": f"{rng.getrandbits(128):032x}",
+        "title": _text(rng, 5),
+        "document_type": "position_paper",
+        "tags": [rng.choice(WORDS) for _ in range(3)],
+        "is_public": bool(i % 2),
+        "author_id": f"{rng.getrandbits(128):032x}",
+        "committee_id": None,
+        "revision": rng.randint(0, 500),
+        "created_at": _timestamp(rng),
+        "updated_at": _timestamp(rng),
+    }
+
+
+def speech_row(rng, i):
+    return {
+        "id": f"{rng.getrandbits(128):032x}",
+        "title": _text(rng, 5),
+        "speech_type": "opening",
+        "duration_seconds": rng.randint(30, 300),
+        "tags": [],
+        "is_public": True,
+        "author_id": f"{rng.getrandbits(128):032x}",
+        "committee_id": f"{rng.getrandbits(128):032x}",
+        "created_at": _timestamp(rng),
+        "updated_at": _timestamp(rng),
+    }
+
+
+CASES = [
+    ("profiles", ProfileSchema, (), profile_row),
+    ("documents", DocumentSchema, ("content",), document_row),
+    ("speeches", SpeechSchema, ("content",), speech_row),
+]
+
+
+def timed(fn, pages):
+    """Return pages per second for ``fn`` over ``pages``."""
+    start = time.perf_counter()
+    for page in pages:
+        fn(page)
+    return len(pages) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=2000, help="pages rendered per path")
+    parser.add_argument("--per-page", type=int, default=50, help="rows per page")
+    args = parser.parse_args()
+
+    if orjson is None:
+        print("orjson is not installed; only the compiled serializers are measured")
+
+    app = Flask(__name__)
+    default_json = DefaultJSONProvider(app)
+    fast_json = FastJSONProvider(app) if orjson is not None else default_json
+    rng = random.Random(42)
+
+    print(f"{'endpoint':<10} {'path':<22} {'pages/s':>10} {'rows/s':>12} {'speedup':>8}")
+    with app.app_context():
+        for name, schema_class, exclude, make_row in CASES:
+            pages = [
+                [make_row(rng, p * args.per_page + i) for i in range(args.per_page)]
+                for p in range(args.pages)
+            ]
+            schema = schema_class(many=True, exclude=exclude)
+            compiled = serializer(schema_class, exclude=exclude)
+
+            def marshmallow_path(page):
+                return default_json.response({"data": schema.dump(page), "meta": {"per_page": 50}}).get_data()
+
+            def compiled_path(page):
+                return fast_json.response({"data": compiled.dump_many(page), "meta": {"per_page": 50}}).get_data()
+
+            mismatches = sum(marshmallow_path(page) != compiled_path(page) for page in pages)
+            if mismatches:
+                print(f"{name}: {mismatches} pages differ between the two paths")
+                sys.exit(1)
+
+            baseline = timed(marshmallow_path, pages)
+            fast = timed(compiled_path, pages)
+            for label, rate in (("marshmallow+json", baseline), ("compiled+orjson", fast)):
+                print(
+                    f"{name:<10} {label:<22} {rate:>10.0f} {rate * args.per_page:>12.0f} "
+                    f"{rate / baseline:>7.1f}x"
+                )
+
+
+if __name__ == "__main__":
+    main()
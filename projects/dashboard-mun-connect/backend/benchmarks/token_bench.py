@@ -0,0 +1,106 @@
+"""
+Benchmark for access token verification.
+
+Times ``_decode_jwt_from_config`` (what ``jwt_required`` runs per request) for
+an app-minted token, a Supabase HS256 token verified from scratch each time
+(distinct tokens) and the same Supabase token repeated, which is served from
+the verified-token cache. When the ``cryptography`` package is installed an
+ES256 token checked against a cached JWKS key is timed as well.
+
+Usage:
+    python benchmarks/token_bench.py [--tokens N]
+"""
+import argparse
+import os
+import sys
+import time
+
+import jwt
+
+# Add the parent directory to the path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SUPABASE_URL = "https://bench.supabase.co"
+SECRET = "bench-supabase-jwt-secret-0123456789"
+
+os.environ.setdefault("NEXT_PUBLIC_SUPABASE_URL", SUPABASE_URL)
+os.environ.setdefault("SUPABASE_API_KEY", "bench.service.key")
+os.environ["AUTH_MODE"] = "hybrid"
+os.environ["SUPABASE_JWT_SECRET"] = SECRET
+
+from flask_jwt_extended import create_access_token
+
+from app import create_app, jwt as jwt_manager
+
+
+def supabase_token(index, key=SECRET, algorithm="HS256", headers=None):
+    now = int(time.time())
+    return jwt.encode({
+        "iss": f"{SUPABASE_URL}/auth/v1",
+        "aud": "authenticated",
+        "sub": f"00000000-0000-4000-8000-{index:012d}",
+        "email": f"delegate_{index}@example.org",
+        "role": "authenticated",
+        "app_metadata": {"provider": "email"},
+        "session_id": f"session-{index}",
+        "iat": now,
+        "exp": now + 3600,
+    }, key, algorithm=algorithm, headers=headers)
+
+
+def es256_tokens(count):
+    """Return ES256 tokens and their JWK, or None without cryptography."""
+    try:
+        from cryptography.hazmat.primitives.asymmetric import ec
+    except ImportError:
+        return None
+    private_key = ec.generate_private_key(ec.SECP256R1())
+    jwk = jwt.algorithms.ECAlgorithm.to_jwk(private_key.public_key(), as_dict=True)
+    jwk.update({"kid": "bench", "use": "sig", "alg": "ES256"})
+    tokens = [supabase_token(i, private_key, "ES256", {"kid": "bench"}) for i in range(count)]
+    return tokens, jwk
+
+
+def run(tokens):
+    """Return microseconds per verification."""
+    decode = jwt_manager._decode_jwt_from_config
+    start = time.perf_counter()
+    for token in tokens:
+        decode(token)
+    return (time.perf_counter() - start) / len(tokens) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tokens", type=int, default=5000, help="verifications timed per case")
+    args = parser.parse_args()
+
+    app = create_app("testing")
+    app.config["SUPABASE_URL"] = SUPABASE_URL
+    verifier = app.extensions["supabase_tokens"]
+    verifier.cache_size = args.tokens + 1
+
+    with app.test_request_context():
+        app_token = create_access_token(identity="bench", additional_claims={"email": "bench@example.org"})
+        cases = [
+            ("app", [app_token] * args.tokens),
+            ("supabase", [supabase_token(i) for i in range(args.tokens)]),
+            ("cached", [supabase_token(0)] * args.tokens),
+        ]
+        es256 = es256_tokens(args.tokens)
+        if es256 is not None:
+            tokens, jwk = es256
+            verifier.keys._keys = {"bench": jwt.PyJWK(jwk)}
+            verifier.keys._expires_at = float("inf")
+            cases.append(("es256", tokens))
+
+        print(f"{'case':<10} {'us/token':>10}")
+        for name, tokens in cases:
+            verifier._verified.clear()
+            print(f"{name:<10} {run(tokens):>10.1f}")
+        if es256 is None:
+            print("(es256 skipped: install cryptography)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Benchmark for the overhead of tracing spans.
+
+Times an empty ``with span(...)`` block, nested one level under a request
+span like the upstream-call spans are, with the tracer off entirely, with
+latency histograms only (the default) and with every request sampled.
+
+Usage:
+    python benchmarks/tracing_bench.py [--spans N]
+"""
+import argparse
+import os
+import sys
+import time
+
+# Add the parent directory to the path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core import tracing
+from app.core.tracing import Tracer, span
+
+MODES = [
+    ("off", {"metrics": False, "sample_rate": 0.0}),
+    ("metrics", {"metrics": True, "sample_rate": 0.0}),
+    ("sampled", {"metrics": True, "sample_rate": 1.0}),
+]
+
+
+def run(tracer, spans, per_request=10):
+    """Return nanoseconds per span, ``per_request`` spans under each request span."""
+    tracing._tracer = tracer
+    start = time.perf_counter()
+    for _ in range(spans // per_request):
+        root = tracer.start_request("GET /bench")
+        for _ in range(per_request):
+            with span("supabase.request", method="GET", target="profiles"):
+                pass
+        if root is not None:
+            root.finish()
+    elapsed = time.perf_counter() - start
+
+    # The same loop without spans, to subtract the loop itself
+    start = time.perf_counter()
+    for _ in range(spans // per_request):
+        for _ in range(per_request):
+            pass
+    baseline = time.perf_counter() - start
+    return (elapsed - baseline) / spans * 1e9
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--spans", type=int, default=200000, help="spans timed per mode")
+    args = parser.parse_args()
+
+    print(f"{'mode':<10} {'ns/span':>10}")
+    for name, options in MODES:
+        tracer = Tracer(max_traces=100, **options)
+        print(f"{name:<10} {run(tracer, args.spans):>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Shared fixtures.
+
+Tests run against ``create_app("testing")`` (SQLite search, stub research
+model) and, where a route talks to Supabase, the in-process fake from
+``benchmarks/fake_supabase.py``.
+"""
+import os
+import sys
+import uuid
+
+import pytest
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+sys.path.insert(0, os.path.join(BACKEND, "benchmarks"))
+
+# Config reads the environment on import
+os.environ.setdefault("NEXT_PUBLIC_SUPABASE_URL", "http://127.0.0.1:9")
+os.environ.setdefault("SUPABASE_API_KEY", "test.service.key")
+
+from flask_jwt_extended import create_access_token  # noqa: E402
+
+from app import create_app  # noqa: E402
+from fake_supabase import FakeSupabase  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def fake_supabase():
+    """A fake Supabase project with 50 seeded profiles, shared by the session."""
+    fake = FakeSupabase(50).start()
+    yield fake
+    fake.stop()
+
+
+@pytest.fixture
+def app(fake_supabase):
+    app = create_app("testing")
+    app.config["SUPABASE_URL"] = fake_supabase.url
+    app.extensions["rate_limiter"].enabled = False
+    yield app
+    app.extensions["research"].shutdown(wait=True)
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def auth_headers(app):
+    """Return ``Authorization`` headers for a user id."""
+    def headers(user_id, **claims):
+        with app.test_request_context():
+            token = create_access_token(identity=user_id, additional_claims=claims)
+        return {"Authorization": f"Bearer {token}"}
+    return headers
+
+
+@pytest.fixture
+def documents(fake_supabase):
+    """
+    Return a function seeding a document into the fake; the documents and
+    revisions tables are emptied afterwards.
+    """
+    def add(author_id, content="", **fields):
+        document = dict({
+            "id": str(uuid.uuid4()),
+            "title": "Position paper",
+            "content": content,
+            "document_type": "position_paper",
+            "tags": [],
+            "is_public": False,
+            "author_id": author_id,
+            "committee_id": None,
+            "revision": 0,
+            "content_revision": 0,
+            "created_at": "2024-03-01T00:00:00+00:00",
+            "updated_at": "2024-03-01T00:00:00+00:00",
+        }, **fields)
+        fake_supabase.tables.setdefault("documents", []).append(document)
+        fake_supabase.tables.setdefault("document_revisions", []).append({
+            "document_id": document["id"], "revision": 0, "ops": None, "size": 0,
+            "snapshot": True, "content": content, "created_at": document["created_at"],
+        })
+        return document
+    yield add
+    fake_supabase.tables["documents"] = []
+    fake_supabase.tables["document_revisions"] = []
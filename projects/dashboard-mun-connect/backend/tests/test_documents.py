@@ -0,0 +1,101 @@
+"""
+Documents API: metadata listings, keyset pagination and content revalidation.
+"""
+AUTHOR = "11111111-1111-4111-8111-111111111111"
+OTHER = "22222222-2222-4222-8222-222222222222"
+
+
+def _seed_pages(documents, count):
+    return [
+        documents(AUTHOR, content="x" * 100, title=f"Paper {i}", updated_at=f"2024-03-{i + 1:02d}T00:00:00+00:00")
+        for i in range(count)
+    ]
+
+
+def test_listing_never_includes_content(client, documents, auth_headers):
+    documents(AUTHOR, content="secret draft")
+
+    response = client.get("/api/documents", headers=auth_headers(AUTHOR))
+
+    assert response.status_code == 200
+    assert len(response.json["data"]) == 1
+    assert "content" not in response.json["data"][0]
+
+
+def test_cursor_pages_cover_every_document_once(client, documents, auth_headers):
+    seeded = _seed_pages(documents, 5)
+    # Same updated_at as another row: the id breaks the tie
+    seeded.append(documents(AUTHOR, title="Tie", updated_at=seeded[2]["updated_at"]))
+    headers = auth_headers(AUTHOR)
+
+    seen, cursor = [], None
+    while True:
+        url = "/api/documents?per_page=2" + (f"&cursor={cursor}" if cursor else "")
+        page = client.get(url, headers=headers).json
+        seen += [row["id"] for row in page["data"]]
+        cursor = page["meta"]["next_cursor"]
+        if not page["meta"]["has_more"]:
+            break
+
+    expected = sorted(seeded, key=lambda d: (d["updated_at"], d["id"]), reverse=True)
+    assert seen == [d["id"] for d in expected]
+
+
+def test_filters_and_visibility(client, documents, auth_headers):
+    documents(AUTHOR, tags=["water", "trade"], committee_id="c1")
+    documents(AUTHOR, tags=["trade"], committee_id="c2")
+    public = documents(OTHER, is_public=True, tags=["water"])
+    documents(OTHER, is_public=False, tags=["water"])
+    headers = auth_headers(AUTHOR)
+
+    def ids(query):
+        return {row["id"] for row in client.get(f"/api/documents?{query}", headers=headers).json["data"]}
+
+    assert len(ids("tag=trade")) == 2
+    assert len(ids("tag=water")) == 1
+    assert len(ids("committee_id=c2")) == 1
+    # Another author's listing only shows their public documents
+    assert ids(f"author_id={OTHER}") == {public["id"]}
+    assert public["id"] in ids("is_public=true")
+
+
+def test_content_revalidates_with_etag(client, documents, auth_headers):
+    document = documents(AUTHOR, content="The delegation of Ghana")
+    headers = auth_headers(AUTHOR)
+
+    first = client.get(f"/api/documents/{document['id']}/content", headers=headers)
+    again = client.get(
+        f"/api/documents/{document['id']}/content",
+        headers=dict(headers, **{"If-None-Match": first.headers["ETag"]}),
+    )
+
+    assert first.status_code == 200
+    assert first.json["content"] == "The delegation of Ghana"
+    assert again.status_code == 304
+    assert again.data == b""
+
+
+def test_private_documents_are_hidden_from_others(client, documents, auth_headers):
+    document = documents(AUTHOR, content="draft")
+
+    response = client.get(f"/api/documents/{document['id']}/content", headers=auth_headers(OTHER))
+
+    assert response.status_code == 404
+
+
+def test_create_update_and_delete(client, auth_headers, documents):
+    headers = auth_headers(AUTHOR)
+
+    created = client.post("/api/documents", headers=headers, json={
+        "title": "Draft", "content": "text", "document_type": "notes",
+    })
+    document_id = created.json["id"]
+    updated = client.put(f"/api/documents/{document_id}", headers=headers, json={"title": "Final"})
+    foreign = client.delete(f"/api/documents/{document_id}", headers=auth_headers(OTHER))
+    deleted = client.delete(f"/api/documents/{document_id}", headers=headers)
+
+    assert created.status_code == 201
+    assert "content" not in created.json
+    assert updated.json["title"] == "Final"
+    assert foreign.status_code == 404
+    assert deleted.status_code == 200
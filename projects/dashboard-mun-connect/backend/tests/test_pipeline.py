@@ -0,0 +1,157 @@
+"""
+Response pipeline: content negotiation, ETags, conditional GET and
+per-route caching policy.
+"""
+import gzip
+import json
+
+import pytest
+from flask import Flask, Response, jsonify
+
+from app.core import pipeline
+from app.core.pipeline import cache_control, init_response_pipeline, set_resource_version
+
+BIG = "delegate " * 200
+UPDATED_AT = "2024-03-01T12:00:00+00:00"
+
+
+@pytest.fixture
+def bare_client():
+    """A client for an app with only the pipeline and a few routes."""
+    app = Flask(__name__)
+    app.config.update(COMPRESS_MIN_SIZE=1024, DEFAULT_CACHE_CONTROL="private, no-cache")
+    init_response_pipeline(app)
+
+    @app.route("/big")
+    def big():
+        return jsonify(text=BIG)
+
+    @app.route("/small")
+    def small():
+        return jsonify(text="hi")
+
+    @app.route("/versioned")
+    @cache_control("public, max-age=60")
+    def versioned():
+        set_resource_version("row-1", UPDATED_AT)
+        return jsonify(text=BIG)
+
+    @app.route("/stream")
+    def stream():
+        return Response((chunk for chunk in [BIG]), mimetype="text/plain")
+
+    @app.route("/big", methods=["POST"])
+    def create():
+        return jsonify(text=BIG), 201
+
+    return app.test_client()
+
+
+def test_gzip_above_the_size_threshold(bare_client):
+    response = bare_client.get("/big", headers={"Accept-Encoding": "gzip"})
+
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["Vary"]
+    assert response.headers["ETag"].endswith('-gzip"')
+    assert json.loads(gzip.decompress(response.data)) == {"text": BIG}
+
+
+def test_small_bodies_are_sent_as_is(bare_client):
+    response = bare_client.get("/small", headers={"Accept-Encoding": "gzip"})
+
+    assert "Content-Encoding" not in response.headers
+    assert "Accept-Encoding" in response.headers["Vary"]
+    assert response.json == {"text": "hi"}
+
+
+def test_identity_when_no_coding_is_accepted(bare_client):
+    plain = bare_client.get("/big")
+    refused = bare_client.get("/big", headers={"Accept-Encoding": "gzip;q=0"})
+
+    assert "Content-Encoding" not in plain.headers
+    assert "Content-Encoding" not in refused.headers
+
+
+def test_brotli_is_preferred_when_installed(bare_client):
+    brotli = pytest.importorskip("brotli")
+
+    response = bare_client.get("/big", headers={"Accept-Encoding": "gzip, br"})
+
+    assert response.headers["Content-Encoding"] == "br"
+    assert json.loads(brotli.decompress(response.data)) == {"text": BIG}
+
+
+def test_brotli_only_clients_get_identity_without_the_package(bare_client, monkeypatch):
+    monkeypatch.setattr(pipeline, "brotli", None)
+
+    response = bare_client.get("/big", headers={"Accept-Encoding": "br"})
+
+    assert "Content-Encoding" not in response.headers
+    assert response.json == {"text": BIG}
+
+
+def test_streams_and_writes_pass_through(bare_client):
+    stream = bare_client.get("/stream", headers={"Accept-Encoding": "gzip"})
+    created = bare_client.post("/big", headers={"Accept-Encoding": "gzip"})
+
+    assert "Content-Encoding" not in stream.headers
+    assert "ETag" not in stream.headers
+    assert created.headers["Content-Encoding"] == "gzip"
+    assert "ETag" not in created.headers
+    assert "Cache-Control" not in created.headers
+
+
+def test_if_none_match_in_any_encoding(bare_client):
+    compressed = bare_client.get("/big", headers={"Accept-Encoding": "gzip"})
+    plain = bare_client.get("/big")
+
+    # A validator from the gzip representation still matches the plain one
+    again = bare_client.get("/big", headers={"If-None-Match": compressed.headers["ETag"]})
+    other = bare_client.get("/big", headers={"If-None-Match": '"something-else"'})
+
+    assert compressed.headers["ETag"] == plain.headers["ETag"][:-1] + '-gzip"'
+    assert again.status_code == 304
+    assert again.data == b""
+    assert "Content-Type" not in again.headers
+    assert again.headers["ETag"] == plain.headers["ETag"]
+    assert other.status_code == 200
+
+
+def test_resource_version_sets_validators(bare_client):
+    response = bare_client.get("/versioned")
+    modified = bare_client.get("/versioned", headers={"If-Modified-Since": response.headers["Last-Modified"]})
+    stale = bare_client.get("/versioned", headers={"If-Modified-Since": "Fri, 01 Mar 2024 11:59:59 GMT"})
+
+    assert response.headers["Last-Modified"] == "Fri, 01 Mar 2024 12:00:00 GMT"
+    assert modified.status_code == 304
+    assert modified.headers["Cache-Control"] == "public, max-age=60"
+    assert stale.status_code == 200
+
+
+def test_if_none_match_takes_precedence_over_if_modified_since(bare_client):
+    response = bare_client.get("/versioned", headers={
+        "If-None-Match": '"something-else"',
+        "If-Modified-Since": "Fri, 01 Mar 2024 12:00:00 GMT",
+    })
+
+    assert response.status_code == 200
+
+
+def test_cache_control_per_route(bare_client):
+    assert bare_client.get("/big").headers["Cache-Control"] == "private, no-cache"
+    assert bare_client.get("/versioned").headers["Cache-Control"] == "public, max-age=60"
+
+
+def test_cache_control_reads_config_keys(client, fake_supabase, auth_headers):
+    profile = fake_supabase.tables["profiles"][1]
+
+    public = client.get(f"/api/users/profile/{profile['username']}")
+    private = client.get("/api/users/profile", headers=auth_headers(profile["id"]))
+    missing = client.get("/api/users/profile/nobody-here")
+
+    assert public.headers["Cache-Control"] == client.application.config["PUBLIC_PROFILE_CACHE_CONTROL"]
+    assert private.headers["Cache-Control"] == "private, no-cache"
+    # Errors are never cached
+    assert missing.status_code == 404
+    assert "Cache-Control" not in missing.headers
+
@@ -0,0 +1,69 @@
+"""
+Login and profile routes against the fake Supabase project.
+"""
+from fake_supabase import PASSWORD
+
+
+def _profile(fake_supabase, username):
+    return next(row for row in fake_supabase.tables["profiles"] if row["username"] == username)
+
+
+def test_login_returns_profile_and_tokens(client, fake_supabase):
+    response = client.post("/api/auth/login", json={
+        "email": "delegate_0001@example.org",
+        "password": PASSWORD,
+    })
+
+    assert response.status_code == 200
+    assert response.json["user"]["id"] == _profile(fake_supabase, "delegate_0001")["id"]
+    assert response.json["user"]["username"] == "delegate_0001"
+    assert response.json["tokens"]["access_token"]
+
+
+def test_login_rejects_a_wrong_password(client):
+    response = client.post("/api/auth/login", json={
+        "email": "delegate_0001@example.org",
+        "password": "wrong",
+    })
+
+    assert response.status_code == 401
+
+
+def test_get_profile(client, fake_supabase, auth_headers):
+    profile = _profile(fake_supabase, "delegate_0002")
+
+    response = client.get("/api/users/profile", headers=auth_headers(profile["id"]))
+
+    assert response.status_code == 200
+    assert response.json["username"] == "delegate_0002"
+    assert response.json["country"] == profile["country"]
+
+
+def test_update_profile_refreshes_the_cache(client, fake_supabase, auth_headers):
+    headers = auth_headers(_profile(fake_supabase, "delegate_0049")["id"])
+    client.get("/api/users/profile", headers=headers)
+
+    response = client.put("/api/users/profile", headers=headers, json={"bio": "Updated bio"})
+
+    assert response.status_code == 200
+    assert response.json["bio"] == "Updated bio"
+    assert client.get("/api/users/profile", headers=headers).json["bio"] == "Updated bio"
+
+
+def test_update_profile_rejects_a_taken_username(client, fake_supabase, auth_headers):
+    headers = auth_headers(_profile(fake_supabase, "delegate_0048")["id"])
+
+    response = client.put("/api/users/profile", headers=headers, json={"username": "delegate_0000"})
+
+    assert response.status_code == 409
+
+
+def test_profile_directory_pages(client):
+    first = client.get("/api/users/profiles?q=delegate_00&per_page=4")
+    cursor = client.get("/api/users/profiles?q=delegate_00&per_page=4&cursor=delegate_0003")
+
+    assert first.status_code == 200
+    assert [p["username"] for p in first.json["data"]] == [f"delegate_000{i}" for i in range(4)]
+    assert first.json["meta"]["total"] == 50
+    assert [p["username"] for p in cursor.json["data"]] == [f"delegate_000{i}" for i in range(4, 8)]
+    assert cursor.json["meta"]["has_more"] is True
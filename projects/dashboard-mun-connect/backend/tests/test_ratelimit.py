@@ -0,0 +1,32 @@
+"""
+In-process rate limiter state.
+"""
+from app.core.ratelimit import MemoryBackend, SlidingWindow
+
+
+def test_memory_backend_is_bounded_under_key_rotation():
+    backend = MemoryBackend(stripes=1, max_keys_per_stripe=100)
+
+    for i in range(10000):
+        backend.hit(SlidingWindow, f"ip:{i}", limit=5, period=60)
+
+    assert len(backend._stores[0]) <= 100
+
+
+def test_memory_backend_evicts_least_recently_used_keys():
+    backend = MemoryBackend(stripes=1, max_keys_per_stripe=3)
+    for key in ("a", "b", "c"):
+        backend.hit(SlidingWindow, key, limit=5, period=60)
+
+    backend.hit(SlidingWindow, "a", limit=5, period=60)
+    backend.hit(SlidingWindow, "d", limit=5, period=60)
+
+    assert list(backend._stores[0]) == ["c", "a", "d"]
+
+
+def test_memory_backend_still_limits_live_keys():
+    backend = MemoryBackend(stripes=1, max_keys_per_stripe=10)
+
+    results = [backend.hit(SlidingWindow, "user:1", limit=3, period=60) for _ in range(4)]
+
+    assert [r.allowed for r in results] == [True, True, True, False]
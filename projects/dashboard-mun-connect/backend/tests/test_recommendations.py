@@ -0,0 +1,69 @@
+"""
+Profile recommendations: the route's parameters and index rebuilds racing
+with profile updates.
+"""
+from app.users.recommendations import RecommendationIndex, Recommender
+
+PROFILES = [
+    {"id": "a", "interests": ["water", "trade"], "country": "Ghana", "conference_experience": []},
+    {"id": "b", "interests": ["water"], "country": "Ghana", "conference_experience": []},
+    {"id": "c", "interests": ["nuclear"], "country": "Peru", "conference_experience": []},
+]
+
+
+class RacingRecommender(Recommender):
+    """Recommender whose table read is interleaved with ``during_read``."""
+
+    def __init__(self, app, rows, during_read):
+        super().__init__(app, RecommendationIndex())
+        self.rows = rows
+        self.during_read = during_read
+
+    def _read_profiles(self):
+        rows = [dict(row) for row in self.rows]
+        self.during_read(self)
+        return rows
+
+
+def test_recommendations_rank_similar_profiles(client, fake_supabase, auth_headers):
+    profile = fake_supabase.tables["profiles"][1]
+
+    response = client.get("/api/users/recommendations?limit=3", headers=auth_headers(profile["id"]))
+
+    assert response.status_code == 200
+    assert 0 < len(response.json["data"]) <= 3
+    assert profile["id"] not in [row["id"] for row in response.json["data"]]
+
+
+def test_non_integer_limit_is_rejected(client, fake_supabase, auth_headers):
+    profile = fake_supabase.tables["profiles"][1]
+
+    response = client.get("/api/users/recommendations?limit=abc", headers=auth_headers(profile["id"]))
+
+    assert response.status_code == 422
+
+
+def test_changes_during_a_rebuild_survive_it(app):
+    def change(recommender):
+        # Already read as a "water" delegate; now only interested in nuclear
+        recommender.update({"id": "b", "interests": ["nuclear"]})
+        recommender.update({"id": "d", "interests": ["nuclear"], "country": "Peru", "conference_experience": []})
+        recommender.remove("a")
+
+    recommender = RacingRecommender(app, PROFILES, lambda r: None)
+    recommender.rebuild()
+    recommender.during_read = change
+    recommender.rebuild()
+
+    index = recommender.index
+    assert "a" not in index and "d" in index
+    assert {match.profile_id for match in index.similar("c", 5)} == {"b", "d"}
+
+
+def test_changes_during_the_first_build_are_kept(app):
+    recommender = RacingRecommender(app, PROFILES, lambda r: r.remove("c"))
+
+    recommender.rebuild()
+
+    assert len(recommender.index) == 2
+    assert "c" not in recommender.index
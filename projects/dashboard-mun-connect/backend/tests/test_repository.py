@@ -0,0 +1,100 @@
+"""
+PostgresRepository query compilation and execution.
+
+Statements run on a SQLite engine; the SQL they compile to for Postgres is
+checked as text.
+"""
+import pytest
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from app.core.query import Param, Query
+from app.core.repository import PostgresRepository, _condition
+
+PROFILES = Query("profiles")
+
+
+@pytest.fixture
+def repository():
+    engine = sa.create_engine("sqlite://")
+    with engine.begin() as conn:
+        conn.exec_driver_sql(
+            "CREATE TABLE profiles (id TEXT PRIMARY KEY, username TEXT, bio TEXT, is_admin BOOLEAN)"
+        )
+    return PostgresRepository(engine)
+
+
+def _sql(condition):
+    return str(condition.compile(dialect=postgresql.dialect()))
+
+
+def test_insert_read_update_delete(repository):
+    insert = PROFILES.select("id", "username")
+    by_id = PROFILES.select("id", "username", "bio").eq("id", Param("id"))
+
+    created, _ = repository.execute("POST", insert, data=[
+        {"id": "u1", "username": "ana", "bio": None, "is_admin": False},
+        {"id": "u2", "username": "ben", "bio": None, "is_admin": True},
+    ])
+    assert created == [{"id": "u1", "username": "ana"}, {"id": "u2", "username": "ben"}]
+
+    updated, _ = repository.execute("PATCH", by_id, data={"bio": "hi"}, params={"id": "u1"})
+    assert updated == [{"id": "u1", "username": "ana", "bio": "hi"}]
+
+    deleted, total = repository.execute(
+        "DELETE", PROFILES.select("id").in_("id", Param("ids")), params={"ids": ["u1", "u2"]}, count="exact"
+    )
+    assert sorted(row["id"] for row in deleted) == ["u1", "u2"]
+    assert total == 2
+    assert repository.execute("GET", by_id, params={"id": "u1"}) == ([], None)
+
+
+def test_page_with_count(repository):
+    repository.execute("POST", PROFILES.select("id"), data=[
+        {"id": f"u{i}", "username": f"user{i}", "bio": None, "is_admin": False} for i in range(5)
+    ])
+    query = PROFILES.select("username").ilike("username", Param("pattern")).order("username") \
+        .offset(Param("offset")).limit(Param("limit")).with_count()
+
+    rows, total = repository.execute("GET", query, params={"pattern": "*SER*", "offset": 1, "limit": 2})
+
+    assert [row["username"] for row in rows] == ["user1", "user2"]
+    assert total == 5
+
+
+def test_statements_are_compiled_once(repository):
+    query = PROFILES.select("id").eq("id", Param("id"))
+
+    repository.execute("GET", query, params={"id": "a"})
+    repository.execute("GET", query, params={"id": "b"})
+
+    assert len(repository._statements) == 1
+
+
+@pytest.mark.parametrize("operand, expected", [
+    (None, "bio IS NULL"),
+    ("null", "bio IS NULL"),
+    ("true", "bio IS true"),
+    (True, "bio IS true"),
+    ("FALSE", "bio IS false"),
+])
+def test_is_compiles_to_sql_keywords(operand, expected):
+    assert _sql(_condition("bio", "is", operand)) == expected
+
+
+def test_is_rejects_placeholders_and_other_operands():
+    with pytest.raises(ValueError):
+        _condition("bio", "is", Param("bio"))
+    with pytest.raises(ValueError):
+        _condition("bio", "is", "maybe")
+
+
+def test_is_null_filters_rows(repository):
+    repository.execute("POST", PROFILES.select("id"), data=[
+        {"id": "u1", "username": "ana", "bio": "set", "is_admin": False},
+        {"id": "u2", "username": "ben", "bio": None, "is_admin": False},
+    ])
+
+    rows, _ = repository.execute("GET", PROFILES.select("id").is_("bio", "null"))
+
+    assert rows == [{"id": "u2"}]
@@ -0,0 +1,218 @@
+"""
+Research job queue: enqueueing, coalescing, status write-back, event replay
+and recovery of jobs abandoned by a stopped worker.
+"""
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from flask import Flask
+
+from app.research.cache import ResearchCache
+from app.research.jobs import InProcessBroker, JobQueue, init_research_queue
+from app.research.providers import StubModel, build_models
+
+USER = "11111111-1111-4111-8111-111111111111"
+
+
+class GatedModel(StubModel):
+    """Stub model that holds its first chunk until released."""
+
+    def __init__(self, name):
+        super().__init__(name)
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.calls = 0
+
+    def stream(self, query):
+        self.calls += 1
+        self.started.set()
+        self.release.wait(5)
+        yield from super().stream(query)
+
+
+@pytest.fixture
+def research_rows(fake_supabase):
+    """Return a function seeding ``research_queries`` rows; emptied afterwards."""
+    def add(status="pending", age=timedelta(0), **fields):
+        created_at = (datetime.now(timezone.utc) - age).isoformat()
+        row = dict({
+            "id": str(uuid.uuid4()), "query": "Water security", "status": status, "model_used": "stub",
+            "user_id": USER, "committee_id": None, "result": None,
+            "created_at": created_at, "updated_at": created_at,
+        }, **fields)
+        fake_supabase.tables.setdefault("research_queries", []).append(row)
+        return row
+    yield add
+    fake_supabase.tables["research_queries"] = []
+
+
+def _row(fake_supabase, row_id):
+    return next(row for row in fake_supabase.tables["research_queries"] if row["id"] == row_id)
+
+
+def _wait_for(predicate, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def _events(body):
+    """Parse an SSE body into ``(id, event)`` pairs, skipping comments."""
+    events = []
+    for block in body.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.split("\n") if not line.startswith(":"))
+        if fields:
+            events.append((fields.get("id"), fields["event"]))
+    return events
+
+
+def test_enqueue_writes_status_and_result_back(client, auth_headers, fake_supabase, research_rows):
+    response = client.post("/api/research/queries", headers=auth_headers(USER), json={
+        "query": "Maritime boundaries in the Arctic", "refresh": True,
+    })
+
+    assert response.status_code == 202
+    assert response.json["status"] == "pending"
+    row_id = response.json["id"]
+    _wait_for(lambda: _row(fake_supabase, row_id)["status"] == "completed")
+    assert _row(fake_supabase, row_id)["result"].startswith("Research notes on: Maritime boundaries")
+
+
+def test_identical_queries_share_one_execution(app, fake_supabase, research_rows):
+    model = GatedModel("gated")
+    queue = JobQueue(app, InProcessBroker(), {"gated": (model, 1)})
+    first, second = research_rows(), research_rows()
+
+    try:
+        assert queue.enqueue(first["id"], "Water security", "gated") is False
+        model.started.wait(5)
+        assert queue.enqueue(second["id"], "  water   SECURITY ", "gated") is True
+        assert queue.owns(second["id"])
+        model.release.set()
+        _wait_for(lambda: _row(fake_supabase, second["id"])["status"] == "completed")
+    finally:
+        queue.shutdown()
+
+    assert model.calls == 1
+    assert _row(fake_supabase, first["id"])["result"] == _row(fake_supabase, second["id"])["result"]
+    assert queue.stats()["coalesced"] == 1
+    # The joined job replays the answer so far under its own numbering
+    events = list(queue.broker.subscribe(second["id"]))
+    assert [e["seq"] for e in events] == list(range(1, len(events) + 1))
+    assert events[0]["event"] == "status" and events[-1]["event"] == "done"
+
+
+def test_events_replay_after_last_event_id(client, auth_headers, fake_supabase, research_rows):
+    headers = auth_headers(USER)
+    row_id = client.post("/api/research/queries", headers=headers, json={
+        "query": "Sanctions regimes", "refresh": True,
+    }).json["id"]
+    _wait_for(lambda: _row(fake_supabase, row_id)["status"] == "completed")
+
+    full = _events(client.get(f"/api/research/queries/{row_id}/events", headers=headers).get_data(as_text=True))
+    resumed = _events(client.get(
+        f"/api/research/queries/{row_id}/events", headers=dict(headers, **{"Last-Event-ID": "3"}),
+    ).get_data(as_text=True))
+
+    assert full[0] == ("1", "status")
+    assert full[-1][1] == "done"
+    assert resumed == full[3:]
+
+
+def test_events_of_another_workers_job_follow_the_row(app, client, auth_headers, fake_supabase, research_rows):
+    app.config["RESEARCH_SSE_POLL_INTERVAL"] = 0.01
+    row = research_rows(status="running")
+
+    def finish():
+        time.sleep(0.1)
+        row.update(status="completed", result="Answer from another worker")
+
+    threading.Thread(target=finish).start()
+    body = client.get(f"/api/research/queries/{row['id']}/events", headers=auth_headers(USER)).get_data(as_text=True)
+
+    assert [event for _, event in _events(body)] == ["chunk", "done"]
+    assert "Answer from another worker" in body
+
+
+def test_reaper_fails_abandoned_jobs(app, fake_supabase, research_rows):
+    queue = app.extensions["research"]
+    abandoned = research_rows(status="running", age=timedelta(hours=1))
+    waiting = research_rows(status="pending", age=timedelta(hours=2))
+    recent = research_rows(status="pending")
+    finished = research_rows(status="completed", age=timedelta(hours=1))
+
+    with app.app_context():
+        reaped = queue.reap_stale()
+
+    assert sorted(reaped) == sorted([abandoned["id"], waiting["id"]])
+    assert [row["status"] for row in (abandoned, waiting, recent, finished)] == [
+        "failed", "failed", "pending", "completed",
+    ]
+    assert queue.stats()["reaped"] == 2
+
+
+def test_stub_is_not_offered_by_default():
+    config = Flask(__name__).config
+    config.from_object("app.core.config.DevelopmentConfig")
+    config.update(OPENAI_API_KEY="sk-test", ANTHROPIC_API_KEY=None)
+
+    assert list(build_models(config)) == ["gpt-4o-mini"]
+
+
+def test_unavailable_default_model_falls_back():
+    app = Flask(__name__)
+    app.config.update(
+        RESEARCH_MODELS={"gpt-4o-mini": {"provider": "openai"}, "claude-3-5-haiku-latest": {"provider": "anthropic"}},
+        RESEARCH_DEFAULT_MODEL="gpt-4o-mini",
+        ANTHROPIC_API_KEY="sk-ant-test",
+        RESEARCH_REAP_INTERVAL=0,
+        RESEARCH_CACHE_SIZE=0,
+    )
+
+    init_research_queue(app)
+    app.extensions["research"].shutdown()
+
+    assert app.config["RESEARCH_DEFAULT_MODEL"] == "claude-3-5-haiku-latest"
+
+
+def test_cached_answers_are_scoped_by_model():
+    cache = ResearchCache(threshold=0.5)
+    cache.store("Brazil's position on water security", "c1", "Real answer", "gpt-4o-mini")
+
+    assert cache.lookup("Brazil's position on water security", "c1", "gpt-4o-mini").match == "exact"
+    assert cache.lookup("the position of Brazil on water security", "c1", "gpt-4o-mini").match == "similar"
+    assert cache.lookup("Brazil's position on water security", "c1", "claude-3-5-haiku-latest") is None
+    assert cache.lookup("the position of Brazil on water security", "c1", "claude-3-5-haiku-latest") is None
+
+
+def test_identical_queries_to_different_models_run_separately(app, fake_supabase, research_rows):
+    first_model, second_model = GatedModel("first"), GatedModel("second")
+    queue = JobQueue(app, InProcessBroker(), {"first": (first_model, 1), "second": (second_model, 1)})
+    first, second = research_rows(), research_rows()
+
+    try:
+        assert queue.enqueue(first["id"], "Water security", "first") is False
+        assert queue.enqueue(second["id"], "Water security", "second") is False
+        first_model.release.set()
+        second_model.release.set()
+        _wait_for(lambda: _row(fake_supabase, second["id"])["status"] == "completed")
+    finally:
+        queue.shutdown()
+
+    assert first_model.calls == second_model.calls == 1
+
+
+def test_stub_answers_are_not_cached(client, auth_headers, fake_supabase, research_rows):
+    headers = auth_headers(USER)
+    body = {"query": "Nuclear disarmament verification", "committee_id": "c1", "model": "stub"}
+
+    first = client.post("/api/research/queries", headers=headers, json=body)
+    _wait_for(lambda: _row(fake_supabase, first.json["id"])["status"] == "completed")
+    second = client.post("/api/research/queries", headers=headers, json=body)
+
+    assert second.status_code == 202
+    assert second.json["cache"] is None
@@ -0,0 +1,136 @@
+"""
+Delta revisions: patch application, conflicts, snapshots and rebuilds.
+"""
+import json
+
+import pytest
+
+from app.documents.revisions import PatchError, apply_patch
+
+AUTHOR = "11111111-1111-4111-8111-111111111111"
+OTHER = "22222222-2222-4222-8222-222222222222"
+
+
+@pytest.fixture
+def save_function(fake_supabase):
+    """Register a Python mirror of ``save_document_revision`` on the fake."""
+    def save(args):
+        tables = fake_supabase.tables
+        document = next((
+            d for d in tables.get("documents", [])
+            if d["id"] == args["p_document_id"] and d["author_id"] == args["p_author_id"]
+            and args.get("p_base_revision") in (None, d["revision"])
+        ), None)
+        if document is None:
+            return []
+        document["revision"] += 1
+        document["updated_at"] = f"2024-04-01T00:00:{document['revision']:02d}+00:00"
+        content = args.get("p_content")
+        if content is not None:
+            document["content"] = content
+            document["content_revision"] = document["revision"]
+        tables["document_revisions"].append({
+            "document_id": document["id"],
+            "revision": document["revision"],
+            "ops": json.loads(args["p_ops"]) if args.get("p_ops") else None,
+            "size": args.get("p_size", 0),
+            "snapshot": content is not None,
+            "content": content,
+            "created_at": document["updated_at"],
+        })
+        return [{"revision": document["revision"], "updated_at": document["updated_at"]}]
+
+    fake_supabase.functions["save_document_revision"] = save
+    yield
+    fake_supabase.functions.pop("save_document_revision")
+
+
+def _save(client, headers, document, base, *ops):
+    return client.post(f"/api/documents/{document['id']}/revisions", headers=headers, json={
+        "base_revision": base,
+        "ops": [{"start": s, "end": e, "text": t} for s, e, t in ops],
+    })
+
+
+def test_apply_patch():
+    assert apply_patch("hello world", [
+        {"start": 0, "end": 5, "text": "HELLO"},
+        {"start": 11, "end": 11, "text": "!"},
+    ]) == "HELLO world!"
+    with pytest.raises(PatchError):
+        apply_patch("abc", [{"start": 2, "end": 3}, {"start": 0, "end": 1}])
+    with pytest.raises(PatchError):
+        apply_patch("abc", [{"start": 0, "end": 9}])
+
+
+def test_saves_store_deltas_and_content_follows(client, documents, auth_headers, save_function, fake_supabase):
+    # Long enough that two small deltas do not trigger a snapshot
+    tail = "." * 200
+    document = documents(AUTHOR, content="hello world" + tail)
+    headers = auth_headers(AUTHOR)
+
+    first = _save(client, headers, document, 0, (0, 5, "HELLO"))
+    second = _save(client, headers, document, 1, (11, 11, "!"))
+    content = client.get(f"/api/documents/{document['id']}/content", headers=headers)
+
+    assert first.status_code == second.status_code == 201
+    assert second.json["revision"] == 2
+    assert second.json["snapshot"] is False
+    assert content.json == {"id": document["id"], "revision": 2, "content": "HELLO world!" + tail}
+    # Only the edited ranges were stored; documents.content is still revision 0
+    stored = [r for r in fake_supabase.tables["document_revisions"] if r["revision"] > 0]
+    assert [r["content"] for r in stored] == [None, None]
+    assert document["content"] == "hello world" + tail
+
+
+def test_stale_base_revision_conflicts(client, documents, auth_headers, save_function):
+    document = documents(AUTHOR, content="text")
+    headers = auth_headers(AUTHOR)
+    _save(client, headers, document, 0, (0, 0, "a "))
+
+    response = _save(client, headers, document, 0, (0, 0, "b "))
+
+    assert response.status_code == 409
+    assert response.json["revision"] == 1
+
+
+def test_only_the_author_can_save(client, documents, auth_headers, save_function):
+    document = documents(AUTHOR, content="text", is_public=True)
+
+    response = _save(client, auth_headers(OTHER), document, 0, (0, 0, "x"))
+
+    assert response.status_code == 404
+    assert document["revision"] == 0
+
+
+def test_invalid_patches_are_rejected(client, documents, auth_headers, save_function):
+    document = documents(AUTHOR, content="text")
+
+    response = _save(client, auth_headers(AUTHOR), document, 0, (3, 1, "x"))
+
+    assert response.status_code == 422
+    assert document["revision"] == 0
+
+
+def test_snapshots_and_rebuilds(app, client, documents, auth_headers, save_function):
+    store = app.extensions["revisions"]
+    store.snapshot_interval, store.snapshot_ratio = 3, 1000
+    document = documents(AUTHOR, content="a")
+    headers = auth_headers(AUTHOR)
+
+    texts = ["a"]
+    for base in range(5):
+        result = _save(client, headers, document, base, (len(texts[-1]), len(texts[-1]), str(base)))
+        texts.append(texts[-1] + str(base))
+        assert result.json["snapshot"] is (base + 1 == 3)
+
+    # Rebuild from storage, not from the cached head
+    store.cache.clear()
+    for revision, text in enumerate(texts):
+        response = client.get(f"/api/documents/{document['id']}/revisions/{revision}", headers=headers)
+        assert response.json["content"] == text
+    assert client.get(f"/api/documents/{document['id']}/revisions/9", headers=headers).status_code == 404
+
+    history = client.get(f"/api/documents/{document['id']}/revisions?per_page=2", headers=headers).json
+    assert [row["revision"] for row in history["data"]] == [5, 4]
+    assert history["meta"]["next_before"] == 4
@@ -0,0 +1,47 @@
+"""
+Admin role cache: revocations reach workers that cached the flag.
+"""
+import time
+
+from app.core.cache import LocalCache, TieredCache
+from app.core.roles import RoleCache
+
+
+def _workers(count, shared):
+    """Role caches of ``count`` workers sharing one (Redis-like) tier."""
+    return [
+        RoleCache(TieredCache(LocalCache(default_timeout=30), shared), claim_max_age=300, revocation_poll=0)
+        for _ in range(count)
+    ]
+
+
+def test_revocation_overrides_flags_cached_by_other_workers():
+    revoking, other = _workers(2, LocalCache(default_timeout=300))
+    flags = {"admin-1": True}
+
+    assert other.get("admin-1", flags.get) is True
+    flags["admin-1"] = False
+    revoking.revoke("admin-1")
+
+    # The other worker's local entry is still within ROLE_CACHE_TTL
+    assert other.get("admin-1", flags.get) is False
+
+
+def test_promotion_after_a_revocation_is_kept():
+    worker, = _workers(1, LocalCache(default_timeout=300))
+    worker.revoke("admin-1")
+    time.sleep(0.01)
+    worker.set("admin-1", True)
+
+    assert worker.get("admin-1", lambda user_id: False) is True
+
+
+def test_stale_claims_fall_back_to_the_revoked_flag():
+    revoking, other = _workers(2, LocalCache(default_timeout=300))
+    issued = time.time() - 1
+    claims = {"is_admin": True, "iat": issued}
+
+    assert other.claim_allows("admin-1", claims)
+    revoking.revoke("admin-1")
+
+    assert not other.claim_allows("admin-1", claims)
@@ -0,0 +1,89 @@
+"""
+Ranked profile search on the SQLite stand-in.
+"""
+from app.search.backends import SQLiteSearchBackend
+
+PROFILES = [
+    {"id": "1", "username": "maria_lopez", "full_name": "Maria Lopez", "country": "Mexico",
+     "school": "Colegio Central", "education_level": "university", "interests": ["water", "trade"]},
+    {"id": "2", "username": "mario_rossi", "full_name": "Mario Rossi", "country": "Italy",
+     "school": "Liceo Galilei", "education_level": "high_school", "interests": ["security"]},
+    {"id": "3", "username": "amara_okafor", "full_name": "Amara Okafor", "country": "Nigeria",
+     "school": "Unity School", "education_level": "high_school", "interests": ["water", "health"]},
+    {"id": "4", "username": "kenji_sato", "full_name": "Kenji Sato", "country": "Japan",
+     "school": "Tokyo High", "education_level": "high_school", "interests": ["nuclear"]},
+    {"id": "5", "username": "wei_100pct", "full_name": "Wei Zhang", "country": "China",
+     "school": "No_1 Middle School", "education_level": "middle_school", "interests": ["trade"]},
+    {"id": "6", "username": "lucas_vidal", "full_name": "Lucas Vidal", "country": "Chile",
+     "school": "Nox1 Academy", "education_level": "university", "interests": ["energy"]},
+]
+
+
+def backend():
+    search = SQLiteSearchBackend()
+    search.index(PROFILES)
+    return search
+
+
+def test_username_prefix_ranks_first():
+    rows, total = backend().search("mari")
+
+    assert [row["username"] for row in rows][:2] == ["maria_lopez", "mario_rossi"]
+    assert total == len(rows)
+    assert rows[0]["rank"] >= rows[1]["rank"] > 0
+
+
+def test_filters_narrow_results():
+    search = backend()
+
+    rows, total = search.search(interests=["water"])
+    assert {row["id"] for row in rows} == {"1", "3"}
+    assert total == 2
+
+    rows, total = search.search(interests=["water"], education_level="high_school")
+    assert [row["id"] for row in rows] == ["3"]
+    assert rows[0]["interests"] == ["water", "health"]
+
+    rows, total = search.search(country="Japan")
+    assert [row["username"] for row in rows] == ["kenji_sato"]
+
+
+def test_total_is_kept_on_every_page():
+    search = backend()
+
+    first, total = search.search(limit=2, offset=0)
+    last, last_total = search.search(limit=4, offset=4)
+    past, past_total = search.search(limit=2, offset=10)
+
+    assert len(first) == 2 and len(last) == 2 and past == []
+    assert total == last_total == past_total == len(PROFILES)
+
+
+def test_like_wildcards_match_literally():
+    search = backend()
+
+    rows, _ = search.search("%")
+    assert rows == []
+
+    rows, _ = search.search("no_1")
+    assert [row["id"] for row in rows] == ["5"]
+
+
+def test_remove_drops_profiles():
+    search = backend()
+    search.remove(["1"])
+
+    rows, total = search.search(interests=["water"])
+    assert [row["id"] for row in rows] == ["3"]
+    assert total == 1
+
+
+def test_search_route_reports_totals_past_the_last_page(app, client):
+    app.extensions["search"].index(PROFILES)
+
+    response = client.get("/api/search/profiles?per_page=2&page=9")
+
+    assert response.status_code == 200
+    assert response.json["data"] == []
+    assert response.json["meta"]["total"] == len(PROFILES)
+    assert response.json["meta"]["pages"] == 3
@@ -0,0 +1,112 @@
+"""
+Fast serialization paths: compiled serializers and the orjson provider
+produce the same bytes as marshmallow and the standard JSON provider.
+"""
+import datetime
+import decimal
+import uuid
+
+import pytest
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+from app.core.schemas import DocumentSchema, ProfileSchema, SpeechSchema
+from app.core.serializers import FastJSONProvider, orjson, serializer
+
+VALUES = [
+    1e16,
+    -1e16,
+    1e-05,
+    0.0001,
+    1.5,
+    12345678901234567890.0,
+    [1e16, 1e-05, 2.5],
+    {"score": 1e-07, "weight": 3e20, "count": 3},
+    "José from Côte d'Ivoire",
+    "del\x7f",
+    {"b": 1, "a": [None, True, "x"]},
+    datetime.datetime(2024, 3, 1, 12, 30, tzinfo=datetime.timezone.utc),
+    datetime.date(2024, 3, 1),
+    uuid.UUID(int=1),
+    decimal.Decimal("1.10"),
+    "1e16",
+    [],
+    {},
+]
+
+
+def _profile(i):
+    return {
+        "id": f"{i:032x}",
+        "username": f"delegate_{i}",
+        "full_name": "Zoë Amarason",
+        "bio": None if i % 2 else "climate and water",
+        "avatar_url": None,
+        "country": "Côte d'Ivoire",
+        "education_level": "university",
+        "interests": ["trade", "energy"][: i % 3],
+        "created_at": "2024-03-01T12:30:00.000000+00:00",
+        "updated_at": datetime.datetime(2024, 3, 2, 8, 0, tzinfo=datetime.timezone.utc),
+    }
+
+
+def _document(i):
+    return {
+        "id": f"{i:032x}",
+        "title": "Position paper",
+        "document_type": "position_paper",
+        "tags": ["water"],
+        "is_public": bool(i % 2),
+        "author_id": f"{i + 1:032x}",
+        "committee_id": None,
+        "revision": i,
+        "created_at": "2024-03-01T12:30:00+00:00",
+        "updated_at": "2024-03-01T12:30:00+00:00",
+    }
+
+
+def _speech(i):
+    return {
+        "id": f"{i:032x}",
+        "title": "Opening speech",
+        "speech_type": "opening",
+        "duration_seconds": 90 + i,
+        "tags": [],
+        "is_public": True,
+        "author_id": f"{i + 1:032x}",
+        "committee_id": f"{i + 2:032x}",
+        "created_at": "2024-03-01T12:30:00+00:00",
+        "updated_at": "2024-03-01T12:30:00+00:00",
+    }
+
+
+@pytest.fixture
+def providers():
+    app = Flask(__name__)
+    # Providers only keep a weak reference to the app
+    with app.app_context():
+        yield DefaultJSONProvider(app), FastJSONProvider(app)
+
+
+@pytest.mark.skipif(orjson is None, reason="orjson is not installed")
+@pytest.mark.parametrize("value", VALUES, ids=repr)
+def test_fast_provider_matches_the_default_provider(providers, value):
+    default, fast = providers
+
+    assert fast.dumps(value, separators=(",", ":")) == default.dumps(value, separators=(",", ":"))
+    assert fast.response(value).get_data() == default.response(value).get_data()
+
+
+@pytest.mark.parametrize("schema_class, exclude, make_row", [
+    (ProfileSchema, (), _profile),
+    (DocumentSchema, ("content",), _document),
+    (SpeechSchema, ("content",), _speech),
+])
+def test_compiled_serializer_matches_marshmallow(schema_class, exclude, make_row):
+    rows = [make_row(i) for i in range(6)]
+    # A missing key is left out by both paths
+    del rows[0]["title" if "title" in rows[0] else "bio"]
+    compiled = serializer(schema_class, exclude=exclude)
+
+    assert [compiled.dump(row) for row in rows] == [schema_class(exclude=exclude).dump(row) for row in rows]
+    assert compiled.dump_many(rows) == schema_class(many=True, exclude=exclude).dump(rows)
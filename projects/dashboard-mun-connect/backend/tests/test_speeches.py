@@ -0,0 +1,54 @@
+"""
+Speech duration estimates on create and update.
+"""
+import pytest
+
+AUTHOR = "11111111-1111-4111-8111-111111111111"
+# 260 words: 120s at 130 wpm (opening), 104s at 150 wpm (moderated caucus)
+CONTENT = "word " * 260
+
+
+@pytest.fixture
+def speech(fake_supabase, client, auth_headers):
+    response = client.post("/api/speeches", headers=auth_headers(AUTHOR), json={
+        "title": "Opening statement", "content": CONTENT, "speech_type": "opening",
+    })
+    yield response.json
+    fake_supabase.tables["speeches"] = []
+
+
+def test_create_estimates_the_duration(speech):
+    assert speech["duration_seconds"] == 120
+
+
+def test_changing_the_type_re_estimates(client, auth_headers, speech):
+    response = client.put(f"/api/speeches/{speech['id']}", headers=auth_headers(AUTHOR), json={
+        "speech_type": "moderated_caucus",
+    })
+
+    assert response.status_code == 200
+    assert response.json["duration_seconds"] == 104
+
+
+def test_changing_the_content_re_estimates(client, auth_headers, speech):
+    response = client.put(f"/api/speeches/{speech['id']}", headers=auth_headers(AUTHOR), json={
+        "content": "word " * 65,
+    })
+
+    assert response.json["duration_seconds"] == 30
+
+
+def test_explicit_duration_wins(client, auth_headers, speech):
+    response = client.put(f"/api/speeches/{speech['id']}", headers=auth_headers(AUTHOR), json={
+        "speech_type": "closing", "duration_seconds": 45,
+    })
+
+    assert response.json["duration_seconds"] == 45
+
+
+def test_other_fields_keep_the_duration(client, auth_headers, speech):
+    response = client.put(f"/api/speeches/{speech['id']}", headers=auth_headers(AUTHOR), json={
+        "title": "Renamed",
+    })
+
+    assert response.json["duration_seconds"] == 120
@@ -0,0 +1,78 @@
+"""
+SQLClient failover, circuit breakers and metrics.
+"""
+import pytest
+
+from app.core.errors import BadRequestError, ServiceUnavailableError
+from app.core.sql import SQLClient, SQLError
+
+
+class Backend:
+    def __init__(self, name, error=None):
+        self.name = name
+        self.error = error
+        self.calls = 0
+
+    def execute(self, query, params):
+        self.calls += 1
+        if self.error is not None:
+            raise self.error
+        return [{"backend": self.name}]
+
+    def close(self):
+        pass
+
+
+def test_fails_over_and_opens_the_breaker(app):
+    down, up = Backend("mcp", RuntimeError("connection refused")), Backend("rpc")
+    client = SQLClient([down, up], failure_threshold=2, reset_timeout=60)
+
+    with app.app_context():
+        results = [client.execute("SELECT 1") for _ in range(3)]
+
+    assert results == [[{"backend": "rpc"}]] * 3
+    assert down.calls == 2
+    stats = client.stats()
+    assert stats["mcp"]["state"] == "open"
+    assert (stats["mcp"]["errors"], stats["mcp"]["rejected"]) == (2, 1)
+    assert stats["rpc"]["calls"] == 3
+
+
+def test_sql_errors_do_not_fail_over(app):
+    bad, other = Backend("mcp", SQLError("syntax error")), Backend("rpc")
+    client = SQLClient([bad, other])
+
+    with app.app_context(), pytest.raises(BadRequestError):
+        client.execute("SELEC 1")
+
+    assert other.calls == 0
+    assert client.stats()["mcp"]["state"] == "closed"
+
+
+def test_all_backends_down(app):
+    client = SQLClient([Backend("rpc", RuntimeError("timeout"))])
+
+    with app.app_context(), pytest.raises(ServiceUnavailableError):
+        client.execute("SELECT 1")
+
+
+def test_prometheus_lines(app):
+    sql = SQLClient([Backend("mcp", RuntimeError("down")), Backend("rpc")], failure_threshold=1)
+    with app.app_context():
+        sql.execute("SELECT 1")
+        sql.execute("SELECT 1")
+
+    lines = sql.prometheus()
+
+    assert 'mun_sql_calls_total{backend="rpc",result="ok"} 2' in lines
+    assert 'mun_sql_calls_total{backend="mcp",result="error"} 1' in lines
+    assert 'mun_sql_calls_total{backend="mcp",result="rejected"} 1' in lines
+    assert 'mun_sql_breaker_state{backend="mcp",state="open"} 1' in lines
+    assert any(line.startswith('mun_sql_latency_seconds{backend="rpc",quantile="0.5"}') for line in lines)
+
+
+def test_metrics_endpoint_includes_sql_stats(client):
+    text = client.get("/metrics").get_data(as_text=True)
+
+    assert 'mun_sql_calls_total{backend="supabase",result="ok"} 0' in text
+    assert 'mun_sql_breaker_state{backend="supabase",state="closed"} 1' in text
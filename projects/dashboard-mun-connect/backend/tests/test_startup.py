@@ -0,0 +1,69 @@
+"""
+Readiness checks: the Postgres check honours its timeout.
+"""
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+import sqlalchemy as sa
+
+from app.core.startup import HealthCheck, _check_postgres
+
+
+class HangingEngine:
+    """Engine whose connections never come out of the pool."""
+
+    dialect = SimpleNamespace(name="postgresql")
+
+    def __init__(self):
+        self.release = threading.Event()
+
+    def connect(self):
+        self.release.wait(5)
+        raise RuntimeError("pool exhausted")
+
+
+@pytest.fixture
+def engine(app):
+    """Swap the repository's engine for the test; restore it afterwards."""
+    previous = app.extensions.get("repository")
+
+    def use(engine):
+        app.extensions["repository"] = SimpleNamespace(engine=engine)
+        return engine
+    yield use
+    if previous is None:
+        app.extensions.pop("repository", None)
+    else:
+        app.extensions["repository"] = previous
+
+
+def test_postgres_check_passes(app, engine):
+    engine(sa.create_engine("sqlite://"))
+
+    with app.app_context():
+        _check_postgres(1)
+
+
+def test_postgres_check_gives_up_after_the_timeout(app, engine):
+    hanging = engine(HangingEngine())
+    health = HealthCheck(app, timeout=0.1)
+    health.register("postgres", _check_postgres)
+
+    started = time.perf_counter()
+    with app.app_context():
+        result = health.run()["postgres"]
+    hanging.release.set()
+
+    assert time.perf_counter() - started < 1
+    assert result.ok is False
+    assert "0.1" in result.error
+
+
+def test_postgres_check_reports_errors(app, engine):
+    hanging = engine(HangingEngine())
+    hanging.release.set()
+
+    with app.app_context(), pytest.raises(RuntimeError, match="pool exhausted"):
+        _check_postgres(1)
@@ -0,0 +1,122 @@
+"""
+Access tokens: the app's own, Supabase tokens under each AUTH_MODE, and the
+flask-jwt-extended hook ``TokenManager`` overrides.
+"""
+import inspect
+import time
+
+import jwt
+import pytest
+from flask_jwt_extended import JWTManager, decode_token
+
+from app.core.tokens import init_supabase_tokens
+
+SECRET = "supabase-jwt-secret-of-at-least-32-bytes"
+
+
+@pytest.fixture
+def supabase_token(app, fake_supabase):
+    """Return a function signing Supabase-style access tokens for a profile."""
+    def sign(user_id, secret=SECRET, expires_in=3600, **claims):
+        now = int(time.time())
+        payload = dict({
+            "iss": f"{app.config['SUPABASE_URL']}/auth/v1",
+            "aud": "authenticated",
+            "sub": user_id,
+            "iat": now,
+            "exp": now + expires_in,
+            "session_id": "session-1",
+        }, **claims)
+        return jwt.encode(payload, secret, algorithm="HS256")
+    return sign
+
+
+def _auth_mode(app, mode):
+    app.config.update(AUTH_MODE=mode, SUPABASE_JWT_SECRET=SECRET)
+    init_supabase_tokens(app)
+
+
+def _bearer(token):
+    return {"Authorization": f"Bearer {token}"}
+
+
+def test_decode_hook_is_still_called(app, supabase_token):
+    # TokenManager overrides this private hook; a flask-jwt-extended upgrade
+    # that renames or reshapes it must fail here rather than bypass Supabase tokens
+    assert list(inspect.signature(JWTManager._decode_jwt_from_config).parameters) == [
+        "self", "encoded_token", "csrf_value", "allow_expired",
+    ]
+    _auth_mode(app, "hybrid")
+
+    with app.app_context():
+        claims = decode_token(supabase_token("user-1"))
+
+    assert claims["jti"] == "session-1"
+    assert app.extensions["supabase_tokens"].misses == 1
+
+
+def test_app_tokens_in_app_mode(client, fake_supabase, auth_headers, supabase_token):
+    profile = fake_supabase.tables["profiles"][1]
+
+    assert client.get("/api/users/profile", headers=auth_headers(profile["id"])).status_code == 200
+    # Supabase tokens are not accepted unless AUTH_MODE asks for them
+    response = client.get("/api/users/profile", headers=_bearer(supabase_token(profile["id"])))
+    assert response.status_code == 422
+
+
+def test_hybrid_mode_accepts_both(app, client, fake_supabase, auth_headers, supabase_token):
+    _auth_mode(app, "hybrid")
+    profile = fake_supabase.tables["profiles"][1]
+
+    own = client.get("/api/users/profile", headers=auth_headers(profile["id"]))
+    supabase = client.get("/api/users/profile", headers=_bearer(supabase_token(profile["id"])))
+
+    assert own.status_code == supabase.status_code == 200
+    assert supabase.json["id"] == profile["id"]
+
+
+def test_supabase_mode_rejects_app_tokens(app, client, fake_supabase, auth_headers, supabase_token):
+    _auth_mode(app, "supabase")
+    profile = fake_supabase.tables["profiles"][1]
+
+    own = client.get("/api/users/profile", headers=auth_headers(profile["id"]))
+    supabase = client.get("/api/users/profile", headers=_bearer(supabase_token(profile["id"])))
+
+    assert own.status_code == 422
+    assert supabase.status_code == 200
+
+
+def test_invalid_supabase_tokens_are_rejected(app, client, fake_supabase, supabase_token):
+    _auth_mode(app, "hybrid")
+    user_id = fake_supabase.tables["profiles"][1]["id"]
+
+    forged = supabase_token(user_id, secret="forged-secret-of-at-least-32-bytes")
+    wrong_audience = supabase_token(user_id, aud="anon")
+    expired = supabase_token(user_id, expires_in=-60)
+
+    # flask-jwt-extended answers 422 for invalid tokens and 401 for expired ones
+    assert client.get("/api/users/profile", headers=_bearer(forged)).status_code == 422
+    assert client.get("/api/users/profile", headers=_bearer(wrong_audience)).status_code == 422
+    assert client.get("/api/users/profile", headers=_bearer(expired)).status_code == 401
+
+
+def test_verified_tokens_are_cached_and_claims_mapped(app, supabase_token):
+    _auth_mode(app, "hybrid")
+    verifier = app.extensions["supabase_tokens"]
+    token = supabase_token("user-1", app_metadata={"role": "admin"})
+
+    with app.app_context():
+        first = verifier.verify(token)
+        second = verifier.verify(token)
+
+    assert first is second
+    assert (verifier.hits, verifier.misses) == (1, 1)
+    assert first["is_admin"] is True
+    assert (first["type"], first["fresh"], first["jti"]) == ("access", False, "session-1")
+
+
+def test_unknown_auth_mode(app):
+    app.config["AUTH_MODE"] = "both"
+
+    with pytest.raises(ValueError):
+        init_supabase_tokens(app)
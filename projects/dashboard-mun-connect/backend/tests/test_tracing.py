@@ -0,0 +1,54 @@
+"""
+Tracing: sampling decisions for incoming traceparents and the metrics token.
+"""
+import pytest
+from flask import Flask
+
+from app.core.tracing import Tracer, init_tracing
+
+TRACE_ID = "4bf92f3577b34da6a3ce929d0e0e4736"
+SAMPLED = f"00-{TRACE_ID}-00f067aa0ba902b7-01"
+
+
+def test_remote_sampled_flag_is_ignored_by_default():
+    root = Tracer().start_request("GET /", SAMPLED)
+
+    assert root.trace is None
+    root.finish()
+
+
+def test_remote_sampled_flag_is_honored_when_trusted():
+    root = Tracer(honor_remote_sampling=True).start_request("GET /", SAMPLED)
+
+    assert root.trace.trace_id == TRACE_ID
+    root.finish()
+
+
+def test_locally_sampled_requests_join_the_remote_trace():
+    unsampled = f"00-{TRACE_ID}-00f067aa0ba902b7-00"
+    root = Tracer(sample_rate=1.0).start_request("GET /", unsampled)
+
+    assert root.trace.trace_id == TRACE_ID
+    assert root.trace.remote_parent_id == "00f067aa0ba902b7"
+    root.finish()
+
+
+def test_sampled_traceparent_is_not_echoed_unless_honored(client):
+    response = client.get("/healthz", headers={"traceparent": SAMPLED})
+
+    assert "traceparent" not in response.headers
+
+
+def test_production_requires_a_metrics_token():
+    app = Flask(__name__)
+    app.config["METRICS_TOKEN_REQUIRED"] = True
+
+    with pytest.raises(RuntimeError):
+        init_tracing(app)
+
+
+def test_metrics_token_is_checked(app, client):
+    app.config["METRICS_TOKEN"] = "secret"
+
+    assert client.get("/metrics").status_code == 401
+    assert client.get("/metrics", headers={"Authorization": "Bearer secret"}).status_code == 200
@@ -215,6 +215,97 @@ app.post('/rest/v1/:table/upsert', async (req, res) => {
   }
 });
 
+// Raw SQL endpoints used by the backend's SQL client (backend/app/core/sql.py).
+// Statement errors return 400 so the client does not fail over on them;
+// connection, pool and server failures return 503 so it does.
+
+// SQLSTATE classes raised by the statement itself: cardinality, data,
+// integrity, syntax/access, unsupported features and PL/pgSQL RAISE
+const STATEMENT_ERROR_CLASSES = new Set(['21', '22', '23', '42', '0A', 'P0']);
+
+function queryErrorStatus(error) {
+  const code = typeof error.code === 'string' && error.code.length === 5 ? error.code : '';
+  return STATEMENT_ERROR_CLASSES.has(code.slice(0, 2)) ? 400 : 503;
+}
+
+app.post('/query', async (req, res) => {
+  try {
+    const { query, params = [] } = req.body;
+    const result = await pool.query(query, params);
+    res.json(result.rows);
+  } catch (error) {
+    console.error('Error executing query:', error);
+    res.status(queryErrorStatus(error)).json({ error: error.message });
+  }
+});
+
+// Runs every statement in one transaction on one connection
+app.post('/query/batch', async (req, res) => {
+  let client;
+  try {
+    client = await pool.connect();
+  } catch (error) {
+    return res.status(503).json({ error: error.message });
+  }
+
+  try {
+    await client.query('BEGIN');
+    const results = [];
+    for (const { query, params = [] } of req.body.statements || []) {
+      const result = await client.query(query, params);
+      results.push(result.rows);
+    }
+    await client.query('COMMIT');
+    res.json({ results });
+  } catch (error) {
+    console.error('Error executing batch:', error);
+    await client.query('ROLLBACK').catch(() => {});
+    res.status(queryErrorStatus(error)).json({ error: error.message });
+  } finally {
+    client.release();
+  }
+});
+
+// Streams rows as newline-delimited JSON through a server-side cursor
+app.post('/query/stream', async (req, res) => {
+  const { query, params = [] } = req.body;
+  const fetchSize = 500;
+  let client;
+  try {
+    client = await pool.connect();
+  } catch (error) {
+    return res.status(503).json({ error: error.message });
+  }
+
+  try {
+    await client.query('BEGIN');
+    await client.query(`DECLARE mcp_stream NO SCROLL CURSOR FOR ${query}`, params);
+  } catch (error) {
+    console.error('Error opening stream:', error);
+    await client.query('ROLLBACK').catch(() => {});
+    client.release();
+    return res.status(queryErrorStatus(error)).json({ error: error.message });
+  }
+
+  res.setHeader('Content-Type', 'application/x-ndjson');
+  try {
+    for (;;) {
+      const { rows } = await client.query(`FETCH ${fetchSize} FROM mcp_stream`);
+      for (const row of rows) {
+        res.write(JSON.stringify(row) + '\n');
+      }
+      if (rows.length < fetchSize) break;
+    }
+    await client.query('COMMIT');
+  } catch (error) {
+    console.error('Error streaming rows:', error);
+    await client.query('ROLLBACK').catch(() => {});
+  } finally {
+    client.release();
+    res.end();
+  }
+});
+
 // Mock Supabase auth endpoints
 app.post('/auth/v1/token', (req, res) => {
   res.json({
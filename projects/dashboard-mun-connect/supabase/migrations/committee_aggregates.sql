@@ -0,0 +1,137 @@
+-- Precomputed per-committee aggregates for the committees API
+-- document_count, speech_count and last_activity_at are kept current by
+-- statement-level triggers on documents and speeches, so a catalogue page
+-- is one indexed read of committees instead of a count per committee.
+ALTER TABLE committees ADD COLUMN IF NOT EXISTS document_count INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE committees ADD COLUMN IF NOT EXISTS speech_count INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE committees ADD COLUMN IF NOT EXISTS last_activity_at TIMESTAMP WITH TIME ZONE;
+
+UPDATE committees SET updated_at = COALESCE(created_at, NOW()) WHERE updated_at IS NULL;
+
+-- Catalogue order: newest conference first, then conference and committee name
+CREATE INDEX IF NOT EXISTS idx_committees_catalogue
+ON committees (conference_date DESC NULLS LAST, conference_name, name, id);
+
+-- Committees of one conference
+CREATE INDEX IF NOT EXISTS idx_committees_conference
+ON committees (conference_name, name, id);
+
+-- Apply the row changes of one statement to the counters. Rows are
+-- aggregated per committee first, so a bulk import updates each committee
+-- once. Deletes lower the counts but do not count as activity.
+-- An update that keeps the committee (e.g. a document autosave bumping
+-- updated_at) leaves the committee row alone unless it moves
+-- last_activity_at forward by at least a minute, so concurrent editors in
+-- one committee do not queue on its row lock; last_activity_at may lag by
+-- up to that minute.
+CREATE OR REPLACE FUNCTION refresh_committee_aggregates()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+  counter TEXT := CASE TG_TABLE_NAME WHEN 'documents' THEN 'document_count' ELSE 'speech_count' END;
+  changes TEXT;
+BEGIN
+  IF TG_OP = 'INSERT' THEN
+    changes := 'SELECT committee_id, 1 AS n, updated_at FROM new_rows';
+  ELSIF TG_OP = 'DELETE' THEN
+    changes := 'SELECT committee_id, -1 AS n, NULL::timestamptz AS updated_at FROM old_rows';
+  ELSE
+    changes := 'SELECT o.committee_id, -1 AS n, NULL::timestamptz AS updated_at
+                FROM old_rows o JOIN new_rows n ON n.id = o.id
+                WHERE o.committee_id IS DISTINCT FROM n.committee_id
+                UNION ALL
+                SELECT n.committee_id,
+                       CASE WHEN o.committee_id IS DISTINCT FROM n.committee_id THEN 1 ELSE 0 END,
+                       n.updated_at
+                FROM old_rows o JOIN new_rows n ON n.id = o.id';
+  END IF;
+
+  EXECUTE format(
+    'UPDATE committees c
+     SET %1$I = GREATEST(c.%1$I + d.n, 0),
+         last_activity_at = GREATEST(c.last_activity_at, d.last_at)
+     FROM (
+       SELECT committee_id, SUM(n)::int AS n, MAX(updated_at) AS last_at
+       FROM (%2$s) rows
+       WHERE committee_id IS NOT NULL
+       GROUP BY committee_id
+     ) d
+     WHERE c.id = d.committee_id
+       AND (
+         d.n <> 0
+         OR (d.last_at IS NOT NULL AND c.last_activity_at IS NULL)
+         OR d.last_at >= c.last_activity_at + INTERVAL ''1 minute''
+       )',
+    counter, changes
+  );
+  RETURN NULL;
+END;
+$$;
+
+-- Transition tables need one trigger per event
+DROP TRIGGER IF EXISTS documents_committee_insert ON documents;
+CREATE TRIGGER documents_committee_insert
+AFTER INSERT ON documents
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION refresh_committee_aggregates();
+
+DROP TRIGGER IF EXISTS documents_committee_update ON documents;
+CREATE TRIGGER documents_committee_update
+AFTER UPDATE ON documents
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION refresh_committee_aggregates();
+
+DROP TRIGGER IF EXISTS documents_committee_delete ON documents;
+CREATE TRIGGER documents_committee_delete
+AFTER DELETE ON documents
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION refresh_committee_aggregates();
+
+DROP TRIGGER IF EXISTS speeches_committee_insert ON speeches;
+CREATE TRIGGER speeches_committee_insert
+AFTER INSERT ON speeches
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION refresh_committee_aggregates();
+
+DROP TRIGGER IF EXISTS speeches_committee_update ON speeches;
+CREATE TRIGGER speeches_committee_update
+AFTER UPDATE ON speeches
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION refresh_committee_aggregates();
+
+DROP TRIGGER IF EXISTS speeches_committee_delete ON speeches;
+CREATE TRIGGER speeches_committee_delete
+AFTER DELETE ON speeches
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION refresh_committee_aggregates();
+
+-- Backfill from the existing rows
+UPDATE committees c
+SET document_count = COALESCE(d.n, 0),
+    speech_count = COALESCE(s.n, 0),
+    last_activity_at = GREATEST(d.last_at, s.last_at)
+FROM committees c2
+LEFT JOIN (
+  SELECT committee_id, COUNT(*)::int AS n, MAX(updated_at) AS last_at FROM documents GROUP BY committee_id
+) d ON d.committee_id = c2.id
+LEFT JOIN (
+  SELECT committee_id, COUNT(*)::int AS n, MAX(updated_at) AS last_at FROM speeches GROUP BY committee_id
+) s ON s.committee_id = c2.id
+WHERE c.id = c2.id;
+
+-- One row per conference, rolled up from the committee counters
+CREATE OR REPLACE VIEW conferences
+WITH (security_invoker = true) AS
+SELECT
+  conference_name AS name,
+  MIN(conference_date) AS starts_on,
+  MAX(conference_date) AS ends_on,
+  COUNT(*)::int AS committee_count,
+  SUM(document_count)::int AS document_count,
+  SUM(speech_count)::int AS speech_count,
+  MAX(last_activity_at) AS last_activity_at
+FROM committees
+GROUP BY conference_name;
@@ -0,0 +1,103 @@
+-- Delta-based document revisions
+-- documents.content holds the text at content_revision (the latest snapshot);
+-- revision is the head. Revisions after content_revision are deltas.
+ALTER TABLE documents
+ADD COLUMN IF NOT EXISTS revision INTEGER NOT NULL DEFAULT 0,
+ADD COLUMN IF NOT EXISTS content_revision INTEGER NOT NULL DEFAULT 0;
+
+CREATE TABLE IF NOT EXISTS document_revisions (
+  document_id UUID NOT NULL REFERENCES documents(id) ON DELETE CASCADE,
+  revision INTEGER NOT NULL,
+  -- Range ops against the previous revision: [{"start", "end", "text"}, ...]
+  ops JSONB,
+  size INTEGER NOT NULL DEFAULT 0,
+  -- Full text, present on snapshot revisions only
+  snapshot BOOLEAN NOT NULL DEFAULT FALSE,
+  content TEXT,
+  created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+  PRIMARY KEY (document_id, revision)
+);
+
+-- Nearest snapshot at or before a revision
+CREATE INDEX IF NOT EXISTS idx_document_revisions_snapshots
+ON document_revisions (document_id, revision DESC)
+WHERE snapshot;
+
+ALTER TABLE document_revisions ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Authors can view their document revisions"
+ON document_revisions FOR SELECT
+USING (EXISTS (
+  SELECT 1 FROM documents d WHERE d.id = document_id AND d.author_id = auth.uid()
+));
+
+-- Revision 0 is a snapshot of the initial content
+CREATE OR REPLACE FUNCTION public.handle_new_document_revision()
+RETURNS TRIGGER AS $$
+BEGIN
+  INSERT INTO document_revisions (document_id, revision, snapshot, content)
+  VALUES (NEW.id, 0, TRUE, NEW.content);
+  RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS on_document_created ON documents;
+CREATE TRIGGER on_document_created
+AFTER INSERT ON documents
+FOR EACH ROW EXECUTE FUNCTION public.handle_new_document_revision();
+
+-- Backfill revision 0 for existing documents
+INSERT INTO document_revisions (document_id, revision, snapshot, content)
+SELECT id, 0, TRUE, content FROM documents
+ON CONFLICT (document_id, revision) DO NOTHING;
+
+-- Store one revision. With p_base_revision set, the save only applies while
+-- it is still the head; with NULL it goes on top of the current head.
+-- p_content makes the revision a snapshot and refreshes documents.content.
+-- Returns no row when nothing was written.
+-- The function bypasses RLS and trusts p_author_id, so only the backend's
+-- service role may call it (see the REVOKE below); the API checks the author.
+CREATE OR REPLACE FUNCTION public.save_document_revision(
+  p_document_id UUID,
+  p_author_id UUID,
+  p_base_revision INTEGER DEFAULT NULL,
+  p_ops TEXT DEFAULT NULL,
+  p_size INTEGER DEFAULT 0,
+  p_content TEXT DEFAULT NULL
+)
+RETURNS TABLE (revision INTEGER, updated_at TIMESTAMP WITH TIME ZONE)
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+  v_revision INTEGER;
+  v_updated_at TIMESTAMP WITH TIME ZONE := NOW();
+BEGIN
+  UPDATE documents d SET
+    revision = d.revision + 1,
+    updated_at = v_updated_at,
+    content = COALESCE(p_content, d.content),
+    content_revision = CASE WHEN p_content IS NULL THEN d.content_revision ELSE d.revision + 1 END
+  WHERE d.id = p_document_id
+    AND d.author_id = p_author_id
+    AND (p_base_revision IS NULL OR d.revision = p_base_revision)
+  RETURNING d.revision INTO v_revision;
+
+  IF NOT FOUND THEN
+    RETURN;
+  END IF;
+
+  INSERT INTO document_revisions (document_id, revision, ops, size, snapshot, content)
+  VALUES (p_document_id, v_revision, p_ops::JSONB, p_size, p_content IS NOT NULL, p_content);
+
+  RETURN QUERY SELECT v_revision, v_updated_at;
+END;
+$$;
+
+-- Functions are executable by PUBLIC by default, which PostgREST would expose
+-- to the anon and authenticated roles
+REVOKE EXECUTE ON FUNCTION public.save_document_revision(UUID, UUID, INTEGER, TEXT, INTEGER, TEXT)
+FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.save_document_revision(UUID, UUID, INTEGER, TEXT, INTEGER, TEXT)
+TO service_role;
@@ -0,0 +1,22 @@
+-- Keyset pagination for the documents API
+-- Listings are ordered by (updated_at DESC, id DESC), so the cursor column must be set
+UPDATE documents SET updated_at = COALESCE(created_at, NOW()) WHERE updated_at IS NULL;
+ALTER TABLE documents ALTER COLUMN updated_at SET NOT NULL;
+
+-- An author's own documents (the default listing)
+CREATE INDEX IF NOT EXISTS idx_documents_author_updated
+ON documents (author_id, updated_at DESC, id DESC);
+
+-- Public documents across all authors
+CREATE INDEX IF NOT EXISTS idx_documents_public_updated
+ON documents (updated_at DESC, id DESC)
+WHERE is_public;
+
+-- Committee listings
+CREATE INDEX IF NOT EXISTS idx_documents_committee_updated
+ON documents (committee_id, updated_at DESC, id DESC)
+WHERE committee_id IS NOT NULL;
+
+-- Tag filters (tags @> '{tag}')
+CREATE INDEX IF NOT EXISTS idx_documents_tags
+ON documents USING GIN (tags);
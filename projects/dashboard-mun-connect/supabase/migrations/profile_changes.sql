@@ -0,0 +1,67 @@
+-- Change feed over profiles for the backend's derived indexes
+-- The feed polls profiles on (updated_at, id), which on_profile_updated keeps
+-- current, reads deleted ids from profile_deletions and stores its watermarks
+-- in change_feed_checkpoints. NOTIFY on profiles_changed lets listeners on a
+-- direct Postgres connection poll as soon as something changes.
+
+-- Feed order: oldest change first
+CREATE INDEX IF NOT EXISTS idx_profiles_updated_at_id
+ON profiles (updated_at, id);
+
+-- Tombstones of deleted profiles; a recreated id replaces its tombstone time
+CREATE TABLE IF NOT EXISTS profile_deletions (
+  id UUID PRIMARY KEY,
+  deleted_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_profile_deletions_deleted_at_id
+ON profile_deletions (deleted_at, id);
+
+CREATE OR REPLACE FUNCTION record_profile_deletion()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+  INSERT INTO profile_deletions (id, deleted_at)
+  VALUES (OLD.id, NOW())
+  ON CONFLICT (id) DO UPDATE SET deleted_at = EXCLUDED.deleted_at;
+  RETURN OLD;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS on_profile_deleted ON profiles;
+CREATE TRIGGER on_profile_deleted
+AFTER DELETE ON profiles
+FOR EACH ROW EXECUTE FUNCTION record_profile_deletion();
+
+-- Wake listening feeds; the payload is informational, the poll is authoritative
+CREATE OR REPLACE FUNCTION notify_profile_change()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  PERFORM pg_notify(
+    'profiles_changed',
+    json_build_object('op', TG_OP, 'id', COALESCE(NEW.id, OLD.id))::text
+  );
+  RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS on_profile_changed ON profiles;
+CREATE TRIGGER on_profile_changed
+AFTER INSERT OR UPDATE OR DELETE ON profiles
+FOR EACH ROW EXECUTE FUNCTION notify_profile_change();
+
+-- Feed watermarks by feed name
+CREATE TABLE IF NOT EXISTS change_feed_checkpoints (
+  name TEXT PRIMARY KEY,
+  watermarks JSONB NOT NULL,
+  saved_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW()
+);
+
+-- Only the backend's service role reads and writes these
+ALTER TABLE profile_deletions ENABLE ROW LEVEL SECURITY;
+ALTER TABLE change_feed_checkpoints ENABLE ROW LEVEL SECURITY;
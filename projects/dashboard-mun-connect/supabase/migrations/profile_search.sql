@@ -0,0 +1,113 @@
+-- Ranked profile search backed by trigram indexes
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- Lower-cased text of every searchable field, maintained by trigger
+-- (array_to_string is not immutable, so this cannot be a generated column)
+ALTER TABLE profiles
+ADD COLUMN IF NOT EXISTS search_text TEXT;
+
+CREATE OR REPLACE FUNCTION public.handle_profile_search_text()
+RETURNS TRIGGER AS $$
+BEGIN
+  NEW.search_text = lower(concat_ws(' ',
+    NEW.username,
+    NEW.full_name,
+    NEW.school,
+    NEW.country,
+    array_to_string(NEW.interests, ' ')
+  ));
+  RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS on_profile_search_text ON profiles;
+CREATE TRIGGER on_profile_search_text
+BEFORE INSERT OR UPDATE OF username, full_name, school, country, interests ON profiles
+FOR EACH ROW EXECUTE FUNCTION public.handle_profile_search_text();
+
+-- Backfill existing rows
+UPDATE profiles SET search_text = lower(concat_ws(' ',
+  username, full_name, school, country, array_to_string(interests, ' ')
+));
+
+-- Trigram indexes serve ILIKE '%q%' and the % similarity operator
+CREATE INDEX IF NOT EXISTS profiles_search_text_trgm_idx ON profiles USING GIN (search_text gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS profiles_username_trgm_idx ON profiles USING GIN (username gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS profiles_full_name_trgm_idx ON profiles USING GIN (full_name gin_trgm_ops);
+
+-- Interest overlap (&&) filter
+CREATE INDEX IF NOT EXISTS profiles_interests_gin_idx ON profiles USING GIN (interests);
+
+-- Ranked, filterable search. Keep the scoring in sync with
+-- backend/app/search/backends.py (SQLiteSearchBackend).
+-- The count is joined onto the page rather than computed over it, so a page
+-- past the end still returns one row: all columns NULL except total_count.
+-- LIKE wildcards in the query are escaped and match literally.
+CREATE OR REPLACE FUNCTION public.search_profiles_ranked(
+  search_query TEXT DEFAULT NULL,
+  country_filter TEXT DEFAULT NULL,
+  education_level_filter TEXT DEFAULT NULL,
+  interests_filter TEXT[] DEFAULT NULL,
+  result_limit INTEGER DEFAULT 10,
+  result_offset INTEGER DEFAULT 0
+)
+RETURNS TABLE (
+  id UUID,
+  username TEXT,
+  full_name TEXT,
+  bio TEXT,
+  avatar_url TEXT,
+  country TEXT,
+  school TEXT,
+  education_level TEXT,
+  interests TEXT[],
+  created_at TIMESTAMPTZ,
+  updated_at TIMESTAMPTZ,
+  rank REAL,
+  total_count BIGINT
+) AS $$
+  WITH term AS (
+    SELECT q, replace(replace(replace(q, '\', '\\'), '%', '\%'), '_', '\_') AS pattern
+    FROM (SELECT NULLIF(lower(trim(search_query)), '') AS q) t
+  ),
+  matches AS (
+    SELECT
+      p.*,
+      CASE WHEN term.q IS NULL THEN 0::REAL ELSE (
+        2.0 * similarity(p.username, term.q)
+        + 1.5 * similarity(coalesce(p.full_name, ''), term.q)
+        + 0.5 * similarity(coalesce(p.school, ''), term.q)
+        + 0.5 * similarity(coalesce(p.country, ''), term.q)
+        + 0.5 * similarity(coalesce(array_to_string(p.interests, ' '), ''), term.q)
+        + CASE WHEN lower(p.username) LIKE term.pattern || '%' THEN 1.0 ELSE 0.0 END
+      )::REAL END AS rank
+    FROM profiles p, term
+    WHERE (
+        term.q IS NULL
+        OR p.search_text LIKE '%' || term.pattern || '%'
+        OR p.username % term.q
+        OR p.full_name % term.q
+      )
+      AND (country_filter IS NULL OR p.country = country_filter)
+      AND (education_level_filter IS NULL OR p.education_level = education_level_filter)
+      AND (interests_filter IS NULL OR p.interests && interests_filter)
+  ),
+  counted AS (
+    SELECT count(*) AS total_count FROM matches
+  ),
+  page AS (
+    SELECT * FROM matches m
+    ORDER BY m.rank DESC, m.username
+    LIMIT result_limit
+    OFFSET result_offset
+  )
+  SELECT
+    page.id, page.username, page.full_name, page.bio, page.avatar_url, page.country, page.school,
+    page.education_level, page.interests, page.created_at, page.updated_at, page.rank,
+    counted.total_count
+  FROM counted
+  LEFT JOIN page ON true
+  ORDER BY page.rank DESC NULLS LAST, page.username;
+$$ LANGUAGE sql STABLE;
+
+GRANT EXECUTE ON FUNCTION public.search_profiles_ranked(TEXT, TEXT, TEXT, TEXT[], INTEGER, INTEGER) TO anon, authenticated;
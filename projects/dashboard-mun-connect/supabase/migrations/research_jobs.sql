@@ -0,0 +1,13 @@
+-- Background execution of research queries
+-- status moves pending -> running -> completed | failed
+UPDATE research_queries SET updated_at = COALESCE(created_at, NOW()) WHERE updated_at IS NULL;
+ALTER TABLE research_queries ALTER COLUMN updated_at SET NOT NULL;
+
+-- A user's queries, newest first (keyset pagination on updated_at, id)
+CREATE INDEX IF NOT EXISTS idx_research_queries_user_updated
+ON research_queries (user_id, updated_at DESC, id DESC);
+
+-- Jobs left unfinished, e.g. by a restarted worker
+CREATE INDEX IF NOT EXISTS idx_research_queries_unfinished
+ON research_queries (created_at)
+WHERE status IN ('pending', 'running');
@@ -0,0 +1,21 @@
+-- Keyset pagination and filters for the speeches API
+-- Listings are ordered by (updated_at DESC, id DESC), so the cursor column must be set
+UPDATE speeches SET updated_at = COALESCE(created_at, NOW()) WHERE updated_at IS NULL;
+ALTER TABLE speeches ALTER COLUMN updated_at SET NOT NULL;
+
+-- An author's own speeches (the default listing)
+CREATE INDEX IF NOT EXISTS idx_speeches_author_updated
+ON speeches (author_id, updated_at DESC, id DESC);
+
+-- Public speeches across all authors
+CREATE INDEX IF NOT EXISTS idx_speeches_public_updated
+ON speeches (updated_at DESC, id DESC)
+WHERE is_public;
+
+-- speech_type and duration range filters
+CREATE INDEX IF NOT EXISTS idx_speeches_type_duration
+ON speeches (speech_type, duration_seconds);
+
+-- Tag filters (tags @> '{tag}')
+CREATE INDEX IF NOT EXISTS idx_speeches_tags
+ON speeches USING GIN (tags);